@@ -319,6 +319,36 @@ def health_ready():
             "reason": str(e)
         }), 503, {"Retry-After": "30"}
 
+def _summary_cache_stats():
+    """Summary cache hit-rate statistics for gated diagnostics"""
+    try:
+        from shared_managers import shared_managers
+        cache = shared_managers.get_summary_cache()
+        return cache.get_stats() if cache else {"enabled": False}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _email_dispatcher_stats():
+    """Email outbox depth and delivery counters for gated diagnostics"""
+    try:
+        from email_dispatcher import get_existing_dispatcher
+        # Never create the outbox or start the worker from a health probe
+        dispatcher = get_existing_dispatcher()
+        return dispatcher.get_stats() if dispatcher else {"started": False}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _log_queue_stats():
+    """Async log queue depth and drop counters for gated diagnostics"""
+    try:
+        from logging_setup import get_log_queue_stats
+        return get_log_queue_stats()
+    except Exception as e:
+        return {"error": str(e)}
+
+
 # Enhanced health check endpoints with gated diagnostics
 @app.route('/healthz')
 def health_check_apprunner():
@@ -339,6 +369,9 @@ def health_check_apprunner():
         basic_health.update({
             "ffmpeg_available": ffmpeg_available,
             "transcript_metrics": transcript_metrics_snapshot(),
+            "summary_cache": _summary_cache_stats(),
+            "email_dispatcher": _email_dispatcher_stats(),
+            "log_queue": _log_queue_stats(),
         })
     
     return jsonify(basic_health), 200
@@ -541,19 +574,34 @@ def metrics_endpoint():
 
 @app.route('/metrics/percentiles')
 def metrics_percentiles():
-    """Stage duration percentiles for dashboard integration"""
+    """Stage duration percentiles for dashboard integration (?window=1m|5m|1h|all)"""
+    from datetime import datetime
+    from flask import request
+    
     try:
-        from transcript_metrics import get_stage_percentiles
+        from transcript_metrics import (
+            get_stage_percentiles, get_labeled_percentiles, get_percentile_windows,
+            DEFAULT_PERCENTILE_WINDOW
+        )
+        
+        window = request.args.get('window', DEFAULT_PERCENTILE_WINDOW)
+        if window not in get_percentile_windows():
+            return jsonify({
+                'error': f'Unknown window {window!r}',
+                'windows': get_percentile_windows()
+            }), 400
         
         # Calculate percentiles for all known stages
         stages = ["yt_api", "timedtext", "youtubei", "asr"]
         percentiles = {}
         
         for stage in stages:
-            percentiles[stage] = get_stage_percentiles(stage)
+            percentiles[stage] = get_stage_percentiles(stage, window)
         
         return jsonify({
+            'window': window,
             'stage_percentiles': percentiles,
+            'label_percentiles': get_labeled_percentiles(window),
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -565,6 +613,97 @@ def metrics_percentiles():
         }), 500
 
 
+def _register_metrics_collectors():
+    """Feed transcript, job and circuit breaker state to /metrics/prom"""
+    from prom_metrics import (
+        register_collector, collect_transcript_metrics, collect_job_metrics,
+        collect_circuit_breaker_metrics, start_snapshot_writer
+    )
+    from routes import job_manager
+    from transcript_service import get_circuit_breaker_status
+    
+    def collect_jobs():
+        return collect_job_metrics(job_manager.get_stats())
+    
+    def collect_circuit_breaker():
+        return collect_circuit_breaker_metrics(get_circuit_breaker_status())
+    
+    register_collector(collect_transcript_metrics)
+    register_collector(collect_jobs)
+    register_collector(collect_circuit_breaker)
+    # Gunicorn workers share their metrics through METRICS_MULTIPROC_DIR snapshots
+    start_snapshot_writer()
+
+
+_register_metrics_collectors()
+
+
+@app.route('/metrics/prom')
+def metrics_prometheus():
+    """OpenMetrics exposition of in-process counters, gauges and histograms for scraping"""
+    from prom_metrics import render_metrics, OPENMETRICS_CONTENT_TYPE
+    
+    try:
+        return render_metrics(), 200, {'Content-Type': OPENMETRICS_CONTENT_TYPE}
+    except Exception as e:
+        logging.error(f"Failed to render metrics: {e}")
+        return f"# Failed to render metrics: {e}\n# EOF\n", 500, {'Content-Type': OPENMETRICS_CONTENT_TYPE}
+
+
+def _profiler_auth_error():
+    """Error response unless the request carries the profiler admin token (404 while no token is configured)"""
+    from flask import request
+    from sampling_profiler import PROFILER_ADMIN_TOKEN, check_admin_token
+    
+    if not PROFILER_ADMIN_TOKEN:
+        return jsonify({'error': 'Profiler is disabled'}), 404
+    if not check_admin_token(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
+
+
+@app.route('/admin/profile')
+def admin_profile():
+    """
+    Sample all threads of this worker for ?seconds= (default 10) at ?hz=
+    and return collapsed stacks for flame graphs (?format=json for a summary,
+    ?idle=1 to keep threads parked waiting for work)
+    """
+    from flask import request
+    from sampling_profiler import PROFILER_DEFAULT_HZ, profile_for
+    
+    auth_error = _profiler_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        hz = float(request.args.get('hz', PROFILER_DEFAULT_HZ))
+        profile = profile_for(seconds, hz=hz, include_idle=request.args.get('idle') == '1')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if profile is None:
+        return jsonify({'error': 'A profile is already running on this worker'}), 409
+    
+    if request.args.get('format') == 'json':
+        return jsonify(dict(profile.to_dict(limit=50), pid=os.getpid())), 200
+    return profile.collapsed(), 200, {'Content-Type': 'text/plain; charset=utf-8',
+                                      'X-Profile-Pid': str(os.getpid()),
+                                      'X-Profile-Samples': str(profile.samples)}
+
+
+@app.route('/admin/profile/jobs/<job_id>', methods=['POST'])
+def admin_profile_job(job_id):
+    """Flag a queued or running job on this worker for profiling; results are attached to job_finished"""
+    from routes import job_manager
+    
+    auth_error = _profiler_auth_error()
+    if auth_error:
+        return auth_error
+    if not job_manager.enable_profiling(job_id):
+        return jsonify({'error': 'Job not found or already finished on this worker'}), 404
+    return jsonify({'job_id': job_id, 'profiling': True}), 202
+
+
 @app.errorhandler(Exception)
 def handle_exc(e):
     from flask import jsonify
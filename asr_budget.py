@@ -0,0 +1,158 @@
+"""
+Duration-aware ASR budgeting.
+
+Bounds how much audio a single video may send through ffmpeg and Deepgram.
+The video duration comes from the YouTube Data API (contentDetails.duration)
+or, failing that, an ffprobe of the resolved stream. Videos longer than
+ASR_MAX_VIDEO_MINUTES are reduced according to ASR_BUDGET_STRATEGY:
+
+- truncate:    transcribe the first N minutes
+- head_tail:   transcribe the opening and the closing of the video
+- speech_only: drop silence with ffmpeg silenceremove, stop after N minutes of speech
+- none:        no budget (full stream)
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from log_events import evt
+from logging_setup import get_logger
+from reliability_config import get_reliability_config
+from ffmpeg_runner import run_process
+
+logger = get_logger(__name__)
+
+_config = get_reliability_config()
+
+ASR_BUDGET_STRATEGIES = ("truncate", "head_tail", "speech_only", "none")
+ASR_BUDGET_STRATEGY = os.getenv("ASR_BUDGET_STRATEGY", "head_tail").lower()
+ASR_HEAD_FRACTION = float(os.getenv("ASR_HEAD_FRACTION", "0.75"))
+FFPROBE_DURATION_TIMEOUT = 20
+
+# Silence below -40dB lasting over 1s is removed in speech_only mode
+SPEECH_ONLY_FILTER = "silenceremove=stop_periods=-1:stop_duration=1:stop_threshold=-40dB"
+
+_ISO8601_DURATION_RE = re.compile(
+    r"^P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$"
+)
+
+
+def parse_iso8601_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a YouTube ISO 8601 duration (e.g. PT1H2M3S) to seconds.
+
+    Returns:
+        Duration in seconds, or None for missing/unparseable values (live
+        streams report P0D, which is treated as unknown)
+    """
+    if not value or not isinstance(value, str):
+        return None
+
+    match = _ISO8601_DURATION_RE.match(value.strip())
+    if not match:
+        return None
+
+    parts = {k: float(v) for k, v in match.groupdict().items() if v}
+    seconds = (parts.get("weeks", 0) * 604800 + parts.get("days", 0) * 86400 +
+               parts.get("hours", 0) * 3600 + parts.get("minutes", 0) * 60 +
+               parts.get("seconds", 0))
+    return seconds or None
+
+
+def probe_duration_seconds(
+    media_url: str,
+    headers_arg: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None
+) -> Optional[float]:
+    """
+    Probe a stream's duration with ffprobe.
+
+    Args:
+        media_url: Stream URL or local path
+        headers_arg: CRLF-joined headers passed with -headers
+        env: Environment (proxy variables) for the subprocess
+
+    Returns:
+        Duration in seconds, or None if it cannot be determined
+    """
+    cmd = ["ffprobe", "-v", "error"]
+    if headers_arg:
+        cmd += ["-headers", headers_arg]
+    cmd += ["-show_entries", "format=duration", "-of", "json", media_url]
+
+    try:
+        result = run_process(cmd, timeout=FFPROBE_DURATION_TIMEOUT, env=env, context="ffprobe_duration")
+        if result.returncode != 0:
+            return None
+        duration = json.loads(result.stdout.decode("utf-8") or "{}").get("format", {}).get("duration")
+        return float(duration) if duration else None
+    except Exception as e:
+        evt("asr_duration_probe_failed", error_type=type(e).__name__, error=str(e)[:200])
+        return None
+
+
+@dataclass
+class AsrPlan:
+    """How much of a video's audio to extract."""
+    strategy: str
+    # (start_s, duration_s) input windows; duration None means to the end
+    segments: List[Tuple[float, Optional[float]]] = field(default_factory=lambda: [(0.0, None)])
+    audio_filter: Optional[str] = None
+    max_output_s: Optional[float] = None
+    video_duration_s: Optional[float] = None
+    budget_s: Optional[float] = None
+
+    @property
+    def trimmed(self) -> bool:
+        """True when the plan transcribes less than the full stream."""
+        return self.strategy != "full"
+
+
+def plan_asr_extraction(
+    duration_s: Optional[float],
+    max_minutes: int = _config.asr_max_video_minutes,
+    strategy: str = ASR_BUDGET_STRATEGY,
+    head_fraction: float = ASR_HEAD_FRACTION
+) -> AsrPlan:
+    """
+    Decide which parts of the audio to send to ASR.
+
+    Args:
+        duration_s: Video duration in seconds (None if unknown)
+        max_minutes: ASR budget per video in minutes
+        strategy: One of ASR_BUDGET_STRATEGIES
+        head_fraction: Share of the budget spent on the opening (head_tail)
+
+    Returns:
+        AsrPlan for _extract_audio_to_wav
+    """
+    budget_s = float(max_minutes * 60)
+
+    if strategy not in ASR_BUDGET_STRATEGIES:
+        logger.warning(f"Unknown ASR_BUDGET_STRATEGY={strategy}, using truncate")
+        strategy = "truncate"
+
+    if strategy == "none" or (duration_s is not None and duration_s <= budget_s):
+        return AsrPlan(strategy="full", video_duration_s=duration_s, budget_s=budget_s)
+
+    if strategy == "speech_only":
+        # Output is capped, so ffmpeg stops reading once the budget of speech is reached
+        return AsrPlan(strategy="speech_only", audio_filter=SPEECH_ONLY_FILTER,
+                       max_output_s=budget_s, video_duration_s=duration_s, budget_s=budget_s)
+
+    if strategy == "head_tail" and duration_s is not None:
+        head_s = round(budget_s * min(max(head_fraction, 0.0), 1.0), 1)
+        tail_s = budget_s - head_s
+        segments = [(0.0, head_s)]
+        if tail_s > 0:
+            segments.append((round(duration_s - tail_s, 1), tail_s))
+        return AsrPlan(strategy="head_tail", segments=segments,
+                       video_duration_s=duration_s, budget_s=budget_s)
+
+    # truncate, or head_tail without a known duration
+    return AsrPlan(strategy="truncate", segments=[(0.0, budget_s)],
+                   video_duration_s=duration_s, budget_s=budget_s)
@@ -0,0 +1,233 @@
+"""
+Cache for resolved audio stream URLs.
+
+Resolving an audio URL means either a full yt-dlp extraction or a Playwright
+playback capture (10-30s). googlevideo URLs carry their own expiry (an
+``expire=`` query parameter, or an ``/expire/<ts>/`` path segment for HLS
+manifests) and are bound to the client IP, so entries are keyed by
+(video_id, proxy session) and kept until shortly before that expiry.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+from log_events import evt
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Refresh this many seconds before the URL's own expiry
+AUDIO_URL_EXPIRY_MARGIN_SECONDS = int(os.getenv("AUDIO_URL_EXPIRY_MARGIN_SECONDS", "120"))
+# TTL for URLs without a parseable expiry
+AUDIO_URL_DEFAULT_TTL_SECONDS = int(os.getenv("AUDIO_URL_DEFAULT_TTL_SECONDS", "300"))
+# Maximum number of cached URLs
+AUDIO_URL_CACHE_MAX_ENTRIES = int(os.getenv("AUDIO_URL_CACHE_MAX_ENTRIES", "256"))
+
+_EXPIRE_PATH_RE = re.compile(r"/expire/(\d+)(?:/|$)")
+
+
+def parse_url_expiry(url: str) -> Optional[float]:
+    """
+    Extract the expiry timestamp from a googlevideo URL.
+
+    Args:
+        url: Audio stream URL (direct videoplayback or HLS/DASH manifest)
+
+    Returns:
+        Unix timestamp or None if the URL carries no expiry
+    """
+    if not url:
+        return None
+
+    try:
+        parsed = urlparse(url)
+        values = parse_qs(parsed.query).get("expire")
+        if values and values[0].isdigit():
+            return float(values[0])
+
+        match = _EXPIRE_PATH_RE.search(parsed.path)
+        if match:
+            return float(match.group(1))
+    except Exception:
+        pass
+
+    return None
+
+
+def video_id_from_url(youtube_url: str) -> str:
+    """Normalize a YouTube URL or bare video ID to the video ID."""
+    if not youtube_url.startswith("http"):
+        return youtube_url
+
+    parsed = urlparse(youtube_url)
+    values = parse_qs(parsed.query).get("v")
+    if values:
+        return values[0]
+    if parsed.netloc.endswith("youtu.be"):
+        return parsed.path.lstrip("/")
+    return youtube_url
+
+
+def proxy_session_key(proxy_manager=None, job_id: Optional[str] = None) -> str:
+    """
+    Identify the proxy session a URL was resolved through.
+
+    googlevideo URLs are IP-bound, so a URL resolved via one sticky session
+    must not be reused from another.
+    """
+    if not proxy_manager or not getattr(proxy_manager, "in_use", False) or not job_id:
+        return "direct"
+    try:
+        return proxy_manager.for_job(job_id) or "direct"
+    except Exception:
+        return "direct"
+
+
+@dataclass
+class CachedAudioUrl:
+    """A resolved audio URL with its expiry and resolution metadata."""
+    url: str
+    expires_at: float
+    source: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class AudioUrlCache:
+    """Thread-safe LRU cache of resolved audio URLs with per-entry expiry."""
+
+    def __init__(self, max_entries: int = AUDIO_URL_CACHE_MAX_ENTRIES,
+                 expiry_margin: int = AUDIO_URL_EXPIRY_MARGIN_SECONDS,
+                 default_ttl: int = AUDIO_URL_DEFAULT_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.expiry_margin = expiry_margin
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[tuple, CachedAudioUrl]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, video_id: str, session: str, source: str) -> Optional[CachedAudioUrl]:
+        """
+        Get a cached URL if present and not about to expire.
+
+        Args:
+            video_id: YouTube video ID
+            session: Proxy session key (see proxy_session_key)
+            source: Resolver that produced the URL (yt_dlp, playwright_hls)
+        """
+        key = (video_id, session, source)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                    self._evictions += 1
+                entry = None
+                self._misses += 1
+
+        if entry is not None:
+            evt("audio_url_cache_hit",
+                video_id=video_id,
+                source=source,
+                ttl_remaining_s=int(entry.expires_at - now))
+        return entry
+
+    def put(self, video_id: str, session: str, source: str, url: str,
+            metadata: Optional[Dict[str, Any]] = None) -> Optional[CachedAudioUrl]:
+        """
+        Cache a resolved URL until shortly before its embedded expiry.
+
+        URLs that are already inside the expiry margin are not cached.
+        """
+        now = time.time()
+        url_expiry = parse_url_expiry(url)
+        if url_expiry is not None:
+            expires_at = url_expiry - self.expiry_margin
+        else:
+            expires_at = now + self.default_ttl
+
+        if expires_at <= now:
+            return None
+
+        entry = CachedAudioUrl(url=url, expires_at=expires_at, source=source,
+                               metadata=dict(metadata or {}))
+        key = (video_id, session, source)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        evt("audio_url_cached",
+            video_id=video_id,
+            source=source,
+            ttl_s=int(expires_at - now),
+            expiry_parsed=url_expiry is not None)
+        return entry
+
+    def invalidate(self, video_id: str, session: Optional[str] = None, reason: str = "") -> int:
+        """
+        Drop cached URLs for a video (optionally for one proxy session).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = [k for k in self._entries
+                    if k[0] == video_id and (session is None or k[1] == session)]
+            for key in keys:
+                del self._entries[key]
+
+        if keys:
+            evt("audio_url_cache_invalidated", video_id=video_id, removed=len(keys), reason=reason)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Clear all entries and statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0,
+            }
+
+
+# Global cache instance
+_audio_url_cache: Optional[AudioUrlCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_url_cache() -> AudioUrlCache:
+    """Get the global audio URL cache instance."""
+    global _audio_url_cache
+    if _audio_url_cache is None:
+        with _cache_lock:
+            if _audio_url_cache is None:
+                _audio_url_cache = AudioUrlCache()
+    return _audio_url_cache
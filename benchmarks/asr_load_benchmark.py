@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+ASR load benchmark.
+
+Drives ASRAudioExtractor.extract_transcript concurrently against synthetic
+audio served over local HTTP and the local Deepgram stand-in, so the ffmpeg,
+temp-file and upload path can be measured without YouTube or Deepgram.
+
+For each concurrency level it reports throughput, per-video latency
+percentiles, peak RSS (this process plus ffmpeg children) and peak
+temp-disk usage.
+
+Usage:
+    python benchmarks/asr_load_benchmark.py --levels 1,5,10,20 --audio-minutes 10
+    python benchmarks/asr_load_benchmark.py --levels 20 --deepgram-latency-ms 2000 --output results.json
+
+Requires ffmpeg on PATH. psutil is optional (RSS is not reported without it).
+"""
+
+import argparse
+import functools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from deepgram_stub import DeepgramStubServer, StubConfig
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def generate_synthetic_audio(path: str, seconds: int) -> None:
+    """Write an AAC file of speech-band noise with periodic tones."""
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.2:sample_rate=48000:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=48000:duration={seconds}",
+            "-filter_complex", "amix=inputs=2",
+            # moov up front like googlevideo audio; the local server has no Range support
+            "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart", path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_audio_server(directory: str) -> ThreadingHTTPServer:
+    """Serve synthetic audio files the way googlevideo would (plain HTTP GET)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ResourceSampler:
+    """Samples RSS of the process tree and temp-dir usage on a background thread."""
+
+    def __init__(self, temp_dir: str, interval: float = 0.2):
+        self.temp_dir = temp_dir
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_temp_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+
+    def _rss_mb(self) -> float:
+        if not self._process:
+            return 0.0
+        rss = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return rss / 1024 / 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, self._rss_mb())
+            self.peak_temp_mb = max(self.peak_temp_mb, _dir_size(self.temp_dir) / 1024 / 1024)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_level(extractor, audio_url: str, concurrency: int, videos: int,
+              audio_seconds: int, temp_dir: str) -> Dict[str, Any]:
+    """Run one concurrency level and collect results."""
+    latencies: List[float] = []
+    successes = 0
+    lock = threading.Lock()
+
+    extractor.bench_audio_url = audio_url
+
+    def _one(index: int) -> None:
+        nonlocal successes
+        start = time.time()
+        text = extractor.extract_transcript(f"bench{concurrency:02d}{index:04d}",
+                                            job_id=f"bench-c{concurrency}-{index}",
+                                            duration_s=audio_seconds)
+        with lock:
+            latencies.append(time.time() - start)
+            if text:
+                successes += 1
+
+    with ResourceSampler(temp_dir) as sampler:
+        wall_start = time.time()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(_one, range(videos)))
+        wall_s = time.time() - wall_start
+
+    return {
+        "concurrency": concurrency,
+        "videos": videos,
+        "successes": successes,
+        "wall_s": round(wall_s, 2),
+        "videos_per_min": round(videos / wall_s * 60, 2),
+        "audio_min_per_min": round(videos * audio_seconds / 60 / wall_s * 60, 2),
+        "latency_p50_s": round(statistics.median(latencies), 2),
+        "latency_p95_s": round(_percentile(latencies, 95), 2),
+        "peak_rss_mb": round(sampler.peak_rss_mb, 1) if PSUTIL_AVAILABLE else None,
+        "peak_temp_mb": round(sampler.peak_temp_mb, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ASR path load benchmark")
+    parser.add_argument("--levels", default="1,5,10,20", help="Comma-separated concurrency levels")
+    parser.add_argument("--videos-per-level", type=int, default=0,
+                        help="Videos per level (default: equal to the concurrency level)")
+    parser.add_argument("--audio-minutes", type=float, default=10)
+    parser.add_argument("--deepgram-latency-ms", type=int, default=500)
+    parser.add_argument("--deepgram-latency-ms-per-audio-minute", type=int, default=100)
+    parser.add_argument("--deepgram-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="Log pipeline events")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg not found on PATH; the ASR benchmark needs it", file=sys.stderr)
+        return 2
+
+    levels = [int(v) for v in args.levels.split(",") if v.strip()]
+    audio_seconds = int(args.audio_minutes * 60)
+
+    work_dir = tempfile.mkdtemp(prefix="asr_bench_")
+    media_dir = os.path.join(work_dir, "media")
+    asr_temp_dir = os.path.join(work_dir, "tmp")
+    os.makedirs(media_dir)
+    os.makedirs(asr_temp_dir)
+
+    stub = DeepgramStubServer(StubConfig(
+        latency_ms=args.deepgram_latency_ms,
+        latency_ms_per_audio_minute=args.deepgram_latency_ms_per_audio_minute,
+        error_rate=args.deepgram_error_rate,
+        response_shape="scaled",
+    )).start()
+
+    # Must be set before transcript_service is imported
+    os.environ["DEEPGRAM_API_URL"] = stub.url
+    os.environ.setdefault("DEEPGRAM_API_KEY", "benchmark-key")
+    os.environ.pop("ASR_AUDIO_EXTRACTOR", None)
+
+    from logging_setup import configure_logging
+    configure_logging(log_level="INFO" if args.verbose else "WARNING", use_json=True)
+
+    from transcript_service import ASRAudioExtractor
+    from ffmpeg_runner import get_governor
+
+    class BenchmarkExtractor(ASRAudioExtractor):
+        """Resolves every video to the locally served synthetic audio."""
+        bench_audio_url = ""
+
+        def _extract_hls_audio_url(self, video_id, proxy_manager=None, cookies=None):
+            return self.bench_audio_url
+
+    audio_server = None
+    results = []
+    try:
+        print(f"Generating {args.audio_minutes:g} min of synthetic audio...")
+        generate_synthetic_audio(os.path.join(media_dir, "audio.m4a"), audio_seconds)
+        audio_server = start_audio_server(media_dir)
+        audio_url = f"http://127.0.0.1:{audio_server.server_address[1]}/audio.m4a"
+
+        # extract_transcript stages WAV files under the default temp dir
+        tempfile.tempdir = asr_temp_dir
+        extractor = BenchmarkExtractor(deepgram_api_key=os.environ["DEEPGRAM_API_KEY"])
+
+        for level in levels:
+            videos = args.videos_per_level or level
+            print(f"Running concurrency={level} videos={videos}...")
+            result = run_level(extractor, audio_url, level, videos, audio_seconds, asr_temp_dir)
+            result["ffmpeg_governor"] = get_governor().get_stats()
+            results.append(result)
+    finally:
+        tempfile.tempdir = None
+        if audio_server:
+            audio_server.shutdown()
+        stub.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    header = f"{'conc':>5} {'ok':>7} {'wall_s':>8} {'vid/min':>8} {'p50_s':>7} {'p95_s':>7} {'rss_mb':>8} {'tmp_mb':>8}"
+    print(header)
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['successes']:>3}/{r['videos']:<3} {r['wall_s']:>8} "
+              f"{r['videos_per_min']:>8} {r['latency_p50_s']:>7} {r['latency_p95_s']:>7} "
+              f"{str(r['peak_rss_mb']):>8} {r['peak_temp_mb']:>8}")
+    print(f"Deepgram stub: {json.dumps(stub.stats.to_dict())}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "audio_minutes": args.audio_minutes,
+                "deepgram_stub": stub.stats.to_dict(),
+                "levels": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Local Deepgram-compatible stand-in for load testing the ASR path.
+
+Implements the subset of the POST /v1/listen contract used by
+ASRAudioExtractor._transcribe_with_deepgram: Token auth, a WAV request
+body, and a JSON response shaped like tests/fixtures/deepgram_success.json.
+
+Latency, error rate and response shape are configurable. Point the app at
+it with DEEPGRAM_API_URL=http://127.0.0.1:<port>/v1/listen.
+
+Usage:
+    python benchmarks/deepgram_stub.py --port 8099 --latency-ms 200 --error-rate 0.05
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests", "fixtures", "deepgram_success.json"
+)
+
+# 16kHz mono 16-bit PCM, as produced by the ASR ffmpeg step
+WAV_BYTES_PER_SECOND = 16000 * 2
+WAV_HEADER_BYTES = 44
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stand-in."""
+    latency_ms: int = 0
+    # Extra processing time per minute of submitted audio (Deepgram scales with length)
+    latency_ms_per_audio_minute: int = 0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # "fixture" (canned transcript), "scaled" (words proportional to audio length) or "empty"
+    response_shape: str = "fixture"
+    require_auth: bool = True
+
+
+class _StubStats:
+    """Thread-safe request counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.audio_seconds = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def begin(self, audio_seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.audio_seconds += audio_seconds
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def end(self, error: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if error:
+                self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "audio_seconds": round(self.audio_seconds, 1),
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+def _load_fixture() -> Dict[str, Any]:
+    with open(FIXTURE_PATH, "r") as f:
+        return json.load(f)
+
+
+def _build_response(config: StubConfig, fixture: Dict[str, Any], audio_seconds: float) -> Dict[str, Any]:
+    """Build a /v1/listen response body."""
+    response = copy.deepcopy(fixture)
+    response["metadata"]["duration"] = round(audio_seconds, 3)
+    alternative = response["results"]["channels"][0]["alternatives"][0]
+
+    if config.response_shape == "empty":
+        alternative["transcript"] = ""
+        alternative["words"] = []
+    elif config.response_shape == "scaled":
+        # ~150 spoken words per minute
+        base_words = alternative["transcript"].split()
+        count = max(1, int(audio_seconds / 60 * 150))
+        alternative["transcript"] = " ".join(base_words[i % len(base_words)] for i in range(count))
+        alternative["words"] = []
+
+    return response
+
+
+def make_handler(config: StubConfig, stats: _StubStats):
+    """Create a request handler class bound to a config."""
+    fixture = _load_fixture()
+
+    class DeepgramStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/v1/listen":
+                self._send_json(404, {"err_code": "NOT_FOUND", "err_msg": "Unknown endpoint"})
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+
+            if config.require_auth and not (self.headers.get("Authorization") or "").startswith("Token "):
+                self._send_json(401, {"err_code": "INVALID_AUTH", "err_msg": "Invalid credentials."})
+                return
+
+            audio_seconds = max(0, len(body) - WAV_HEADER_BYTES) / WAV_BYTES_PER_SECOND
+            stats.begin(audio_seconds)
+            error = random.random() < config.error_rate
+            try:
+                delay_ms = config.latency_ms + config.latency_ms_per_audio_minute * audio_seconds / 60
+                if delay_ms > 0:
+                    time.sleep(delay_ms / 1000)
+
+                if error:
+                    self._send_json(config.error_status, {
+                        "err_code": "STUB_INJECTED_ERROR",
+                        "err_msg": f"Injected {config.error_status} from Deepgram stub"
+                    })
+                else:
+                    self._send_json(200, _build_response(config, fixture, audio_seconds))
+            finally:
+                stats.end(error)
+
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return DeepgramStubHandler
+
+
+class DeepgramStubServer:
+    """In-process stand-in server running on a background thread."""
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.stats = _StubStats()
+        self._server = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/listen"
+
+    def start(self) -> "DeepgramStubServer":
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread (CLI mode)."""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local Deepgram /v1/listen stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--latency-ms-per-audio-minute", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--response-shape", choices=["fixture", "scaled", "empty"], default="fixture")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_ms_per_audio_minute=args.latency_ms_per_audio_minute,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        response_shape=args.response_shape,
+    )
+    server = DeepgramStubServer(config, host=args.host, port=args.port)
+    print(f"Deepgram stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats.to_dict()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
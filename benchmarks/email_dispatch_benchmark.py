@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Digest delivery benchmark against the local Resend stand-in.
+
+Sends --emails digests in three ways and reports how long the job thread is
+blocked per digest, total time until every digest is delivered, and the TCP
+connections the stand-in accepted:
+
+    oneshot  - requests.post per digest (how EmailService sent before the
+               dispatcher: new connection, blocks, no retries)
+    pooled   - ResendClient.send on the calling thread (shared keep-alive session)
+    queued   - EmailDispatcher.submit; delivery and retries on the worker thread
+
+With --error-rate the stand-in injects 503s; oneshot loses those digests,
+queued retries them.
+
+Usage:
+    python benchmarks/email_dispatch_benchmark.py --emails 50 --latency-ms 80 --error-rate 0.1
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from email_dispatcher import EmailDispatcher, EmailOutbox, ResendClient
+from resend_stub import ResendStubServer, StubConfig
+
+PAYLOAD = {
+    "from": "TL;DW <noreply@example.com>",
+    "to": ["user@example.com"],
+    "subject": "TL;DW: benchmark digest",
+    "html": "<p>" + "summary text " * 2000 + "</p>",
+}
+HEADERS = {"Authorization": "Bearer bench-key", "Content-Type": "application/json"}
+
+
+def run_mode(mode: str, args) -> Dict:
+    random.seed(args.seed)
+    config = StubConfig(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    with ResendStubServer(config) as server:
+        blocked: List[float] = []
+        start = time.perf_counter()
+
+        if mode == "oneshot":
+            for _ in range(args.emails):
+                t = time.perf_counter()
+                try:
+                    requests.post(server.url, json=PAYLOAD, headers=HEADERS, timeout=30)
+                except requests.RequestException:
+                    pass
+                blocked.append(time.perf_counter() - t)
+
+        elif mode == "pooled":
+            client = ResendClient("bench-key", api_url=server.url)
+            for _ in range(args.emails):
+                t = time.perf_counter()
+                client.send(PAYLOAD)
+                blocked.append(time.perf_counter() - t)
+            client.close()
+
+        else:
+            client = ResendClient("bench-key", api_url=server.url)
+            dispatcher = EmailDispatcher(EmailOutbox(tempfile.mkdtemp(prefix="outbox_bench_")), client,
+                                         retry_base_seconds=0.05, retry_max_seconds=0.5, poll_seconds=0.05)
+            for _ in range(args.emails):
+                t = time.perf_counter()
+                dispatcher.submit("user@example.com", PAYLOAD)
+                blocked.append(time.perf_counter() - t)
+            deadline = time.time() + 60
+            while time.time() < deadline:
+                counts = dispatcher.outbox.counts()
+                if counts["pending"] == counts["sending"] == 0:
+                    break
+                time.sleep(0.02)
+            dispatcher.stop()
+            client.close()
+
+        stats = server.stats.to_dict()
+        return {
+            "mode": mode,
+            "emails": args.emails,
+            "blocked_median_ms": round(statistics.median(blocked) * 1000, 2),
+            "blocked_total_s": round(sum(blocked), 2),
+            "delivered_s": round(time.perf_counter() - start, 2),
+            "delivered": stats["delivered"],
+            "connections": stats["connections"],
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Digest delivery benchmark")
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--latency-ms", type=int, default=80, help="Stand-in latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of injected 503s")
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in ("oneshot", "pooled", "queued")]
+
+    print(f"{'mode':<8} {'emails':>6} {'blocked_ms':>11} {'blocked_s':>10} {'done_s':>7} {'delivered':>10} {'conns':>6}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['emails']:>6} {r['blocked_median_ms']:>11} {r['blocked_total_s']:>10} "
+              f"{r['delivered_s']:>7} {r['delivered']:>10} {r['connections']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+LLM client scheduling benchmark.
+
+Simulates concurrent summary jobs, each issuing --calls-per-job LLM calls
+(map-reduce chunks), against the local stub backend with a per-window quota:
+
+    naive   - one thread per job calling the backend directly, no limiter or
+              retries (how VideoSummarizer behaved before LLMClient)
+    client  - the same jobs through one shared LLMClient (token buckets,
+              jittered retries, coalescing)
+
+Reports wall time, completed/failed calls and 429s seen by the backend.
+
+Usage:
+    python benchmarks/llm_client_benchmark.py --jobs 8 --calls-per-job 5 --quota 20 --window 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import LLMClient
+from llm_stub import StubLLMBackend, StubLLMConfig
+
+
+def job_prompts(job: int, calls: int, duplicate_jobs: int) -> List[str]:
+    # The first duplicate_jobs jobs summarize the same video
+    video = 0 if job < duplicate_jobs else job
+    return [f"Below is part {i + 1} of {calls} of video {video}. " + "transcript words " * 500 for i in range(calls)]
+
+
+def run_naive(args, config: StubLLMConfig) -> Dict:
+    backend = StubLLMBackend(config)
+
+    def run_job(job: int):
+        results = []
+        for prompt in job_prompts(job, args.calls_per_job, args.duplicate_jobs):
+            try:
+                results.append(asyncio.run(backend.generate(prompt, 600, 0.7)))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        results = [r for job in executor.map(run_job, range(args.jobs)) for r in job]
+    return summarize("naive", start, results, backend)
+
+
+def run_client(args, config: StubLLMConfig) -> Dict:
+    backend = StubLLMBackend(config)
+    # Quota expressed per minute for the client's buckets
+    rpm = int(args.quota * 60 / args.window) if args.quota else 100000
+    client = LLMClient(backend, requests_per_minute=rpm, tokens_per_minute=10 ** 9,
+                       max_concurrency=args.jobs * args.calls_per_job, retry_base_seconds=0.25,
+                       request_burst=args.quota or None)
+
+    def run_job(job: int):
+        return client.generate_many_sync(job_prompts(job, args.calls_per_job, args.duplicate_jobs),
+                                         max_output_tokens=600)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            results = [r for job in executor.map(run_job, range(args.jobs)) for r in job]
+        result = summarize("client", start, results, backend)
+        result["client_stats"] = client.get_stats()
+        return result
+    finally:
+        client.close()
+
+
+def summarize(mode: str, start: float, results: List, backend: StubLLMBackend) -> Dict:
+    failed = sum(1 for r in results if isinstance(r, BaseException))
+    return {
+        "mode": mode,
+        "wall_s": round(time.perf_counter() - start, 2),
+        "calls": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "backend_calls": backend.calls,
+        "backend_429s": backend.rate_limited,
+        "backend_5xx": backend.errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="LLM client scheduling benchmark")
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--calls-per-job", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub latency per call (s)")
+    parser.add_argument("--quota", type=int, default=20, help="Stub requests per window (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=5.0, help="Stub quota window (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub 503s")
+    parser.add_argument("--duplicate-jobs", type=int, default=2, help="Jobs sharing identical prompts")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    config = StubLLMConfig(latency_s=args.latency, quota_requests=args.quota,
+                           quota_window_s=args.window, error_rate=args.error_rate)
+    results = [run_naive(args, config), run_client(args, config)]
+
+    print(f"{'mode':<8} {'wall_s':>7} {'ok':>5} {'failed':>7} {'backend':>8} {'429s':>6} {'5xx':>5}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['wall_s']:>7} {r['succeeded']:>5} {r['failed']:>7} "
+              f"{r['backend_calls']:>8} {r['backend_429s']:>6} {r['backend_5xx']:>5}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
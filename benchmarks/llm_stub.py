@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Gemini used by the LLM client benchmark and tests.
+
+StubLLMBackend plugs into llm_client.LLMClient in place of GeminiBackend. It
+sleeps for a configurable latency, enforces a sliding-window request quota
+(answering 429 like Gemini when exceeded), can inject 503s, and returns a
+deterministic IQ SUMMARY-shaped response, streamed in stream_chunks pieces
+when asked, so client scheduling can be measured without API keys or spend.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import LLMBackend, LLMError
+
+
+@dataclass
+class StubLLMConfig:
+    latency_s: float = 0.5
+    latency_jitter_s: float = 0.1
+    # Requests allowed per quota window before answering 429 (0 = unlimited)
+    quota_requests: int = 0
+    quota_window_s: float = 60.0
+    # Fraction of calls answered with 503
+    error_rate: float = 0.0
+    # Pieces a streamed response is split into (latency is spread across them)
+    stream_chunks: int = 4
+    seed: int = 7
+
+
+class StubLLMBackend(LLMBackend):
+    """In-process fake Gemini with latency, quota and error injection"""
+
+    def __init__(self, config: Optional[StubLLMConfig] = None, model_name: str = "stub-llm"):
+        self.config = config or StubLLMConfig()
+        self.model_name = model_name
+        self._rng = random.Random(self.config.seed)
+        self._window: Deque[float] = deque()
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.active = 0
+        self.peak_active = 0
+
+    def _over_quota(self) -> bool:
+        if not self.config.quota_requests:
+            return False
+        now = time.monotonic()
+        while self._window and now - self._window[0] >= self.config.quota_window_s:
+            self._window.popleft()
+        if len(self._window) >= self.config.quota_requests:
+            return True
+        self._window.append(now)
+        return False
+
+    def _admit(self) -> None:
+        """Count the call and raise the injected 429/503 errors"""
+        self.calls += 1
+        if self._over_quota():
+            self.rate_limited += 1
+            raise LLMError("429 Resource has been exhausted (stub quota)", status=429)
+        if self._rng.random() < self.config.error_rate:
+            self.errors += 1
+            raise LLMError("503 The service is currently unavailable (stub)", status=503)
+
+    def _latency(self) -> float:
+        jitter = self._rng.uniform(-self.config.latency_jitter_s, self.config.latency_jitter_s)
+        return max(0.0, self.config.latency_s + jitter)
+
+    @staticmethod
+    def _response(prompt: str) -> str:
+        return (f"**IQ SUMMARY:**\n\n**High-level statement:** Stub summary of a {len(prompt)} character prompt.\n\n"
+                f"**Main points:**\n- **First point (00:30)**\n  - detail")
+
+    async def generate(self, prompt: str, max_output_tokens: int, temperature: float) -> str:
+        self._admit()
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await asyncio.sleep(self._latency())
+        finally:
+            self.active -= 1
+        return self._response(prompt)
+
+    async def stream(self, prompt: str, max_output_tokens: int, temperature: float):
+        self._admit()
+        text = self._response(prompt)
+        pieces = max(1, self.config.stream_chunks)
+        size = -(-len(text) // pieces)
+        delay = self._latency() / pieces
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            for offset in range(0, len(text), size):
+                await asyncio.sleep(delay)
+                yield text[offset:offset + size]
+        finally:
+            self.active -= 1
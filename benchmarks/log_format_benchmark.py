@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Structured log formatting micro-benchmark.
+
+Builds the LogRecords a job emits per video through evt() (job/stage events,
+the ASR trace block, cache and summary events) and reports the median cost
+per formatted event and the formatter CPU time per video and per second at
+--events-per-sec, for:
+
+    current         - logging_setup.JsonFormatter (orjson when installed)
+    current-stdjson - the same formatter forced onto the stdlib json encoder
+    <ref>           - with --compare-ref, JsonFormatter from that git revision
+
+With --compare-ref the outputs are also checked to be identical record by
+record.
+
+Usage:
+    python benchmarks/log_format_benchmark.py --videos 200
+    python benchmarks/log_format_benchmark.py --videos 200 --compare-ref HEAD~1
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from unittest.mock import patch
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import logging_setup
+
+# (event, fields) emitted for one video that falls through to ASR
+VIDEO_EVENTS = [
+    ("video_processing_start", {"title": "A talk about caching"}),
+    ("stage_start", {"stage": "transcript_cache"}),
+    ("stage_result", {"stage": "transcript_cache", "outcome": "miss", "dur_ms": 2}),
+    ("stage_start", {"stage": "youtube-transcript-api"}),
+    ("stage_result", {"stage": "youtube-transcript-api", "outcome": "no_captions", "dur_ms": 812}),
+    ("stage_start", {"stage": "timedtext", "use_proxy": True, "cookie_source": "s3"}),
+    ("timedtext_attempt_failed", {"lang": "en", "kind": "asr", "status": 404, "attempt": 1}),
+    ("timedtext_all_attempts_failed", {"attempts": 3}),
+    ("stage_result", {"stage": "timedtext", "outcome": "no_captions", "dur_ms": 1430, "use_proxy": True}),
+    ("stage_start", {"stage": "youtubei", "profile": "desktop", "use_proxy": True}),
+    ("youtubei_retry_attempt", {"attempt": 2, "error_type": "timeout", "delay_ms": 500}),
+    ("stage_result", {"stage": "youtubei", "outcome": "timeout", "dur_ms": 15021, "profile": "desktop"}),
+    ("stage_start", {"stage": "asr"}),
+    ("asr_audio_url_cache", {"outcome": "miss"}),
+    ("asr_extract_start", {"method": "hls", "duration_s": 1834.2}),
+    ("asr_download_progress", {"bytes": 14680064, "segments": 120, "elapsed_ms": 3810}),
+    ("asr_extract_done", {"dur_ms": 6120, "audio_bytes": 29360128, "codec": "pcm_s16le"}),
+    ("asr_chunk_plan", {"chunks": 4, "chunk_s": 480, "overlap_s": 2}),
+    ("asr_chunk_submitted", {"chunk": 1, "bytes": 7340032}),
+    ("asr_chunk_done", {"chunk": 1, "dur_ms": 5210, "words": 1210}),
+    ("asr_chunk_done", {"chunk": 2, "dur_ms": 5480, "words": 1188}),
+    ("asr_merge", {"words": 4721, "dedup_words": 19}),
+    ("asr_budget", {"minutes": 30.6, "remaining_minutes": 912.4}),
+    ("stage_result", {"stage": "asr", "outcome": "success", "dur_ms": 24410}),
+    ("summary_cache_miss", {"prompt_version": "3f9c2a1be07d4411", "model": "gemini-2.5-flash"}),
+    ("llm_call", {"model": "gemini-2.5-flash", "prompt_chars": 48210, "dur_ms": 6120, "attempt": 1}),
+    ("video_processed", {"outcome": "success", "transcript_source": "asr", "dur_ms": 46880}),
+]
+
+
+def build_records(videos: int) -> List[logging.LogRecord]:
+    logger = logging.getLogger("bench")
+    records = []
+    for v in range(videos):
+        for event, fields in VIDEO_EVENTS:
+            extra = {"event": event, **fields}
+            if v % 3 == 0:
+                extra["video_id"] = f"vid{v:08d}"
+            records.append(logger.makeRecord("root", logging.INFO, __file__, 0, "", (), None, extra=extra))
+    return records
+
+
+def load_formatter_from_ref(ref: str):
+    source = subprocess.run(["git", "-C", REPO_ROOT, "show", f"{ref}:logging_setup.py"],
+                            check=True, capture_output=True, text=True).stdout
+    path = os.path.join(tempfile.mkdtemp(prefix="logfmt_bench_"), "logging_setup_at_ref.py")
+    with open(path, "w") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location("logging_setup_at_ref", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # Share the job context thread-local so both formatters see the same context
+    module._local = logging_setup._local
+    return module.JsonFormatter()
+
+
+def measure(label: str, formatter, records: List[logging.LogRecord], repeats: int, args) -> Dict:
+    fmt = formatter.format
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for record in records:
+            fmt(record)
+        timings.append(time.perf_counter() - start)
+    per_event_us = statistics.median(timings) / len(records) * 1e6
+    return {
+        "label": label,
+        "events": len(records),
+        "per_event_us": round(per_event_us, 2),
+        "cpu_ms_per_video": round(per_event_us * len(VIDEO_EVENTS) / 1000, 3),
+        # Share of one core spent formatting at the requested event rate
+        "core_pct_at_rate": round(per_event_us * args.events_per_sec / 1e4, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="JsonFormatter micro-benchmark")
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--events-per-sec", type=int, default=2000,
+                        help="Event rate for the core-share column (busy instance)")
+    parser.add_argument("--compare-ref", help="Also measure JsonFormatter at this git revision")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    records = build_records(args.videos)
+    logging_setup.set_job_ctx(job_id="j-bench-0001")
+    current = logging_setup.JsonFormatter()
+
+    results = []
+    if args.compare_ref:
+        reference = load_formatter_from_ref(args.compare_ref)
+        mismatches = sum(1 for r in records if reference.format(r) != current.format(r))
+        print(f"output mismatches vs {args.compare_ref}: {mismatches}/{len(records)}")
+        results.append(measure(args.compare_ref, reference, records, args.repeats, args))
+
+    results.append(measure("current", current, records, args.repeats, args))
+    if logging_setup.ORJSON_AVAILABLE:
+        with patch.object(logging_setup, "_dumps", logging_setup._stdlib_dumps):
+            results.append(measure("current-stdjson", current, records, args.repeats, args))
+
+    print(f"{'formatter':<16} {'events':>7} {'us/event':>9} {'ms/video':>9} {'core%@rate':>11}")
+    for r in results:
+        print(f"{r['label']:<16} {r['events']:>7} {r['per_event_us']:>9} {r['cpu_ms_per_video']:>9} "
+              f"{r['core_pct_at_rate']:>11}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
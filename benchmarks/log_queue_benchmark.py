@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Logging back-pressure benchmark: synchronous vs queued (LOG_ASYNC) output.
+
+--threads job threads each emit --events evt() calls in bursts while the log
+sink is slow (every write call sleeps --write-latency-ms, like a stdout pipe
+whose reader is falling behind). Reports, per mode, the time evt() blocks the
+calling thread (p50/p99/max), total producer wall time, and for the queued
+mode how many records were written, batched and dropped.
+
+Usage:
+    python benchmarks/log_queue_benchmark.py --threads 4 --events 2000 --write-latency-ms 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging_setup
+from log_events import evt
+
+
+class SlowStream:
+    """Discarding text stream whose every write takes write_latency seconds."""
+
+    def __init__(self, write_latency: float):
+        self.write_latency = write_latency
+        self.writes = 0
+        self.chars = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.write_latency)
+        self.writes += 1
+        self.chars += len(text)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def run_mode(mode: str, args) -> Dict:
+    os.environ["LOG_QUEUE_CAPACITY"] = str(args.capacity)
+    logging_setup.configure_logging("INFO", use_json=True, async_mode=(mode == "queued"))
+    # Every evt() record must reach the sink, so the rate limiter is detached
+    for handler in logging.getLogger().handlers:
+        handler.filters.clear()
+    sink = SlowStream(args.write_latency_ms / 1000)
+    if mode == "queued":
+        target = logging_setup._log_writer.handlers[0]
+    else:
+        target = logging.getLogger().handlers[0]
+    target.setStream(sink)
+
+    latencies: List[List[float]] = [[] for _ in range(args.threads)]
+
+    def produce(index: int):
+        logging_setup.set_job_ctx(job_id=f"j-{index}", video_id=f"vid{index:04d}")
+        timings = latencies[index]
+        for i in range(args.events):
+            start = time.perf_counter()
+            evt("asr_chunk_done", chunk=i, dur_ms=5210, words=1210, stage="asr")
+            timings.append(time.perf_counter() - start)
+            if i % args.burst == args.burst - 1:
+                time.sleep(args.pause_ms / 1000)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    producer_s = time.perf_counter() - start
+
+    stats = logging_setup.get_log_queue_stats()
+    logging_setup.configure_logging("WARNING", use_json=True, async_mode=False)  # drains the queue
+    flat = sorted(x for per_thread in latencies for x in per_thread)
+    return {
+        "mode": mode,
+        "events": len(flat),
+        "evt_p50_us": round(statistics.median(flat) * 1e6, 1),
+        "evt_p99_us": round(flat[int(len(flat) * 0.99) - 1] * 1e6, 1),
+        "evt_max_ms": round(flat[-1] * 1000, 2),
+        "producer_s": round(producer_s, 3),
+        "sink_writes": sink.writes,
+        "dropped": stats.get("dropped", 0),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sync vs queued logging benchmark")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--events", type=int, default=2000, help="evt() calls per thread")
+    parser.add_argument("--burst", type=int, default=50, help="Events per burst")
+    parser.add_argument("--pause-ms", type=float, default=5.0, help="Pause between bursts")
+    parser.add_argument("--write-latency-ms", type=float, default=0.2)
+    parser.add_argument("--capacity", type=int, default=10000, help="LOG_QUEUE_CAPACITY for queued mode")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in ("sync", "queued")]
+
+    print(f"{'mode':<7} {'events':>7} {'p50_us':>8} {'p99_us':>8} {'max_ms':>8} {'producer_s':>11} "
+          f"{'writes':>7} {'dropped':>8}")
+    for r in results:
+        print(f"{r['mode']:<7} {r['events']:>7} {r['evt_p50_us']:>8} {r['evt_p99_us']:>8} {r['evt_max_ms']:>8} "
+              f"{r['producer_s']:>11} {r['sink_writes']:>7} {r['dropped']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark on recorded fixtures.
+
+Runs summary jobs the way JobManager._run_summarize_job does: for each
+video, TranscriptService.get_transcript then VideoSummarizer.summarize_video,
+then one EmailService digest per job. Everything runs offline:
+
+    YouTube  - watch page, youtubei/v1/player and timedtext responses replayed
+               from benchmarks/fixtures/youtube_responses.json (youtube_replay.py)
+    LLM      - the stub backend (llm_stub.py) behind the real LLMClient
+    Email    - the local Resend stand-in (resend_stub.py)
+
+The Playwright youtubei method and ASR are switched off (asr_load_benchmark.py
+covers ASR), and video details are not looked up.
+
+For each concurrency level (jobs in flight) it reports job and video latency
+p50/p95, per-stage p50, throughput and peak RSS. --output writes the results
+with the git commit and settings for regression tracking. --baseline compares
+against an earlier results file, and --fail-on-regression exits 1 when a
+metric is worse by more than the given percentage.
+
+With --cache cold (default) every video gets a fresh id, so the transcript
+and summary caches never hit. With --cache warm, jobs reuse ids and only the
+first job does the work.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --levels 1,4,8 --jobs-per-level 16
+    python benchmarks/pipeline_benchmark.py --output new.json --baseline old.json --fail-on-regression 15
+    python benchmarks/pipeline_benchmark.py --record fixtures.json --video-ids <id>,<id>   (live network)
+
+psutil is optional (RSS is not reported without it).
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from asr_load_benchmark import PSUTIL_AVAILABLE, ResourceSampler, _percentile
+from llm_stub import StubLLMBackend, StubLLMConfig
+from resend_stub import ResendStubServer, StubConfig as ResendStubConfig
+from youtube_replay import YouTubeReplay
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "youtube_responses.json")
+
+# Compared against --baseline: metric -> True when higher is better
+TRACKED_METRICS = {
+    "job_p50_s": False,
+    "job_p95_s": False,
+    "video_p50_s": False,
+    "video_p95_s": False,
+    "videos_per_min": True,
+    "peak_rss_mb": False,
+}
+
+NO_TRANSCRIPT_SUMMARY = "No transcript available for this video."
+
+
+def configure_environment(work_dir: str, resend_url: str, cache_mode: str) -> None:
+    """Point the pipeline at the stand-ins; must run before the app modules are imported."""
+    os.environ.update({
+        "ENABLE_YOUTUBEI": "0",
+        "ASR_DISABLED": "true",
+        "USE_PROXIES": "false",
+        "GOOGLE_API_KEY": "benchmark-key",
+        "RESEND_API_KEY": "benchmark-key",
+        "RESEND_API_URL": resend_url,
+        "TRANSCRIPT_CACHE_DIR": os.path.join(work_dir, "transcript_cache"),
+        "SUMMARY_CACHE_DIR": os.path.join(work_dir, "summary_cache"),
+        "SUMMARY_CACHE_ENABLED": "true" if cache_mode == "warm" else "false",
+        "EMAIL_OUTBOX_DIR": os.path.join(work_dir, "email_outbox"),
+    })
+    os.environ.pop("DEEPGRAM_API_KEY", None)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_job(job_id: str, video_ids: List[str], email_mode: str) -> Dict[str, Any]:
+    """One summary job, mirroring JobManager._run_summarize_job without the Flask/user plumbing."""
+    from email_service import EmailService
+    from logging_setup import clear_job_ctx, set_job_ctx
+    from routes import _convert_transcript_to_text
+    from summarizer import VideoSummarizer
+    from transcript_service import TranscriptService
+
+    job_start = time.perf_counter()
+    set_job_ctx(job_id=job_id)
+    ts = TranscriptService()
+    summarizer = VideoSummarizer()
+    email_service = EmailService()
+    videos, items = [], []
+    try:
+        for vid in video_ids:
+            set_job_ctx(job_id=job_id, video_id=vid)
+            video_start = time.perf_counter()
+            segments = ts.get_transcript(vid, job_id=job_id)
+            transcript_s = time.perf_counter() - video_start
+            text = _convert_transcript_to_text(segments)
+
+            summary_start = time.perf_counter()
+            if text and text.strip():
+                summary = summarizer.summarize_video(
+                    transcript_text=text, video_id=vid,
+                    segments=segments if isinstance(segments, list) else None)
+            else:
+                summary = NO_TRANSCRIPT_SUMMARY
+            summary_s = time.perf_counter() - summary_start
+
+            items.append({
+                "video_id": vid,
+                "title": f"Video {vid}",
+                "thumbnail_url": "",
+                "video_url": f"https://www.youtube.com/watch?v={vid}",
+                "summary": summary,
+            })
+            videos.append({
+                "transcript_s": transcript_s,
+                "summary_s": summary_s,
+                "total_s": time.perf_counter() - video_start,
+                "has_transcript": bool(text and text.strip()),
+            })
+
+        email_start = time.perf_counter()
+        if email_mode == "queued":
+            email_ok = email_service.queue_digest_email("bench@example.com", items, job_id=job_id)
+        else:
+            email_ok = email_service.send_digest_email("bench@example.com", items)
+        email_s = time.perf_counter() - email_start
+    finally:
+        clear_job_ctx()
+
+    return {"job_s": time.perf_counter() - job_start, "email_s": email_s, "email_ok": email_ok, "videos": videos}
+
+
+def _wait_for_outbox(timeout_s: float = 120) -> None:
+    from email_dispatcher import get_email_dispatcher
+
+    outbox = get_email_dispatcher().outbox
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        counts = outbox.counts()
+        if counts["pending"] == counts["sending"] == 0:
+            return
+        time.sleep(0.02)
+
+
+def run_level(args, replay: YouTubeReplay, fixture_ids: List[str], concurrency: int,
+              id_counter, work_dir: str, jobs: Optional[int] = None) -> Dict[str, Any]:
+    """Run one concurrency level and collect results."""
+    jobs = jobs or args.jobs_per_level or concurrency * 2
+    job_videos = []
+    for job in range(jobs):
+        ids = []
+        for index in range(args.videos_per_job):
+            fixture_id = fixture_ids[(job + index) % len(fixture_ids)]
+            if args.cache == "warm":
+                video_id = f"bw{(job + index) % len(fixture_ids):09d}"
+            else:
+                video_id = f"bc{next(id_counter):09d}"
+            replay.alias(video_id, fixture_id)
+            ids.append(video_id)
+        job_videos.append(ids)
+
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _one(job: int) -> None:
+        result = run_job(f"bench-c{concurrency}-{job}", job_videos[job], args.email_mode)
+        with lock:
+            results.append(result)
+
+    with ResourceSampler(work_dir) as sampler:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(_one, range(jobs)))
+        if args.email_mode == "queued":
+            _wait_for_outbox()
+        wall_s = time.perf_counter() - wall_start
+
+    job_s = [r["job_s"] for r in results]
+    videos = [v for r in results for v in r["videos"]]
+    video_s = [v["total_s"] for v in videos]
+
+    def p50(values):
+        return round(statistics.median(values), 3) if values else 0.0
+
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "videos": len(videos),
+        "transcripts": sum(1 for v in videos if v["has_transcript"]),
+        "emails_ok": sum(1 for r in results if r["email_ok"]),
+        "wall_s": round(wall_s, 2),
+        "jobs_per_min": round(jobs / wall_s * 60, 2),
+        "videos_per_min": round(len(videos) / wall_s * 60, 2),
+        "job_p50_s": p50(job_s),
+        "job_p95_s": round(_percentile(job_s, 95), 3),
+        "video_p50_s": p50(video_s),
+        "video_p95_s": round(_percentile(video_s, 95), 3),
+        "transcript_p50_s": p50([v["transcript_s"] for v in videos]),
+        "summary_p50_s": p50([v["summary_s"] for v in videos]),
+        "email_p50_s": p50([r["email_s"] for r in results]),
+        "peak_rss_mb": round(sampler.peak_rss_mb, 1) if PSUTIL_AVAILABLE else None,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold_pct: Optional[float]) -> List[str]:
+    """Print per-level changes against a baseline results file; returns the regressions."""
+    base_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    print(f"\nAgainst baseline {baseline.get('git_commit') or '?'} ({baseline.get('timestamp', '?')}):")
+    print(f"{'conc':>5} {'metric':<16} {'baseline':>10} {'now':>10} {'change':>9}")
+    for level in results:
+        base = base_levels.get(level["concurrency"])
+        if not base:
+            continue
+        for metric, higher_is_better in TRACKED_METRICS.items():
+            old, new = base.get(metric), level.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if threshold_pct is not None and worse > threshold_pct:
+                flag = "  REGRESSION"
+                regressions.append(f"c={level['concurrency']} {metric} {change:+.1f}%")
+            print(f"{level['concurrency']:>5} {metric:<16} {old:>10} {new:>10} {change:>+8.1f}%{flag}")
+    return regressions
+
+
+def record_fixtures(args) -> int:
+    """Fetch live responses for --video-ids through the pipeline and save them as fixtures."""
+    work_dir = tempfile.mkdtemp(prefix="pipeline_record_")
+    configure_environment(work_dir, "http://127.0.0.1:9/emails", "cold")
+    from logging_setup import configure_logging
+    configure_logging(log_level="WARNING", use_json=True)
+    from transcript_service import TranscriptService
+
+    replay = YouTubeReplay(record=True)
+    try:
+        with replay:
+            ts = TranscriptService()
+            for video_id in [v.strip() for v in args.video_ids.split(",") if v.strip()]:
+                segments = ts.get_transcript(video_id)
+                replay.videos[video_id] = {"segments": len(segments) if isinstance(segments, list) else 0}
+                print(f"{video_id}: {replay.videos[video_id]['segments']} segments")
+        replay.save(args.record)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"Recorded {len(replay.interactions)} responses to {args.record}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark on recorded fixtures")
+    parser.add_argument("--levels", default="1,4,8", help="Comma-separated concurrency levels (jobs in flight)")
+    parser.add_argument("--jobs-per-level", type=int, default=0, help="Jobs per level (default: 2x the level)")
+    parser.add_argument("--videos-per-job", type=int, default=3)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--youtube-latency-ms", type=int, default=60, help="Added to every replayed response")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub LLM latency per call (s)")
+    parser.add_argument("--email-latency-ms", type=int, default=80)
+    parser.add_argument("--email-mode", choices=("direct", "queued"), default="direct")
+    parser.add_argument("--cache", choices=("cold", "warm"), default="cold")
+    parser.add_argument("--warmup-jobs", type=int, default=1,
+                        help="Untimed jobs run first so imports and client setup are not measured")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PCT",
+                        help="Exit 1 if a tracked metric is worse than the baseline by more than PCT percent")
+    parser.add_argument("--record", metavar="PATH", help="Record live responses for --video-ids to PATH and exit")
+    parser.add_argument("--video-ids", default="", help="Videos to record")
+    parser.add_argument("--verbose", action="store_true", help="Log pipeline events")
+    args = parser.parse_args()
+
+    if args.record:
+        return record_fixtures(args)
+
+    levels = [int(v) for v in args.levels.split(",") if v.strip()]
+    replay = YouTubeReplay.from_file(args.fixtures, latency_ms=args.youtube_latency_ms)
+    fixture_ids = [video_id for video_id, _ in replay.fixture_videos()]
+    work_dir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    resend = ResendStubServer(ResendStubConfig(latency_ms=args.email_latency_ms)).start()
+    configure_environment(work_dir, resend.url, args.cache)
+
+    from logging_setup import configure_logging
+    configure_logging(log_level="INFO" if args.verbose else "WARNING", use_json=True)
+
+    import llm_client
+    backend = StubLLMBackend(StubLLMConfig(latency_s=args.llm_latency, latency_jitter_s=args.llm_latency / 5))
+    llm_client._client = llm_client.LLMClient(backend)
+
+    results = []
+    id_counter = itertools.count()
+    try:
+        with replay:
+            if args.warmup_jobs:
+                print(f"Warming up ({args.warmup_jobs} job(s))...")
+                run_level(args, replay, fixture_ids, 1, id_counter, work_dir, jobs=args.warmup_jobs)
+            for level in levels:
+                print(f"Running concurrency={level}...")
+                results.append(run_level(args, replay, fixture_ids, level, id_counter, work_dir))
+    finally:
+        llm_client._client.close()
+        resend.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'conc':>5} {'jobs':>5} {'videos':>7} {'wall_s':>7} {'vid/min':>8} {'job_p50':>8} {'job_p95':>8} "
+          f"{'vid_p50':>8} {'vid_p95':>8} {'tx_p50':>7} {'sum_p50':>8} {'rss_mb':>7}")
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['jobs']:>5} {r['transcripts']:>3}/{r['videos']:<3} {r['wall_s']:>7} "
+              f"{r['videos_per_min']:>8} {r['job_p50_s']:>8} {r['job_p95_s']:>8} {r['video_p50_s']:>8} "
+              f"{r['video_p95_s']:>8} {r['transcript_p50_s']:>7} {r['summary_p50_s']:>8} {str(r['peak_rss_mb']):>7}")
+    stubs = {"youtube": replay.stats(), "llm": {"calls": backend.calls, "peak_active": backend.peak_active},
+             "email": resend.stats.to_dict()}
+    print(f"Stand-ins: {json.dumps(stubs)}")
+
+    report = {
+        "benchmark": "pipeline",
+        "git_commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "baseline", "fail_on_regression", "record", "video_ids", "verbose")},
+        "stubs": stubs,
+        "levels": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.fail_on_regression)
+        if regressions and args.fail_on_regression is not None:
+            print(f"Regressions beyond {args.fail_on_regression:g}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local Resend-compatible stand-in for email delivery tests and benchmarks.
+
+Implements the subset of POST /emails used by email_dispatcher.ResendClient:
+Bearer auth, a JSON body with from/to/subject/html, and a {"id": ...} reply.
+Latency, injected failures (a fixed number of leading failures and/or a
+random error rate, optionally with Retry-After) are configurable. Accepted
+messages are recorded, and new TCP connections are counted so connection
+reuse can be checked.
+
+Point the app at it with RESEND_API_URL=http://127.0.0.1:<port>/emails.
+
+Usage:
+    python benchmarks/resend_stub.py --port 8098 --latency-ms 150 --error-rate 0.1
+"""
+
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stand-in."""
+    latency_ms: int = 0
+    # The first fail_first requests are answered with error_status
+    fail_first: int = 0
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Sent with injected 429/5xx answers when set
+    retry_after_s: Optional[float] = None
+    require_auth: bool = True
+
+
+class _StubStats:
+    """Thread-safe request counters and the accepted messages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.messages: List[Dict[str, Any]] = []
+
+    def connect(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def begin(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def record(self, message: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if message is None:
+                self.errors += 1
+            else:
+                self.messages.append(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "delivered": len(self.messages),
+                "connections": self.connections,
+            }
+
+
+def make_handler(config: StubConfig, stats: _StubStats):
+    """Create a request handler class bound to a config."""
+
+    class ResendStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Headers and body go out in separate writes; without this, Nagle plus
+            # delayed ACK stalls every response on a kept-alive connection
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stats.connect()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+
+            if self.path.split("?")[0] != "/emails":
+                self._send_json(404, {"name": "not_found", "message": "Unknown endpoint"})
+                return
+
+            if config.require_auth and not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                self._send_json(401, {"name": "missing_api_key", "message": "Missing API key in the authorization header"})
+                return
+
+            number = stats.begin()
+            if config.latency_ms > 0:
+                time.sleep(config.latency_ms / 1000)
+
+            if number <= config.fail_first or random.random() < config.error_rate:
+                stats.record(None)
+                headers = {}
+                if config.retry_after_s is not None:
+                    headers["Retry-After"] = str(config.retry_after_s)
+                self._send_json(config.error_status, {
+                    "name": "stub_injected_error",
+                    "message": f"Injected {config.error_status} from Resend stub"
+                }, headers)
+                return
+
+            try:
+                message = json.loads(body or b"{}")
+            except ValueError:
+                self._send_json(422, {"name": "validation_error", "message": "Invalid JSON body"})
+                return
+            missing = [field for field in ("from", "to", "subject", "html") if not message.get(field)]
+            if missing:
+                self._send_json(422, {"name": "validation_error", "message": f"Missing fields: {missing}"})
+                return
+
+            message_id = str(uuid.uuid4())
+            stats.record(dict(message, id=message_id))
+            self._send_json(200, {"id": message_id})
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return ResendStubHandler
+
+
+class ResendStubServer:
+    """In-process stand-in server running on a background thread."""
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.stats = _StubStats()
+        self._server = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/emails"
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        return list(self.stats.messages)
+
+    def start(self) -> "ResendStubServer":
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread (CLI mode)."""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local Resend /emails stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        fail_first=args.fail_first,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after_s=args.retry_after,
+    )
+    server = ResendStubServer(config, host=args.host, port=args.port)
+    print(f"Resend stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats.to_dict()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Stage metrics store benchmark.
+
+Records --records stage durations (log-normal, four stages, proxy/profile
+labels, a new video_id per record) through transcript_metrics and reports:
+
+    record_us     - median cost of record_stage_metrics (log output disabled)
+    query_us      - median cost of get_stage_percentiles for one stage
+    metrics_ms    - median cost of get_comprehensive_metrics
+    heap_kb       - Python heap held by the store after recording (tracemalloc)
+    p95_err_pct   - relative error of the asr p95 against the exact p95 of
+                    every recorded asr sample
+
+With --compare-ref the same run is made against transcript_metrics at that
+git revision (the list-based store keeps only the last 1000 samples per
+stage, so its p95 error reflects that truncation).
+
+Usage:
+    python benchmarks/stage_metrics_benchmark.py --records 50000
+    python benchmarks/stage_metrics_benchmark.py --records 50000 --compare-ref HEAD~1
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import transcript_metrics
+
+STAGES = ("yt_api", "timedtext", "youtubei", "asr")
+# Median stage duration in ms
+STAGE_MEDIANS = {"yt_api": 400, "timedtext": 900, "youtubei": 3000, "asr": 25000}
+PROFILES = ("desktop", "mobile", None)
+
+
+def load_module_from_ref(ref: str):
+    source = subprocess.run(["git", "-C", REPO_ROOT, "show", f"{ref}:transcript_metrics.py"],
+                            check=True, capture_output=True, text=True).stdout
+    path = os.path.join(tempfile.mkdtemp(prefix="stage_metrics_bench_"), "transcript_metrics_at_ref.py")
+    with open(path, "w") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location("transcript_metrics_at_ref", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The list-based store's get_comprehensive_metrics re-acquires its
+    # non-reentrant lock; give it a reentrant one so it can be measured
+    module._lock = threading.RLock()
+    return module
+
+
+def build_samples(count: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        stage = rng.choice(STAGES)
+        samples.append({
+            "video_id": f"vid{i:08d}",
+            "stage": stage,
+            "duration_ms": int(rng.lognormvariate(0, 0.6) * STAGE_MEDIANS[stage]),
+            "success": rng.random() < 0.7,
+            "proxy_used": rng.random() < 0.5,
+            "profile": rng.choice(PROFILES),
+        })
+    return samples
+
+
+def exact_p95(values: List[int]) -> float:
+    ordered = sorted(values)
+    return ordered[round(0.95 * (len(ordered) - 1))]
+
+
+def run(label: str, module, samples: List[Dict], args) -> Dict:
+    record = module.record_stage_metrics
+
+    # Heap in its own pass; tracemalloc slows every allocation down
+    module.reset_metrics()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for sample in samples:
+        record(**sample)
+    heap_kb = (tracemalloc.get_traced_memory()[0] - before) / 1024
+    tracemalloc.stop()
+
+    module.reset_metrics()
+    timings = []
+    for sample in samples:
+        start = time.perf_counter()
+        record(**sample)
+        timings.append(time.perf_counter() - start)
+
+    query_timings = []
+    for _ in range(args.queries):
+        start = time.perf_counter()
+        p = module.get_stage_percentiles("asr")
+        query_timings.append(time.perf_counter() - start)
+
+    metrics_timings = []
+    for _ in range(max(1, args.queries // 20)):
+        start = time.perf_counter()
+        module.get_comprehensive_metrics()
+        metrics_timings.append(time.perf_counter() - start)
+
+    exact = exact_p95([s["duration_ms"] for s in samples if s["stage"] == "asr"])
+    return {
+        "label": label,
+        "records": len(samples),
+        "record_us": round(statistics.median(timings) * 1e6, 2),
+        "query_us": round(statistics.median(query_timings) * 1e6, 2),
+        "metrics_ms": round(statistics.median(metrics_timings) * 1000, 3),
+        "heap_kb": round(heap_kb, 1),
+        "p95": p["p95"],
+        "p95_exact": exact,
+        "p95_err_pct": round(abs(p["p95"] - exact) / exact * 100, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stage metrics store benchmark")
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--compare-ref", help="Also measure transcript_metrics at this git revision")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # Measure the store, not the stage_success/stage_failure log lines
+    logging.disable(logging.CRITICAL)
+    samples = build_samples(args.records, args.seed)
+
+    results = []
+    if args.compare_ref:
+        results.append(run(args.compare_ref, load_module_from_ref(args.compare_ref), samples, args))
+    results.append(run("current", transcript_metrics, samples, args))
+
+    print(f"{'store':<10} {'records':>8} {'record_us':>10} {'query_us':>9} {'metrics_ms':>11} "
+          f"{'heap_kb':>9} {'p95':>9} {'exact':>9} {'err%':>6}")
+    for r in results:
+        print(f"{r['label']:<10} {r['records']:>8} {r['record_us']:>10} {r['query_us']:>9} {r['metrics_ms']:>11} "
+              f"{r['heap_kb']:>9} {r['p95']:>9} {r['p95_exact']:>9} {r['p95_err_pct']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
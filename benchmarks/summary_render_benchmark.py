@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Summary and digest rendering micro-benchmark.
+
+Renders --items synthetic summaries the way a job does and reports, per
+digest, the median and p95 time and the tracemalloc peak of two stages:
+
+    summaries    - VideoSummarizer._add_timestamp_links plus
+                   EmailService._format_summary_html for every item
+    digest_cold  - the full EmailService._generate_email_html document with
+                   an empty card cache (first digest for these videos)
+    digest_warm  - the same digest again (cards served from the cache)
+
+With --compare-ref, summarizer.py and email_service.py are also loaded from
+that git revision (e.g. the commit before the shared renderer) and measured
+on the same input.
+
+Usage:
+    python benchmarks/summary_render_benchmark.py --items 50
+    python benchmarks/summary_render_benchmark.py --items 50 --compare-ref HEAD~1
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+STAGES = ("summaries", "digest_cold", "digest_warm")
+
+_WORDS = ("the speaker argues that caching & batching reduce latency while <careful> tuning of "
+          "\"hot\" paths keeps costs down for every request in the system").split()
+
+
+def synthetic_summary(rng: random.Random, points: int = 6) -> str:
+    def sentence(n):
+        return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+    lines = ["**IQ SUMMARY:**", "", f"**High-level statement:** {sentence(40)}", "", "**Main points:**"]
+    for i in range(points):
+        minutes = 2 * i + rng.randint(0, 1)
+        lines.append(f"- **{sentence(8)} ({minutes:02d}:{rng.randint(0, 59):02d})**")
+        lines.extend(f"  - {sentence(14)}" for _ in range(rng.randint(2, 3)))
+    return "\n".join(lines)
+
+
+def load_modules_from_ref(ref: str):
+    """Import summarizer/email_service as they were at a git revision"""
+    modules = {}
+    tmpdir = tempfile.mkdtemp(prefix="render_bench_")
+    for name in ("summarizer", "email_service"):
+        source = subprocess.run(["git", "-C", REPO_ROOT, "show", f"{ref}:{name}.py"],
+                                check=True, capture_output=True, text=True).stdout
+        path = os.path.join(tmpdir, f"{name}_{ref.replace('~', '_').replace('/', '_')}.py")
+        with open(path, "w") as f:
+            f.write(source)
+        spec = importlib.util.spec_from_file_location(f"{name}_at_ref", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules[name] = module
+    return modules["summarizer"], modules["email_service"]
+
+
+def measure(label: str, summarizer_module, email_module, summaries: List[str], repeats: int) -> Dict:
+    summarizer = summarizer_module.VideoSummarizer.__new__(summarizer_module.VideoSummarizer)
+    email = email_module.EmailService.__new__(email_module.EmailService)
+
+    items = [{
+        "title": f"Video {i}",
+        "thumbnail_url": f"https://i.ytimg.com/vi/vid{i}/hqdefault.jpg",
+        "video_url": f"https://www.youtube.com/watch?v=vid{i}",
+        "summary": summarizer._add_timestamp_links(summary, f"vid{i}"),
+    } for i, summary in enumerate(summaries)]
+
+    def render_summaries():
+        return [email._format_summary_html(summarizer._add_timestamp_links(summary, f"vid{i}"))
+                for i, summary in enumerate(summaries)]
+
+    clear_cache = getattr(email_module, "clear_card_cache", lambda: None)
+
+    def render_digest_cold():
+        clear_cache()
+        return email._generate_email_html(items)
+
+    def render_digest_warm():
+        return email._generate_email_html(items)
+
+    result = {"label": label, "items": len(summaries), "html_chars": len(render_digest_cold())}
+    for stage, render in zip(STAGES, (render_summaries, render_digest_cold, render_digest_warm)):
+        render()  # warm up
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result[stage] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1], 3),
+            "peak_alloc_kib": round(peak / 1024, 1),
+        }
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Summary rendering micro-benchmark")
+    parser.add_argument("--items", type=int, default=50, help="Summaries per digest")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--compare-ref", help="Also measure summarizer/email_service at this git revision")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    summaries = [synthetic_summary(rng) for _ in range(args.items)]
+
+    import email_service
+    import summarizer
+    results = [measure("current", summarizer, email_service, summaries, args.repeats)]
+    if args.compare_ref:
+        old_summarizer, old_email = load_modules_from_ref(args.compare_ref)
+        results.insert(0, measure(args.compare_ref, old_summarizer, old_email, summaries, args.repeats))
+
+    print(f"{'revision':<12} {'stage':<12} {'items':>6} {'median_ms':>10} {'p95_ms':>8} {'peak_KiB':>9}")
+    for r in results:
+        for stage in STAGES:
+            m = r[stage]
+            print(f"{r['label']:<12} {stage:<12} {r['items']:>6} {m['median_ms']:>10} {m['p95_ms']:>8} "
+                  f"{m['peak_alloc_kib']:>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Transcript compaction benchmark.
+
+Compares the summarization prompt built from the raw transcript (segments
+joined with spaces, as before compaction) with the compacted prompt:
+characters, estimated tokens and compaction time. With --live, each prompt is
+also sent to Gemini and the generate_content latency is reported.
+
+Transcript sources:
+    --input FILE...       JSON files holding a segment list or {"captions": [...]}
+                          (e.g. youtube-transcript-api output saved to disk)
+    --video-ids ID...     fetch real transcripts via youtube-transcript-api
+    --synthetic-minutes   auto-caption-style cues (rolling overlaps, fillers,
+                          sound tags) for the given durations
+
+Usage:
+    python benchmarks/transcript_compaction_benchmark.py --synthetic-minutes 10,60,180
+    python benchmarks/transcript_compaction_benchmark.py --video-ids dQw4w9WgXcQ --live
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_compactor import compact_transcript, estimate_tokens
+
+_VOCABULARY = (
+    "so today we are going to look at how the system handles caching and why "
+    "latency matters when you have a lot of requests coming in at the same time "
+    "the first thing to understand is that every request goes through the queue "
+    "and then the worker picks it up and processes the data before returning it"
+).split()
+_FILLERS = ["um", "uh", "you know", "like"]
+
+
+def synthetic_auto_captions(minutes: int, seed: int = 7) -> List[Dict]:
+    """Generate cues resembling YouTube auto-captions."""
+    rng = random.Random(seed)
+    cues = []
+    t = 0.0
+    previous: List[str] = []
+    while t < minutes * 60:
+        words = [rng.choice(_VOCABULARY) for _ in range(rng.randint(5, 10))]
+        if rng.random() < 0.15:
+            words.insert(rng.randrange(len(words)), rng.choice(_FILLERS))
+        if previous and rng.random() < 0.35:
+            # Rolling cue: repeats the tail of the previous line
+            words = previous[-rng.randint(2, 4):] + words
+        if rng.random() < 0.03:
+            words = ["[Music]"]
+        duration = round(rng.uniform(1.5, 4.0), 2)
+        cues.append({"text": " ".join(words), "start": round(t, 2), "duration": duration})
+        previous = words
+        t += duration
+    return cues
+
+
+def load_input_file(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("captions") or data.get("segments") or []
+    return data
+
+
+def fetch_transcript(video_id: str) -> List[Dict]:
+    from youtube_transcript_api_compat import get_transcript
+    return get_transcript(video_id, ["en"])
+
+
+def raw_prompt_text(segments: List[Dict]) -> str:
+    """Transcript text as it was sent before compaction."""
+    return " ".join(segment.get("text", "") for segment in segments)
+
+
+def measure(name: str, segments: List[Dict], live_model=None) -> Dict:
+    from summarizer import build_summary_prompt
+
+    raw_text = raw_prompt_text(segments)
+    start = time.perf_counter()
+    compacted = compact_transcript(segments)
+    compaction_ms = (time.perf_counter() - start) * 1000
+
+    raw_prompt = build_summary_prompt(raw_text)
+    compact_prompt = build_summary_prompt(compacted.text, compacted.has_timestamps)
+
+    result = {
+        "name": name,
+        "cues": len(segments),
+        "raw_prompt_chars": len(raw_prompt),
+        "raw_prompt_tokens": estimate_tokens(raw_prompt),
+        "compact_prompt_chars": len(compact_prompt),
+        "compact_prompt_tokens": estimate_tokens(compact_prompt),
+        "reduction": round(1 - len(compact_prompt) / len(raw_prompt), 3) if raw_prompt else 0.0,
+        "compaction_ms": round(compaction_ms, 1),
+        "trimmed": compacted.trimmed,
+    }
+
+    if live_model is not None:
+        for label, prompt in (("raw", raw_prompt), ("compact", compact_prompt)):
+            start = time.perf_counter()
+            try:
+                live_model.generate_content(prompt, generation_config={"temperature": 0.7, "max_output_tokens": 1500})
+                result[f"{label}_llm_s"] = round(time.perf_counter() - start, 2)
+            except Exception as e:
+                result[f"{label}_llm_s"] = None
+                result[f"{label}_llm_error"] = str(e)[:120]
+
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Transcript compaction benchmark")
+    parser.add_argument("--input", nargs="*", default=[], help="Transcript JSON files")
+    parser.add_argument("--video-ids", nargs="*", default=[], help="Fetch transcripts for these videos")
+    parser.add_argument("--synthetic-minutes", default="", help="Comma-separated synthetic durations")
+    parser.add_argument("--live", action="store_true", help="Also time Gemini calls (needs GOOGLE_API_KEY)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    transcripts: List[Tuple[str, List[Dict]]] = []
+    for path in args.input:
+        transcripts.append((os.path.basename(path), load_input_file(path)))
+    for video_id in args.video_ids:
+        try:
+            transcripts.append((video_id, fetch_transcript(video_id)))
+        except Exception as e:
+            print(f"Skipping {video_id}: {e}", file=sys.stderr)
+    for minutes in [int(m) for m in args.synthetic_minutes.split(",") if m.strip()]:
+        transcripts.append((f"synthetic_{minutes}m", synthetic_auto_captions(minutes)))
+
+    if not transcripts:
+        transcripts = [(f"synthetic_{m}m", synthetic_auto_captions(m)) for m in (10, 60, 180)]
+
+    live_model = None
+    if args.live:
+        import google.generativeai as genai
+        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+        live_model = genai.GenerativeModel("gemini-2.0-flash")
+
+    results = [measure(name, segments, live_model) for name, segments in transcripts]
+
+    print(f"{'transcript':<22} {'cues':>6} {'raw_tok':>9} {'compact_tok':>12} {'reduction':>10} {'compact_ms':>11}")
+    for r in results:
+        print(f"{r['name']:<22} {r['cues']:>6} {r['raw_prompt_tokens']:>9} {r['compact_prompt_tokens']:>12} "
+              f"{r['reduction']:>10.1%} {r['compaction_ms']:>11}")
+        if "raw_llm_s" in r:
+            print(f"{'':<22} llm latency raw={r['raw_llm_s']}s compact={r['compact_llm_s']}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Replays recorded YouTube HTTP responses to the transcript pipeline.
+
+YouTubeReplay patches requests' HTTPAdapter.send so requests to YouTube
+hosts (watch pages, youtubei/v1/player, timedtext) are answered from a
+fixture file instead of the network. Requests to other hosts (the local LLM
+and Resend stand-ins) pass through. This covers the youtube_api and
+timedtext methods, which both use requests; the Playwright-based youtubei
+method and ASR are not replayed.
+
+Fixtures are matched on the request's video id (the v query parameter or
+the videoId of a JSON body), method, URL without query, and the query
+parameters the fixture lists. The most specific match wins. A video id can be
+aliased to a fixture video so many distinct videos replay the same
+responses (the id is rewritten in response bodies too). Unmatched YouTube
+requests get a 404 and are counted, so fixture gaps show up in results.
+
+With record=True, YouTube requests go to the network and are saved in the
+same format by save().
+
+Fixture file layout:
+    {"videos": {"<id>": {...}},
+     "interactions": [{"video_id", "method", "url", "query", "status",
+                       "headers", "body" | "json"}]}
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+YOUTUBE_HOSTS = frozenset({"www.youtube.com", "youtube.com", "m.youtube.com", "video.google.com"})
+
+
+def _request_video_id(request: requests.PreparedRequest, query: Dict[str, str]) -> Optional[str]:
+    if "v" in query:
+        return query["v"]
+    if request.body:
+        try:
+            body = json.loads(request.body)
+        except (TypeError, ValueError):
+            return None
+        if isinstance(body, dict):
+            return body.get("videoId")
+    return None
+
+
+class YouTubeReplay:
+    """Serves fixture responses for YouTube requests while installed."""
+
+    def __init__(self, fixtures: Optional[Dict[str, Any]] = None, latency_ms: int = 0, record: bool = False):
+        fixtures = fixtures or {"videos": {}, "interactions": []}
+        self.videos: Dict[str, Any] = fixtures.get("videos", {})
+        self.interactions: List[Dict[str, Any]] = list(fixtures.get("interactions", []))
+        self.latency_ms = latency_ms
+        self.record = record
+        self._aliases: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._original_send = None
+        self.requests = 0
+        self.unmatched: List[str] = []
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "YouTubeReplay":
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def alias(self, video_id: str, fixture_video_id: str) -> None:
+        """Answer requests for video_id with fixture_video_id's responses."""
+        if fixture_video_id not in self.videos:
+            raise KeyError(f"No fixtures for video {fixture_video_id}")
+        with self._lock:
+            self._aliases[video_id] = fixture_video_id
+
+    def _match(self, method: str, url: str, query: Dict[str, str], fixture_id: str) -> Optional[Dict[str, Any]]:
+        best, best_score = None, -1
+        for interaction in self.interactions:
+            if (interaction["video_id"] != fixture_id or interaction["method"] != method
+                    or interaction["url"] != url):
+                continue
+            wanted = interaction.get("query", {})
+            if all(query.get(key) == value for key, value in wanted.items()) and len(wanted) > best_score:
+                best, best_score = interaction, len(wanted)
+        return best
+
+    @staticmethod
+    def _response(request, status: int, headers: Dict[str, str], content: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK" if status < 400 else "Fixture"
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def _replay(self, request) -> requests.Response:
+        parts = urlsplit(request.url)
+        query = dict(parse_qsl(parts.query))
+        video_id = _request_video_id(request, query)
+        with self._lock:
+            self.requests += 1
+            fixture_id = self._aliases.get(video_id, video_id)
+        url = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        interaction = self._match(request.method, url, query, fixture_id) if fixture_id else None
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if interaction is None:
+            with self._lock:
+                self.unmatched.append(f"{request.method} {url} v={video_id}")
+            return self._response(request, 404, {"Content-Type": "text/plain"}, b"no fixture")
+
+        if "json" in interaction:
+            text = json.dumps(interaction["json"])
+        else:
+            text = interaction.get("body", "")
+        if video_id != fixture_id:
+            text = text.replace(fixture_id, video_id)
+        return self._response(request, interaction.get("status", 200), interaction.get("headers", {}),
+                              text.encode("utf-8"))
+
+    def _record(self, adapter, request, **kwargs) -> requests.Response:
+        response = self._original_send(adapter, request, **kwargs)
+        parts = urlsplit(request.url)
+        query = dict(parse_qsl(parts.query))
+        video_id = _request_video_id(request, query)
+        if video_id:
+            query.pop("v", None)
+            entry = {
+                "video_id": video_id,
+                "method": request.method,
+                "url": f"{parts.scheme}://{parts.netloc}{parts.path}",
+                "query": query,
+                "status": response.status_code,
+                "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+                "body": response.text,
+            }
+            with self._lock:
+                self.interactions.append(entry)
+                self.videos.setdefault(video_id, {})
+        return response
+
+    def install(self) -> "YouTubeReplay":
+        self._original_send = HTTPAdapter.send
+        replay = self
+
+        def send(adapter, request, **kwargs):
+            if urlsplit(request.url).hostname not in YOUTUBE_HOSTS:
+                return replay._original_send(adapter, request, **kwargs)
+            if replay.record:
+                return replay._record(adapter, request, **kwargs)
+            return replay._replay(request)
+
+        HTTPAdapter.send = send
+        return self
+
+    def uninstall(self) -> None:
+        if self._original_send is not None:
+            HTTPAdapter.send = self._original_send
+            self._original_send = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            payload = {"videos": self.videos, "interactions": self.interactions}
+        with open(path, "w") as f:
+            json.dump(payload, f, indent=1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "unmatched": len(self.unmatched),
+                    "unmatched_examples": sorted(set(self.unmatched))[:5]}
+
+    def fixture_videos(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return sorted(self.videos.items())
@@ -15,6 +15,7 @@ from typing import Dict, List, Any, Optional
 from collections import defaultdict, deque
 from dataclasses import dataclass
 
+import emf
 from cloudwatch_logs_client import CloudWatchLogsClient
 from cloudwatch_query_templates import QUERY_TEMPLATES
 
@@ -395,16 +396,21 @@ SOURCE '{self.log_group_name}'
             self.logger.error(f"Error collecting system health metrics: {e}")
             return []
     
-    def collect_all_metrics(self, time_window_minutes: int = 5) -> List[MetricData]:
-        """Collect all available metrics."""
+    def collect_all_metrics(self, time_window_minutes: int = 5,
+                            include_pipeline_metrics: bool = True) -> List[MetricData]:
+        """
+        Collect all available metrics. With include_pipeline_metrics=False only
+        the system health metrics are collected (the rest come from EMF).
+        """
         all_metrics = []
         
         try:
             # Collect different metric types
-            all_metrics.extend(self.collect_stage_success_rates(time_window_minutes))
-            all_metrics.extend(self.collect_performance_metrics(time_window_minutes))
-            all_metrics.extend(self.collect_error_rate_metrics(time_window_minutes))
-            all_metrics.extend(self.collect_job_metrics(time_window_minutes))
+            if include_pipeline_metrics:
+                all_metrics.extend(self.collect_stage_success_rates(time_window_minutes))
+                all_metrics.extend(self.collect_performance_metrics(time_window_minutes))
+                all_metrics.extend(self.collect_error_rate_metrics(time_window_minutes))
+                all_metrics.extend(self.collect_job_metrics(time_window_minutes))
             all_metrics.extend(self.collect_system_health_metrics(time_window_minutes))
             
             self.logger.info(f"Collected {len(all_metrics)} metrics from logs")
@@ -500,7 +506,12 @@ class MetricsCollectionScheduler:
         self.scheduler_thread = threading.Thread(target=self._collection_loop, daemon=True)
         self.scheduler_thread.start()
         
-        self.logger.info(f"Started metrics collection scheduler (interval: {self.collection_interval}s)")
+        if emf.EMF_ENABLED:
+            # Pipeline metrics are extracted from EMF records at ingestion; only system health is queried
+            self.logger.info(f"Started metrics collection scheduler for system health metrics only "
+                             f"(EMF_ENABLED; interval: {self.collection_interval}s)")
+        else:
+            self.logger.info(f"Started metrics collection scheduler (interval: {self.collection_interval}s)")
     
     def stop(self):
         """Stop the metrics collection scheduler."""
@@ -516,7 +527,8 @@ class MetricsCollectionScheduler:
             try:
                 # Collect metrics
                 metrics = self.collector.collect_all_metrics(
-                    time_window_minutes=self.collection_interval // 60
+                    time_window_minutes=self.collection_interval // 60,
+                    include_pipeline_metrics=not emf.EMF_ENABLED
                 )
                 
                 # Publish metrics
@@ -536,7 +548,7 @@ class MetricsCollectionScheduler:
     def collect_and_publish_once(self) -> int:
         """Collect and publish metrics once (for testing/manual execution)."""
         try:
-            metrics = self.collector.collect_all_metrics()
+            metrics = self.collector.collect_all_metrics(include_pipeline_metrics=not emf.EMF_ENABLED)
             if metrics:
                 success = self.publisher.publish_metrics(metrics)
                 if success:
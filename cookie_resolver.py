@@ -0,0 +1,231 @@
+"""
+Per-job cookie resolution.
+
+User cookies live in S3 (user_cookies/<user_id>/cookies.json) with an
+environment/cookies.txt fallback. Resolving them used to cost an S3 client
+construction plus a get_object for every transcript method of every video.
+Cookies are now resolved once into an immutable CookieBundle carrying every
+representation the pipeline needs (header string, requests jar, Playwright
+list), cached per user for COOKIE_CACHE_TTL_SECONDS, and fetched through one
+shared S3 client.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.cookiejar import CookieJar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cookie_utils import parse_netscape_cookies_txt, to_playwright_cookies, to_requests_cookiejar
+from log_events import evt
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# How long a resolved bundle (including "no cookies") is reused
+COOKIE_CACHE_TTL_SECONDS = int(os.getenv("COOKIE_CACHE_TTL_SECONDS", "300"))
+# Maximum number of users with cached bundles
+COOKIE_CACHE_MAX_ENTRIES = int(os.getenv("COOKIE_CACHE_MAX_ENTRIES", "512"))
+
+# Domain assumed for cookies that arrive as a bare header string
+DEFAULT_COOKIE_DOMAIN = ".youtube.com"
+
+
+# --- Shared S3 client ---
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Get the process-wide S3 client.
+
+    boto3 clients are thread-safe, so one client (and its connection pool) is
+    shared instead of building a new one per lookup.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.client("s3")
+    return _s3_client
+
+
+# --- Cookie bundle ---
+
+def _rows_from_header(cookie_header: str, domain: str = DEFAULT_COOKIE_DOMAIN) -> List[dict]:
+    """Convert a 'name=value; name2=value2' header into Netscape-style rows."""
+    rows = []
+    for pair in cookie_header.split(";"):
+        name, sep, value = pair.strip().partition("=")
+        if not sep or not name:
+            continue
+        rows.append({
+            "domain": domain,
+            "include_subdomains": True,
+            "path": "/",
+            "secure": True,
+            "expires": 0,
+            "name": name.strip(),
+            "value": value.strip(),
+        })
+    return rows
+
+
+@dataclass(frozen=True)
+class CookieBundle:
+    """
+    Pre-parsed cookies for one user, shared read-only across a job.
+
+    Attributes:
+        header: 'name=value; ...' string for Cookie headers (None if no cookies)
+        jar: requests-compatible CookieJar
+        playwright_cookies: Cookies in context.add_cookies() format
+        source: Where the cookies came from (s3_or_env, header, netscape, none)
+        resolved_at: Unix timestamp of resolution
+    """
+    header: Optional[str] = None
+    jar: Optional[CookieJar] = field(default=None, compare=False, repr=False)
+    playwright_cookies: Tuple[Dict[str, Any], ...] = field(default=(), repr=False)
+    source: str = "none"
+    resolved_at: float = field(default_factory=time.time)
+
+    def __bool__(self) -> bool:
+        return bool(self.header)
+
+    @property
+    def cookie_count(self) -> int:
+        return len(self.playwright_cookies)
+
+    @classmethod
+    def from_rows(cls, rows: List[dict], source: str) -> "CookieBundle":
+        if not rows:
+            return cls(source="none")
+        header = "; ".join(f"{r['name']}={r['value']}" for r in rows if r["name"])
+        return cls(
+            header=header or None,
+            jar=to_requests_cookiejar(rows),
+            playwright_cookies=tuple(to_playwright_cookies(rows)),
+            source=source,
+        )
+
+    @classmethod
+    def from_header(cls, cookie_header: Optional[str], source: str = "header") -> "CookieBundle":
+        """Build a bundle from a Cookie header string."""
+        if not cookie_header or not cookie_header.strip():
+            return cls(source="none")
+        return cls.from_rows(_rows_from_header(cookie_header), source)
+
+    @classmethod
+    def from_netscape(cls, raw: Optional[str], source: str = "netscape") -> "CookieBundle":
+        """Build a bundle from cookies.txt (Netscape) content."""
+        if not raw or not raw.strip():
+            return cls(source="none")
+        return cls.from_rows(parse_netscape_cookies_txt(raw), source)
+
+
+EMPTY_COOKIE_BUNDLE = CookieBundle()
+
+
+# --- Resolver ---
+
+def _default_loader(user_id: Optional[int]) -> Optional[str]:
+    # Imported lazily: transcript_service imports this module
+    from transcript_service import get_user_cookies_with_fallback
+    return get_user_cookies_with_fallback(user_id)
+
+
+class CookieResolver:
+    """Thread-safe TTL cache of CookieBundles keyed by user."""
+
+    def __init__(self, loader: Callable[[Optional[int]], Optional[str]] = _default_loader,
+                 ttl_seconds: int = COOKIE_CACHE_TTL_SECONDS,
+                 max_entries: int = COOKIE_CACHE_MAX_ENTRIES):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Optional[int], CookieBundle]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def resolve(self, user_id: Optional[int] = None) -> CookieBundle:
+        """
+        Resolve cookies for a user (S3 first, then environment/cookies.txt).
+
+        Args:
+            user_id: User ID for S3 lookup (None resolves environment cookies)
+
+        Returns:
+            CookieBundle (falsy when no cookies are available)
+        """
+        now = time.time()
+        with self._lock:
+            bundle = self._entries.get(user_id)
+            if bundle is not None and now - bundle.resolved_at < self.ttl_seconds:
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return bundle
+            self._misses += 1
+
+        start = time.time()
+        try:
+            bundle = CookieBundle.from_header(self.loader(user_id), source="s3_or_env")
+        except Exception as e:
+            logger.warning(f"Cookie resolution failed for user {user_id}: {e}")
+            bundle = CookieBundle(source="none")
+
+        with self._lock:
+            self._entries[user_id] = bundle
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        evt("cookies_resolved",
+            user_id=user_id,
+            source=bundle.source,
+            cookie_count=bundle.cookie_count,
+            duration_ms=int((time.time() - start) * 1000))
+        return bundle
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop a user's cached bundle (e.g. after a cookie upload or auth failure)."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Clear all entries and statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0,
+            }
+
+
+# Global resolver instance
+_cookie_resolver: Optional[CookieResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_cookie_resolver() -> CookieResolver:
+    """Get the global cookie resolver instance."""
+    global _cookie_resolver
+    if _cookie_resolver is None:
+        with _resolver_lock:
+            if _cookie_resolver is None:
+                _cookie_resolver = CookieResolver()
+    return _cookie_resolver
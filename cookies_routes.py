@@ -6,6 +6,7 @@ import logging
 from typing import Optional
 from flask import Blueprint, request, render_template_string, redirect, url_for, flash
 from flask_login import login_required, current_user
+from cookie_resolver import get_cookie_resolver
 
 bp_cookies = Blueprint("cookies_routes", __name__, url_prefix="/account")
 
@@ -281,6 +282,7 @@ def cookies_upload():
     # Optional: push to S3 (preferred in production)
     s3_uri = _store_s3_if_configured(current_user.id, data)
     where = s3_uri or path
+    get_cookie_resolver().invalidate(current_user.id)
     flash("Cookies uploaded successfully.")
     logging.info(f"User {current_user.id} uploaded cookies -> {where}")
     return redirect(url_for("cookies_routes.cookies_page"))
@@ -304,5 +306,6 @@ def delete_cookies():
             boto3.client("s3").delete_object(Bucket=bucket, Key=f"cookies/{current_user.id}.txt")
         except Exception as e:
             logging.warning(f"S3 cookie delete failed for user {current_user.id}: {e}")
+    get_cookie_resolver().invalidate(current_user.id)
     flash("Cookies deleted.")
     return redirect(url_for("cookies_routes.cookies_page"))
\ No newline at end of file
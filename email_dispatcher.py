@@ -0,0 +1,409 @@
+"""
+Background delivery of digest emails through Resend.
+
+A job hands its rendered digest to the dispatcher, which writes it to a small
+SQLite outbox and returns immediately; a worker thread sends due messages over
+one pooled requests.Session. Transient failures (connection errors, timeouts,
+429 and 5xx) are retried with jittered exponential backoff, honouring
+Retry-After, up to EMAIL_MAX_ATTEMPTS. Messages left "sending" by a crashed
+process are picked up again once they go stale, and claiming rows inside a
+write transaction keeps several app processes sharing one outbox from sending
+the same digest twice.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, Timeout, ConnectionError
+
+from log_events import evt
+
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com/emails")
+RESEND_TIMEOUT_SECONDS = float(os.getenv("RESEND_TIMEOUT_SECONDS", "30"))
+RESEND_POOL_SIZE = int(os.getenv("RESEND_POOL_SIZE", "4"))
+
+EMAIL_DISPATCH_ASYNC = os.getenv("EMAIL_DISPATCH_ASYNC", "true").lower() == "true"
+# Outside the working tree, like TRACE_DIR; point at persistent storage to keep mail across restarts
+EMAIL_OUTBOX_DIR = os.getenv("EMAIL_OUTBOX_DIR", "/tmp/tldw_email_outbox")
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "1800"))
+EMAIL_DISPATCH_POLL_SECONDS = float(os.getenv("EMAIL_DISPATCH_POLL_SECONDS", "5"))
+# Delivered/failed rows are kept this long for inspection, then purged
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+EMAIL_OUTBOX_PURGE_INTERVAL_SECONDS = float(os.getenv("EMAIL_OUTBOX_PURGE_INTERVAL_SECONDS", "3600"))
+
+OUTBOX_STATUSES = ("pending", "sending", "sent", "failed")
+
+
+@dataclass
+class SendResult:
+    """Outcome of one Resend API call"""
+    ok: bool
+    status: Optional[int] = None
+    retryable: bool = False
+    retry_after: Optional[float] = None
+    detail: str = ""
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    recipient: str
+    payload: Dict[str, Any]
+    attempts: int
+    job_id: Optional[str] = None
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class ResendClient:
+    """Resend /emails client over one pooled keep-alive session"""
+
+    def __init__(self, api_key: str, api_url: str = RESEND_API_URL,
+                 timeout: float = RESEND_TIMEOUT_SECONDS, pool_size: int = RESEND_POOL_SIZE):
+        if not api_key:
+            raise ValueError("RESEND_API_KEY is required")
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Retries are owned by the dispatcher, not urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def send(self, payload: Dict[str, Any]) -> SendResult:
+        try:
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+        except (Timeout, ConnectionError) as e:
+            return SendResult(ok=False, retryable=True, detail=f"{type(e).__name__}: {e}"[:300])
+        except RequestException as e:
+            return SendResult(ok=False, retryable=False, detail=f"{type(e).__name__}: {e}"[:300])
+
+        status = response.status_code
+        if 200 <= status < 300:
+            return SendResult(ok=True, status=status)
+        return SendResult(
+            ok=False,
+            status=status,
+            retryable=status == 429 or status >= 500,
+            retry_after=_parse_retry_after(response.headers.get("Retry-After")),
+            detail=(response.text or "")[:300],
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class EmailOutbox:
+    """SQLite-backed queue of outgoing emails"""
+
+    def __init__(self, outbox_dir: str = EMAIL_OUTBOX_DIR):
+        self.outbox_dir = outbox_dir
+        self.db_path = os.path.join(outbox_dir, "email_outbox.db")
+        os.makedirs(outbox_dir, exist_ok=True)
+        self._init_database()
+
+    def _init_database(self):
+        # journal_mode cannot change inside a transaction
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT,
+                    recipient TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_outbox_due
+                ON email_outbox(status, next_attempt_at)
+            """)
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get database connection with proper error handling"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # Explicit write transaction: claims are atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logging.error(f"Email outbox database error: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def enqueue(self, recipient: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> int:
+        now = time.time()
+        with self._get_db_connection() as conn:
+            cursor = conn.execute("""
+                INSERT INTO email_outbox (job_id, recipient, payload, status, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, 'pending', ?, ?, ?)
+            """, (job_id, recipient, json.dumps(payload), now, now, now))
+            return cursor.lastrowid
+
+    def claim_due(self, limit: int = 10, now: Optional[float] = None) -> List[OutboxMessage]:
+        """Mark up to limit due messages as sending and return them"""
+        now = time.time() if now is None else now
+        with self._get_db_connection() as conn:
+            rows = conn.execute("""
+                SELECT id, job_id, recipient, payload, attempts FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            """, (now, limit)).fetchall()
+            conn.executemany("UPDATE email_outbox SET status = 'sending', updated_at = ? WHERE id = ?",
+                             [(now, row["id"]) for row in rows])
+        return [OutboxMessage(id=row["id"], recipient=row["recipient"], payload=json.loads(row["payload"]),
+                              attempts=row["attempts"], job_id=row["job_id"]) for row in rows]
+
+    def mark_sent(self, message_id: int, attempts: int) -> None:
+        self._update(message_id, "sent", attempts)
+
+    def mark_retry(self, message_id: int, attempts: int, delay_seconds: float, error: str) -> None:
+        self._update(message_id, "pending", attempts, error, next_attempt_at=time.time() + delay_seconds)
+
+    def mark_failed(self, message_id: int, attempts: int, error: str) -> None:
+        self._update(message_id, "failed", attempts, error)
+
+    def _update(self, message_id: int, status: str, attempts: int, error: Optional[str] = None,
+                next_attempt_at: Optional[float] = None) -> None:
+        now = time.time()
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                UPDATE email_outbox
+                SET status = ?, attempts = ?, last_error = COALESCE(?, last_error),
+                    next_attempt_at = COALESCE(?, next_attempt_at), updated_at = ?
+                WHERE id = ?
+            """, (status, attempts, error, next_attempt_at, now, message_id))
+
+    def requeue_stale(self, older_than_seconds: float) -> int:
+        """Return messages stuck in 'sending' (their process died mid-send) to the queue"""
+        now = time.time()
+        with self._get_db_connection() as conn:
+            return conn.execute("""
+                UPDATE email_outbox SET status = 'pending', updated_at = ?
+                WHERE status = 'sending' AND updated_at < ?
+            """, (now, now - older_than_seconds)).rowcount
+
+    def next_due_at(self) -> Optional[float]:
+        with self._get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT MIN(next_attempt_at) AS due FROM email_outbox WHERE status = 'pending'").fetchone()
+        return row["due"]
+
+    def purge_finished(self, older_than_days: int = EMAIL_OUTBOX_RETENTION_DAYS) -> int:
+        cutoff = time.time() - older_than_days * 86400
+        with self._get_db_connection() as conn:
+            return conn.execute("""
+                DELETE FROM email_outbox WHERE status IN ('sent', 'failed') AND updated_at < ?
+            """, (cutoff,)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._get_db_connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM email_outbox GROUP BY status").fetchall()
+        counts = dict.fromkeys(OUTBOX_STATUSES, 0)
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+
+class EmailDispatcher:
+    """Sends outbox messages on a background thread with bounded retries"""
+
+    def __init__(self, outbox: EmailOutbox, client: ResendClient,
+                 max_attempts: int = EMAIL_MAX_ATTEMPTS,
+                 retry_base_seconds: float = EMAIL_RETRY_BASE_SECONDS,
+                 retry_max_seconds: float = EMAIL_RETRY_MAX_SECONDS,
+                 poll_seconds: float = EMAIL_DISPATCH_POLL_SECONDS,
+                 batch_size: int = 10,
+                 stale_after_seconds: Optional[float] = None):
+        self.outbox = outbox
+        self.client = client
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        # A send outlives its request timeout only if the sending process died
+        self.stale_after_seconds = stale_after_seconds or client.timeout * 2 + 60
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    def start(self) -> "EmailDispatcher":
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="email-dispatcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def submit(self, recipient: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> int:
+        """Persist an email and wake the worker; returns the outbox id"""
+        message_id = self.outbox.enqueue(recipient, payload, job_id)
+        self._count("queued")
+        evt("email_queued", recipient=recipient, job_id=job_id, outbox_id=message_id)
+        self.start()
+        self._wake.set()
+        return message_id
+
+    def _run(self) -> None:
+        next_purge_at = 0.0
+        while not self._stop.is_set():
+            try:
+                recovered = self.outbox.requeue_stale(self.stale_after_seconds)
+                if recovered:
+                    logging.warning(f"Requeued {recovered} emails abandoned mid-send")
+            except Exception as e:
+                logging.error(f"Email outbox recovery error: {e}")
+            if time.time() >= next_purge_at:
+                # Retried on the next pass if it fails (e.g. the outbox is locked by another process)
+                try:
+                    self.outbox.purge_finished()
+                    next_purge_at = time.time() + EMAIL_OUTBOX_PURGE_INTERVAL_SECONDS
+                except Exception as e:
+                    logging.error(f"Email outbox purge error: {e}")
+            # Cleared before draining so a submit during the drain is not missed
+            self._wake.clear()
+            try:
+                while self.process_due() and not self._stop.is_set():
+                    pass
+                self._wake.wait(self._idle_seconds())
+            except Exception as e:
+                logging.error(f"Email dispatcher loop error: {e}")
+                self._wake.wait(self.poll_seconds)
+
+    def _idle_seconds(self) -> float:
+        due = self.outbox.next_due_at()
+        if due is None:
+            return self.poll_seconds
+        return min(self.poll_seconds, max(0.0, due - time.time()))
+
+    def process_due(self) -> int:
+        """Send one batch of due messages; returns how many were attempted"""
+        messages = self.outbox.claim_due(self.batch_size)
+        for message in messages:
+            self._deliver(message)
+        return len(messages)
+
+    def _deliver(self, message: OutboxMessage) -> None:
+        attempts = message.attempts + 1
+        start = time.perf_counter()
+        result = self.client.send(message.payload)
+        duration_ms = int((time.perf_counter() - start) * 1000)
+
+        if result.ok:
+            self.outbox.mark_sent(message.id, attempts)
+            self._count("sent")
+            evt("email_sent", recipient=message.recipient, job_id=message.job_id, outbox_id=message.id,
+                attempts=attempts, status_code=result.status, duration_ms=duration_ms)
+            return
+
+        error = f"{result.status or 'error'}: {result.detail}"
+        if result.retryable and attempts < self.max_attempts:
+            delay = self._backoff(attempts, result.retry_after)
+            self.outbox.mark_retry(message.id, attempts, delay, error)
+            self._count("retried")
+            evt("email_retry", recipient=message.recipient, job_id=message.job_id, outbox_id=message.id,
+                attempts=attempts, status_code=result.status, delay_s=round(delay, 2), detail=result.detail[:200])
+        else:
+            self.outbox.mark_failed(message.id, attempts, error)
+            self._count("failed")
+            evt("email_failed", recipient=message.recipient, job_id=message.job_id, outbox_id=message.id,
+                attempts=attempts, status_code=result.status, outcome="error", detail=result.detail[:200])
+
+    def _backoff(self, attempts: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential delay, never shorter than Retry-After"""
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.retry_max_seconds))
+        return delay
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["outbox"] = self.outbox.counts()
+        stats["running"] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+
+_resend_client: Optional[ResendClient] = None
+_dispatcher: Optional[EmailDispatcher] = None
+_singleton_lock = threading.Lock()
+
+
+def get_resend_client() -> ResendClient:
+    """Get the process-wide pooled Resend client"""
+    global _resend_client
+    if _resend_client is None:
+        with _singleton_lock:
+            if _resend_client is None:
+                _resend_client = ResendClient(os.environ.get("RESEND_API_KEY"))
+    return _resend_client
+
+
+def get_email_dispatcher() -> EmailDispatcher:
+    """Get the process-wide email dispatcher, starting its worker (resumes any queued mail)"""
+    global _dispatcher
+    if _dispatcher is None:
+        client = get_resend_client()
+        with _singleton_lock:
+            if _dispatcher is None:
+                _dispatcher = EmailDispatcher(EmailOutbox(EMAIL_OUTBOX_DIR), client).start()
+    return _dispatcher
+
+
+def get_existing_dispatcher() -> Optional[EmailDispatcher]:
+    """The process-wide dispatcher if one was started, without creating it (for diagnostics)"""
+    return _dispatcher
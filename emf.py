@@ -0,0 +1,266 @@
+"""
+CloudWatch Embedded Metric Format (EMF) emission.
+
+Pipeline metrics are aggregated in process and written once per
+EMF_FLUSH_INTERVAL_SECONDS as EMF JSON lines on stdout, which App Runner
+ships to CloudWatch Logs; CloudWatch extracts the metrics at ingestion, so
+nothing has to query the logs afterwards (cloudwatch_metrics_publisher's
+Logs Insights scheduler stands down while EMF is enabled).
+
+Per flush and dimension set, one record carries:
+- counts summed over the interval (StageAttemptCount, JobOutcome, ...),
+- rates derived from those counts (StageSuccessRate, StageErrorRate),
+- duration samples as EMF value arrays (StageDuration, VideoDuration,
+  JobDuration), split across records at the 100-values-per-metric limit,
+  so CloudWatch can serve averages and p95/p99 from them,
+- the interval's StageDurationAverage/P95/P99, which the Logs Insights
+  publisher produced as separate metrics.
+
+Metric names and dimensions follow the ones the Logs Insights publisher
+produced (namespace TL-DW/Pipeline). Its scheduler keeps running while EMF
+is enabled, but only for the system health metrics (CPUUtilization,
+MemoryUtilization, RateLimitingSuppression) that come from log lines
+rather than pipeline events. Off unless EMF_ENABLED=true.
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+EMF_ENABLED = os.getenv("EMF_ENABLED", "false").lower() == "true"
+EMF_NAMESPACE = os.getenv("EMF_NAMESPACE", "TL-DW/Pipeline")
+EMF_FLUSH_INTERVAL_SECONDS = float(os.getenv("EMF_FLUSH_INTERVAL_SECONDS", "60"))
+
+# EMF limits per record
+MAX_VALUES_PER_METRIC = 100
+MAX_METRICS_PER_DIRECTIVE = 100
+
+# Derived percentage metrics: name -> (numerator count, denominator count)
+DERIVED_RATES = {
+    "StageSuccessRate": ("StageSuccessCount", "StageAttemptCount"),
+    "StageErrorRate": ("StageFailureCount", "StageAttemptCount"),
+}
+
+# Statistics published as their own metrics: sample metric -> {statistic metric: percentile (None = mean)}
+SAMPLE_STATISTICS = {
+    "StageDuration": {"StageDurationAverage": None, "StageDurationP95": 95, "StageDurationP99": 99},
+}
+
+JOB_OUTCOMES = {"success": "Success", "partial_success": "Partial", "error": "Failed", "cancelled": "Cancelled"}
+
+DimensionKey = Tuple[Tuple[str, str], ...]
+
+
+def sample_statistic(samples: List[float], percentile: Optional[float]) -> float:
+    """Mean of samples (percentile None), or their nearest-rank percentile."""
+    if percentile is None:
+        return round(sum(samples) / len(samples), 2)
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class EmfAggregator:
+    """
+    Collects counts and samples per dimension set and flushes them as EMF
+    records. Thread-safe; the flush thread is started by start().
+    """
+
+    def __init__(self, namespace: str = EMF_NAMESPACE,
+                 flush_interval_seconds: float = EMF_FLUSH_INTERVAL_SECONDS,
+                 stream=None):
+        self.namespace = namespace
+        self.flush_interval_seconds = flush_interval_seconds
+        # None means sys.stdout at write time (it may be replaced after import)
+        self.stream = stream
+        # dimensions -> metric name -> [unit, count total or list of samples]
+        self._counts: Dict[DimensionKey, Dict[str, List[Any]]] = {}
+        self._values: Dict[DimensionKey, Dict[str, List[Any]]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.records_written = 0
+
+    @staticmethod
+    def _key(dimensions: Optional[Dict[str, Any]]) -> DimensionKey:
+        return tuple(sorted((k, str(v)) for k, v in (dimensions or {}).items()))
+
+    def add_count(self, metric: str, dimensions: Optional[Dict[str, Any]] = None,
+                  value: float = 1, unit: str = "Count") -> None:
+        key = self._key(dimensions)
+        with self._lock:
+            metrics = self._counts.setdefault(key, {})
+            entry = metrics.get(metric)
+            if entry is None:
+                metrics[metric] = [unit, value]
+            else:
+                entry[1] += value
+
+    def add_value(self, metric: str, value: float, dimensions: Optional[Dict[str, Any]] = None,
+                  unit: str = "Milliseconds") -> None:
+        key = self._key(dimensions)
+        with self._lock:
+            metrics = self._values.setdefault(key, {})
+            entry = metrics.get(metric)
+            if entry is None:
+                metrics[metric] = [unit, [value]]
+            else:
+                entry[1].append(value)
+
+    def _build_records(self, counts, values, timestamp_ms: int) -> List[Dict[str, Any]]:
+        records = []
+        for key in list(counts) + [k for k in values if k not in counts]:
+            metrics = {name: (unit, total) for name, (unit, total) in counts.get(key, {}).items()}
+            for name, (numerator, denominator) in DERIVED_RATES.items():
+                if denominator in metrics and metrics[denominator][1] > 0:
+                    part = metrics[numerator][1] if numerator in metrics else 0
+                    metrics[name] = ("Percent", round(part / metrics[denominator][1] * 100, 2))
+            samples = values.get(key, {})
+            for sample_name, statistics in SAMPLE_STATISTICS.items():
+                if sample_name in samples:
+                    unit, series = samples[sample_name]
+                    for name, percentile in statistics.items():
+                        metrics[name] = (unit, sample_statistic(series, percentile))
+            # The first record carries the counts; extra records carry the rest of the samples
+            chunk = 0
+            while True:
+                record_metrics = dict(metrics) if chunk == 0 else {}
+                for name, (unit, series) in samples.items():
+                    part = series[chunk * MAX_VALUES_PER_METRIC:(chunk + 1) * MAX_VALUES_PER_METRIC]
+                    if part:
+                        record_metrics[name] = (unit, part)
+                if not record_metrics:
+                    break
+                records.extend(self._records_for(key, record_metrics, timestamp_ms))
+                chunk += 1
+        return records
+
+    def _records_for(self, key: DimensionKey, metrics: Dict[str, Tuple[str, Any]],
+                     timestamp_ms: int) -> List[Dict[str, Any]]:
+        names = sorted(metrics)
+        records = []
+        for start in range(0, len(names), MAX_METRICS_PER_DIRECTIVE):
+            batch = names[start:start + MAX_METRICS_PER_DIRECTIVE]
+            record: Dict[str, Any] = {
+                "_aws": {
+                    "Timestamp": timestamp_ms,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [[name for name, _ in key]],
+                        "Metrics": [{"Name": name, "Unit": metrics[name][0]} for name in batch],
+                    }],
+                },
+            }
+            record.update(key)
+            for name in batch:
+                record[name] = metrics[name][1]
+            records.append(record)
+        return records
+
+    def flush(self) -> int:
+        """Write everything aggregated since the last flush; returns the number of records."""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            values, self._values = self._values, {}
+        if not counts and not values:
+            return 0
+        records = self._build_records(counts, values, int(time.time() * 1000))
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        with self._write_lock:
+            stream = self.stream or sys.stdout
+            stream.write(lines)
+            stream.flush()
+            self.records_written += len(records)
+        return len(records)
+
+    def start(self) -> "EmfAggregator":
+        self._thread = threading.Thread(target=self._run, name="emf-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.warning(f"EMF flush failed: {e}")
+
+    def stop(self) -> None:
+        """Stop the flush thread and write what is left."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        try:
+            self.flush()
+        except Exception as e:
+            logging.warning(f"EMF flush failed: {e}")
+
+
+_aggregator: Optional[EmfAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def get_emf_aggregator() -> EmfAggregator:
+    """Process-wide aggregator; starts its flush thread on first use."""
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = EmfAggregator().start()
+    return _aggregator
+
+
+# --- Pipeline hooks (no-ops unless EMF_ENABLED) ---------------------------------
+
+def record_stage(stage: str, duration_ms: float, success: bool, error_type: Optional[str] = None) -> None:
+    """Called from transcript_metrics.record_stage_metrics."""
+    if not EMF_ENABLED:
+        return
+    aggregator = get_emf_aggregator()
+    dimensions = {"Stage": stage}
+    aggregator.add_count("StageAttemptCount", dimensions)
+    aggregator.add_count("StageSuccessCount" if success else "StageFailureCount", dimensions)
+    aggregator.add_value("StageDuration", duration_ms, dimensions)
+    if not success:
+        error_kind = "Timeout" if error_type and "timeout" in error_type.lower() else "Error"
+        aggregator.add_count("StageErrorCount", {"Stage": stage, "ErrorType": error_kind})
+
+
+def record_video(outcome: str, duration_ms: float, transcript_source: Optional[str] = None) -> None:
+    """Called from log_events.video_processed."""
+    if not EMF_ENABLED:
+        return
+    aggregator = get_emf_aggregator()
+    aggregator.add_count("VideosProcessed")
+    aggregator.add_value("VideoDuration", duration_ms)
+    aggregator.add_count("VideoOutcome", {"Outcome": outcome})
+    aggregator.add_count("VideosByTranscriptSource", {"TranscriptSource": transcript_source or "none"})
+
+
+def record_job_received(video_count: int) -> None:
+    """Called from log_events.job_received."""
+    if not EMF_ENABLED:
+        return
+    aggregator = get_emf_aggregator()
+    aggregator.add_count("JobsReceived")
+    aggregator.add_count("VideosRequested", value=video_count)
+
+
+def record_job(outcome: str, duration_ms: float) -> None:
+    """Called from log_events.job_finished and job_failed (outcome "error")."""
+    if not EMF_ENABLED:
+        return
+    aggregator = get_emf_aggregator()
+    aggregator.add_count("JobsCompleted")
+    aggregator.add_value("JobDuration", duration_ms)
+    aggregator.add_count("JobOutcome", {"Outcome": JOB_OUTCOMES.get(outcome, outcome)})
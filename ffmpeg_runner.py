@@ -0,0 +1,446 @@
+"""
+Asyncio-based subprocess runner for ffmpeg/ffprobe with a global concurrency governor.
+
+This module provides:
+- A process-wide governor capping concurrent ffmpeg/ffprobe processes (sized to CPU count)
+- Streaming stderr parsing with progress events (time=, speed=) surfaced via evt()
+- Job-scoped cancellation that terminates running processes when a job is aborted
+- A synchronous facade returning subprocess-compatible results for existing callers
+"""
+
+import asyncio
+import os
+import re
+import subprocess
+import threading
+import time
+import concurrent.futures
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from log_events import evt
+from logging_setup import get_logger, get_job_ctx, set_job_ctx
+from reliability_config import get_reliability_config
+from tracing import span, wrap_context
+
+logger = get_logger(__name__)
+
+# Get reliability configuration
+_config = get_reliability_config()
+
+# Seconds between ffmpeg_progress events for a single process
+PROGRESS_EVENT_INTERVAL = 5.0
+# Seconds to wait for graceful termination before killing a cancelled process
+TERMINATE_GRACE_SECONDS = 2.0
+# Poll interval for governor slots and cancellation checks
+POLL_INTERVAL = 0.1
+
+# ffmpeg "-stats" line, e.g. "size=  1024kB time=00:01:02.50 bitrate= 128.0kbits/s speed=12.3x"
+_PROGRESS_TIME_RE = re.compile(r"time=\s*(-?\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_PROGRESS_SPEED_RE = re.compile(r"speed=\s*([\d.]+)x")
+_PROGRESS_SIZE_RE = re.compile(r"size=\s*(\d+)\s*[kK]i?B")
+_LINE_SPLIT_RE = re.compile(rb"[\r\n]+")
+
+
+class ProcessCancelled(Exception):
+    """Raised when a governed process is terminated because its job was aborted."""
+
+
+@dataclass
+class ProcessResult:
+    """Result of a governed subprocess run (compatible with subprocess.CompletedProcess)."""
+    args: List[str]
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    duration_ms: int
+    queue_wait_ms: int = 0
+    last_progress: Optional[Dict[str, float]] = None
+
+
+def parse_ffmpeg_progress(line: str) -> Optional[Dict[str, float]]:
+    """
+    Parse an ffmpeg stats line into progress fields.
+
+    Args:
+        line: Single stderr line emitted by ffmpeg with -stats
+
+    Returns:
+        Dict with out_time_s and optional speed/size_kb, or None if not a progress line
+    """
+    if not line or "time=" not in line:
+        return None
+
+    time_match = _PROGRESS_TIME_RE.search(line)
+    if not time_match:
+        return None
+
+    hours, minutes, seconds = time_match.groups()
+    progress = {
+        "out_time_s": round(abs(int(hours)) * 3600 + int(minutes) * 60 + float(seconds), 2)
+    }
+
+    speed_match = _PROGRESS_SPEED_RE.search(line)
+    if speed_match:
+        try:
+            progress["speed"] = float(speed_match.group(1))
+        except ValueError:
+            pass
+
+    size_match = _PROGRESS_SIZE_RE.search(line)
+    if size_match:
+        progress["size_kb"] = int(size_match.group(1))
+
+    return progress
+
+
+class ProcessGovernor:
+    """
+    Process-wide cap on concurrently running ffmpeg/ffprobe processes.
+
+    Uses a threading semaphore so the limit holds across the per-thread event
+    loops created by job workers.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._peak_active = 0
+        self._total_started = 0
+
+    async def acquire(self, cancel_event: Optional[threading.Event] = None) -> None:
+        """Wait for a free slot without blocking the event loop."""
+        with self._lock:
+            self._waiting += 1
+        try:
+            while not self._semaphore.acquire(blocking=False):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ProcessCancelled("job cancelled while waiting for ffmpeg slot")
+                await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        with self._lock:
+            self._active += 1
+            self._total_started += 1
+            self._peak_active = max(self._peak_active, self._active)
+
+    def release(self) -> None:
+        """Release a slot acquired with acquire()."""
+        with self._lock:
+            self._active -= 1
+        self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get governor statistics for health checks."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "waiting": self._waiting,
+                "peak_active": self._peak_active,
+                "total_started": self._total_started,
+            }
+
+
+# Global governor instance
+_governor = ProcessGovernor(_config.ffmpeg_max_concurrency)
+
+# Job-scoped cancellation events
+_job_cancel_events: Dict[str, threading.Event] = {}
+_cancel_lock = threading.Lock()
+
+
+def get_governor() -> ProcessGovernor:
+    """Get the global process governor."""
+    return _governor
+
+
+def _job_cancel_event(job_id: Optional[str]) -> Optional[threading.Event]:
+    """Get or create the cancellation event for a job."""
+    if not job_id:
+        return None
+    with _cancel_lock:
+        event = _job_cancel_events.get(job_id)
+        if event is None:
+            event = threading.Event()
+            _job_cancel_events[job_id] = event
+        return event
+
+
+def cancel_job(job_id: str) -> None:
+    """
+    Abort all governed processes belonging to a job.
+
+    Running processes are terminated (then killed after a grace period) and
+    queued processes fail fast with ProcessCancelled.
+    """
+    event = _job_cancel_event(job_id)
+    if event is not None and not event.is_set():
+        event.set()
+        evt("ffmpeg_job_cancel_requested", job_id=job_id)
+
+
+def is_job_cancelled(job_id: Optional[str]) -> bool:
+    """Check whether a job has been cancelled."""
+    if not job_id:
+        return False
+    with _cancel_lock:
+        event = _job_cancel_events.get(job_id)
+    return bool(event and event.is_set())
+
+
+def clear_job(job_id: str) -> None:
+    """Forget cancellation state for a finished job."""
+    with _cancel_lock:
+        _job_cancel_events.pop(job_id, None)
+
+
+async def _terminate(proc: asyncio.subprocess.Process) -> None:
+    """Terminate a process, escalating to kill after the grace period."""
+    if proc.returncode is not None:
+        return
+    try:
+        proc.terminate()
+        await asyncio.wait_for(proc.wait(), timeout=TERMINATE_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+async def run_process_async(
+    cmd: List[str],
+    *,
+    timeout: float,
+    env: Optional[Dict[str, str]] = None,
+    job_id: Optional[str] = None,
+    context: str = "ffmpeg",
+    on_progress: Optional[Callable[[Dict[str, float]], None]] = None,
+) -> ProcessResult:
+    """
+    Run a governed subprocess, streaming stderr for progress.
+
+    Progress lines are parsed and surfaced as ffmpeg_progress events; they are
+    excluded from the returned stderr so error classification only sees
+    diagnostics.
+
+    Args:
+        cmd: Command and arguments
+        timeout: Maximum run time in seconds (excluding time queued for a slot)
+        env: Environment for the subprocess
+        job_id: Job identifier for cancellation and event correlation
+        context: Label for events (ffmpeg_extract, ffprobe_validation, ...)
+        on_progress: Optional callback invoked with each parsed progress dict
+
+    Returns:
+        ProcessResult with captured stdout/stderr
+
+    Raises:
+        subprocess.TimeoutExpired: If the process exceeds timeout
+        ProcessCancelled: If the job was cancelled
+    """
+    # Traced from before the slot is acquired so queueing shows up in the span
+    with span("subprocess", context=context, cmd=os.path.basename(cmd[0])) as proc_span:
+        result = await _run_governed(
+            cmd,
+            timeout=timeout,
+            env=env,
+            job_id=job_id,
+            context=context,
+            on_progress=on_progress,
+        )
+        if proc_span is not None:
+            proc_span.set_attribute("returncode", result.returncode)
+            proc_span.set_attribute("queue_wait_ms", result.queue_wait_ms)
+        return result
+
+
+async def _run_governed(
+    cmd: List[str],
+    *,
+    timeout: float,
+    env: Optional[Dict[str, str]],
+    job_id: Optional[str],
+    context: str,
+    on_progress: Optional[Callable[[Dict[str, float]], None]],
+) -> ProcessResult:
+    """Body of run_process_async: wait for a slot, then run and stream the process."""
+    cancel_event = _job_cancel_event(job_id)
+    queued_at = time.time()
+    await _governor.acquire(cancel_event)
+
+    try:
+        queue_wait_ms = int((time.time() - queued_at) * 1000)
+        start_time = time.time()
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+        )
+
+        stdout_chunks: List[bytes] = []
+        stderr_lines: List[bytes] = []
+        last_progress: Dict[str, Optional[Dict[str, float]]] = {"value": None}
+        last_emit = {"ts": 0.0}
+
+        def _handle_stderr_line(raw_line: bytes) -> None:
+            text = raw_line.decode("utf-8", errors="replace")
+            progress = parse_ffmpeg_progress(text)
+            if progress is None:
+                stderr_lines.append(raw_line)
+                return
+
+            last_progress["value"] = progress
+            if on_progress:
+                try:
+                    on_progress(progress)
+                except Exception as e:
+                    logger.debug(f"ffmpeg progress callback failed: {e}")
+
+            now = time.time()
+            if now - last_emit["ts"] >= PROGRESS_EVENT_INTERVAL:
+                last_emit["ts"] = now
+                evt("ffmpeg_progress",
+                    job_id=job_id,
+                    context=context,
+                    elapsed_ms=int((now - start_time) * 1000),
+                    **progress)
+
+        async def _read_stdout() -> None:
+            while True:
+                chunk = await proc.stdout.read(65536)
+                if not chunk:
+                    break
+                stdout_chunks.append(chunk)
+
+        async def _read_stderr() -> None:
+            # ffmpeg terminates stats lines with \r, so split on both \r and \n
+            pending = b""
+            while True:
+                chunk = await proc.stderr.read(4096)
+                if not chunk:
+                    break
+                parts = _LINE_SPLIT_RE.split(pending + chunk)
+                pending = parts.pop()
+                for part in parts:
+                    if part.strip():
+                        _handle_stderr_line(part)
+            if pending.strip():
+                _handle_stderr_line(pending)
+
+        readers = asyncio.gather(_read_stdout(), _read_stderr())
+        deadline = start_time + timeout
+
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    await _terminate(proc)
+                    evt("ffmpeg_cancelled",
+                        job_id=job_id,
+                        context=context,
+                        duration_ms=int((time.time() - start_time) * 1000))
+                    raise ProcessCancelled(f"{context} cancelled for job {job_id}")
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    await _terminate(proc)
+                    raise subprocess.TimeoutExpired(
+                        cmd, timeout,
+                        output=b"".join(stdout_chunks),
+                        stderr=b"\n".join(stderr_lines)
+                    )
+
+                try:
+                    await asyncio.wait_for(asyncio.shield(proc.wait()), timeout=min(POLL_INTERVAL, remaining))
+                    break
+                except asyncio.TimeoutError:
+                    continue
+
+            await readers
+        except BaseException:
+            readers.cancel()
+            try:
+                await readers
+            except BaseException:
+                pass
+            raise
+
+        return ProcessResult(
+            args=list(cmd),
+            returncode=proc.returncode,
+            stdout=b"".join(stdout_chunks),
+            stderr=b"\n".join(stderr_lines),
+            duration_ms=int((time.time() - start_time) * 1000),
+            queue_wait_ms=queue_wait_ms,
+            last_progress=last_progress["value"],
+        )
+    finally:
+        _governor.release()
+
+
+def run_process(
+    cmd: List[str],
+    *,
+    timeout: float,
+    env: Optional[Dict[str, str]] = None,
+    job_id: Optional[str] = None,
+    context: str = "ffmpeg",
+    on_progress: Optional[Callable[[Dict[str, float]], None]] = None,
+) -> ProcessResult:
+    """
+    Synchronous facade over run_process_async for thread-based callers.
+
+    Runs on a private event loop; if the calling thread already has a running
+    loop, the process is driven from a helper thread instead.
+
+    Args:
+        cmd: Command and arguments
+        timeout: Maximum run time in seconds
+        env: Environment for the subprocess
+        job_id: Job identifier (defaults to the current job context)
+        context: Label for events
+        on_progress: Optional progress callback
+
+    Returns:
+        ProcessResult with captured stdout/stderr
+    """
+    if job_id is None:
+        job_id = get_job_ctx().get("job_id")
+
+    def _run() -> ProcessResult:
+        return asyncio.run(run_process_async(
+            cmd,
+            timeout=timeout,
+            env=env,
+            job_id=job_id,
+            context=context,
+            on_progress=on_progress,
+        ))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _run()
+
+    # Called from inside an event loop: carry job context and the current
+    # trace span into the helper thread
+    job_ctx = get_job_ctx()
+
+    def _run_with_ctx() -> ProcessResult:
+        set_job_ctx(**job_ctx)
+        return _run()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(wrap_context(_run_with_ctx)).result()
@@ -26,6 +26,8 @@ from urllib3.util.retry import Retry
 from logging_setup import get_logger
 from log_events import evt
 from reliability_config import get_reliability_config
+from ffmpeg_runner import run_process, ProcessCancelled
+from range_downloader import RangeDownloader, get_job_policy
 
 logger = get_logger(__name__)
 
@@ -35,7 +37,6 @@ _config = get_reliability_config()
 # FFmpeg configuration from centralized config
 FFMPEG_TIMEOUT = _config.ffmpeg_timeout
 FFMPEG_MAX_RETRIES = _config.ffmpeg_max_retries
-REQUESTS_CHUNK_SIZE = 8192  # bytes
 REQUESTS_TIMEOUT = 180  # seconds
 
 # User agent for requests
@@ -324,6 +325,10 @@ class FFmpegService:
             if error_classification in ["format_error", "proxy_enforcement_error"]:
                 break
             
+            # Job was aborted - stop without retrying or falling back
+            if error_classification == "cancelled":
+                return False, returncode, "cancelled"
+            
             # Short delay before retry
             if attempt < FFMPEG_MAX_RETRIES:
                 time.sleep(1)
@@ -372,6 +377,7 @@ class FFmpegService:
                 "ffmpeg",
                 "-y",  # Overwrite output file
                 "-loglevel", "error",  # Only show errors
+                "-stats",  # Progress lines on stderr (parsed by ffmpeg_runner)
                 # Network resilience flags
                 "-rw_timeout", "60000000",  # 60 second read/write timeout (microseconds)
                 "-reconnect", "1",
@@ -416,13 +422,13 @@ class FFmpegService:
                 has_proxy_flag=bool(self.proxy_url),
                 has_proxy_env=bool(self.proxy_env))
             
-            # Execute FFmpeg
-            result = subprocess.run(
+            # Execute FFmpeg through the governed async runner
+            result = run_process(
                 cmd,
-                capture_output=True,
                 timeout=FFMPEG_TIMEOUT,
                 env=env,
-                check=False  # Don't raise on non-zero exit
+                job_id=self.job_id,
+                context="ffmpeg_extract"
             )
             
             duration_ms = int((time.time() - start_time) * 1000)
@@ -505,6 +511,9 @@ class FFmpegService:
             
             return False, -1, "timeout"
             
+        except ProcessCancelled:
+            return False, -1, "cancelled"
+            
         except Exception as e:
             duration_ms = int((time.time() - start_time) * 1000)
             
@@ -538,11 +547,11 @@ class FFmpegService:
                 audio_path
             ]
             
-            result = subprocess.run(
+            result = run_process(
                 cmd,
-                capture_output=True,
                 timeout=10,  # Keep shorter timeout for ffprobe validation
-                check=False
+                job_id=self.job_id,
+                context="ffprobe_validation"
             )
             
             if result.returncode != 0:
@@ -689,7 +698,10 @@ class FFmpegService:
         cookies: Optional[str]
     ) -> bool:
         """
-        Fallback method using requests streaming to download audio.
+        Fallback method downloading audio with concurrent HTTP Range requests.
+        
+        Connection count and bandwidth come from the job's download policy;
+        servers without Range support are streamed over a single connection.
         
         Args:
             audio_url: URL of audio stream
@@ -721,7 +733,8 @@ class FFmpegService:
                 allowed_methods=["GET"],
             )
             
-            adapter = HTTPAdapter(max_retries=retry_strategy)
+            policy = get_job_policy(self.job_id)
+            adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=max(1, policy.connections))
             session.mount("https://", adapter)
             session.mount("http://", adapter)
             
@@ -754,27 +767,22 @@ class FFmpegService:
                 job_id=self.job_id,
                 url=_mask_url_for_logging(audio_url),
                 has_cookies=bool(cookies),
-                has_proxy=bool(proxies))
+                has_proxy=bool(proxies),
+                connections=policy.connections,
+                max_bytes_per_sec=policy.max_bytes_per_sec)
             
-            response = session.get(
-                audio_url,
+            # Download to temporary file first
+            temp_path = output_path + ".tmp"
+            downloader = RangeDownloader(
+                session,
                 headers=headers,
                 proxies=proxies,
-                stream=True,
+                policy=policy,
+                job_id=self.job_id,
                 timeout=(10, REQUESTS_TIMEOUT)
             )
-            
-            response.raise_for_status()
-            
-            # Stream to temporary file first
-            temp_path = output_path + ".tmp"
-            bytes_downloaded = 0
-            
-            with open(temp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=REQUESTS_CHUNK_SIZE):
-                    if chunk:
-                        f.write(chunk)
-                        bytes_downloaded += len(chunk)
+            download = downloader.download(audio_url, temp_path)
+            bytes_downloaded = download.bytes_downloaded
             
             duration_ms = int((time.time() - start_time) * 1000)
             
@@ -787,7 +795,9 @@ class FFmpegService:
                     job_id=self.job_id,
                     duration_ms=duration_ms,
                     bytes_downloaded=bytes_downloaded,
-                    status_code=response.status_code)
+                    status_code=download.status_code,
+                    ranged=download.ranged,
+                    connections=download.connections)
                 
                 return True
             else:
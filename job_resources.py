@@ -0,0 +1,264 @@
+"""
+Per-job resource usage sampling.
+
+While a job runs, a shared background thread samples the worker process
+with psutil every JOB_RESOURCE_INTERVAL_SECONDS: CPU time, RSS, open file
+descriptors, threads, the child process tree (Chromium and the Playwright
+driver, ffmpeg/ffprobe) and used space on the temp filesystem. Each running
+job accumulates peaks and means from the samples taken during its run, and
+finish() returns them as resource_* fields for job_finished / job_failed.
+
+Everything except resource_thread_cpu_s (CPU time of the job's own worker
+thread) is measured for the whole worker process, so jobs running at the
+same time see each other's usage; resource_overlapping_jobs says how many
+did. Deltas (end minus start) of children, browsers, file descriptors and
+temp space are the leak signal: a job that ran alone and ends with more
+browsers or temp data than it started with also emits job_resource_leak.
+
+Off when psutil is not installed or JOB_RESOURCE_SAMPLING=false.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from log_events import evt
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    psutil = None
+    PSUTIL_AVAILABLE = False
+
+JOB_RESOURCE_SAMPLING = os.getenv("JOB_RESOURCE_SAMPLING", "true").lower() == "true"
+JOB_RESOURCE_INTERVAL_SECONDS = float(os.getenv("JOB_RESOURCE_INTERVAL_SECONDS", "1.0"))
+# Temp space a job may leave behind before it is reported as a leak
+JOB_RESOURCE_TMP_LEAK_MB = float(os.getenv("JOB_RESOURCE_TMP_LEAK_MB", "50"))
+
+MB = 1024 * 1024
+
+# Child process names (lowercased, prefix match) by kind
+BROWSER_PROCESS_PREFIXES = ("chrome", "chromium", "headless_shell")
+DRIVER_PROCESS_PREFIXES = ("node", "playwright")
+FFMPEG_PROCESS_PREFIXES = ("ffmpeg", "ffprobe")
+
+
+def classify_process(name: str) -> str:
+    """Kind of a child process by its name: browser, driver, ffmpeg or other."""
+    name = (name or "").lower()
+    if name.startswith(BROWSER_PROCESS_PREFIXES):
+        return "browser"
+    if name.startswith(DRIVER_PROCESS_PREFIXES):
+        return "driver"
+    if name.startswith(FFMPEG_PROCESS_PREFIXES):
+        return "ffmpeg"
+    return "other"
+
+
+def take_snapshot(process) -> Dict[str, Any]:
+    """One reading of the worker process and its child tree."""
+    cpu = process.cpu_times()
+    snapshot = {
+        "t": time.monotonic(),
+        "cpu_s": cpu.user + cpu.system,
+        # Children that already exited and were waited for (e.g. finished ffmpeg runs)
+        "children_cpu_s": getattr(cpu, "children_user", 0.0) + getattr(cpu, "children_system", 0.0),
+        "rss_mb": process.memory_info().rss / MB,
+        "threads": process.num_threads(),
+        "thread_cpu_s": {t.id: t.user_time + t.system_time for t in process.threads()},
+        "children": 0,
+        "children_rss_mb": 0.0,
+        "browser": 0,
+        "driver": 0,
+        "ffmpeg": 0,
+    }
+    try:
+        snapshot["fds"] = process.num_fds()
+    except AttributeError:
+        snapshot["fds"] = process.num_handles()
+    for child in process.children(recursive=True):
+        try:
+            kind = classify_process(child.name())
+            rss_mb = child.memory_info().rss / MB
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+        snapshot["children"] += 1
+        snapshot["children_rss_mb"] += rss_mb
+        if kind != "other":
+            snapshot[kind] += 1
+    try:
+        snapshot["tmp_used_mb"] = shutil.disk_usage(tempfile.gettempdir()).used / MB
+    except OSError:
+        snapshot["tmp_used_mb"] = None
+    return snapshot
+
+
+class JobUsage:
+    """Peaks and sums over the samples taken while one job ran."""
+
+    PEAK_FIELDS = ("rss_mb", "children_rss_mb", "fds", "threads", "children", "browser", "driver", "ffmpeg")
+
+    def __init__(self, job_id: str, thread_id: int, start: Dict[str, Any]):
+        self.job_id = job_id
+        self.thread_id = thread_id
+        self.start = start
+        self.last = start
+        self.samples = 0
+        self.rss_sum = 0.0
+        self.cpu_pct_sum = 0.0
+        self.cpu_pct_peak = 0.0
+        self.tmp_peak_mb = 0.0
+        self.overlapping_jobs = 0
+        self.peaks = {name: start[name] for name in self.PEAK_FIELDS}
+
+    def add(self, snapshot: Dict[str, Any], running_jobs: int) -> None:
+        elapsed = snapshot["t"] - self.last["t"]
+        if elapsed > 0:
+            cpu_pct = 100.0 * (snapshot["cpu_s"] - self.last["cpu_s"]) / elapsed
+            self.cpu_pct_sum += cpu_pct
+            self.cpu_pct_peak = max(self.cpu_pct_peak, cpu_pct)
+        self.samples += 1
+        self.rss_sum += snapshot["rss_mb"]
+        for name in self.PEAK_FIELDS:
+            self.peaks[name] = max(self.peaks[name], snapshot[name])
+        if snapshot["tmp_used_mb"] is not None and self.start["tmp_used_mb"] is not None:
+            self.tmp_peak_mb = max(self.tmp_peak_mb, snapshot["tmp_used_mb"] - self.start["tmp_used_mb"])
+        self.overlapping_jobs = max(self.overlapping_jobs, running_jobs - 1)
+        # Keep the job thread's last CPU reading in case it is gone at the end
+        if self.thread_id not in snapshot["thread_cpu_s"]:
+            snapshot = dict(snapshot, thread_cpu_s=self.last["thread_cpu_s"])
+        self.last = snapshot
+
+    def fields(self) -> Dict[str, Any]:
+        start, end = self.start, self.last
+        samples = max(self.samples, 1)
+        fields = {
+            "resource_samples": self.samples,
+            "resource_thread_cpu_s": round(end["thread_cpu_s"].get(self.thread_id, 0.0)
+                                           - start["thread_cpu_s"].get(self.thread_id, 0.0), 3),
+            "resource_process_cpu_s": round(end["cpu_s"] - start["cpu_s"], 3),
+            "resource_children_cpu_s": round(end["children_cpu_s"] - start["children_cpu_s"], 3),
+            "resource_cpu_pct_mean": round(self.cpu_pct_sum / samples, 1),
+            "resource_cpu_pct_peak": round(self.cpu_pct_peak, 1),
+            "resource_rss_mb_start": round(start["rss_mb"], 1),
+            "resource_rss_mb_mean": round(self.rss_sum / samples, 1),
+            "resource_rss_mb_peak": round(self.peaks["rss_mb"], 1),
+            "resource_rss_mb_delta": round(end["rss_mb"] - start["rss_mb"], 1),
+            "resource_children_rss_mb_peak": round(self.peaks["children_rss_mb"], 1),
+            "resource_fds_peak": self.peaks["fds"],
+            "resource_fds_delta": end["fds"] - start["fds"],
+            "resource_threads_peak": self.peaks["threads"],
+            "resource_children_peak": self.peaks["children"],
+            "resource_children_delta": end["children"] - start["children"],
+            "resource_browsers_peak": self.peaks["browser"],
+            "resource_browsers_delta": end["browser"] - start["browser"],
+            "resource_drivers_peak": self.peaks["driver"],
+            "resource_ffmpeg_peak": self.peaks["ffmpeg"],
+            "resource_overlapping_jobs": self.overlapping_jobs,
+        }
+        if start["tmp_used_mb"] is not None and end["tmp_used_mb"] is not None:
+            fields["resource_tmp_mb_peak"] = round(self.tmp_peak_mb, 1)
+            fields["resource_tmp_mb_delta"] = round(end["tmp_used_mb"] - start["tmp_used_mb"], 1)
+        return fields
+
+
+class JobResourceSampler:
+    """
+    Samples the worker process on one background thread while any job is
+    registered; start() and finish() are called from the job's own thread.
+    """
+
+    def __init__(self, interval_seconds: float = JOB_RESOURCE_INTERVAL_SECONDS,
+                 enabled: bool = JOB_RESOURCE_SAMPLING):
+        self.interval_seconds = interval_seconds
+        self.enabled = enabled and PSUTIL_AVAILABLE
+        self._jobs: Dict[str, JobUsage] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process() if self.enabled else None
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval_seconds)
+            with self._lock:
+                if not self._jobs:
+                    self._thread = None
+                    return
+            self.sample()
+
+    def sample(self) -> None:
+        """Take one snapshot and add it to every running job."""
+        try:
+            snapshot = take_snapshot(self._process)
+        except Exception as e:
+            evt("job_resource_sample_failed", detail=str(e)[:200])
+            return
+        with self._lock:
+            for usage in self._jobs.values():
+                usage.add(snapshot, len(self._jobs))
+
+    def start(self, job_id: str) -> bool:
+        """Start tracking a job on the calling (worker) thread."""
+        if not self.enabled:
+            return False
+        try:
+            snapshot = take_snapshot(self._process)
+        except Exception as e:
+            evt("job_resource_sample_failed", detail=str(e)[:200])
+            return False
+        with self._lock:
+            self._jobs[job_id] = JobUsage(job_id, threading.get_native_id(), snapshot)
+            # Count jobs that start and end between two samples as overlapping too
+            for usage in self._jobs.values():
+                usage.overlapping_jobs = max(usage.overlapping_jobs, len(self._jobs) - 1)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="job-resource-sampler", daemon=True)
+                self._thread.start()
+        return True
+
+    def finish(self, job_id: str) -> Dict[str, Any]:
+        """
+        Stop tracking a job and return its resource_* fields; {} if the job
+        was not tracked (sampling off, or already finished).
+        """
+        with self._lock:
+            if job_id not in self._jobs:
+                return {}
+        self.sample()
+        with self._lock:
+            usage = self._jobs.pop(job_id, None)
+        if usage is None:
+            return {}
+
+        fields = usage.fields()
+        tmp_delta = fields.get("resource_tmp_mb_delta", 0.0)
+        # Process-wide deltas only belong to this job if no other job ran alongside it
+        leaked = fields["resource_browsers_delta"] > 0 or tmp_delta > JOB_RESOURCE_TMP_LEAK_MB
+        if leaked and fields["resource_overlapping_jobs"] == 0:
+            evt("job_resource_leak",
+                browsers_delta=fields["resource_browsers_delta"],
+                children_delta=fields["resource_children_delta"],
+                tmp_mb_delta=tmp_delta)
+        return fields
+
+    def active_jobs(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+
+_sampler: Optional[JobResourceSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_job_resource_sampler() -> JobResourceSampler:
+    """Process-wide sampler shared by all jobs of this worker."""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = JobResourceSampler()
+    return _sampler
@@ -0,0 +1,451 @@
+"""
+Rate-limit aware LLM client for summarization.
+
+Every VideoSummarizer in the process shares one LLMClient, so concurrent jobs
+draw from the same per-minute quota instead of colliding on 429s:
+
+- two token buckets (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE) gate
+  each call; token cost is the estimated prompt size plus max_output_tokens
+- 429 and 5xx responses are retried with full-jitter exponential backoff
+  (LLM_MAX_RETRIES), and a 429 pauses all callers for the backoff period
+- identical in-flight requests are coalesced into one backend call
+- the backend is pluggable: GeminiBackend in production, a local stub in
+  benchmarks (benchmarks/llm_stub.py)
+- generate_stream() delivers text chunks as they arrive (not coalesced;
+  retried only while nothing has been streamed yet)
+
+The client runs on a private asyncio loop in a daemon thread; worker threads
+call the *_sync wrappers, async code can await generate()/generate_many().
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Union
+
+from log_events import evt
+from logging_setup import get_logger
+from transcript_compactor import estimate_tokens
+
+logger = get_logger(__name__)
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
+# Per-minute quota shared by all summaries in this process
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+# Calls in flight at once across all jobs
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1.0"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMError(Exception):
+    """Backend failure carrying an HTTP-style status code"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of a backend error (LLMError, google.api_core or httpx style)"""
+    for attr in ("status", "code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    return error_status(exc) in RETRYABLE_STATUS_CODES
+
+
+# --- Backends ---
+
+class LLMBackend:
+    """Interface for text generation backends"""
+
+    model_name = "unknown"
+
+    async def generate(self, prompt: str, max_output_tokens: int, temperature: float) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, max_output_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Yield text chunks; backends without streaming yield the whole response"""
+        yield await self.generate(prompt, max_output_tokens, temperature)
+
+
+def _chunk_text(chunk: Any) -> str:
+    # .text raises ValueError for chunks without text parts (e.g. safety stops)
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai (genai.configure must have run)"""
+
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME, model: Any = None):
+        self.model_name = model_name
+        self._model = model
+
+    @property
+    def model(self):
+        if self._model is None:
+            import google.generativeai as genai
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt: str, max_output_tokens: int, temperature: float) -> str:
+        generation_config = {
+            'temperature': temperature,
+            'max_output_tokens': max_output_tokens,
+        }
+        generate_async = getattr(self.model, "generate_content_async", None)
+        if asyncio.iscoroutinefunction(generate_async):
+            response = await generate_async(prompt, generation_config=generation_config)
+        else:
+            response = await asyncio.to_thread(self.model.generate_content, prompt,
+                                               generation_config=generation_config)
+        if not response or not response.text:
+            return ""
+        return response.text
+
+    async def stream(self, prompt: str, max_output_tokens: int, temperature: float) -> AsyncIterator[str]:
+        generate_async = getattr(self.model, "generate_content_async", None)
+        if not asyncio.iscoroutinefunction(generate_async):
+            yield await self.generate(prompt, max_output_tokens, temperature)
+            return
+        response = await generate_async(
+            prompt,
+            generation_config={
+                'temperature': temperature,
+                'max_output_tokens': max_output_tokens,
+            },
+            stream=True,
+        )
+        async for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+
+
+# --- Rate limiting ---
+
+class TokenBucket:
+    """Async token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until amount tokens are available; returns seconds waited"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # FIFO: one waiter at a time drains the bucket
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate_per_second
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+# --- Client ---
+
+class LLMClient:
+    """Shared, rate-limited, retrying and coalescing LLM client"""
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_seconds: float = LLM_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = LLM_RETRY_MAX_SECONDS,
+        timeout_seconds: float = LLM_REQUEST_TIMEOUT_SECONDS,
+        request_burst: Optional[int] = None,
+    ):
+        self.backend = backend
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.timeout_seconds = timeout_seconds
+
+        # Burst defaults to a full minute of requests, matching per-minute quotas
+        self._request_bucket = TokenBucket(requests_per_minute, capacity=request_burst)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Monotonic time until which all calls wait after a 429
+        self._cooldown_until = 0.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+        self._stats = {
+            "requests": 0,
+            "backend_calls": 0,
+            "coalesced": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "throttle_wait_s": 0.0,
+        }
+
+    @property
+    def model_name(self) -> str:
+        return self.backend.model_name
+
+    # --- async API ---
+
+    async def generate(self, prompt: str, max_output_tokens: int = 1500, temperature: float = 0.7) -> str:
+        """Generate text, sharing the result with identical in-flight requests"""
+        self._stats["requests"] += 1
+        key = hashlib.sha256(f"{max_output_tokens}|{temperature}|{prompt}".encode("utf-8")).hexdigest()
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._generate_with_retries(prompt, max_output_tokens, temperature)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so unshared failures don't warn as "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        on_chunk: Callable[[str], None],
+        max_output_tokens: int = 1500,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate text, calling on_chunk(delta) for each streamed piece; returns the full text"""
+        self._stats["requests"] += 1
+        return await self._generate_with_retries(prompt, max_output_tokens, temperature, on_chunk)
+
+    async def generate_many(
+        self,
+        prompts: Sequence[str],
+        max_output_tokens: int = 1500,
+        temperature: float = 0.7,
+        concurrency: Optional[int] = None,
+    ) -> List[Union[str, BaseException]]:
+        """Generate for a batch of prompts; failed entries hold their exception"""
+        limit = asyncio.Semaphore(max(1, concurrency or len(prompts) or 1))
+
+        async def run(prompt: str) -> str:
+            async with limit:
+                return await self.generate(prompt, max_output_tokens, temperature)
+
+        return await asyncio.gather(*(run(p) for p in prompts), return_exceptions=True)
+
+    async def _generate_with_retries(
+        self,
+        prompt: str,
+        max_output_tokens: int,
+        temperature: float,
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        cost = estimate_tokens(prompt) + max_output_tokens
+        attempt = 0
+        streamed: List[str] = []
+
+        while True:
+            waited = await self._wait_for_capacity(cost)
+            start = time.monotonic()
+            try:
+                async with self._semaphore:
+                    self._stats["backend_calls"] += 1
+                    if on_chunk is None:
+                        call = self.backend.generate(prompt, max_output_tokens, temperature)
+                    else:
+                        call = self._consume_stream(prompt, max_output_tokens, temperature, on_chunk, streamed)
+                    result = await asyncio.wait_for(call, timeout=self.timeout_seconds)
+                evt("llm_call",
+                    model=self.model_name,
+                    outcome="success",
+                    streamed=on_chunk is not None,
+                    attempt=attempt + 1,
+                    est_tokens=cost,
+                    throttle_ms=int(waited * 1000),
+                    duration_ms=int((time.monotonic() - start) * 1000))
+                return result
+            except Exception as e:
+                status = error_status(e)
+                # Text already handed to on_chunk cannot be taken back, so no retry
+                if not is_retryable(e) or attempt >= self.max_retries or streamed:
+                    self._stats["failures"] += 1
+                    evt("llm_call",
+                        model=self.model_name,
+                        outcome="error",
+                        attempt=attempt + 1,
+                        status=status,
+                        detail=str(e)[:200],
+                        duration_ms=int((time.monotonic() - start) * 1000))
+                    raise
+
+                delay = self._backoff_delay(attempt, getattr(e, "retry_after", None))
+                if status == 429:
+                    self._stats["rate_limited"] += 1
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                self._stats["retries"] += 1
+                attempt += 1
+                logger.warning(f"LLM call failed (status={status}), retry {attempt}/{self.max_retries} "
+                               f"in {delay:.2f}s: {e}")
+                evt("llm_retry", model=self.model_name, status=status, attempt=attempt,
+                    delay_ms=int(delay * 1000))
+                await asyncio.sleep(delay)
+
+    async def _consume_stream(
+        self,
+        prompt: str,
+        max_output_tokens: int,
+        temperature: float,
+        on_chunk: Callable[[str], None],
+        streamed: List[str],
+    ) -> str:
+        async for text in self.backend.stream(prompt, max_output_tokens, temperature):
+            streamed.append(text)
+            try:
+                on_chunk(text)
+            except Exception as e:
+                logger.warning(f"LLM stream callback failed: {e}")
+        return "".join(streamed)
+
+    async def _wait_for_capacity(self, cost: int) -> float:
+        """Honour any 429 cooldown, then take one request and cost tokens"""
+        waited = 0.0
+        cooldown = self._cooldown_until - time.monotonic()
+        if cooldown > 0:
+            await asyncio.sleep(cooldown)
+            waited += cooldown
+        waited += await self._request_bucket.acquire(1)
+        waited += await self._token_bucket.acquire(cost)
+        self._stats["throttle_wait_s"] += waited
+        return waited
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than retry_after"""
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after:
+            delay = max(delay, min(float(retry_after), self.retry_max_seconds))
+        return delay
+
+    # --- sync API for worker threads ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True)
+                    thread.start()
+                    self._loop_thread = thread
+                    self._loop = loop
+        return self._loop
+
+    def _run(self, coro):
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("LLMClient sync API called from its own event loop; await the async API instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def generate_sync(self, prompt: str, max_output_tokens: int = 1500, temperature: float = 0.7) -> str:
+        return self._run(self.generate(prompt, max_output_tokens, temperature))
+
+    def generate_stream_sync(
+        self,
+        prompt: str,
+        on_chunk: Callable[[str], None],
+        max_output_tokens: int = 1500,
+        temperature: float = 0.7,
+    ) -> str:
+        """Streaming generate for worker threads; on_chunk runs on the client loop thread"""
+        return self._run(self.generate_stream(prompt, on_chunk, max_output_tokens, temperature))
+
+    def generate_many_sync(
+        self,
+        prompts: Sequence[str],
+        max_output_tokens: int = 1500,
+        temperature: float = 0.7,
+        concurrency: Optional[int] = None,
+    ) -> List[Union[str, BaseException]]:
+        return self._run(self.generate_many(prompts, max_output_tokens, temperature, concurrency))
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["throttle_wait_s"] = round(stats["throttle_wait_s"], 3)
+        stats["model"] = self.model_name
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+    def close(self) -> None:
+        """Stop the background loop (tests/benchmarks)"""
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                if self._loop_thread is not None:
+                    self._loop_thread.join(timeout=5)
+                self._loop.close()
+                self._loop = None
+                self._loop_thread = None
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Get the process-wide Gemini LLMClient"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(GeminiBackend())
+    return _client
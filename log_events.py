@@ -6,10 +6,14 @@ for the TL;DW application's logging system.
 """
 
 import logging
+import os
+import random
 import time
 from typing import Any, Dict, Optional
 from contextlib import contextmanager
 
+import emf
+
 # Get the main application logger
 logger = logging.getLogger()
 
@@ -17,10 +21,118 @@ logger = logging.getLogger()
 perf_logger = logging.getLogger('perf')
 
 
+# Event classes. Core events (lifecycle, results, errors and anything not
+# registered) are always emitted at INFO and are exempt from rate limiting.
+# Diagnostic events are emitted at INFO and sampled at LOG_SAMPLE_DIAGNOSTIC.
+# Trace events are emitted at DEBUG (off at the default LOG_LEVEL=INFO) and
+# sampled at LOG_SAMPLE_TRACE.
+CORE = "core"
+DIAGNOSTIC = "diagnostic"
+TRACE = "trace"
+
+EVENT_CLASS_LEVELS = {CORE: logging.INFO, DIAGNOSTIC: logging.INFO, TRACE: logging.DEBUG}
+
+_sample_rates = {
+    CORE: 1.0,
+    DIAGNOSTIC: float(os.getenv("LOG_SAMPLE_DIAGNOSTIC", "1.0")),
+    TRACE: float(os.getenv("LOG_SAMPLE_TRACE", "1.0")),
+}
+
+# Explicitly classified events (unlisted events are core unless a prefix matches)
+EVENT_CLASSES: Dict[str, str] = {
+    "transcript_pipeline_enter_asr_block": DIAGNOSTIC,
+    "asr_eligibility_check": DIAGNOSTIC,
+    "asr_audio_source_select": DIAGNOSTIC,
+    "asr_step": DIAGNOSTIC,
+    "asr_capture": DIAGNOSTIC,
+    "asr_strategy": DIAGNOSTIC,
+    "asr_playback_keyboard_success": DIAGNOSTIC,
+    "asr_playback_keyboard_failed": DIAGNOSTIC,
+    "asr_playback_click_success": DIAGNOSTIC,
+    "asr_playback_click_failed": DIAGNOSTIC,
+    "asr_playback_js_success": DIAGNOSTIC,
+    "asr_playback_js_failed": DIAGNOSTIC,
+    "youtubei_retry_decision": DIAGNOSTIC,
+}
+
+EVENT_CLASS_PREFIXES = (
+    ("asr_trace_", TRACE),
+)
+
+# Resolved class per event name (registry + prefixes), filled on first use
+_event_class_cache: Dict[str, str] = {}
+
+
+def register_event(event: str, event_class: str) -> None:
+    """
+    Classify an event as core, diagnostic or trace.
+    
+    Example:
+        register_event("proxy_pool_snapshot", DIAGNOSTIC)
+    """
+    if event_class not in EVENT_CLASS_LEVELS:
+        raise ValueError(f"Unknown event class: {event_class}")
+    EVENT_CLASSES[event] = event_class
+    _event_class_cache.pop(event, None)
+
+
+def get_event_class(event: str) -> str:
+    """Return the class of an event (core when unregistered)."""
+    event_class = _event_class_cache.get(event)
+    if event_class is None:
+        event_class = EVENT_CLASSES.get(event)
+        if event_class is None:
+            event_class = next((cls for prefix, cls in EVENT_CLASS_PREFIXES if event.startswith(prefix)), CORE)
+        _event_class_cache[event] = event_class
+    return event_class
+
+
+def is_core_event(event: str) -> bool:
+    return get_event_class(event) == CORE
+
+
+def set_sample_rate(event_class: str, rate: float) -> None:
+    """Set the fraction (0.0-1.0) of diagnostic or trace events emitted."""
+    if event_class not in (DIAGNOSTIC, TRACE):
+        raise ValueError(f"Sampling applies to diagnostic and trace events, not {event_class!r}")
+    _sample_rates[event_class] = min(1.0, max(0.0, float(rate)))
+
+
+def get_sample_rates() -> Dict[str, float]:
+    return dict(_sample_rates)
+
+
+def _should_emit(event_class: str) -> bool:
+    if not logger.isEnabledFor(EVENT_CLASS_LEVELS[event_class]):
+        return False
+    rate = _sample_rates[event_class]
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def event_enabled(event: str) -> bool:
+    """
+    Cheap check whether an event can be emitted at all (level and a
+    non-zero sample rate). Guard expensive diagnostic/trace call sites with
+    it so their fields are never built when the event is switched off:
+    
+        if event_enabled("asr_trace_booleans"):
+            evt("asr_trace_booleans", asr_enabled_type=str(type(asr_enabled)), ...)
+    
+    Per-event sampling still happens in evt(). Core events are always enabled.
+    """
+    event_class = _event_class_cache.get(event) or get_event_class(event)
+    if event_class == CORE:
+        return True
+    return _sample_rates[event_class] > 0.0 and logger.isEnabledFor(EVENT_CLASS_LEVELS[event_class])
+
+
 def evt(event: str, **fields) -> None:
     """
     Emit a structured event with consistent field naming.
     
+    Diagnostic and trace events are level-gated and sampled per class before
+    any record is created (see register_event / set_sample_rate).
+    
     Args:
         event: The event type/name
         **fields: Additional fields to include in the event
@@ -29,12 +141,16 @@ def evt(event: str, **fields) -> None:
         evt("job_received", video_id="abc123", config="default")
         evt("stage_result", stage="youtubei", outcome="success", dur_ms=1250)
     """
-    # Create the event data with the event field
-    event_data = {"event": event}
-    event_data.update(fields)
+    event_class = _event_class_cache.get(event) or get_event_class(event)
+    
+    # The kwargs dict is fresh per call, so it carries the event field itself
+    fields["event"] = event
     
-    # Log at INFO level with the structured data
-    logger.info("", extra=event_data)
+    if event_class == CORE:
+        # Log at INFO level with the structured data
+        logger.info("", extra=fields)
+    elif _should_emit(event_class):
+        logger.log(EVENT_CLASS_LEVELS[event_class], "", extra=fields)
 
 
 def perf_evt(**fields) -> None:
@@ -194,6 +310,7 @@ def job_received(video_count: int, **config_fields) -> None:
         job_received(video_count=5, use_cookies=True, proxy_enabled=False)
     """
     evt("job_received", video_count=video_count, **config_fields)
+    emf.record_job_received(video_count)
 
 
 def job_finished(total_duration_ms: int, processed_count: int, video_count: int, outcome: str = "success", **result_fields) -> None:
@@ -217,6 +334,7 @@ def job_finished(total_duration_ms: int, processed_count: int, video_count: int,
         video_count=video_count,
         outcome=outcome,
         **result_fields)
+    emf.record_job(outcome, total_duration_ms)
 
 
 def job_failed(total_duration_ms: int, processed_count: int, video_count: int, error_type: str, error_detail: str, **error_fields) -> None:
@@ -242,6 +360,7 @@ def job_failed(total_duration_ms: int, processed_count: int, video_count: int, e
         error_type=error_type,
         detail=error_detail,
         **error_fields)
+    emf.record_job("error", total_duration_ms)
 
 
 def video_processed(video_id: str, outcome: str, duration_ms: int, transcript_source: str = None, **processing_fields) -> None:
@@ -271,6 +390,7 @@ def video_processed(video_id: str, outcome: str, duration_ms: int, transcript_so
     event_fields.update(processing_fields)
     
     evt("video_processed", **event_fields)
+    emf.record_video(outcome, duration_ms, transcript_source)
 
 
 # Reliability Event Definitions
@@ -2,29 +2,35 @@
 Core logging infrastructure for TL;DW application.
 
 Provides minimal JSON logging with thread-safe context management,
-rate limiting, and third-party library noise suppression.
+rate limiting, third-party library noise suppression and an optional
+asynchronous mode (LOG_ASYNC) that moves formatting and writes off the
+calling thread.
 """
 
+import atexit
 import json
 import logging
+import os
 import threading
 import time
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, Set
-from collections import defaultdict
+from logging.handlers import QueueHandler
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from collections import deque
 
 
 # Thread-local storage for job context
 _local = threading.local()
 
 
-def set_job_ctx(job_id: str = None, video_id: str = None):
+def set_job_ctx(job_id: str = None, video_id: str = None, trace_id: str = None):
     """
     Set thread-local context for job correlation.
     
     Args:
         job_id: Unique job identifier
         video_id: YouTube video ID being processed
+        trace_id: Id of the job's trace when tracing is enabled (see tracing.py)
     """
     if not hasattr(_local, 'context'):
         _local.context = {}
@@ -33,6 +39,8 @@ def set_job_ctx(job_id: str = None, video_id: str = None):
         _local.context['job_id'] = job_id
     if video_id is not None:
         _local.context['video_id'] = video_id
+    if trace_id is not None:
+        _local.context['trace_id'] = trace_id
 
 
 def clear_job_ctx():
@@ -48,12 +56,52 @@ def get_job_ctx() -> Dict[str, str]:
     return _local.context.copy()
 
 
+# Optional faster JSON encoder (output is identical for the types we log)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Attributes every LogRecord carries, plus those other formatters may add
+_RECORD_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+# Fields emitted in this order after lvl/job_id/video_id
+_ORDERED_FIELDS = (
+    'stage', 'event', 'outcome', 'dur_ms', 'detail',
+    'attempt', 'use_proxy', 'profile', 'cookie_source'
+)
+
+# Never emitted as extras (standard attributes and fields handled explicitly)
+_NON_EXTRA_FIELDS = _RECORD_ATTRS | frozenset(_ORDERED_FIELDS) | {'ts', 'lvl', 'job_id', 'video_id', 'trace_id'}
+
+
+def _stdlib_dumps(log_data: Dict[str, Any]) -> str:
+    return json.dumps(log_data, separators=(',', ':'), ensure_ascii=False)
+
+
+if ORJSON_AVAILABLE:
+    def _dumps(log_data: Dict[str, Any]) -> str:
+        try:
+            return orjson.dumps(log_data).decode('utf-8')
+        except TypeError:
+            # orjson rejects a few values json accepts (e.g. ints over 64 bits)
+            return _stdlib_dumps(log_data)
+else:
+    _dumps = _stdlib_dumps
+
+
 class JsonFormatter(logging.Formatter):
     """
     JSON formatter with standardized field order and context injection.
     
     Produces single-line JSON with stable schema:
     lvl, job_id, video_id, stage, event, outcome, dur_ms, detail
+    followed by any extra fields in alphabetical order.
+    
+    Extras are read from record.__dict__ against a precomputed set of
+    standard keys, so formatting does no per-record reflection.
     
     Note: Timestamps are omitted as CloudWatch provides them automatically.
     """
@@ -66,48 +114,46 @@ class JsonFormatter(logging.Formatter):
                 'lvl': record.levelname
             }
             
-            # Add thread-local context
-            context = get_job_ctx()
-            if 'job_id' in context:
-                log_data['job_id'] = context['job_id']
-            if 'video_id' in context:
-                log_data['video_id'] = context['video_id']
+            attrs = record.__dict__
             
-            # Add record attributes in stable order
-            for field in ['stage', 'event', 'outcome', 'dur_ms', 'detail']:
-                if hasattr(record, field) and getattr(record, field) is not None:
-                    log_data[field] = getattr(record, field)
+            # Add job context: captured at log time in async mode, otherwise
+            # read from this thread's context in place (no copy)
+            if '_job_ctx' in attrs:
+                context = attrs['_job_ctx']
+            else:
+                context = getattr(_local, 'context', None)
+            if context:
+                if 'job_id' in context:
+                    log_data['job_id'] = context['job_id']
+                if 'video_id' in context:
+                    log_data['video_id'] = context['video_id']
+                if 'trace_id' in context:
+                    log_data['trace_id'] = context['trace_id']
             
-            # Add optional context fields
-            for field in ['attempt', 'use_proxy', 'profile', 'cookie_source']:
-                if hasattr(record, field) and getattr(record, field) is not None:
-                    log_data[field] = getattr(record, field)
-            
-            # Add any other extra fields that were passed via logger.info(extra=...)
-            # Skip standard LogRecord attributes and fields we've already processed
-            standard_fields = {
-                'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 'filename',
-                'module', 'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
-                'thread', 'threadName', 'processName', 'process', 'getMessage', 'exc_info',
-                'exc_text', 'stack_info', 'ts', 'lvl', 'job_id', 'video_id', 'stage',
-                'event', 'outcome', 'dur_ms', 'detail', 'attempt', 'use_proxy', 'profile',
-                'cookie_source'
-            }
+            # Add record attributes in stable order, then optional context fields
+            for field in _ORDERED_FIELDS:
+                value = attrs.get(field)
+                if value is not None:
+                    log_data[field] = value
             
-            for attr_name in dir(record):
-                if (not attr_name.startswith('_') and 
-                    attr_name not in standard_fields and
-                    not callable(getattr(record, attr_name))):
-                    attr_value = getattr(record, attr_name)
-                    if attr_value is not None:
-                        log_data[attr_name] = attr_value
+            # Add any other extra fields that were passed via logger.info(extra=...),
+            # sorted to keep the key order stable
+            extras = [name for name in attrs if name not in _NON_EXTRA_FIELDS and not name.startswith('_')]
+            if extras:
+                extras.sort()
+                for name in extras:
+                    value = attrs[name]
+                    if value is not None and not callable(value):
+                        log_data[name] = value
             
             # Add message if not already in detail
-            if 'detail' not in log_data and record.getMessage():
-                log_data['detail'] = record.getMessage()
+            if 'detail' not in log_data:
+                message = record.getMessage()
+                if message:
+                    log_data['detail'] = message
             
             # Return single-line JSON
-            return json.dumps(log_data, separators=(',', ':'), ensure_ascii=False)
+            return _dumps(log_data)
             
         except Exception:
             # Fallback to basic formatting on any error (CloudWatch provides timestamps)
@@ -118,28 +164,41 @@ class RateLimitFilter(logging.Filter):
     """
     Rate limiting filter to prevent log spam.
     
-    Limits messages to 5 per key per 60-second sliding window.
-    Emits suppression markers when limits are exceeded.
+    Limits messages to 5 per key per 60-second window using a token bucket
+    per key (per_key tokens, refilled at per_key/window_sec per second), so
+    each record costs O(1). Structured events are keyed by level and event
+    name, plain messages by level and message text. Emits a suppression
+    marker when a key first runs out. Events for which exempt_event(name)
+    is true (core pipeline events) are never limited.
     """
     
-    def __init__(self, per_key: int = 5, window_sec: int = 60):
+    # Idle buckets are dropped once this many keys are tracked
+    MAX_KEYS = 10000
+    
+    def __init__(self, per_key: int = 5, window_sec: int = 60,
+                 exempt_event: Optional[Callable[[str], bool]] = None):
         super().__init__()
         self.per_key = per_key
         self.window_sec = window_sec
-        self.counts: Dict[str, list] = defaultdict(list)
-        self.suppressed: Set[str] = set()
+        self.refill_per_sec = per_key / window_sec
+        self.exempt_event = exempt_event
+        # key -> [tokens, last_refill_time, suppressing]
+        self.buckets: Dict[Tuple[str, str], list] = {}
         self._lock = threading.Lock()
     
-    def _get_message_key(self, record: logging.LogRecord) -> str:
-        """Generate key for rate limiting based on level and message template."""
+    def _get_message_key(self, record: logging.LogRecord) -> Tuple[str, str]:
+        """Generate key for rate limiting based on level and event name or message template."""
+        event = record.__dict__.get('event')
+        if event is not None:
+            return record.levelname, event
         # Use level and first 100 chars of message as key
-        message = record.getMessage()[:100]
-        return f"{record.levelname}:{message}"
+        return record.levelname, record.getMessage()[:100]
     
-    def _cleanup_old_entries(self, key: str, now: float):
-        """Remove entries outside the current window."""
-        cutoff = now - self.window_sec
-        self.counts[key] = [ts for ts in self.counts[key] if ts > cutoff]
+    def _prune(self, now: float):
+        """Drop buckets idle long enough to have refilled completely."""
+        idle_cutoff = now - self.window_sec
+        for key in [k for k, bucket in self.buckets.items() if bucket[1] <= idle_cutoff]:
+            del self.buckets[key]
     
     def filter(self, record: logging.LogRecord) -> bool:
         """
@@ -149,24 +208,35 @@ class RateLimitFilter(logging.Filter):
             True if record should be logged, False otherwise
         """
         try:
+            if self.exempt_event is not None:
+                event = record.__dict__.get('event')
+                if event is not None and self.exempt_event(event):
+                    return True
+            
             key = self._get_message_key(record)
-            now = time.time()
+            now = time.monotonic()
             
             with self._lock:
-                # Clean up old entries
-                self._cleanup_old_entries(key, now)
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    if len(self.buckets) >= self.MAX_KEYS:
+                        self._prune(now)
+                    bucket = self.buckets[key] = [float(self.per_key), now, False]
+                else:
+                    bucket[0] = min(self.per_key, bucket[0] + (now - bucket[1]) * self.refill_per_sec)
+                    bucket[1] = now
                 
                 # Check if we're within limits
-                if len(self.counts[key]) < self.per_key:
-                    self.counts[key].append(now)
-                    # Remove from suppressed set if we were suppressing
-                    self.suppressed.discard(key)
+                if bucket[0] >= 1.0:
+                    bucket[0] -= 1.0
+                    # Stop suppressing once messages flow again
+                    bucket[2] = False
                     return True
                 
                 # We're over the limit
-                if key not in self.suppressed:
-                    # First time hitting limit in this window - emit suppression marker
-                    self.suppressed.add(key)
+                if not bucket[2]:
+                    # First time hitting limit - emit suppression marker
+                    bucket[2] = True
                     # Modify the record to indicate suppression
                     original_msg = record.getMessage()
                     record.msg = f"{original_msg} [suppressed]"
@@ -181,13 +251,220 @@ class RateLimitFilter(logging.Filter):
             return True
 
 
-def configure_logging(log_level: str = "INFO", use_json: bool = True) -> logging.Logger:
+class LogRingBuffer:
+    """
+    Bounded FIFO of log records waiting for the async writer.
+    
+    Never blocks the producer: when full, the oldest record is discarded
+    (and counted), so a burst of events costs old log lines rather than
+    pipeline time.
+    """
+    
+    def __init__(self, capacity: int = 10000):
+        self.capacity = max(1, capacity)
+        self._records = deque(maxlen=self.capacity)
+        self._cond = threading.Condition(threading.Lock())
+        self.enqueued = 0
+        self.dropped = 0
+    
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        """Append a record (QueueHandler interface), dropping the oldest when full."""
+        with self._cond:
+            if len(self._records) == self.capacity:
+                self.dropped += 1
+            self._records.append(record)
+            self.enqueued += 1
+            self._cond.notify()
+    
+    def get_batch(self, max_items: int, timeout: float) -> List[logging.LogRecord]:
+        """Take up to max_items records, waiting up to timeout for the first one."""
+        with self._cond:
+            if not self._records and timeout > 0:
+                self._cond.wait(timeout)
+            records = self._records
+            return [records.popleft() for _ in range(min(max_items, len(records)))]
+    
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+    
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class AsyncLogHandler(QueueHandler):
+    """
+    Root handler for async mode: enqueues records for the batching writer.
+    
+    Only the message and the job context are resolved on the calling
+    thread; JSON formatting and I/O happen on the writer thread.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if '_job_ctx' not in record.__dict__:
+            context = getattr(_local, 'context', None)
+            record._job_ctx = dict(context) if context else None
+        return record
+
+
+class BatchingLogWriter:
+    """
+    Background thread that drains a LogRingBuffer into target handlers.
+    
+    Each batch is formatted with the target's own formatter and written to
+    its stream in a single write and flush. Records dropped by the buffer
+    are reported with a log_records_dropped line in the next batch.
+    """
+    
+    def __init__(self, buffer: LogRingBuffer, handlers: List[logging.Handler],
+                 batch_size: int = 256, flush_interval: float = 0.05):
+        self.buffer = buffer
+        self.handlers = list(handlers)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self._reported_dropped = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> 'BatchingLogWriter':
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the thread after writing everything still queued."""
+        self._stop.set()
+        self.buffer.wake()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def set_handlers(self, handlers: List[logging.Handler]) -> None:
+        self.handlers = list(handlers)
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self.buffer.get_batch(self.batch_size, self.flush_interval)
+            if batch:
+                self._write(batch)
+        # Drain what is left so shutdown loses nothing
+        while True:
+            batch = self.buffer.get_batch(self.batch_size, 0)
+            if not batch:
+                break
+            self._write(batch)
+    
+    def _dropped_notice(self) -> Optional[logging.LogRecord]:
+        dropped = self.buffer.dropped
+        if dropped == self._reported_dropped:
+            return None
+        count = dropped - self._reported_dropped
+        self._reported_dropped = dropped
+        notice = logging.LogRecord('logging_setup', logging.WARNING, __file__, 0,
+                                   f"{count} log records dropped (log queue full)", None, None)
+        notice.event = 'log_records_dropped'
+        notice.count = count
+        notice._job_ctx = None
+        return notice
+    
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        count = len(records)
+        notice = self._dropped_notice()
+        if notice:
+            records.insert(0, notice)
+        
+        for handler in self.handlers:
+            stream = getattr(handler, 'stream', None)
+            if stream is None:
+                for record in records:
+                    handler.handle(record)
+                continue
+            
+            lines = []
+            for record in records:
+                if record.levelno >= handler.level and handler.filter(record):
+                    try:
+                        lines.append(handler.format(record))
+                    except Exception:
+                        handler.handleError(record)
+            if not lines:
+                continue
+            
+            terminator = getattr(handler, 'terminator', '\n')
+            handler.acquire()
+            try:
+                stream.write(terminator.join(lines) + terminator)
+                handler.flush()
+            except Exception:
+                handler.handleError(records[-1])
+            finally:
+                handler.release()
+        
+        self.written += count
+        self.batches += 1
+
+
+# Async mode state (one writer per process)
+_log_buffer: Optional[LogRingBuffer] = None
+_log_writer: Optional[BatchingLogWriter] = None
+
+
+def _stop_async_logging() -> None:
+    global _log_buffer, _log_writer
+    if _log_writer is not None:
+        _log_writer.stop()
+    _log_buffer = None
+    _log_writer = None
+
+
+atexit.register(_stop_async_logging)
+
+
+def set_async_log_targets(handlers: List[logging.Handler]) -> bool:
+    """
+    Send async-mode output to these handlers (e.g. gunicorn's).
+    
+    Returns:
+        False if async mode is not active (caller should attach them directly)
+    """
+    if _log_writer is None:
+        return False
+    _log_writer.set_handlers(handlers)
+    return True
+
+
+def get_log_queue_stats() -> Dict[str, Any]:
+    """Async log queue depth and counters ({"async": False} in sync mode)."""
+    if _log_buffer is None or _log_writer is None:
+        return {"async": False}
+    return {
+        "async": True,
+        "capacity": _log_buffer.capacity,
+        "depth": len(_log_buffer),
+        "enqueued": _log_buffer.enqueued,
+        "dropped": _log_buffer.dropped,
+        "written": _log_writer.written,
+        "batches": _log_writer.batches,
+    }
+
+
+def configure_logging(log_level: str = "INFO", use_json: bool = True,
+                      async_mode: Optional[bool] = None) -> logging.Logger:
     """
     Configure application logging with JSON formatting and noise suppression.
     
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
         use_json: Whether to use JSON formatting (True) or basic formatting (False)
+        async_mode: Queue records in a bounded ring buffer and write them in
+            batches on a background thread (defaults to the LOG_ASYNC env var).
+            Sized by LOG_QUEUE_CAPACITY, LOG_BATCH_SIZE and LOG_FLUSH_INTERVAL_MS.
+    
+    Output goes to stderr, and also to LOG_FILE when that is set.
     
     Returns:
         Configured root logger
@@ -196,29 +473,59 @@ def configure_logging(log_level: str = "INFO", use_json: bool = True) -> logging
         # Get root logger
         root_logger = logging.getLogger()
         
-        # Clear any existing handlers
+        # Clear any existing handlers (and stop a previous async writer)
         for handler in root_logger.handlers[:]:
             root_logger.removeHandler(handler)
+        _stop_async_logging()
         
         # Set log level
         root_logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
         
-        # Create console handler
-        handler = logging.StreamHandler()
+        # Create console handler (plus optional file handler)
+        handlers = [logging.StreamHandler()]
+        log_file = os.getenv('LOG_FILE')
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
         
+        rate_filter = None
         if use_json:
             # Use JSON formatter with rate limiting
             formatter = JsonFormatter()
-            rate_filter = RateLimitFilter()
-            handler.addFilter(rate_filter)
+            # Core pipeline events are volume-controlled by event class, not rate limited
+            from log_events import is_core_event
+            rate_filter = RateLimitFilter(exempt_event=is_core_event)
         else:
             # Basic formatter for fallback
             formatter = logging.Formatter(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
         
-        handler.setFormatter(formatter)
-        root_logger.addHandler(handler)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        if async_mode is None:
+            async_mode = os.getenv('LOG_ASYNC', 'false').lower() == 'true'
+        
+        if async_mode:
+            global _log_buffer, _log_writer
+            _log_buffer = LogRingBuffer(int(os.getenv('LOG_QUEUE_CAPACITY', '10000')))
+            _log_writer = BatchingLogWriter(
+                _log_buffer, handlers,
+                batch_size=int(os.getenv('LOG_BATCH_SIZE', '256')),
+                flush_interval=int(os.getenv('LOG_FLUSH_INTERVAL_MS', '50')) / 1000
+            ).start()
+            
+            # Rate limiting runs before enqueueing so suppressed spam takes no queue space
+            queue_handler = AsyncLogHandler(_log_buffer)
+            queue_handler.setFormatter(formatter)
+            if rate_filter:
+                queue_handler.addFilter(rate_filter)
+            root_logger.addHandler(queue_handler)
+        else:
+            for handler in handlers:
+                if rate_filter:
+                    handler.addFilter(rate_filter)
+                root_logger.addHandler(handler)
         
         # Suppress third-party library noise
         _suppress_library_noise()
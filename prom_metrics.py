@@ -0,0 +1,366 @@
+"""
+OpenMetrics exposition of in-process counters, gauges and histograms.
+
+Collectors registered with register_collector() turn live in-process state
+(transcript_metrics, the JobManager, the circuit breaker) into
+MetricFamily objects; render_metrics() formats them as OpenMetrics text for
+the /metrics/prom scrape endpoint, so scraping reads memory instead of
+querying logs.
+
+Under gunicorn every worker has its own counters. With METRICS_MULTIPROC_DIR
+set, each worker writes a snapshot of its metrics to that directory every
+METRICS_SNAPSHOT_INTERVAL_SECONDS (and at exit), and a scrape served by any
+worker merges its own fresh metrics with the other workers' snapshots:
+counters and histograms are summed, including those of workers that have
+exited, and gauges are summed or maxed over live workers only. Snapshot
+files are namespaced by the gunicorn master pid, so a restart starts from
+zero.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("METRICS_SNAPSHOT_INTERVAL_SECONDS", "5"))
+# Snapshots left by a previous server (another master pid) are removed after this long
+STALE_SNAPSHOT_SECONDS = 3600
+
+# Upper bounds (seconds) of the exposed stage duration buckets
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0, 120.0, 300.0, 600.0)
+
+CIRCUIT_BREAKER_STATES = {"closed": 0, "half-open": 1, "open": 2}
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+@dataclass
+class MetricFamily:
+    """One metric family and its samples."""
+    name: str
+    type: str  # counter, gauge or histogram
+    help: str
+    unit: str = ""
+    # How gauges from several workers combine: "sum" or "max" (live workers only)
+    multiprocess_mode: str = "sum"
+    # (sample name suffix, labels, value)
+    samples: List[Sample] = field(default_factory=list)
+
+    def add(self, labels: Dict[str, Any], value: float) -> None:
+        suffix = "_total" if self.type == "counter" else ""
+        self.samples.append((suffix, {k: str(v) for k, v in labels.items()}, value))
+
+    def add_histogram(self, labels: Dict[str, Any], bounds: Iterable[float], cumulative_counts: Iterable[int],
+                      count: int, total: float) -> None:
+        labels = {k: str(v) for k, v in labels.items()}
+        for bound, n in zip(bounds, cumulative_counts):
+            self.samples.append(("_bucket", dict(labels, le=_format_value(bound)), n))
+        self.samples.append(("_bucket", dict(labels, le="+Inf"), count))
+        self.samples.append(("_count", labels, count))
+        self.samples.append(("_sum", labels, total))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name, "type": self.type, "help": self.help, "unit": self.unit,
+            "multiprocess_mode": self.multiprocess_mode,
+            "samples": [list(sample) for sample in self.samples],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricFamily":
+        family = cls(data["name"], data["type"], data["help"], data.get("unit", ""),
+                     data.get("multiprocess_mode", "sum"))
+        family.samples = [(suffix, labels, value) for suffix, labels, value in data["samples"]]
+        return family
+
+
+_collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+_collectors_lock = threading.Lock()
+
+
+def register_collector(collector: Callable[[], Iterable[MetricFamily]]) -> None:
+    """Add a callable returning MetricFamily objects to every scrape."""
+    with _collectors_lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+
+def collect() -> List[MetricFamily]:
+    """Run every registered collector; one failing collector does not fail the scrape."""
+    with _collectors_lock:
+        collectors = list(_collectors)
+    families = []
+    for collector in collectors:
+        try:
+            families.extend(collector())
+        except Exception as e:
+            logging.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+    return families
+
+
+# --- Collectors -----------------------------------------------------------
+
+def collect_transcript_metrics() -> List[MetricFamily]:
+    """Transcript outcome counters and stage duration histograms from transcript_metrics."""
+    import transcript_metrics
+
+    legacy = transcript_metrics.snapshot()
+    success = MetricFamily("tldw_transcript_success", "counter", "Transcripts obtained, by source.")
+    for source, n in sorted(legacy["success_by_source"].items()):
+        success.add({"source": source}, n)
+    failure = MetricFamily("tldw_transcript_failure", "counter", "Transcript stage failures, by stage.")
+    for stage, n in sorted(legacy["fail_by_stage"].items()):
+        failure.add({"stage": stage}, n)
+
+    attempts = MetricFamily("tldw_stage_attempts", "counter", "Transcript stage attempts.")
+    for (stage, proxy_used, profile, outcome), n in sorted(transcript_metrics.get_stage_attempt_counts().items()):
+        attempts.add({"stage": stage, "proxy_used": str(proxy_used).lower(), "profile": profile,
+                      "outcome": outcome}, n)
+
+    durations = MetricFamily("tldw_stage_duration_seconds", "histogram", "Transcript stage duration.",
+                             unit="seconds")
+    bounds_ms = [bound * 1000 for bound in DURATION_BUCKETS]
+    for stage, hist in sorted(transcript_metrics.get_stage_duration_buckets(bounds_ms).items()):
+        durations.add_histogram({"stage": stage}, DURATION_BUCKETS, hist["buckets"],
+                                hist["count"], hist["sum"] / 1000)
+
+    return [success, failure, attempts, durations]
+
+
+def collect_job_metrics(stats: Dict[str, Any]) -> List[MetricFamily]:
+    """Job gauges from JobManager.get_stats()."""
+    jobs = MetricFamily("tldw_jobs", "gauge", "Summarization jobs held by the job manager, by status.")
+    for status, n in sorted(stats["jobs_by_status"].items()):
+        jobs.add({"status": status}, n)
+    videos = MetricFamily("tldw_job_active_videos", "gauge", "Videos of queued or processing jobs, by stage.")
+    for stage, n in sorted(stats["active_videos_by_stage"].items()):
+        videos.add({"stage": stage}, n)
+    slots = MetricFamily("tldw_job_worker_slots", "gauge", "Concurrent job slots.")
+    slots.add({}, stats["worker_concurrency"])
+    return [jobs, videos, slots]
+
+
+def collect_circuit_breaker_metrics(status: Dict[str, Any]) -> List[MetricFamily]:
+    """Circuit breaker gauges from get_circuit_breaker_status(); the worst worker wins."""
+    state = MetricFamily("tldw_circuit_breaker_state", "gauge",
+                         "Playwright circuit breaker state (0=closed, 1=half-open, 2=open).",
+                         multiprocess_mode="max")
+    state.add({}, CIRCUIT_BREAKER_STATES.get(status.get("state"), 0))
+    failures = MetricFamily("tldw_circuit_breaker_failures", "gauge", "Playwright circuit breaker failure count.",
+                            multiprocess_mode="max")
+    failures.add({}, status.get("failure_count") or 0)
+    return [state, failures]
+
+
+# --- Exposition -------------------------------------------------------------
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def render(families: List[MetricFamily]) -> str:
+    """Format metric families as OpenMetrics text."""
+    lines = []
+    for family in families:
+        lines.append(f"# TYPE {family.name} {family.type}")
+        if family.unit:
+            lines.append(f"# UNIT {family.name} {family.unit}")
+        lines.append(f"# HELP {family.name} {family.help}")
+        for suffix, labels, value in family.samples:
+            if labels:
+                label_text = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels.items())
+                lines.append(f"{family.name}{suffix}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{family.name}{suffix} {_format_value(value)}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def merge_families(snapshots: List[Tuple[bool, List[MetricFamily]]]) -> List[MetricFamily]:
+    """
+    Combine per-worker families given as (worker_alive, families).
+
+    Counter and histogram samples are summed over every worker; gauge samples
+    are summed or maxed (per family multiprocess_mode) over live workers.
+    """
+    merged: Dict[str, MetricFamily] = {}
+    values: Dict[str, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Sample]] = {}
+    for alive, families in snapshots:
+        for family in families:
+            if family.type == "gauge" and not alive:
+                continue
+            target = merged.get(family.name)
+            if target is None:
+                target = merged[family.name] = MetricFamily(family.name, family.type, family.help, family.unit,
+                                                             family.multiprocess_mode)
+                values[family.name] = {}
+            samples = values[family.name]
+            for suffix, labels, value in family.samples:
+                key = (suffix, tuple(sorted(labels.items())))
+                previous = samples.get(key)
+                if previous is None:
+                    samples[key] = (suffix, labels, value)
+                elif family.type == "gauge" and family.multiprocess_mode == "max":
+                    samples[key] = (suffix, labels, max(previous[2], value))
+                else:
+                    samples[key] = (suffix, labels, previous[2] + value)
+    for name, family in merged.items():
+        family.samples = list(values[name].values())
+    return list(merged.values())
+
+
+# --- Multi-process snapshots --------------------------------------------------
+
+def _snapshot_prefix() -> str:
+    # Workers of one gunicorn master share its pid as their parent
+    return f"{os.getppid()}-"
+
+
+def _snapshot_path(directory: str) -> str:
+    return os.path.join(directory, f"{_snapshot_prefix()}{os.getpid()}.json")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot(directory: str, families: Optional[List[MetricFamily]] = None) -> None:
+    """Atomically write this worker's metrics to its snapshot file."""
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory)
+    payload = {
+        "pid": os.getpid(),
+        "written_at": time.time(),
+        "families": [family.to_dict() for family in (collect() if families is None else families)],
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_snapshots(directory: str) -> List[Tuple[bool, List[MetricFamily]]]:
+    """Other workers' snapshots (this server only) as (alive, families)."""
+    own = _snapshot_path(directory)
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, f"{_snapshot_prefix()}*.json")):
+        if path == own:
+            continue
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+            families = [MetricFamily.from_dict(data) for data in payload["families"]]
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
+            continue
+        snapshots.append((_pid_alive(int(payload["pid"])), families))
+    return snapshots
+
+
+def remove_stale_snapshots(directory: str, max_age_seconds: float = STALE_SNAPSHOT_SECONDS) -> int:
+    """Delete snapshots written by other servers and not updated for max_age_seconds."""
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    prefix = _snapshot_prefix()
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        if os.path.basename(path).startswith(prefix):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def render_metrics() -> str:
+    """OpenMetrics text for this process, merged with sibling workers when configured."""
+    families = collect()
+    if not METRICS_MULTIPROC_DIR:
+        return render(families)
+    snapshots = [(True, families)] + read_snapshots(METRICS_MULTIPROC_DIR)
+    merged = merge_families(snapshots)
+    workers = MetricFamily("tldw_metrics_workers", "gauge", "Live worker processes contributing metrics.")
+    workers.add({}, sum(1 for alive, _ in snapshots if alive))
+    return render(merged + [workers])
+
+
+class MetricsSnapshotWriter:
+    """Background thread writing this worker's snapshot every interval."""
+
+    def __init__(self, directory: str, interval_seconds: float = METRICS_SNAPSHOT_INTERVAL_SECONDS):
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsSnapshotWriter":
+        remove_stale_snapshots(self.directory)
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.write()
+            self._stop.wait(self.interval_seconds)
+
+    def write(self) -> None:
+        try:
+            write_snapshot(self.directory)
+        except Exception as e:
+            logging.warning(f"Failed to write metrics snapshot: {e}")
+
+    def stop(self) -> None:
+        """Stop the thread and leave a final snapshot so this worker's counters survive it."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.write()
+
+
+_snapshot_writer: Optional[MetricsSnapshotWriter] = None
+_snapshot_writer_lock = threading.Lock()
+
+
+def start_snapshot_writer() -> Optional[MetricsSnapshotWriter]:
+    """Start this process's snapshot writer once, if METRICS_MULTIPROC_DIR is set."""
+    global _snapshot_writer
+    if not METRICS_MULTIPROC_DIR:
+        return None
+    with _snapshot_writer_lock:
+        if _snapshot_writer is None:
+            _snapshot_writer = MetricsSnapshotWriter(METRICS_MULTIPROC_DIR).start()
+        return _snapshot_writer
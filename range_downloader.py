@@ -0,0 +1,300 @@
+"""
+Range-parallel HTTP downloader for audio streams.
+
+googlevideo serves audio with HTTP Range support, so a long file can be
+fetched over several connections at once. The downloader probes the size
+with a one-byte range request, preallocates the output file, and has each
+worker write its part at the right offset with os.pwrite. Servers that do
+not answer the probe with 206 fall back to a single streaming connection.
+
+Concurrency and bandwidth are per-job policy rather than a fixed global
+throttle: JobManager sets each job's policy when it starts (see
+job_download_policy), and every download of a job draws from that job's
+one token bucket, so max_bytes_per_sec limits the job as a whole.
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from log_events import evt
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for jobs without an explicit policy
+AUDIO_DOWNLOAD_CONNECTIONS = int(os.getenv("AUDIO_DOWNLOAD_CONNECTIONS", "4"))
+AUDIO_DOWNLOAD_MAX_BPS = int(os.getenv("AUDIO_DOWNLOAD_MAX_BPS", "0"))  # 0 = unlimited
+# Bandwidth shared by all concurrent jobs of a worker; split evenly between job slots
+AUDIO_DOWNLOAD_WORKER_MAX_BPS = int(os.getenv("AUDIO_DOWNLOAD_WORKER_MAX_BPS", "0"))  # 0 = unlimited
+AUDIO_DOWNLOAD_MIN_PART_BYTES = 1024 * 1024  # Don't split below 1MB per connection
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PART_MAX_ATTEMPTS = 2
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
+
+
+@dataclass(frozen=True)
+class DownloadPolicy:
+    """Per-job download limits."""
+    connections: int = AUDIO_DOWNLOAD_CONNECTIONS
+    max_bytes_per_sec: int = AUDIO_DOWNLOAD_MAX_BPS  # 0 = unlimited
+    min_part_bytes: int = AUDIO_DOWNLOAD_MIN_PART_BYTES
+
+
+_job_policies: Dict[str, DownloadPolicy] = {}
+_job_buckets: Dict[str, "TokenBucket"] = {}
+_policy_lock = threading.Lock()
+
+
+def job_download_policy(job_slots: int) -> DownloadPolicy:
+    """
+    Limits for one of job_slots concurrently running jobs: the per-job
+    defaults, with AUDIO_DOWNLOAD_WORKER_MAX_BPS (if set) split evenly so the
+    worker's jobs together stay within it.
+    """
+    max_bps = AUDIO_DOWNLOAD_MAX_BPS
+    if AUDIO_DOWNLOAD_WORKER_MAX_BPS > 0:
+        share = max(1, AUDIO_DOWNLOAD_WORKER_MAX_BPS // max(1, job_slots))
+        max_bps = min(max_bps, share) if max_bps > 0 else share
+    return DownloadPolicy(max_bytes_per_sec=max_bps)
+
+
+def set_job_policy(job_id: str, policy: DownloadPolicy) -> None:
+    """Set download limits for a job."""
+    with _policy_lock:
+        _job_policies[job_id] = policy
+        _job_buckets.pop(job_id, None)
+
+
+def get_job_policy(job_id: Optional[str]) -> DownloadPolicy:
+    """Get download limits for a job (environment defaults if unset)."""
+    with _policy_lock:
+        policy = _job_policies.get(job_id) if job_id else None
+    return policy or DownloadPolicy()
+
+
+def get_job_bucket(job_id: Optional[str], policy: DownloadPolicy) -> "TokenBucket":
+    """
+    The token bucket shared by all downloads of a job (created from policy on
+    first use); downloads without a job get their own.
+    """
+    if not job_id:
+        return TokenBucket(policy.max_bytes_per_sec)
+    with _policy_lock:
+        bucket = _job_buckets.get(job_id)
+        if bucket is None:
+            bucket = _job_buckets[job_id] = TokenBucket(policy.max_bytes_per_sec)
+    return bucket
+
+
+def clear_job_policy(job_id: str) -> None:
+    """Forget the policy and bandwidth bucket of a finished job."""
+    with _policy_lock:
+        _job_policies.pop(job_id, None)
+        _job_buckets.pop(job_id, None)
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting bytes per second."""
+
+    def __init__(self, rate: int, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, DOWNLOAD_CHUNK_SIZE)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        """Block until amount tokens are available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a download."""
+    bytes_downloaded: int
+    ranged: bool
+    connections: int
+    duration_ms: int
+    status_code: int
+
+
+def _split_ranges(total_size: int, policy: DownloadPolicy) -> List[Tuple[int, int]]:
+    """Split [0, total_size) into inclusive byte ranges, one per connection."""
+    max_parts = max(1, total_size // max(1, policy.min_part_bytes))
+    parts = max(1, min(policy.connections, max_parts))
+    part_size = -(-total_size // parts)  # ceil division
+    return [(start, min(start + part_size, total_size) - 1)
+            for start in range(0, total_size, part_size)]
+
+
+class RangeDownloader:
+    """Download a URL into a file over concurrent Range requests."""
+
+    def __init__(
+        self,
+        session: requests.Session,
+        headers: Optional[Dict[str, str]] = None,
+        proxies: Optional[Dict[str, str]] = None,
+        policy: Optional[DownloadPolicy] = None,
+        job_id: Optional[str] = None,
+        timeout: Tuple[int, int] = (10, 180),
+    ):
+        self.session = session
+        self.headers = dict(headers or {})
+        self.proxies = proxies
+        self.policy = policy or get_job_policy(job_id)
+        self.job_id = job_id
+        self.timeout = timeout
+        self._bucket = get_job_bucket(job_id, self.policy)
+
+    def download(self, url: str, output_path: str) -> DownloadResult:
+        """
+        Download url to output_path.
+
+        Raises:
+            requests.exceptions.RequestException: On HTTP/network failure
+            IOError: If a part comes back short after retries
+        """
+        start_time = time.time()
+        total_size, probe_status = self._probe_size(url)
+
+        if total_size is None:
+            bytes_downloaded, status_code = self._download_single(url, output_path)
+            return DownloadResult(
+                bytes_downloaded=bytes_downloaded,
+                ranged=False,
+                connections=1,
+                duration_ms=int((time.time() - start_time) * 1000),
+                status_code=status_code,
+            )
+
+        ranges = _split_ranges(total_size, self.policy)
+        fd = os.open(output_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            self._preallocate(fd, total_size)
+
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(self._download_part, url, fd, start, end)
+                           for start, end in ranges]
+                bytes_downloaded = sum(f.result() for f in futures)
+        finally:
+            os.close(fd)
+
+        duration_ms = int((time.time() - start_time) * 1000)
+        evt("range_download_complete",
+            job_id=self.job_id,
+            bytes_downloaded=bytes_downloaded,
+            connections=len(ranges),
+            duration_ms=duration_ms,
+            throughput_kbps=int(bytes_downloaded / 1024 / max(duration_ms / 1000, 0.001)))
+
+        return DownloadResult(
+            bytes_downloaded=bytes_downloaded,
+            ranged=True,
+            connections=len(ranges),
+            duration_ms=duration_ms,
+            status_code=probe_status,
+        )
+
+    def _probe_size(self, url: str) -> Tuple[Optional[int], int]:
+        """Return (total size, status) if the server honours Range requests."""
+        headers = dict(self.headers, Range="bytes=0-0")
+        response = self.session.get(url, headers=headers, proxies=self.proxies,
+                                    stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            if response.status_code != 206:
+                evt("range_download_unsupported", job_id=self.job_id, status_code=response.status_code)
+                return None, response.status_code
+
+            match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+            if not match or int(match.group(3)) <= 0:
+                evt("range_download_unsupported", job_id=self.job_id, reason="no_content_range")
+                return None, response.status_code
+
+            return int(match.group(3)), response.status_code
+        finally:
+            response.close()
+
+    @staticmethod
+    def _preallocate(fd: int, size: int) -> None:
+        """Reserve disk space for the whole file up front."""
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError:
+                pass
+        os.ftruncate(fd, size)
+
+    def _download_part(self, url: str, fd: int, start: int, end: int) -> int:
+        """Fetch bytes [start, end] and write them at their offset, resuming on short reads."""
+        offset = start
+        for attempt in range(1, PART_MAX_ATTEMPTS + 1):
+            headers = dict(self.headers, Range=f"bytes={offset}-{end}")
+            response = self.session.get(url, headers=headers, proxies=self.proxies,
+                                        stream=True, timeout=self.timeout)
+            try:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise IOError(f"Range request returned {response.status_code}")
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    chunk = chunk[:end + 1 - offset]
+                    self._bucket.consume(len(chunk))
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    if offset > end:
+                        break
+            except (requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ConnectionError) as e:
+                if attempt == PART_MAX_ATTEMPTS:
+                    raise
+                evt("range_download_part_retry", job_id=self.job_id, attempt=attempt,
+                    error_type=type(e).__name__)
+                continue
+            finally:
+                response.close()
+
+            if offset > end:
+                return end + 1 - start
+
+        raise IOError(f"Short read for bytes {start}-{end}: got {offset - start}")
+
+    def _download_single(self, url: str, output_path: str) -> Tuple[int, int]:
+        """Stream the whole body over one connection."""
+        response = self.session.get(url, headers=self.headers, proxies=self.proxies,
+                                    stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            bytes_downloaded = 0
+            with open(output_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:
+                        self._bucket.consume(len(chunk))
+                        f.write(chunk)
+                        bytes_downloaded += len(chunk)
+            return bytes_downloaded, response.status_code
+        finally:
+            response.close()
+
@@ -46,6 +46,9 @@ class ReliabilityConfig:
     # ASR settings
     asr_max_video_minutes: int = 20
     
+    # Concurrency settings
+    ffmpeg_max_concurrency: int = max(1, os.cpu_count() or 1)
+    
     @classmethod
     def from_env(cls) -> 'ReliabilityConfig':
         """Load configuration from environment variables with validation."""
@@ -74,7 +77,10 @@ class ReliabilityConfig:
                 circuit_breaker_recovery=cls._parse_int_env("CIRCUIT_BREAKER_RECOVERY", 600, min_val=60, max_val=3600),
                 
                 # ASR settings
-                asr_max_video_minutes=cls._parse_int_env("ASR_MAX_VIDEO_MINUTES", 20, min_val=1, max_val=120)
+                asr_max_video_minutes=cls._parse_int_env("ASR_MAX_VIDEO_MINUTES", 20, min_val=1, max_val=120),
+                
+                # Concurrency settings (default: one ffmpeg/ffprobe process per CPU)
+                ffmpeg_max_concurrency=cls._parse_int_env("FFMPEG_MAX_CONCURRENCY", max(1, os.cpu_count() or 1), min_val=1, max_val=64)
             )
             
             # Validate configuration consistency
@@ -151,6 +157,7 @@ class ReliabilityConfig:
         logger.info(f"  Features: content_validation={self.enable_content_validation}, fast_fail={self.enable_fast_fail_youtubei}")
         logger.info(f"  Retries: FFmpeg={self.ffmpeg_max_retries}, Timedtext={self.timedtext_retries}, YouTubei={self.youtubei_retries}")
         logger.info(f"  ASR: max_minutes={self.asr_max_video_minutes}, playback_trigger={self.enable_asr_playback_trigger}")
+        logger.info(f"  Concurrency: ffmpeg_max={self.ffmpeg_max_concurrency}")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary for serialization."""
@@ -179,6 +186,9 @@ class ReliabilityConfig:
             },
             "asr": {
                 "asr_max_video_minutes": self.asr_max_video_minutes
+            },
+            "concurrency": {
+                "ffmpeg_max_concurrency": self.ffmpeg_max_concurrency
             }
         }
     
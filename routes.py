@@ -3,16 +3,22 @@ import os
 from datetime import datetime
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import login_required, current_user
-from cookie_utils import parse_netscape_for_both
+from cookie_resolver import CookieBundle, get_cookie_resolver
 from youtube_service import YouTubeService, AuthenticationError
 from transcript_service import TranscriptService
 from summarizer import VideoSummarizer
 from email_service import EmailService
+from email_dispatcher import EMAIL_DISPATCH_ASYNC
 from models import update_user_session, get_user_session
 from error_handler import (
     StructuredLogger, handle_transcript_error, handle_summarization_error, 
     handle_email_error, handle_job_error, handle_api_error, log_performance_metrics
 )
+from ffmpeg_runner import cancel_job as cancel_job_processes, is_job_cancelled, clear_job as clear_job_processes
+from range_downloader import clear_job_policy, job_download_policy, set_job_policy
+from asr_budget import parse_iso8601_duration
+from sampling_profiler import check_admin_token, start_job_profiler, finish_job_profile
+from job_resources import get_job_resource_sampler
 from security_manager import secure_cookie_manager, credential_protector, setup_secure_logging
 
 main_routes = Blueprint("main_routes", __name__)
@@ -255,9 +261,34 @@ def _convert_transcript_to_text(transcript) -> str:
 import threading
 import time
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
 
+# Per-video stages exposed through JobStatus.to_dict
+VIDEO_STAGES = ("queued", "fetching_transcript", "transcript_acquired", "summary_streaming", "summary_done", "error")
+
+@dataclass
+class VideoProgress:
+    video_id: str
+    stage: str = "queued"
+    title: Optional[str] = None
+    transcript_source: Optional[str] = None
+    # Partial summary while streaming, final summary once done
+    summary: Optional[str] = None
+    error_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "video_id": self.video_id,
+            "stage": self.stage,
+            "title": self.title,
+            "transcript_source": self.transcript_source,
+            "summary": self.summary,
+            "error_message": self.error_message,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
 @dataclass
 class JobStatus:
     job_id: str
@@ -268,6 +299,11 @@ class JobStatus:
     video_count: int
     processed_count: int = 0
     error_message: Optional[str] = None
+    videos: Dict[str, VideoProgress] = field(default_factory=dict)
+    # Sample this job's thread and attach the profile to job_finished
+    profile_requested: bool = False
+    # Worker thread running the job, once it has started
+    thread_id: Optional[int] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -278,16 +314,20 @@ class JobStatus:
             "user_id": self.user_id,
             "video_count": self.video_count,
             "processed_count": self.processed_count,
-            "error_message": self.error_message
+            "error_message": self.error_message,
+            "videos": [video.to_dict() for video in list(self.videos.values())]
         }
 
 class JobManager:
     def __init__(self, worker_concurrency: int = 2):
+        self.worker_concurrency = worker_concurrency
         self.executor = ThreadPoolExecutor(max_workers=worker_concurrency)
         self.jobs: Dict[str, JobStatus] = {}
         self.lock = threading.Lock()
         # Semaphore for job concurrency control
         self.job_semaphore = threading.Semaphore(worker_concurrency)
+        # Running sampling profilers of jobs flagged for profiling
+        self.job_profilers = {}
     
     def submit_summarization_job(self, user_id: int, video_ids: list, app) -> str:
         """Submit job and return job_id immediately"""
@@ -300,7 +340,8 @@ class JobManager:
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow(),
                 user_id=user_id,
-                video_count=len(video_ids)
+                video_count=len(video_ids),
+                videos={vid: VideoProgress(video_id=vid) for vid in video_ids}
             )
         
         # Submit job to executor
@@ -318,13 +359,87 @@ class JobManager:
         with self.lock:
             if job_id in self.jobs:
                 job = self.jobs[job_id]
-                job.status = status
+                # A cancelled job keeps its status while in-flight work winds down
+                if job.status != "cancelled":
+                    job.status = status
                 job.updated_at = datetime.utcnow()
                 if error_message:
                     job.error_message = error_message
                 if processed_count is not None:
                     job.processed_count = processed_count
 
+    def update_video_progress(self, job_id: str, video_id: str, stage: str = None, **fields):
+        """Update one video's progress thread-safely (fields: title, transcript_source, summary, error_message)"""
+        if stage is not None and stage not in VIDEO_STAGES:
+            raise ValueError(f"Unknown video stage: {stage}")
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return
+            video = job.videos.get(video_id)
+            if video is None:
+                video = job.videos[video_id] = VideoProgress(video_id=video_id)
+            if stage:
+                video.stage = stage
+            for name, value in fields.items():
+                setattr(video, name, value)
+            video.updated_at = job.updated_at = datetime.utcnow()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Job counts by status and, for queued/processing jobs, video counts by stage"""
+        jobs_by_status = {}
+        active_videos_by_stage = {}
+        with self.lock:
+            for job in self.jobs.values():
+                jobs_by_status[job.status] = jobs_by_status.get(job.status, 0) + 1
+                if job.status in ("queued", "processing"):
+                    for video in job.videos.values():
+                        active_videos_by_stage[video.stage] = active_videos_by_stage.get(video.stage, 0) + 1
+        return {
+            "jobs_by_status": jobs_by_status,
+            "active_videos_by_stage": active_videos_by_stage,
+            "worker_concurrency": self.worker_concurrency,
+        }
+
+    def cancel_job(self, job_id: str) -> bool:
+        """Abort a queued or running job and terminate its ffmpeg/ffprobe processes"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job.status in ("done", "error", "cancelled"):
+                return False
+            job.status = "cancelled"
+            job.updated_at = datetime.utcnow()
+        
+        cancel_job_processes(job_id)
+        return True
+
+    def enable_profiling(self, job_id: str) -> bool:
+        """Flag a queued or running job for stack sampling; its profile is attached to job_finished"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job.status in ("done", "error", "cancelled"):
+                return False
+            job.profile_requested = True
+            if job.thread_id is not None and job_id not in self.job_profilers:
+                self.job_profilers[job_id] = start_job_profiler(job.thread_id)
+        return True
+
+    def _mark_job_thread(self, job_id: str):
+        """Record the worker thread running a job and start its profiler if one was requested"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return
+            job.thread_id = threading.get_ident()
+            if job.profile_requested and job_id not in self.job_profilers:
+                self.job_profilers[job_id] = start_job_profiler(job.thread_id)
+
+    def _finish_job_profile(self, job_id: str) -> Dict[str, Any]:
+        """Stop a job's profiler, if any, and return the fields for its completion event"""
+        with self.lock:
+            profiler = self.job_profilers.pop(job_id, None)
+        return finish_job_profile(profiler, job_id)
+
     def _run_summarize_job(self, app, job_id: str, user_id: int, video_ids: list[str]):
         """
         Execute summarization job with per-video error isolation and concurrency control
@@ -332,6 +447,7 @@ class JobManager:
         # Import logging setup and lifecycle events
         from logging_setup import set_job_ctx, clear_job_ctx
         from log_events import evt, job_received, job_finished, job_failed, video_processed, classify_error_type
+        import tracing
         
         processed_count = 0  # ensure defined for job-level exception paths
         with self.job_semaphore:
@@ -339,6 +455,13 @@ class JobManager:
             
             # Set job context at the start of processing
             set_job_ctx(job_id=job_id)
+            self._mark_job_thread(job_id)
+            # Download concurrency/bandwidth for this job's audio fallbacks (one bucket per job)
+            set_job_policy(job_id, job_download_policy(self.worker_concurrency))
+            resource_sampler = get_job_resource_sampler()
+            resource_sampler.start(job_id)
+            trace_root = tracing.start_trace("job", job_id=job_id, video_count=len(video_ids))
+            job_error = None
             
             # Emit job_received event
             job_received(video_count=len(video_ids), user_id=user_id)
@@ -358,26 +481,27 @@ class JobManager:
                     summarizer = VideoSummarizer()
                     email_service = EmailService()
 
-                    # Get user cookies if available
-                    raw_cookie_txt = self._get_user_cookies(user_id)
-                    requests_cookies = None
-                    playwright_cookies = None
-                    if isinstance(raw_cookie_txt, str) and raw_cookie_txt.strip():
-                        try:
-                            requests_cookies, playwright_cookies = parse_netscape_for_both(raw_cookie_txt)
-                        except Exception:
-                            logging.warning("Failed to parse Netscape cookies; continuing without cookies.")
-                            requests_cookies, playwright_cookies = None, None
+                    # Resolve cookies once for the whole job (S3/env first, then the user's stored cookies.txt)
+                    cookie_bundle = get_cookie_resolver().resolve(user_id)
+                    if not cookie_bundle:
+                        cookie_bundle = self._get_user_cookie_bundle(user_id) or cookie_bundle
 
                     # Process videos with per-video error isolation
                     email_items = []
                     
                     for i, vid in enumerate(video_ids):
+                        if is_job_cancelled(job_id):
+                            evt("job_cancelled", processed_count=processed_count, video_count=len(video_ids))
+                            break
+                        
                         video_start_time = time.time()
                         transcript_source = "none"
                         
                         # Set video context for this iteration
                         set_job_ctx(job_id=job_id, video_id=vid)
+                        video_span = tracing.start_span("video", video_id=vid, index=i)
+                        video_error = None
+                        self.update_video_progress(job_id, vid, "fetching_transcript")
                         
                         try:
                             # Get video details with error handling
@@ -388,10 +512,17 @@ class JobManager:
                                 logging.warning(f"Job {job_id}: failed to get video details for {vid}: {e}")
                                 video = {"id": vid, "title": f"Video {vid}", "thumbnail": ""}
                                 video_title = f"Video {vid}"
+                            self.update_video_progress(job_id, vid, title=self._safe_get_title(video, vid))
                             
                             # Get transcript using enhanced hierarchical fallback
                             transcript_start_time = time.time()
-                            transcript_segments = ts.get_transcript(vid, cookie_header=requests_cookies, user_id=user_id, job_id=job_id)
+                            transcript_segments = ts.get_transcript(
+                                vid,
+                                cookie_bundle=cookie_bundle,
+                                user_id=user_id,
+                                job_id=job_id,
+                                duration_s=parse_iso8601_duration(video.get("duration"))
+                            )
                             transcript_duration_ms = int((time.time() - transcript_start_time) * 1000)
                             
                             # Convert segments to text string for summarization
@@ -402,6 +533,8 @@ class JobManager:
                                 transcript_source = "acquired"  # Could be yt_api, timedtext, youtubei, or asr
                             else:
                                 transcript_source = "none"
+                            self.update_video_progress(job_id, vid, "transcript_acquired",
+                                                       transcript_source=transcript_source)
                             
                             # Generate summary with enhanced error handling
                             summary_start_time = time.time()
@@ -410,7 +543,13 @@ class JobManager:
                                 logging.info(f"Job {job_id}: no transcript for {vid} - using default message")
                             else:
                                 try:
-                                    summary = summarizer.summarize_video(transcript_text=text, video_id=vid)
+                                    summary = summarizer.summarize_video(
+                                        transcript_text=text,
+                                        video_id=vid,
+                                        segments=transcript_segments if isinstance(transcript_segments, list) else None,
+                                        on_progress=lambda partial, vid=vid: self.update_video_progress(
+                                            job_id, vid, "summary_streaming", summary=partial)
+                                    )
                                     summary_duration_ms = int((time.time() - summary_start_time) * 1000)
                                     logging.info(f"Job {job_id}: summarized {vid} in {summary_duration_ms}ms")
                                 except Exception as e:
@@ -418,6 +557,7 @@ class JobManager:
                             
                             # Build email item with flat structure and safe field access
                             email_items.append({
+                                "video_id": vid,
                                 "title": self._safe_get_title(video, vid),
                                 "thumbnail_url": self._safe_get_thumbnail(video),
                                 "video_url": f"https://www.youtube.com/watch?v={video.get('id', vid)}",
@@ -425,6 +565,7 @@ class JobManager:
                             })
                             
                             processed_count += 1
+                            self.update_video_progress(job_id, vid, "summary_done", summary=summary)
                             self.update_job_status(job_id, "processing", processed_count=processed_count)
                             
                             # Emit video_processed event with structured data
@@ -440,6 +581,7 @@ class JobManager:
                             
                         except Exception as e:
                             # Per-video error isolation - don't stop entire job
+                            video_error = e
                             video_duration_ms = int((time.time() - video_start_time) * 1000)
                             error_type = classify_error_type(e)
                             
@@ -456,6 +598,7 @@ class JobManager:
                             
                             # Add error item to email with safe fallback
                             email_items.append({
+                                "video_id": vid,
                                 "title": f"Video {vid} (Processing Failed)",
                                 "thumbnail_url": "",
                                 "video_url": f"https://www.youtube.com/watch?v={vid}",
@@ -463,20 +606,45 @@ class JobManager:
                             })
                             
                             processed_count += 1
+                            self.update_video_progress(job_id, vid, "error",
+                                                       error_message=self._truncate_error(str(e)))
                             self.update_job_status(job_id, "processing", processed_count=processed_count)
+                        finally:
+                            tracing.end_span(video_span, video_error)
+
+                    # A cancelled job (including one cancelled while queued) sends no digest
+                    if is_job_cancelled(job_id):
+                        job_finished(
+                            total_duration_ms=int((time.time() - start_time) * 1000),
+                            processed_count=processed_count,
+                            video_count=len(video_ids),
+                            outcome="cancelled",
+                            email_sent=False,
+                            error_count=len(video_ids) - processed_count,
+                            **self._finish_job_profile(job_id),
+                            **resource_sampler.finish(job_id)
+                        )
+                        return
 
                     # Send consolidated digest email (single email per job)
                     user_email = user.email
                     email_sent = False
                     
                     try:
-                        # Use enhanced EmailService with fault tolerance
-                        email_sent = email_service.send_digest_email(user_email, email_items)
-                        
-                        if email_sent:
-                            evt("email_sent", recipient=user_email, items_count=len(email_items))
+                        if EMAIL_DISPATCH_ASYNC:
+                            # Persisted to the outbox; delivery and retries happen on the
+                            # dispatcher thread, which emits email_sent/email_failed itself
+                            email_sent = email_service.queue_digest_email(user_email, email_items, job_id=job_id)
+                            if not email_sent:
+                                evt("email_failed", recipient=user_email, items_count=len(email_items), outcome="error")
                         else:
-                            evt("email_failed", recipient=user_email, items_count=len(email_items), outcome="error")
+                            # Use enhanced EmailService with fault tolerance
+                            email_sent = email_service.send_digest_email(user_email, email_items)
+                            
+                            if email_sent:
+                                evt("email_sent", recipient=user_email, items_count=len(email_items))
+                            else:
+                                evt("email_failed", recipient=user_email, items_count=len(email_items), outcome="error")
                     except Exception as e:
                         email_sent = handle_email_error(user_email, e, len(email_items))
                         evt("email_failed", recipient=user_email, items_count=len(email_items), 
@@ -500,10 +668,14 @@ class JobManager:
                         video_count=len(video_ids),
                         outcome=outcome,
                         email_sent=email_sent,
-                        error_count=error_count
+                        email_delivery="queued" if EMAIL_DISPATCH_ASYNC else "direct",
+                        error_count=error_count,
+                        **self._finish_job_profile(job_id),
+                        **resource_sampler.finish(job_id)
                     )
                     
-                    self.update_job_status(job_id, "done")
+                    if not is_job_cancelled(job_id):
+                        self.update_job_status(job_id, "done")
 
             except Exception as e:
                 # Critical job-level error - emit job_failed event
@@ -515,57 +687,35 @@ class JobManager:
                     processed_count=processed_count,
                     video_count=len(video_ids),
                     error_type=error_type,
-                    error_detail=str(e)
+                    error_detail=str(e),
+                    **self._finish_job_profile(job_id),
+                    **resource_sampler.finish(job_id)
                 )
                 
                 # Use structured error handling for backward compatibility
                 handle_job_error(job_id, e, len(video_ids), processed_count)
                 self.update_job_status(job_id, "error", str(e))
+                job_error = e
             finally:
+                # Export the job trace before the context (and its trace_id) is cleared
+                tracing.end_trace(trace_root, job_error)
+                # Stops profiling and resource sampling left running if the job ended before reporting
+                self._finish_job_profile(job_id)
+                resource_sampler.finish(job_id)
                 # Clear job context on completion or failure
                 clear_job_ctx()
+                clear_job_processes(job_id)
+                clear_job_policy(job_id)
     
-    def _get_user_cookies(self, user_id: int):
-        """Get user cookies for restricted video access using secure storage"""
+    def _get_user_cookie_bundle(self, user_id: int) -> Optional[CookieBundle]:
+        """Get the user's securely stored cookies as a parsed bundle (cached by the cookie manager)"""
         try:
-            # Use secure cookie manager for encrypted storage
-            cookie_data = secure_cookie_manager.retrieve_cookies(user_id)
-            
-            if cookie_data:
-                # Convert to format expected by transcript service
-                if "cookies" in cookie_data:
-                    return cookie_data["cookies"]
-                elif "cookie_string" in cookie_data:
-                    # Parse cookie string if needed
-                    return self._parse_cookie_string(cookie_data["cookie_string"])
-                else:
-                    return cookie_data
-            
-            # Fallback to legacy cookie storage for backward compatibility
-            legacy_path = _local_cookie_path(user_id)
-            if os.path.exists(legacy_path):
-                logging.warning(f"Using legacy cookie storage for user {user_id} - consider migrating")
-                # Don't log cookie content - just indicate presence
-                return {"legacy": True}
-            
-            return None
-            
+            return secure_cookie_manager.get_cookie_bundle(user_id)
         except Exception as e:
-            # Use credential protector to redact any sensitive data from error
             safe_error = credential_protector.redact_sensitive_data(str(e))
             logging.warning(f"Could not load user cookies for {user_id}: {safe_error}")
             return None
     
-    def _parse_cookie_string(self, cookie_string: str) -> Optional[Dict]:
-        """Parse cookie string into format usable by services"""
-        try:
-            # This is a placeholder for cookie string parsing
-            # Implementation depends on the specific cookie format used
-            return {"cookie_string": cookie_string}
-        except Exception as e:
-            logging.warning(f"Failed to parse cookie string: {credential_protector.redact_sensitive_data(str(e))}")
-            return None
-    
     def _safe_get_title(self, video: dict, video_id: str) -> str:
         """Safely extract video title with fallback"""
         try:
@@ -624,6 +774,9 @@ def summarize_videos():
         # Submit job using JobManager
         app_obj = current_app._get_current_object()
         job_id = job_manager.submit_summarization_job(current_user.id, video_ids, app_obj)
+        # Per-job profiling is reserved for operators holding the profiler admin token
+        if data.get("profile") and check_admin_token(request.headers.get("Authorization")):
+            job_manager.enable_profiling(job_id)
         
         # Ensure 202 response within 500ms budget
         response_time_ms = int((time.time() - start_time) * 1000)
@@ -639,6 +792,24 @@ def summarize_videos():
         error_response, status_code = handle_api_error("summarize", e, current_user.id)
         return jsonify(error_response), status_code
 
+@main_routes.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+@login_required
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    try:
+        job_status = job_manager.get_job_status(job_id)
+        if not job_status or job_status.user_id != current_user.id:
+            return jsonify({"error": "Job not found"}), 404
+        
+        if not job_manager.cancel_job(job_id):
+            return jsonify({"error": f"Job already {job_status.status}"}), 409
+        
+        return jsonify({"job_id": job_id, "status": "cancelled"}), 202
+        
+    except Exception as e:
+        error_response, status_code = handle_api_error("job_cancel", e, current_user.id)
+        return jsonify(error_response), status_code
+
 @main_routes.route("/api/jobs/<job_id>")
 @login_required
 def get_job_status(job_id):
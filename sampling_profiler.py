@@ -0,0 +1,231 @@
+"""
+Stack-sampling profiler for live workers.
+
+A background thread reads every thread's current frame with
+sys._current_frames() at a fixed rate and counts whole stacks, so the
+profiled code runs unmodified and the cost is one stack walk per thread per
+tick. Results are rendered as collapsed stacks
+("thread;outer;...;inner <samples>" per line), the input format of
+flamegraph.pl, speedscope and inferno.
+
+Two entry points:
+- /admin/profile runs a time-bounded profile of all threads of the worker
+  that serves the request (requires PROFILER_ADMIN_TOKEN).
+- A job flagged for profiling is sampled on its own thread for its whole
+  run; the hottest frames are attached to job_finished and the full
+  collapsed output is written to PROFILE_DIR.
+"""
+
+import hmac
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PROFILER_ADMIN_TOKEN = os.getenv("PROFILER_ADMIN_TOKEN", "")
+PROFILER_DEFAULT_HZ = float(os.getenv("PROFILER_DEFAULT_HZ", "100"))
+PROFILER_MAX_HZ = float(os.getenv("PROFILER_MAX_HZ", "1000"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+# Upper bound for profiles of a single job, which run for the whole job
+PROFILER_JOB_MAX_SECONDS = float(os.getenv("PROFILER_JOB_MAX_SECONDS", "1800"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/tldw_profiles")
+
+# Leaf frames of threads parked waiting for work; dropped unless include_idle
+IDLE_FRAMES = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("thread.py", "_worker"),
+})
+
+
+def check_admin_token(authorization: Optional[str]) -> bool:
+    """True when an Authorization header carries PROFILER_ADMIN_TOKEN as a bearer token."""
+    if not PROFILER_ADMIN_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(token.strip().encode(), PROFILER_ADMIN_TOKEN.encode())
+
+
+@dataclass
+class Profile:
+    """Sample counts per collapsed stack."""
+    stacks: Counter
+    ticks: int
+    duration_s: float
+    hz: float
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_frames(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Frames with the most samples at the top of the stack (self time)."""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def to_dict(self, limit: int = 10) -> Dict[str, Any]:
+        return {
+            "duration_s": round(self.duration_s, 3),
+            "hz": self.hz,
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in self.top_frames(limit)],
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples thread stacks on a background thread between start() and stop().
+
+    thread_ids limits sampling to those threads (e.g. one job's worker
+    thread); by default every thread except the sampler itself is sampled.
+    Sampling ends by itself after max_seconds.
+    """
+
+    def __init__(self, hz: float = PROFILER_DEFAULT_HZ, thread_ids: Optional[Iterable[int]] = None,
+                 include_idle: bool = False, max_seconds: float = PROFILER_MAX_SECONDS):
+        if not 0 < hz <= PROFILER_MAX_HZ:
+            raise ValueError(f"hz must be in (0, {PROFILER_MAX_HZ:g}]")
+        self.hz = hz
+        self.thread_ids = frozenset(thread_ids) if thread_ids is not None else None
+        self.include_idle = include_idle
+        self.max_seconds = max_seconds
+        self._stacks: Counter = Counter()
+        self._ticks = 0
+        self._labels: Dict[Any, str] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+        self._stopped_at: Optional[float] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{os.path.basename(code.co_filename)}:{name}".replace(";", ":").replace(" ", "_")
+            self._labels[code] = label
+        return label
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {t.ident: t.name.replace(";", ":").replace(" ", "_")
+                                  for t in threading.enumerate()}
+            name = self._thread_names.get(ident, f"thread-{ident}")
+        return name
+
+    def _sample(self, own_ident: int) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            if not self.include_idle:
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(self._thread_name(ident))
+            labels.reverse()
+            self._stacks[";".join(labels)] += 1
+        self._ticks += 1
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        interval = 1.0 / self.hz
+        deadline = self._started_at + self.max_seconds
+        next_tick = time.perf_counter()
+        while True:
+            self._sample(own_ident)
+            next_tick += interval
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            # Skip ticks missed under load instead of bursting to catch up
+            if next_tick < now:
+                next_tick = now
+            if self._stop.wait(next_tick - now):
+                break
+        self._stopped_at = time.perf_counter()
+
+    def start(self) -> "SamplingProfiler":
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        stopped_at = self._stopped_at or time.perf_counter()
+        return Profile(stacks=self._stacks, ticks=self._ticks,
+                       duration_s=stopped_at - self._started_at, hz=self.hz)
+
+
+_profile_lock = threading.Lock()
+
+
+def profile_for(seconds: float, hz: float = PROFILER_DEFAULT_HZ, include_idle: bool = False) -> Optional[Profile]:
+    """
+    Profile all threads for `seconds` (capped at PROFILER_MAX_SECONDS) and
+    return the result; None if another on-demand profile is already running.
+    """
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError("seconds must be a positive number")
+    seconds = min(seconds, PROFILER_MAX_SECONDS)
+    profiler = SamplingProfiler(hz=hz, include_idle=include_idle, max_seconds=seconds)
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler.start()
+        time.sleep(seconds)
+    finally:
+        profile = profiler.stop()
+        _profile_lock.release()
+    return profile
+
+
+def start_job_profiler(thread_id: int) -> SamplingProfiler:
+    """Start sampling one job's worker thread."""
+    return SamplingProfiler(thread_ids=[thread_id], max_seconds=PROFILER_JOB_MAX_SECONDS).start()
+
+
+def finish_job_profile(profiler: Optional[SamplingProfiler], job_id: str, top: int = 5) -> Dict[str, Any]:
+    """
+    Stop a job profiler and return the fields to attach to the job's
+    completion event; the full collapsed stacks go to PROFILE_DIR.
+    """
+    if profiler is None:
+        return {}
+    profile = profiler.stop()
+    fields: Dict[str, Any] = {
+        "profile_samples": profile.samples,
+        "profile_hz": profile.hz,
+        "profile_top": [f"{frame} {count}" for frame, count in profile.top_frames(top)],
+    }
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{job_id}.collapsed")
+        with open(path, "w") as f:
+            f.write(profile.collapsed())
+        fields["profile_path"] = path
+    except OSError as e:
+        fields["profile_error"] = str(e)[:200]
+    return fields
@@ -8,13 +8,27 @@ import json
 import time
 import hashlib
 import secrets
-from typing import Dict, Any, Optional, Union
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 
+from cookie_resolver import CookieBundle
+
+
+@dataclass
+class _DecryptedCookies:
+    """Decrypted cookie data cached against the storage file's identity"""
+    file_key: Tuple[int, int, int]  # (st_ino, st_mtime_ns, st_size)
+    expires_at: datetime
+    cookie_data: Dict
+    bundle: Optional[CookieBundle] = None
+
 
 class SecureCookieManager:
     """Secure cookie storage with encryption at rest and TTL enforcement"""
@@ -24,6 +38,11 @@ class SecureCookieManager:
         self.cookie_ttl_hours = int(os.getenv("COOKIE_TTL_HOURS", "24"))
         self.max_cookie_size = int(os.getenv("MAX_COOKIE_SIZE_KB", "100")) * 1024  # 100KB default
         
+        # Decrypted cookies per user, revalidated against file mtime/size on every read
+        self.max_cached_users = max(1, int(os.getenv("COOKIE_CACHE_MAX_USERS", "128")))
+        self._cache: "OrderedDict[int, _DecryptedCookies]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         # Initialize encryption
         if encryption_key:
             self.fernet = Fernet(encryption_key.encode())
@@ -101,6 +120,7 @@ class SecureCookieManager:
             
             with open(storage_path, 'w') as f:
                 json.dump(storage_data, f, indent=2)
+            self._invalidate_cache(user_id)
             
             # Set restrictive permissions (Unix-like systems)
             try:
@@ -119,17 +139,61 @@ class SecureCookieManager:
         """
         Retrieve and decrypt user cookies with TTL validation
         
+        Decrypted data is cached per user and reused while the storage file's
+        inode, mtime and size are unchanged.
+        
         Args:
             user_id: User ID for cookie ownership
             
         Returns:
             Dict: Decrypted cookie data or None if not found/expired
         """
+        entry = self._load_cookies(user_id)
+        return dict(entry.cookie_data) if entry else None
+    
+    def get_cookie_bundle(self, user_id: int) -> Optional[CookieBundle]:
+        """
+        Get the user's stored cookies as a pre-parsed CookieBundle
+        
+        Args:
+            user_id: User ID for cookie ownership
+            
+        Returns:
+            CookieBundle or None if no usable cookies are stored
+        """
+        entry = self._load_cookies(user_id)
+        if not entry:
+            return None
+        
+        if entry.bundle is None:
+            entry.bundle = self._bundle_from_cookie_data(entry.cookie_data)
+        return entry.bundle or None
+    
+    def _load_cookies(self, user_id: int) -> Optional[_DecryptedCookies]:
+        """Return the cached decrypted entry, decrypting from disk when the file changed"""
         try:
             storage_path = self._get_cookie_storage_path(user_id)
             
-            if not os.path.exists(storage_path):
+            try:
+                stat = os.stat(storage_path)
+            except FileNotFoundError:
+                self._invalidate_cache(user_id)
                 return None
+            file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            
+            with self._cache_lock:
+                entry = self._cache.get(user_id)
+                if entry is not None and entry.file_key == file_key:
+                    self._cache.move_to_end(user_id)
+                else:
+                    entry = None
+            
+            if entry is not None:
+                if datetime.utcnow() > entry.expires_at:
+                    self.logger.info(f"Cookies expired for user {user_id}, cleaning up")
+                    self.delete_cookies(user_id)
+                    return None
+                return entry
             
             # Read storage data
             with open(storage_path, 'r') as f:
@@ -154,13 +218,37 @@ class SecureCookieManager:
             decrypted_json = self.fernet.decrypt(encrypted_cookies).decode()
             cookie_data = json.loads(decrypted_json)
             
+            entry = _DecryptedCookies(file_key=file_key, expires_at=expires_at, cookie_data=cookie_data)
+            with self._cache_lock:
+                self._cache[user_id] = entry
+                self._cache.move_to_end(user_id)
+                while len(self._cache) > self.max_cached_users:
+                    self._cache.popitem(last=False)
+            
             self.logger.info(f"Retrieved cookies for user {user_id} (expires: {expires_at.strftime('%Y-%m-%d %H:%M')})")
-            return cookie_data
+            return entry
             
         except Exception as e:
             self.logger.error(f"Failed to retrieve cookies for user {user_id}: {e}")
             return None
     
+    def _bundle_from_cookie_data(self, cookie_data: Dict) -> CookieBundle:
+        """Parse stored cookie data (Netscape text, header string or name/value dict)"""
+        cookies = cookie_data.get("cookies", cookie_data.get("cookie_string"))
+        if isinstance(cookies, str):
+            if "\t" in cookies:
+                return CookieBundle.from_netscape(cookies, source="secure_store")
+            return CookieBundle.from_header(cookies, source="secure_store")
+        if isinstance(cookies, dict):
+            header = "; ".join(f"{name}={value}" for name, value in cookies.items() if isinstance(value, str))
+            return CookieBundle.from_header(header, source="secure_store")
+        return CookieBundle(source="none")
+    
+    def _invalidate_cache(self, user_id: int) -> None:
+        """Drop a user's cached decrypted cookies"""
+        with self._cache_lock:
+            self._cache.pop(user_id, None)
+    
     def delete_cookies(self, user_id: int) -> bool:
         """
         Delete user cookies and cleanup storage
@@ -173,6 +261,7 @@ class SecureCookieManager:
         """
         try:
             storage_path = self._get_cookie_storage_path(user_id)
+            self._invalidate_cache(user_id)
             
             if os.path.exists(storage_path):
                 os.remove(storage_path)
@@ -214,6 +303,8 @@ class SecureCookieManager:
                     
                     if datetime.utcnow() > expires_at:
                         os.remove(filepath)
+                        if isinstance(metadata.get("user_id"), int):
+                            self._invalidate_cache(metadata["user_id"])
                         cleaned_count += 1
                         self.logger.debug(f"Cleaned up expired cookies: {filename}")
                         
@@ -9,6 +9,7 @@ from proxy_manager import ProxyManager
 from proxy_http import ProxyHTTPClient
 from user_agent_manager import UserAgentManager
 from transcript_cache import TranscriptCache
+from summary_cache import SUMMARY_CACHE_DIR, SummaryCache
 
 class SharedManagers:
     """Factory for shared manager instances to avoid duplication"""
@@ -75,13 +76,31 @@ class SharedManagers:
         
         return self._managers['transcript_cache']
     
+    def get_summary_cache(self) -> Optional[SummaryCache]:
+        """Get or create SummaryCache instance (None when disabled)"""
+        if 'summary_cache' not in self._managers:
+            if os.getenv('SUMMARY_CACHE_ENABLED', 'true').lower() != 'true':
+                self._managers['summary_cache'] = None
+                return None
+            try:
+                cache_dir = os.getenv('SUMMARY_CACHE_DIR', SUMMARY_CACHE_DIR)
+                ttl_days = int(os.getenv('SUMMARY_CACHE_TTL_DAYS', '30'))
+                self._managers['summary_cache'] = SummaryCache(cache_dir, ttl_days)
+                logging.info("Shared SummaryCache initialized successfully")
+            except Exception as e:
+                logging.error(f"Failed to initialize shared SummaryCache: {e}")
+                self._managers['summary_cache'] = None
+        
+        return self._managers['summary_cache']
+    
     def get_all_managers(self) -> Dict[str, Any]:
         """Get all manager instances as a dictionary"""
         return {
             'proxy_manager': self.get_proxy_manager(),
             'proxy_http_client': self.get_proxy_http_client(),
             'user_agent_manager': self.get_user_agent_manager(),
-            'transcript_cache': self.get_transcript_cache()
+            'transcript_cache': self.get_transcript_cache(),
+            'summary_cache': self.get_summary_cache()
         }
     
     def _create_proxy_manager(self) -> ProxyManager:
@@ -0,0 +1,258 @@
+"""
+Fixed-memory streaming histograms for latency percentiles.
+
+LogHistogram buckets values on a logarithmic scale (the HDR histogram /
+DDSketch layout): bucket i covers (gamma^(i-1), gamma^i] with
+gamma = (1 + a) / (1 - a), so every quantile is reported within relative
+error a (1% by default) of a real sample. Values are clamped to
+[min_value, max_value], which bounds the number of buckets regardless of
+how many samples are recorded. Histograms with the same accuracy can be
+merged and subtracted bucket by bucket.
+
+WindowedHistogram keeps a ring of short time slots and a running aggregate
+per window (1m/5m/1h by default): recording touches one bucket per window,
+expired slots are subtracted from the aggregates as time moves on, and a
+percentile query only walks the non-empty buckets of one aggregate.
+
+Neither class locks; callers serialise access (transcript_metrics holds its
+module lock around every call).
+"""
+
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+# (name, seconds) of the rolling windows kept by WindowedHistogram
+DEFAULT_WINDOWS = (("1m", 60), ("5m", 300), ("1h", 3600))
+DEFAULT_SLOT_SECONDS = 10
+LIFETIME = "all"
+
+
+class LogHistogram:
+    """Log-bucketed histogram with bounded relative error."""
+
+    __slots__ = ("relative_accuracy", "min_value", "max_value", "_gamma", "_log_gamma",
+                 "buckets", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 min_value: float = 1e-3, max_value: float = 86_400_000.0):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        # Exact extremes; only maintained for histograms that are never subtracted from
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def max_buckets(self) -> int:
+        """Upper bound on the number of buckets this histogram can hold."""
+        return int(math.ceil(math.log(self.max_value / self.min_value) / self._log_gamma)) + 2
+
+    def bucket_index(self, value: float) -> Optional[int]:
+        """Bucket of value, or None for the zero bucket (below min_value)."""
+        if value < self.min_value:
+            return None
+        if value > self.max_value:
+            value = self.max_value
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def add_indexed(self, index: Optional[int], value: float) -> None:
+        """Add one sample whose bucket_index is already known (min/max not tracked)."""
+        self.count += 1
+        self.sum += value
+        if index is None:
+            self.zero_count += 1
+        else:
+            buckets = self.buckets
+            buckets[index] = buckets.get(index, 0) + 1
+
+    def _bucket_value(self, index: int) -> float:
+        # Midpoint (in relative terms) of (gamma^(i-1), gamma^i]
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def record(self, value: float, count: int = 1) -> None:
+        """Add count samples of value."""
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        index = self.bucket_index(value)
+        if index is None:
+            self.zero_count += count
+        else:
+            buckets = self.buckets
+            buckets[index] = buckets.get(index, 0) + count
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Add other's samples to this histogram."""
+        self._check_compatible(other)
+        buckets = self.buckets
+        for index, n in other.buckets.items():
+            buckets[index] = buckets.get(index, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def subtract(self, other: "LogHistogram") -> None:
+        """Remove other's samples, which must have been merged in before."""
+        self._check_compatible(other)
+        buckets = self.buckets
+        for index, n in other.buckets.items():
+            remaining = buckets.get(index, 0) - n
+            if remaining > 0:
+                buckets[index] = remaining
+            else:
+                buckets.pop(index, None)
+        self.zero_count -= other.zero_count
+        self.count -= other.count
+        self.sum -= other.sum
+        if self.count <= 0:
+            self.clear()
+
+    def _check_compatible(self, other: "LogHistogram") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Histograms with different accuracy cannot be combined")
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def quantiles(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> List[float]:
+        """Return the values at quantiles qs (0-1), in one pass over the buckets."""
+        if self.count <= 0:
+            return [0.0 for _ in qs]
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        ranks = [min(max(qs[i], 0.0), 1.0) * (self.count - 1) for i in order]
+        results = [0.0] * len(qs)
+        position = 0
+        cumulative = self.zero_count
+        # Samples below min_value report as 0
+        while position < len(order) and ranks[position] < cumulative:
+            position += 1
+        if position < len(order):
+            for index in sorted(self.buckets):
+                cumulative += self.buckets[index]
+                while position < len(order) and ranks[position] < cumulative:
+                    results[order[position]] = self._bucket_value(index)
+                    position += 1
+                if position == len(order):
+                    break
+        return results
+
+    def cumulative_counts(self, bounds: Sequence[float]) -> List[int]:
+        """
+        Samples at or below each of the ascending bounds (Prometheus "le"
+        buckets). A log bucket counts toward a bound when its representative
+        value does, so counts near a bound are off by at most the accuracy.
+        """
+        counts = []
+        cumulative = self.zero_count
+        indexes = sorted(self.buckets)
+        position = 0
+        for bound in bounds:
+            while position < len(indexes) and self._bucket_value(indexes[position]) <= bound:
+                cumulative += self.buckets[indexes[position]]
+                position += 1
+            counts.append(cumulative)
+        return counts
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles((q,))[0]
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count > 0 else 0.0
+
+
+class WindowedHistogram:
+    """
+    LogHistograms over rolling time windows plus a lifetime histogram.
+
+    Samples land in slot_seconds-wide slots. Each window keeps the slots it
+    spans and their running total; when time moves past a slot it is
+    subtracted from that window's total. Slots with no samples are never
+    created, so an idle series costs nothing but its lifetime buckets.
+    """
+
+    def __init__(self, windows: Iterable[Tuple[str, int]] = DEFAULT_WINDOWS,
+                 slot_seconds: int = DEFAULT_SLOT_SECONDS,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 clock=time.monotonic):
+        self.slot_seconds = slot_seconds
+        self.relative_accuracy = relative_accuracy
+        self._clock = clock
+        # name -> (slot span, running total, [(slot index, slot histogram), ...])
+        self._windows: Dict[str, Tuple[int, LogHistogram, Deque[Tuple[int, LogHistogram]]]] = {
+            name: (max(1, seconds // slot_seconds), LogHistogram(relative_accuracy), deque())
+            for name, seconds in windows
+        }
+        self.lifetime = LogHistogram(relative_accuracy)
+        self._slot_index: Optional[int] = None
+        self._slot: Optional[LogHistogram] = None
+
+    @property
+    def window_names(self) -> List[str]:
+        return list(self._windows) + [LIFETIME]
+
+    def _advance(self, now: float) -> None:
+        index = int(now // self.slot_seconds)
+        if index == self._slot_index:
+            return
+        self._slot_index = index
+        self._slot = None
+        for span, total, slots in self._windows.values():
+            while slots and slots[0][0] <= index - span:
+                total.subtract(slots.popleft()[1])
+
+    def record(self, value: float, now: Optional[float] = None) -> None:
+        self._advance(self._clock() if now is None else now)
+        slot = self._slot
+        if slot is None:
+            slot = self._slot = LogHistogram(self.relative_accuracy)
+            for _, _, slots in self._windows.values():
+                slots.append((self._slot_index, slot))
+        # One bucket lookup per sample, shared by the slot and every aggregate
+        index = self.lifetime.bucket_index(value)
+        slot.add_indexed(index, value)
+        for _, total, _ in self._windows.values():
+            total.add_indexed(index, value)
+        self.lifetime.record(value)
+
+    def histogram(self, window: str = LIFETIME, now: Optional[float] = None) -> LogHistogram:
+        """The aggregate for a window name (or "all"); do not modify it."""
+        if window == LIFETIME:
+            return self.lifetime
+        if window not in self._windows:
+            raise ValueError(f"Unknown window {window!r}; expected one of {self.window_names}")
+        self._advance(self._clock() if now is None else now)
+        return self._windows[window][1]
+
+    def percentiles(self, window: str = LIFETIME, qs: Sequence[float] = DEFAULT_QUANTILES,
+                    now: Optional[float] = None) -> Dict[str, float]:
+        """Return {"p50": ..., "p95": ..., "p99": ..., "count": n, "mean": ...} for a window."""
+        hist = self.histogram(window, now)
+        result = {
+            f"p{q * 100:g}": round(value, 2)
+            for q, value in zip(qs, hist.quantiles(qs))
+        }
+        result["count"] = hist.count
+        result["mean"] = round(hist.mean(), 2)
+        return result
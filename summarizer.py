@@ -1,10 +1,102 @@
 import os
-import re
 import logging
+import time
+from typing import Callable, Dict, List, Optional
 import google.generativeai as genai
 
+from llm_client import LLMClient, get_llm_client
+from log_events import evt
+from tracing import traced
+from summary_cache import SummaryCache, prompt_version_hash, transcript_content_hash
+from summary_renderer import add_timestamp_links, timestamp_to_seconds
+from transcript_compactor import (
+    CompactionResult,
+    TRANSCRIPT_BLOCK_SECONDS,
+    TRANSCRIPT_TOKEN_BUDGET,
+    chunk_blocks,
+    compact_transcript,
+    format_timestamp,
+    render_blocks,
+)
+
+# Transcripts above this many (estimated) tokens are summarized map-reduce style.
+# Kept at or below TRANSCRIPT_TOKEN_BUDGET, so a single prompt never needs trimming
+SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS = min(int(os.getenv("SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS", "24000")),
+                                          TRANSCRIPT_TOKEN_BUDGET)
+# Time window and size cap of one map chunk
+SUMMARY_CHUNK_MINUTES = int(os.getenv("SUMMARY_CHUNK_MINUTES", "15"))
+SUMMARY_CHUNK_MAX_TOKENS = int(os.getenv("SUMMARY_CHUNK_MAX_TOKENS", "12000"))
+# Concurrent chunk summaries per video (the shared LLMClient also caps calls process-wide)
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+# Chunks per video; by default one concurrent round, however long the video
+SUMMARY_MAX_CHUNKS = max(1, int(os.getenv("SUMMARY_MAX_CHUNKS", str(SUMMARY_MAP_CONCURRENCY))))
+# Total transcript tokens sent to the map calls; longer transcripts are trimmed to it
+SUMMARY_MAP_INPUT_TOKENS = min(TRANSCRIPT_TOKEN_BUDGET, SUMMARY_MAX_CHUNKS * SUMMARY_CHUNK_MAX_TOKENS)
+
+SUMMARY_FORMAT_INSTRUCTIONS = """Your response must follow this exact format:
+
+**IQ SUMMARY:**
+
+**High-level statement:** A 3-5 sentence paragraph giving the overall essence and conclusion of the video.
+
+**Main points:** A bulleted list of the most important points or arguments. The number of points should be appropriate for the video's length (e.g., 3 points for a short video, up to 7 for a long one). Each main point must be in bold and must end with a timestamp in the format (MM:SS) or (HH:MM:SS) if the video is over an hour.
+
+**Subpoints:** Under each main point, include 2-3 indented, non-bolded subpoints that provide supporting details for that main point.
+"""
+
+SUMMARY_PROMPT_TEMPLATE = """Summarize the following YouTube video transcript. Your goal is to create an engaging and easily digestible summary for a busy professional. Adopt a tone that is clear, insightful, and slightly informal.
+
+""" + SUMMARY_FORMAT_INSTRUCTIONS + """{timestamp_hint}
+Transcript to summarize:
+{transcript}
+"""
+
+MAP_PROMPT_TEMPLATE = """Below is part {index} of {count} of a YouTube video transcript, covering {span}. Write 4-8 concise bullet points capturing the key points, arguments and facts in this part. End every bullet with the timestamp where it is discussed, in the format (MM:SS) or (HH:MM:SS), taken from the [MM:SS] line markers.
+
+Transcript part:
+{transcript}
+"""
+
+REDUCE_PROMPT_TEMPLATE = """Below are notes on consecutive parts of a long YouTube video. Each note ends with the timestamp it refers to. Combine them into one summary of the whole video. Your goal is to create an engaging and easily digestible summary for a busy professional. Adopt a tone that is clear, insightful, and slightly informal. Reuse the timestamps from the notes.
+
+""" + SUMMARY_FORMAT_INSTRUCTIONS + """
+Notes:
+{notes}
+"""
+
+TIMESTAMP_HINT = "\nEach transcript line starts with its [MM:SS] start time; use these for the timestamps.\n"
+
+# Cache version of everything that shapes the model input; any prompt or
+# compaction change invalidates previously cached summaries
+PROMPT_VERSION = prompt_version_hash(
+    SUMMARY_PROMPT_TEMPLATE, MAP_PROMPT_TEMPLATE, REDUCE_PROMPT_TEMPLATE, TIMESTAMP_HINT,
+    TRANSCRIPT_TOKEN_BUDGET, TRANSCRIPT_BLOCK_SECONDS,
+    SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS, SUMMARY_CHUNK_MINUTES, SUMMARY_CHUNK_MAX_TOKENS,
+    SUMMARY_MAX_CHUNKS, SUMMARY_MAP_INPUT_TOKENS,
+)
+
+
+def build_summary_prompt(transcript: str, has_timestamps: bool = False) -> str:
+    """Build the IQ SUMMARY prompt for a (compacted) transcript."""
+    return SUMMARY_PROMPT_TEMPLATE.format(
+        timestamp_hint=TIMESTAMP_HINT if has_timestamps else "",
+        transcript=transcript,
+    )
+
+
+def summary_transcript_hash(transcript_text: str, segments: Optional[List[Dict]] = None) -> str:
+    """Content hash of the transcript a summary is generated from."""
+    if segments:
+        return transcript_content_hash("\n".join(
+            f"{segment.get('start')}|{segment.get('text', '')}" for segment in segments if isinstance(segment, dict)
+        ))
+    return transcript_content_hash(transcript_text)
+
+
 class VideoSummarizer:
-    def __init__(self):
+    cache: Optional[SummaryCache] = None
+
+    def __init__(self, use_cache: bool = True):
         self.google_api_key = os.environ.get("GOOGLE_API_KEY", "")
         if not self.google_api_key:
             logging.error("GOOGLE_API_KEY environment variable is required but not set")
@@ -12,22 +104,39 @@ class VideoSummarizer:
         
         try:
             genai.configure(api_key=self.google_api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
+            self.llm: LLMClient = get_llm_client()
             logging.info("Gemini Flash client initialized successfully")
         except Exception as e:
             logging.error(f"Failed to initialize Gemini client: {e}")
             raise
 
-    def summarize_video(self, *, transcript_text: str, video_id: str) -> str:
+        if use_cache:
+            from shared_managers import shared_managers
+            self.cache = shared_managers.get_summary_cache()
+            if self.cache:
+                self.cache.invalidate_prompt_versions(PROMPT_VERSION)
+
+    @traced("summarize")
+    def summarize_video(self, *, transcript_text: str, video_id: str,
+                        segments: Optional[List[Dict]] = None,
+                        on_progress: Optional[Callable[[str], None]] = None) -> str:
         """
         Generate AI summary using Google Gemini 2.0 Flash with specific formatting.
         
         Args:
             transcript_text: The video transcript text (keyword-only)
             video_id: The video ID for timestamp links (keyword-only)
+            segments: Optional timed transcript segments; when given, the prompt
+                carries coarse [MM:SS] timestamps (keyword-only)
+            on_progress: Optional callback receiving the partial summary (with
+                timestamp links) while it streams; called from the LLM client
+                thread (keyword-only)
             
         Returns:
             Summary text or "No transcript available for this video." for empty input
+            
+        Summaries are cached by (video_id, transcript hash, PROMPT_VERSION, model),
+        so unchanged transcripts skip compaction and the LLM entirely.
         """
         # Strict input validation to prevent pipeline crashes
         if not isinstance(transcript_text, str):
@@ -48,42 +157,52 @@ class VideoSummarizer:
             logging.info(f"Transcript too short for video {video_id} ({len(transcript_text)} chars) - skipping LLM call")
             return "No transcript available for this video."
 
+        transcript_hash = None
+        if self.cache:
+            transcript_hash = summary_transcript_hash(transcript_text, segments)
+            cached = self.cache.get(video_id, transcript_hash, PROMPT_VERSION, self.llm.model_name)
+            if cached:
+                logging.info(f"Using cached summary for video {video_id}")
+                return self._add_timestamp_links(cached, video_id)
+
         try:
             logging.info(f"Starting summarization for video {video_id}")
             logging.debug(f"Transcript length: {len(transcript_text)} characters")
             
-            # The prompt for the AI
-            prompt_text = f"""Summarize the following YouTube video transcript. Your goal is to create an engaging and easily digestible summary for a busy professional. Adopt a tone that is clear, insightful, and slightly informal.
-
-Your response must follow this exact format:
-
-**IQ SUMMARY:**
-
-**High-level statement:** A 3-5 sentence paragraph giving the overall essence and conclusion of the video.
-
-**Main points:** A bulleted list of the most important points or arguments. The number of points should be appropriate for the video's length (e.g., 3 points for a short video, up to 7 for a long one). Each main point must be in bold and must end with a timestamp in the format (MM:SS) or (HH:MM:SS) if the video is over an hour.
-
-**Subpoints:** Under each main point, include 2-3 indented, non-bolded subpoints that provide supporting details for that main point.
-
-Transcript to summarize:
-{transcript_text}
-"""
-
-            response = self.model.generate_content(
-                prompt_text,
-                generation_config={
-                    'temperature': 0.7,
-                    'max_output_tokens': 1500,
-                }
-            )
+            # Compact the transcript (untrimmed first, so long videos can be chunked)
+            source = segments if segments else transcript_text
+            compact_start = time.time()
+            compacted = compact_transcript(source, token_budget=0)
+            use_map_reduce = compacted.output_tokens > SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS
+            if use_map_reduce and compacted.output_tokens > SUMMARY_MAP_INPUT_TOKENS:
+                compacted = compact_transcript(source, token_budget=SUMMARY_MAP_INPUT_TOKENS)
+            evt("transcript_compacted",
+                video_id=video_id,
+                duration_ms=int((time.time() - compact_start) * 1000),
+                map_reduce=use_map_reduce,
+                **compacted.to_dict())
+            
+            on_text = None
+            if on_progress:
+                def on_text(text: str):
+                    on_progress(self._add_timestamp_links(text, video_id))
             
-            if not response or not response.text:
+            if use_map_reduce:
+                summary = self._summarize_map_reduce(compacted, video_id, on_text)
+            else:
+                # The prompt for the AI
+                prompt_text = build_summary_prompt(compacted.text or transcript_text, compacted.has_timestamps)
+                summary = self._generate(prompt_text, max_output_tokens=1500, on_text=on_text)
+            
+            if not summary:
                 logging.error("Gemini API returned empty response")
                 return "Summary unavailable: API returned empty response."
             
-            summary = response.text
             logging.info(f"Successfully generated summary for video {video_id}")
             
+            if self.cache:
+                self.cache.set(video_id, transcript_hash, PROMPT_VERSION, self.llm.model_name, summary)
+            
             # Add timestamp links
             summary_with_links = self._add_timestamp_links(summary, video_id)
             
@@ -93,45 +212,86 @@ Transcript to summarize:
             logging.error(f"Gemini API error for video {video_id}: {e}")
             return f"Summary unavailable: {str(e)}"
 
+    def _generate(self, prompt_text: str, max_output_tokens: int,
+                  on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Run one rate-limited Gemini call and return the response text (empty if none).
+        
+        With on_text, the response is streamed and on_text receives the text
+        generated so far after every chunk.
+        """
+        if on_text is None:
+            return self.llm.generate_sync(prompt_text, max_output_tokens=max_output_tokens, temperature=0.7)
+        
+        parts: List[str] = []
+        
+        def on_chunk(delta: str):
+            parts.append(delta)
+            on_text("".join(parts))
+        
+        return self.llm.generate_stream_sync(prompt_text, on_chunk, max_output_tokens=max_output_tokens,
+                                             temperature=0.7)
+
+    def _summarize_map_reduce(self, compacted: CompactionResult, video_id: str,
+                              on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Summarize a long transcript by time-window chunks, then merge.
+        
+        There are at most SUMMARY_MAX_CHUNKS chunks (windows widen for long
+        videos), submitted to the LLM client as one batch (at most
+        SUMMARY_MAP_CONCURRENCY at a time), so with the defaults latency is
+        bounded by the slowest chunk plus one reduce call. Chunk notes keep
+        (MM:SS) anchors, which the reduce step carries into the final
+        summary. Only the reduce call is streamed to on_text.
+        """
+        chunks = chunk_blocks(compacted.blocks, SUMMARY_CHUNK_MINUTES * 60, SUMMARY_CHUNK_MAX_TOKENS,
+                              max_chunks=SUMMARY_MAX_CHUNKS)
+        map_start = time.time()
+        
+        prompts = []
+        for index, chunk in enumerate(chunks):
+            if chunk[0][0] is not None:
+                span = f"{format_timestamp(chunk[0][0])} to {format_timestamp(chunk[-1][0])}"
+            else:
+                span = "an untimed section"
+            prompts.append(MAP_PROMPT_TEMPLATE.format(index=index + 1, count=len(chunks), span=span,
+                                                      transcript=render_blocks(chunk)))
+        
+        results = self.llm.generate_many_sync(prompts, max_output_tokens=600, temperature=0.7,
+                                              concurrency=SUMMARY_MAP_CONCURRENCY)
+        notes = []
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                logging.warning(f"Chunk {index + 1}/{len(chunks)} summary failed for video {video_id}: {result}")
+                result = ""
+            notes.append(result)
+        
+        failed = sum(1 for note in notes if not note.strip())
+        evt("summary_map_complete",
+            video_id=video_id,
+            chunks=len(chunks),
+            failed_chunks=failed,
+            duration_ms=int((time.time() - map_start) * 1000))
+        
+        if failed == len(chunks):
+            raise RuntimeError(f"all {len(chunks)} chunk summaries failed")
+        
+        combined_notes = "\n\n".join(
+            f"Part {i + 1}:\n{note.strip()}" for i, note in enumerate(notes) if note.strip()
+        )
+        return self._generate(REDUCE_PROMPT_TEMPLATE.format(notes=combined_notes), max_output_tokens=1500,
+                              on_text=on_text)
+
     def _add_timestamp_links(self, summary_text, video_id):
         """
         Convert timestamps like (12:34) or (1:05:22) to clickable YouTube links
         """
         try:
-            if not isinstance(summary_text, str) or not isinstance(video_id, str):
-                return summary_text
-            
-            def replace_timestamp(match):
-                try:
-                    timestamp = match.group(1)
-                    total_seconds = self._timestamp_to_seconds(timestamp)
-                    return f'<a href="https://www.youtube.com/watch?v={video_id}&t={total_seconds}s">({timestamp})</a>'
-                except Exception:
-                    # If timestamp conversion fails, return original
-                    return match.group(0)
-            
-            # Regex to find timestamps in format (MM:SS) or (HH:MM:SS)
-            timestamp_pattern = r'\((\d{1,2}:\d{2}(?::\d{2})?)\)'
-            
-            return re.sub(timestamp_pattern, replace_timestamp, summary_text)
+            return add_timestamp_links(summary_text, video_id)
         except Exception as e:
             logging.warning(f"Failed to add timestamp links: {e}")
             return summary_text
 
     def _timestamp_to_seconds(self, timestamp):
         """Convert timestamp string to total seconds"""
-        try:
-            if not isinstance(timestamp, str):
-                return 0
-            
-            parts = timestamp.split(':')
-            if len(parts) == 2:  # MM:SS
-                minutes, seconds = map(int, parts)
-                return max(0, minutes * 60 + seconds)
-            elif len(parts) == 3:  # HH:MM:SS
-                hours, minutes, seconds = map(int, parts)
-                return max(0, hours * 3600 + minutes * 60 + seconds)
-            return 0
-        except (ValueError, TypeError) as e:
-            logging.warning(f"Failed to convert timestamp '{timestamp}': {e}")
-            return 0
+        return timestamp_to_seconds(timestamp)
@@ -0,0 +1,251 @@
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from log_events import evt
+
+# Outside the working tree, so running the app or tests never writes into the repo
+SUMMARY_CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", "/tmp/tldw_summary_cache")
+
+
+def transcript_content_hash(text: str) -> str:
+    """Stable hash of the transcript text a summary was generated from"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def prompt_version_hash(*parts: Any) -> str:
+    """
+    Version identifier for the prompt pipeline.
+
+    Built from the prompt templates and every setting that shapes the model
+    input, so editing any of them yields a new version (and cache miss).
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+class SummaryCache:
+    """SQLite-backed cache of generated summaries with TTL support
+
+    Entries are keyed by (video_id, transcript hash, prompt version, model),
+    so a changed transcript, prompt or model never returns a stale summary.
+    """
+
+    def __init__(self, cache_dir: str = SUMMARY_CACHE_DIR, default_ttl_days: int = 30):
+        self.cache_dir = cache_dir
+        self.default_ttl_days = default_ttl_days
+        self.db_path = os.path.join(cache_dir, "summary_cache.db")
+
+        # In-process hit/miss counters (persisted per-entry hit counts live in the DB)
+        self._hits = 0
+        self._misses = 0
+        self._stats_lock = threading.Lock()
+        # Prompt versions already purged for in this process
+        self._current_versions = set()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+
+        logging.info(f"SummaryCache initialized with {default_ttl_days} day TTL")
+
+    def _init_database(self):
+        """Initialize SQLite database for cached summaries"""
+        with self._get_db_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summary_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    transcript_hash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_summary_video
+                ON summary_cache(video_id)
+            """)
+
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_summary_expires_at
+                ON summary_cache(expires_at)
+            """)
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get database connection with proper error handling"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            yield conn
+            conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Summary cache database error: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def _get_cache_key(self, video_id: str, transcript_hash: str, prompt_version: str, model_name: str) -> str:
+        """Generate cache key for the full summary identity"""
+        key_data = f"{video_id}|{transcript_hash}|{prompt_version}|{model_name}"
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def get(self, video_id: str, transcript_hash: str, prompt_version: str, model_name: str) -> Optional[str]:
+        """Get cached summary if available and not expired"""
+        cache_key = self._get_cache_key(video_id, transcript_hash, prompt_version, model_name)
+
+        try:
+            with self._get_db_connection() as conn:
+                row = conn.execute("""
+                    SELECT summary FROM summary_cache
+                    WHERE cache_key = ? AND expires_at > ?
+                """, (cache_key, datetime.now())).fetchone()
+
+                if row:
+                    conn.execute("UPDATE summary_cache SET hit_count = hit_count + 1 WHERE cache_key = ?",
+                                 (cache_key,))
+        except Exception as e:
+            logging.error(f"Error reading summary cache for video {video_id}: {e}")
+            row = None
+
+        with self._stats_lock:
+            if row:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        evt("summary_cache_hit" if row else "summary_cache_miss",
+            video_id=video_id,
+            prompt_version=prompt_version,
+            model=model_name)
+        return row["summary"] if row else None
+
+    def set(self, video_id: str, transcript_hash: str, prompt_version: str, model_name: str,
+            summary: str, ttl_days: Optional[int] = None) -> bool:
+        """Cache a summary with specified TTL"""
+        if not summary or not summary.strip():
+            return False
+
+        cache_key = self._get_cache_key(video_id, transcript_hash, prompt_version, model_name)
+        ttl_days = ttl_days or self.default_ttl_days
+        created_at = datetime.now()
+        expires_at = created_at + timedelta(days=ttl_days)
+
+        try:
+            with self._get_db_connection() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO summary_cache
+                    (cache_key, video_id, transcript_hash, prompt_version, model_name,
+                     summary, created_at, expires_at, hit_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """, (cache_key, video_id, transcript_hash, prompt_version, model_name,
+                      summary, created_at, expires_at))
+
+            logging.info(f"Cached summary for video {video_id} (prompt: {prompt_version}, "
+                         f"model: {model_name}, ttl: {ttl_days} days)")
+            return True
+
+        except Exception as e:
+            logging.error(f"Error caching summary for video {video_id}: {e}")
+            return False
+
+    def invalidate_prompt_versions(self, current_version: str) -> int:
+        """
+        Remove summaries generated with any other prompt version.
+
+        Runs once per version per process; later calls return 0 immediately.
+        """
+        with self._stats_lock:
+            if current_version in self._current_versions:
+                return 0
+            self._current_versions.add(current_version)
+
+        try:
+            with self._get_db_connection() as conn:
+                cursor = conn.execute("DELETE FROM summary_cache WHERE prompt_version != ?",
+                                      (current_version,))
+                removed = cursor.rowcount
+            if removed:
+                logging.info(f"Invalidated {removed} cached summaries from previous prompt versions")
+                evt("summary_cache_invalidated", reason="prompt_version", removed=removed)
+            return removed
+        except Exception as e:
+            logging.error(f"Error invalidating summary cache: {e}")
+            return 0
+
+    def cleanup_expired(self) -> int:
+        """Remove expired cache entries and return count of removed items"""
+        try:
+            with self._get_db_connection() as conn:
+                cursor = conn.execute("DELETE FROM summary_cache WHERE expires_at <= ?", (datetime.now(),))
+                removed = cursor.rowcount
+            if removed:
+                logging.info(f"Cleaned up {removed} expired summary cache entries")
+            return removed
+        except Exception as e:
+            logging.error(f"Error during summary cache cleanup: {e}")
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._stats_lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+
+        try:
+            with self._get_db_connection() as conn:
+                row = conn.execute("""
+                    SELECT COUNT(*) AS total,
+                           SUM(CASE WHEN expires_at > ? THEN 1 ELSE 0 END) AS valid,
+                           COALESCE(SUM(hit_count), 0) AS stored_hits
+                    FROM summary_cache
+                """, (datetime.now(),)).fetchone()
+                versions = {r["prompt_version"]: r["count"] for r in conn.execute("""
+                    SELECT prompt_version, COUNT(*) AS count FROM summary_cache GROUP BY prompt_version
+                """)}
+
+            return {
+                "total_entries": row["total"],
+                "valid_entries": row["valid"] or 0,
+                "expired_entries": row["total"] - (row["valid"] or 0),
+                "lifetime_hits": row["stored_hits"],
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "prompt_versions": versions,
+                "default_ttl_days": self.default_ttl_days
+            }
+        except Exception as e:
+            logging.error(f"Error getting summary cache stats: {e}")
+            return {"error": str(e), "hits": hits, "misses": misses}
+
+    def clear_all(self) -> bool:
+        """Clear all cache entries (for testing/maintenance)"""
+        try:
+            with self._get_db_connection() as conn:
+                conn.execute("DELETE FROM summary_cache")
+            with self._stats_lock:
+                self._hits = 0
+                self._misses = 0
+            logging.info("Cleared all summary cache entries")
+            return True
+        except Exception as e:
+            logging.error(f"Error clearing summary cache: {e}")
+            return False
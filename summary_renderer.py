@@ -0,0 +1,148 @@
+"""
+Summary rendering shared by VideoSummarizer and EmailService.
+
+Summaries come back from the LLM as light markdown ("**bold**", "- bullet",
+"  - subpoint") with (MM:SS) / (H:MM:SS) timestamps. This module turns
+timestamps into YouTube deep links and renders the markdown to inline-styled
+email HTML. All patterns are compiled once at import. Inline markup
+(escaping outside existing links, bold) is one pass over the whole summary
+with C-level str.replace/re.sub, then a single walk over the lines adds the
+list and heading structure.
+"""
+
+import logging
+import re
+from typing import List, Optional
+
+# (12:34) or (1:05:22)
+TIMESTAMP_RE = re.compile(r'\((\d{1,2}:\d{2}(?::\d{2})?)\)')
+
+# Links already inserted by add_timestamp_links (kept verbatim, never escaped)
+_LINK_RE = re.compile(r'(<a\s+href="[^"]*"[^>]*>[^<]*</a>)')
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+_SUBPOINT_RE = re.compile(r'^(?:\s{2,}-\s|\t-)')
+
+_LIST_OPEN = '<ul style="margin: 12px 0; padding-left: 20px; list-style-type: disc;">'
+_SUBLIST_OPEN = '<ul style="margin: 4px 0 4px 20px; padding-left: 16px; list-style-type: circle;">'
+_BULLET_ITEM = '<li style="margin-bottom: 8px; color: #4a5568;">'
+_SUBPOINT_ITEM = '<li style="margin-bottom: 4px; color: #718096; font-size: 0.95em;">'
+_HEADING = ('<h3 style="margin: 20px 0 8px 0; font-size: 1.1em; color: #2d3748; '
+            'border-bottom: 1px solid #e2e8f0; padding-bottom: 6px;">')
+_PARAGRAPH = '<p style="margin: 8px 0; color: #4a5568;">'
+_SPACER = '<div style="height: 8px;"></div>'
+
+EMPTY_SUMMARY_HTML = "<p>No summary available.</p>"
+
+
+def timestamp_to_seconds(timestamp: str) -> int:
+    """Convert MM:SS or H:MM:SS to total seconds (0 if malformed)"""
+    try:
+        if not isinstance(timestamp, str):
+            return 0
+        parts = timestamp.split(':')
+        if len(parts) == 2:
+            minutes, seconds = map(int, parts)
+            return max(0, minutes * 60 + seconds)
+        if len(parts) == 3:
+            hours, minutes, seconds = map(int, parts)
+            return max(0, hours * 3600 + minutes * 60 + seconds)
+        return 0
+    except (ValueError, TypeError) as e:
+        logging.warning(f"Failed to convert timestamp '{timestamp}': {e}")
+        return 0
+
+
+def timestamp_link(timestamp: str, video_id: str) -> str:
+    return (f'<a href="https://www.youtube.com/watch?v={video_id}&t={timestamp_to_seconds(timestamp)}s">'
+            f'({timestamp})</a>')
+
+
+def add_timestamp_links(summary_text: str, video_id: str) -> str:
+    """Convert timestamps like (12:34) or (1:05:22) to clickable YouTube links"""
+    if not isinstance(summary_text, str) or not isinstance(video_id, str):
+        return summary_text
+    return TIMESTAMP_RE.sub(lambda match: timestamp_link(match.group(1), video_id), summary_text)
+
+
+def _escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def render_inline(text: str) -> str:
+    """Escape text outside existing <a> links and convert **bold** to <strong>"""
+    if '<a' in text:
+        # re.split with a capture group alternates text (even) and links (odd)
+        pieces = _LINK_RE.split(text)
+        pieces[::2] = [_escape(piece) for piece in pieces[::2]]
+        text = ''.join(pieces)
+    else:
+        text = _escape(text)
+    return _BOLD_RE.sub(r'<strong>\1</strong>', text)
+
+
+def render_summary_html(summary: str, video_id: Optional[str] = None) -> str:
+    """
+    Render a markdown summary as inline-styled email HTML.
+
+    Handles **bold**, "- " bullets, indented "  - " subpoints, blank-line
+    spacing and bold-only lines as section headings. Existing <a href> links
+    are preserved; with video_id, bare (MM:SS) timestamps are linked too.
+    """
+    if not summary or not isinstance(summary, str):
+        return EMPTY_SUMMARY_HTML
+
+    if video_id:
+        summary = add_timestamp_links(summary, video_id)
+    # Inline markup is rendered over the whole text at once; the line walk
+    # below only adds block structure
+    text = render_inline(summary)
+
+    parts: List[str] = []
+    in_list = False
+    in_sublist = False
+
+    for line in text.split('\n'):
+        stripped = line.strip()
+
+        if not stripped:
+            if in_sublist:
+                parts.append('</ul>')
+                in_sublist = False
+            if in_list:
+                parts.append('</ul>')
+                in_list = False
+            parts.append(_SPACER)
+            continue
+
+        if line[0] in ' \t' and _SUBPOINT_RE.match(line):
+            if not in_sublist:
+                in_sublist = True
+                parts.append(_SUBLIST_OPEN)
+            # Drop the leading "-" (the match guarantees it follows the indent)
+            parts.append(_SUBPOINT_ITEM + stripped[1:].lstrip() + '</li>')
+        elif stripped.startswith('- '):
+            if in_sublist:
+                parts.append('</ul>')
+                in_sublist = False
+            if not in_list:
+                in_list = True
+                parts.append(_LIST_OPEN)
+            parts.append(_BULLET_ITEM + stripped[2:] + '</li>')
+        else:
+            if in_sublist:
+                parts.append('</ul>')
+                in_sublist = False
+            if in_list:
+                parts.append('</ul>')
+                in_list = False
+            if stripped.startswith('<strong>') and stripped.endswith('</strong>'):
+                parts.append(_HEADING + stripped + '</h3>')
+            else:
+                parts.append(_PARAGRAPH + stripped + '</p>')
+
+    if in_sublist:
+        parts.append('</ul>')
+    if in_list:
+        parts.append('</ul>')
+
+    return '\n'.join(parts)
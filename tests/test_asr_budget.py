@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for duration-aware ASR budgeting.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch, Mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr_budget import (
+    AsrPlan,
+    SPEECH_ONLY_FILTER,
+    parse_iso8601_duration,
+    plan_asr_extraction,
+    probe_duration_seconds,
+)
+
+
+class TestDurationParsing(unittest.TestCase):
+    """Test ISO 8601 and ffprobe duration sources."""
+
+    def test_iso8601_durations(self):
+        self.assertEqual(parse_iso8601_duration("PT4M13S"), 253)
+        self.assertEqual(parse_iso8601_duration("PT1H2M3S"), 3723)
+        self.assertEqual(parse_iso8601_duration("P1DT2H"), 93600)
+        self.assertEqual(parse_iso8601_duration("PT45S"), 45)
+
+    def test_unknown_durations(self):
+        self.assertIsNone(parse_iso8601_duration("P0D"))  # live streams
+        self.assertIsNone(parse_iso8601_duration(""))
+        self.assertIsNone(parse_iso8601_duration(None))
+        self.assertIsNone(parse_iso8601_duration("4 minutes"))
+
+    @patch("asr_budget.run_process")
+    def test_ffprobe_duration(self, mock_run):
+        mock_run.return_value = Mock(returncode=0, stdout=b'{"format": {"duration": "612.48"}}')
+        self.assertEqual(probe_duration_seconds("https://example.com/a.m3u8"), 612.48)
+
+        mock_run.return_value = Mock(returncode=1, stdout=b"")
+        self.assertIsNone(probe_duration_seconds("https://example.com/a.m3u8"))
+
+
+class TestBudgetPlan(unittest.TestCase):
+    """Test budget strategies."""
+
+    def test_short_video_is_not_trimmed(self):
+        plan = plan_asr_extraction(600, max_minutes=20, strategy="head_tail")
+        self.assertFalse(plan.trimmed)
+        self.assertEqual(plan.segments, [(0.0, None)])
+
+    def test_truncate(self):
+        plan = plan_asr_extraction(36000, max_minutes=20, strategy="truncate")
+        self.assertEqual(plan.strategy, "truncate")
+        self.assertEqual(plan.segments, [(0.0, 1200.0)])
+
+    def test_head_tail(self):
+        plan = plan_asr_extraction(36000, max_minutes=20, strategy="head_tail", head_fraction=0.75)
+        self.assertEqual(plan.segments, [(0.0, 900.0), (35700.0, 300.0)])
+        self.assertEqual(sum(d for _, d in plan.segments), 1200.0)
+
+    def test_head_tail_without_duration_falls_back_to_truncate(self):
+        plan = plan_asr_extraction(None, max_minutes=20, strategy="head_tail")
+        self.assertEqual(plan.strategy, "truncate")
+        self.assertEqual(plan.segments, [(0.0, 1200.0)])
+
+    def test_speech_only(self):
+        plan = plan_asr_extraction(36000, max_minutes=20, strategy="speech_only")
+        self.assertEqual(plan.audio_filter, SPEECH_ONLY_FILTER)
+        self.assertEqual(plan.max_output_s, 1200.0)
+        self.assertEqual(plan.segments, [(0.0, None)])
+
+    def test_none_disables_budget(self):
+        self.assertFalse(plan_asr_extraction(36000, max_minutes=20, strategy="none").trimmed)
+
+
+class TestBudgetedFfmpegCommand(unittest.TestCase):
+    """Test that plans are reflected in the ffmpeg command."""
+
+    def _run_extract(self, plan):
+        from transcript_service import ASRAudioExtractor
+        extractor = ASRAudioExtractor("fake_key")
+        with patch("ffmpeg_runner.run_process") as mock_run:
+            mock_run.return_value = Mock(returncode=0, stderr=b"")
+            self.assertTrue(extractor._extract_audio_to_wav("https://example.com/a.m3u8", "/tmp/out.wav", plan))
+            return mock_run.call_args[0][0]
+
+    def test_head_tail_uses_two_seeked_inputs(self):
+        cmd = self._run_extract(AsrPlan(strategy="head_tail", segments=[(0.0, 900.0), (35700.0, 300.0)]))
+        self.assertEqual(cmd.count("-i"), 2)
+        self.assertIn("-ss", cmd)
+        self.assertEqual(cmd[cmd.index("-ss") + 1], "35700.0")
+        self.assertIn("[0:a][1:a]concat=n=2:v=0:a=1[a]", cmd)
+        # Headers precede every input
+        for i, arg in enumerate(cmd):
+            if arg == "-i":
+                self.assertIn("-headers", cmd[max(0, i - 10):i])
+
+    def test_speech_only_caps_output(self):
+        cmd = self._run_extract(AsrPlan(strategy="speech_only", audio_filter=SPEECH_ONLY_FILTER, max_output_s=1200.0))
+        self.assertEqual(cmd[cmd.index("-af") + 1], SPEECH_ONLY_FILTER)
+        self.assertEqual(cmd[cmd.index("-t") + 1], "1200.0")
+
+    def test_full_plan_unchanged(self):
+        cmd = self._run_extract(None)
+        self.assertEqual(cmd.count("-i"), 1)
+        self.assertNotIn("-ss", cmd)
+        self.assertNotIn("-t", cmd)
+
+
+if __name__ == "__main__":
+    unittest.main()
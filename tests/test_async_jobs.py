@@ -28,7 +28,7 @@ def test_job_manager_class():
             'get_job_status',
             'update_job_status',
             '_run_summarize_job',
-            '_get_user_cookies'
+            '_get_user_cookie_bundle'
         ]
         
         for method_name in methods:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the resolved audio URL cache.
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_url_cache import (
+    AudioUrlCache,
+    parse_url_expiry,
+    proxy_session_key,
+    video_id_from_url,
+)
+
+
+class TestExpiryParsing(unittest.TestCase):
+    """Test googlevideo expiry extraction."""
+
+    def test_query_parameter(self):
+        url = "https://rr1---sn-abc.googlevideo.com/videoplayback?expire=1700000000&ip=1.2.3.4&mime=audio%2Fwebm"
+        self.assertEqual(parse_url_expiry(url), 1700000000.0)
+
+    def test_hls_path_segment(self):
+        url = "https://manifest.googlevideo.com/api/manifest/hls_playlist/expire/1700000123/ei/abc/playlist/index.m3u8"
+        self.assertEqual(parse_url_expiry(url), 1700000123.0)
+
+    def test_missing_expiry(self):
+        self.assertIsNone(parse_url_expiry("https://example.com/audio.m4a"))
+        self.assertIsNone(parse_url_expiry(""))
+
+    def test_video_id_normalization(self):
+        self.assertEqual(video_id_from_url("dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+        self.assertEqual(video_id_from_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=5"), "dQw4w9WgXcQ")
+        self.assertEqual(video_id_from_url("https://youtu.be/dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+
+    def test_proxy_session_key(self):
+        self.assertEqual(proxy_session_key(None, "job-1"), "direct")
+
+        pm = mock.Mock(in_use=True)
+        pm.for_job.return_value = "abc123"
+        self.assertEqual(proxy_session_key(pm, "job-1"), "abc123")
+        self.assertEqual(proxy_session_key(pm, None), "direct")
+
+
+class TestAudioUrlCache(unittest.TestCase):
+    """Test cache expiry, keying and eviction."""
+
+    def setUp(self):
+        self.cache = AudioUrlCache(max_entries=2, expiry_margin=60, default_ttl=300)
+
+    def _url(self, expires_in):
+        return f"https://rr1.googlevideo.com/videoplayback?expire={int(time.time() + expires_in)}"
+
+    def test_hit_until_expiry_margin(self):
+        url = self._url(3600)
+        self.cache.put("vid", "direct", "yt_dlp", url, metadata={"format_id": "251"})
+
+        entry = self.cache.get("vid", "direct", "yt_dlp")
+        self.assertEqual(entry.url, url)
+        self.assertEqual(entry.metadata["format_id"], "251")
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 0)
+
+    def test_url_inside_margin_not_cached(self):
+        self.assertIsNone(self.cache.put("vid", "direct", "yt_dlp", self._url(30)))
+        self.assertIsNone(self.cache.get("vid", "direct", "yt_dlp"))
+
+    def test_expired_entry_is_a_miss(self):
+        self.cache.put("vid", "direct", "yt_dlp", self._url(3600))
+        with mock.patch("audio_url_cache.time.time", return_value=time.time() + 3600):
+            self.assertIsNone(self.cache.get("vid", "direct", "yt_dlp"))
+
+    def test_keyed_by_proxy_session_and_source(self):
+        self.cache.put("vid", "session-a", "yt_dlp", self._url(3600))
+        self.assertIsNone(self.cache.get("vid", "session-b", "yt_dlp"))
+        self.assertIsNone(self.cache.get("vid", "session-a", "playwright_hls"))
+
+    def test_lru_eviction(self):
+        self.cache.put("a", "direct", "yt_dlp", self._url(3600))
+        self.cache.put("b", "direct", "yt_dlp", self._url(3600))
+        self.cache.get("a", "direct", "yt_dlp")
+        self.cache.put("c", "direct", "yt_dlp", self._url(3600))
+
+        self.assertIsNotNone(self.cache.get("a", "direct", "yt_dlp"))
+        self.assertIsNone(self.cache.get("b", "direct", "yt_dlp"))
+
+    def test_invalidate(self):
+        self.cache.put("vid", "s1", "yt_dlp", self._url(3600))
+        self.cache.put("vid", "s2", "playwright_hls", self._url(3600))
+        self.assertEqual(self.cache.invalidate("vid"), 2)
+        self.assertIsNone(self.cache.get("vid", "s1", "yt_dlp"))
+
+
+class TestYtdlpIntegration(unittest.TestCase):
+    """Test that yt-dlp extraction is skipped on a cache hit."""
+
+    def setUp(self):
+        os.environ.pop("DISABLE_YTDLP", None)
+        os.environ.pop("ENFORCE_PROXY_ALL", None)
+        from audio_url_cache import get_audio_url_cache
+        get_audio_url_cache().clear()
+
+    @mock.patch('ytdlp_service.yt_dlp')
+    def test_second_resolution_uses_cache(self, mock_ytdlp):
+        from ytdlp_service import extract_best_audio_url
+
+        expire = int(time.time() + 6 * 3600)
+        mock_ydl = mock.MagicMock()
+        mock_ydl.extract_info.return_value = {
+            'formats': [{
+                'url': f'https://rr1.googlevideo.com/videoplayback?expire={expire}',
+                'ext': 'webm', 'format_id': '251', 'abr': 160,
+                'acodec': 'opus', 'vcodec': 'none'
+            }]
+        }
+        mock_ytdlp.YoutubeDL.return_value.__enter__.return_value = mock_ydl
+
+        first = extract_best_audio_url("cachedVid01")
+        second = extract_best_audio_url("https://www.youtube.com/watch?v=cachedVid01")
+
+        self.assertEqual(mock_ydl.extract_info.call_count, 1)
+        self.assertEqual(second["url"], first["url"])
+        self.assertEqual(second["format_id"], "251")
+        self.assertTrue(second["cached"])
+
+
+if __name__ == "__main__":
+    unittest.main()
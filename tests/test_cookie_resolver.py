@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for per-job cookie resolution and caching.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cookie_resolver import CookieBundle, CookieResolver, get_cookie_resolver
+
+
+NETSCAPE_COOKIES = """# Netscape HTTP Cookie File
+.youtube.com\tTRUE\t/\tTRUE\t1999999999\tSID\tabc123
+.youtube.com\tTRUE\t/\tFALSE\t0\tPREF\tf1=50000000
+"""
+
+
+class TestCookieBundle(unittest.TestCase):
+    """Test bundle construction."""
+
+    def test_from_header(self):
+        bundle = CookieBundle.from_header("SID=abc123; PREF=f1=50000000", source="header")
+
+        self.assertTrue(bundle)
+        self.assertEqual(bundle.header, "SID=abc123; PREF=f1=50000000")
+        self.assertEqual(bundle.cookie_count, 2)
+        self.assertEqual({c.name: c.value for c in bundle.jar}, {"SID": "abc123", "PREF": "f1=50000000"})
+        self.assertEqual(bundle.playwright_cookies[0]["domain"], "youtube.com")
+
+    def test_from_netscape(self):
+        bundle = CookieBundle.from_netscape(NETSCAPE_COOKIES)
+
+        self.assertEqual(bundle.header, "SID=abc123; PREF=f1=50000000")
+        self.assertEqual(bundle.playwright_cookies[0]["expires"], 1999999999)
+        self.assertNotIn("expires", bundle.playwright_cookies[1])
+
+    def test_empty_inputs(self):
+        self.assertFalse(CookieBundle.from_header(None))
+        self.assertFalse(CookieBundle.from_header("   "))
+        self.assertFalse(CookieBundle.from_netscape("# only a comment\n"))
+        self.assertIsNone(CookieBundle.from_header("").header)
+
+
+class TestCookieResolver(unittest.TestCase):
+    """Test TTL caching of resolved bundles."""
+
+    def test_resolves_once_within_ttl(self):
+        loader = Mock(return_value="SID=abc123")
+        resolver = CookieResolver(loader=loader, ttl_seconds=300)
+
+        first = resolver.resolve(42)
+        second = resolver.resolve(42)
+
+        self.assertIs(first, second)
+        loader.assert_called_once_with(42)
+        self.assertEqual(resolver.get_stats()["hits"], 1)
+
+    def test_missing_cookies_are_cached(self):
+        loader = Mock(return_value=None)
+        resolver = CookieResolver(loader=loader, ttl_seconds=300)
+
+        self.assertFalse(resolver.resolve(7))
+        self.assertFalse(resolver.resolve(7))
+        loader.assert_called_once()
+
+    def test_ttl_expiry_and_invalidate(self):
+        loader = Mock(side_effect=["SID=one", "SID=two", "SID=three"])
+        resolver = CookieResolver(loader=loader, ttl_seconds=0)
+
+        self.assertEqual(resolver.resolve(1).header, "SID=one")
+        self.assertEqual(resolver.resolve(1).header, "SID=two")
+
+        resolver.ttl_seconds = 300
+        resolver.invalidate(1)
+        self.assertEqual(resolver.resolve(1).header, "SID=three")
+
+    def test_loader_errors_resolve_to_empty_bundle(self):
+        resolver = CookieResolver(loader=Mock(side_effect=RuntimeError("S3 down")))
+        self.assertEqual(resolver.resolve(5).source, "none")
+
+    def test_bounded_entries(self):
+        resolver = CookieResolver(loader=lambda uid: f"SID={uid}", max_entries=2)
+        for user_id in range(3):
+            resolver.resolve(user_id)
+        self.assertEqual(resolver.get_stats()["entries"], 2)
+
+
+class TestPipelineCookieResolution(unittest.TestCase):
+    """Test that the transcript pipeline resolves cookies once per call."""
+
+    def setUp(self):
+        get_cookie_resolver().clear()
+        self.addCleanup(get_cookie_resolver().clear)
+
+    def test_pipeline_resolves_cookies_once(self):
+        import transcript_service
+        from transcript_service import TranscriptService
+
+        service = TranscriptService(use_shared_managers=False)
+        with patch("transcript_service.get_user_cookies_with_fallback", return_value="SID=abc") as mock_cookies, \
+             patch.object(transcript_service, "ENABLE_YT_API", True), \
+             patch.object(transcript_service, "ENABLE_TIMEDTEXT", True), \
+             patch.object(transcript_service, "ENABLE_YOUTUBEI", False), \
+             patch("transcript_service.get_transcript", return_value=[]) as mock_api, \
+             patch("transcript_service.timedtext_with_job_proxy", return_value="hello") as mock_timedtext:
+            segments = service._execute_transcript_pipeline("vid12345678", ["en"], user_id=99)
+
+        self.assertEqual(segments[0]["text"], "hello")
+        mock_cookies.assert_called_once_with(99)
+        self.assertEqual(mock_api.call_args[0][2], "SID=abc")
+        # timedtext gets the pre-built jar rather than re-parsing the header
+        jar = mock_timedtext.call_args.kwargs["cookies"]
+        self.assertEqual({c.name: c.value for c in jar}, {"SID": "abc"})
+
+    def test_youtubei_gets_playwright_cookies(self):
+        import transcript_service
+        from transcript_service import TranscriptService
+
+        service = TranscriptService(use_shared_managers=False)
+        bundle = CookieBundle.from_header("SID=job")
+        with patch.object(transcript_service, "ENABLE_YT_API", False), \
+             patch.object(transcript_service, "ENABLE_TIMEDTEXT", False), \
+             patch.object(transcript_service, "ENABLE_YOUTUBEI", True), \
+             patch("transcript_service.extract_transcript_with_job_proxy", return_value="") as mock_youtubei:
+            service._execute_transcript_pipeline("vid12345678", ["en"], user_id=99, cookie_bundle=bundle)
+
+        args = mock_youtubei.call_args[0]
+        self.assertEqual(args[3], "SID=job")
+        self.assertEqual([c["name"] for c in args[4]], ["SID"])
+
+    def test_supplied_bundle_skips_lookup(self):
+        import transcript_service
+        from transcript_service import TranscriptService
+
+        service = TranscriptService(use_shared_managers=False)
+        bundle = CookieBundle.from_header("SID=job")
+        with patch("transcript_service.get_user_cookies_with_fallback") as mock_cookies, \
+             patch.object(transcript_service, "ENABLE_YT_API", True), \
+             patch("transcript_service.get_transcript",
+                   return_value=[{"text": "hi", "start": 0, "duration": 1}]) as mock_api:
+            service._execute_transcript_pipeline("vid12345678", ["en"], user_id=99, cookie_bundle=bundle)
+
+        mock_cookies.assert_not_called()
+        self.assertEqual(mock_api.call_args[0][2], "SID=job")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the local Deepgram stand-in used by the ASR load benchmark.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from deepgram_stub import DeepgramStubServer, StubConfig, WAV_BYTES_PER_SECOND, WAV_HEADER_BYTES
+
+
+def _wav_bytes(seconds: int) -> bytes:
+    return b"\0" * (WAV_HEADER_BYTES + WAV_BYTES_PER_SECOND * seconds)
+
+
+class TestDeepgramStub(unittest.TestCase):
+    """Test the /v1/listen contract of the stand-in."""
+
+    def test_requires_token_auth(self):
+        with DeepgramStubServer() as stub:
+            response = httpx.post(stub.url, content=_wav_bytes(1))
+            self.assertEqual(response.status_code, 401)
+
+    def test_scaled_response_reflects_audio_length(self):
+        with DeepgramStubServer(StubConfig(response_shape="scaled")) as stub:
+            response = httpx.post(stub.url, headers={"Authorization": "Token test"}, content=_wav_bytes(120))
+
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual(body["metadata"]["duration"], 120.0)
+            self.assertEqual(len(body["results"]["channels"][0]["alternatives"][0]["transcript"].split()), 300)
+            self.assertEqual(stub.stats.to_dict()["audio_seconds"], 120.0)
+
+    def test_injected_errors(self):
+        with DeepgramStubServer(StubConfig(error_rate=1.0, error_status=429)) as stub:
+            response = httpx.post(stub.url, headers={"Authorization": "Token test"}, content=_wav_bytes(1))
+
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(stub.stats.to_dict()["errors"], 1)
+
+    def test_extractor_uses_configured_endpoint(self):
+        from transcript_service import ASRAudioExtractor
+
+        with DeepgramStubServer() as stub, patch("transcript_service.DEEPGRAM_API_URL", stub.url):
+            transcript = ASRAudioExtractor("test_key")._transcribe_with_deepgram(_wav_bytes(2), "stub_video")
+
+            self.assertTrue(transcript)
+            self.assertEqual(stub.stats.to_dict()["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for precompiled digest templates and card fragment memoization.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email_service
+from email_service import EmailService, clear_card_cache, get_card_cache_stats
+
+
+def _item(video_id="vid1", summary="**IQ SUMMARY:**\n- **Point**", title="Title"):
+    return {
+        "video_id": video_id,
+        "title": title,
+        "thumbnail_url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+        "video_url": f"https://www.youtube.com/watch?v={video_id}",
+        "summary": summary,
+    }
+
+
+class TestCardCache(unittest.TestCase):
+    """Test card reuse across digests."""
+
+    def setUp(self):
+        clear_card_cache()
+        self.addCleanup(clear_card_cache)
+        self.service = EmailService.__new__(EmailService)
+
+    def test_identical_cards_rendered_once(self):
+        with patch.object(EmailService, "_format_summary_html", wraps=self.service._format_summary_html) as fmt:
+            first = self.service._generate_email_html([_item("a"), _item("b")])
+            second = self.service._generate_email_html([_item("b"), _item("a")])
+
+        self.assertEqual(fmt.call_count, 2)
+        self.assertEqual(get_card_cache_stats()["hits"], 2)
+        self.assertEqual(len(first), len(second))
+
+    def test_changed_summary_or_title_re_renders(self):
+        self.service._generate_email_html([_item("a")])
+        html = self.service._generate_email_html([_item("a", summary="New summary"), _item("a", title="Renamed")])
+
+        self.assertEqual(get_card_cache_stats()["misses"], 3)
+        self.assertIn("New summary", html)
+        self.assertIn("Renamed", html)
+
+    def test_video_id_derived_from_url(self):
+        item = _item("xyz")
+        del item["video_id"]
+        self.service._generate_email_html([item])
+        self.assertIn("xyz", [key[0] for key in email_service._card_cache])
+
+    def test_cache_is_bounded(self):
+        with patch.object(email_service, "EMAIL_CARD_CACHE_SIZE", 2):
+            self.service._generate_email_html([_item(f"v{i}") for i in range(5)])
+        self.assertEqual(get_card_cache_stats()["size"], 2)
+
+    def test_document_and_empty_state(self):
+        html = self.service._generate_email_html([])
+        self.assertTrue(html.lstrip().startswith("<!DOCTYPE html>"))
+        self.assertIn("No summaries were generated for this request.", html)
+        self.assertTrue(html.rstrip().endswith("</html>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled Resend client, the SQLite outbox and the background
+email dispatcher, against the local Resend stand-in.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import email_dispatcher
+from email_dispatcher import EmailDispatcher, EmailOutbox, ResendClient
+from resend_stub import ResendStubServer, StubConfig
+
+PAYLOAD = {
+    "from": "TL;DW <noreply@example.com>",
+    "to": ["user@example.com"],
+    "subject": "Your digest",
+    "html": "<p>hello</p>",
+}
+
+
+class TestEmailDispatcher(unittest.TestCase):
+    """Test delivery, retry/backoff and outbox durability."""
+
+    def setUp(self):
+        self.outbox_dir = tempfile.mkdtemp(prefix="email_outbox_test_")
+        self.addCleanup(shutil.rmtree, self.outbox_dir, True)
+        self.outbox = EmailOutbox(self.outbox_dir)
+
+    def _server(self, **config):
+        server = ResendStubServer(StubConfig(**config)).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _dispatcher(self, server, **kwargs):
+        client = ResendClient("test-key", api_url=server.url, timeout=5)
+        self.addCleanup(client.close)
+        kwargs.setdefault("retry_base_seconds", 0.0)
+        return EmailDispatcher(self.outbox, client, **kwargs)
+
+    def test_delivers_queued_message(self):
+        server = self._server()
+        dispatcher = self._dispatcher(server)
+        self.outbox.enqueue("user@example.com", PAYLOAD, job_id="job-1")
+
+        self.assertEqual(dispatcher.process_due(), 1)
+        self.assertEqual(len(server.messages), 1)
+        self.assertEqual(server.messages[0]["subject"], "Your digest")
+        self.assertEqual(self.outbox.counts()["sent"], 1)
+
+    def test_reuses_pooled_connection(self):
+        server = self._server()
+        dispatcher = self._dispatcher(server)
+        for _ in range(5):
+            self.outbox.enqueue("user@example.com", PAYLOAD)
+
+        dispatcher.process_due()
+        self.assertEqual(server.stats.to_dict()["delivered"], 5)
+        self.assertEqual(server.stats.to_dict()["connections"], 1)
+
+    def test_retries_transient_failures(self):
+        server = self._server(fail_first=2, error_status=503)
+        dispatcher = self._dispatcher(server)
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+
+        for _ in range(3):
+            dispatcher.process_due()
+        self.assertEqual(self.outbox.counts()["sent"], 1)
+        self.assertEqual(dispatcher.get_stats()["retried"], 2)
+
+    def test_honours_retry_after(self):
+        server = self._server(fail_first=1, error_status=429, retry_after_s=60)
+        dispatcher = self._dispatcher(server)
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+
+        dispatcher.process_due()
+        self.assertGreaterEqual(self.outbox.next_due_at() - time.time(), 55)
+        # Not due yet
+        self.assertEqual(dispatcher.process_due(), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        server = self._server(fail_first=10, error_status=500)
+        dispatcher = self._dispatcher(server, max_attempts=3)
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+
+        for _ in range(5):
+            dispatcher.process_due()
+        self.assertEqual(server.stats.to_dict()["requests"], 3)
+        self.assertEqual(self.outbox.counts()["failed"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        server = self._server(fail_first=1, error_status=422)
+        dispatcher = self._dispatcher(server)
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+
+        dispatcher.process_due()
+        self.assertEqual(dispatcher.process_due(), 0)
+        self.assertEqual(self.outbox.counts()["failed"], 1)
+
+    def test_connection_errors_are_retried(self):
+        client = ResendClient("test-key", api_url="http://127.0.0.1:1/emails", timeout=1)
+        self.addCleanup(client.close)
+        dispatcher = EmailDispatcher(self.outbox, client, retry_base_seconds=0.0)
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+
+        dispatcher.process_due()
+        self.assertEqual(self.outbox.counts()["pending"], 1)
+
+    def test_stale_in_flight_messages_are_requeued(self):
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+        self.assertEqual(len(self.outbox.claim_due()), 1)
+        # A fresh claim belongs to a live process
+        self.assertEqual(self.outbox.requeue_stale(60), 0)
+        self.assertEqual(self.outbox.requeue_stale(0), 1)
+
+        server = self._server()
+        self.assertEqual(self._dispatcher(server).process_due(), 1)
+        self.assertEqual(len(server.messages), 1)
+
+    def test_outbox_survives_restart(self):
+        self.outbox.enqueue("user@example.com", PAYLOAD)
+        reopened = EmailOutbox(self.outbox_dir)
+        self.assertEqual(reopened.counts()["pending"], 1)
+
+    def test_background_worker_delivers_submitted_mail(self):
+        server = self._server(latency_ms=50)
+        dispatcher = self._dispatcher(server, poll_seconds=0.05)
+        self.addCleanup(dispatcher.stop)
+
+        start = time.perf_counter()
+        dispatcher.submit("user@example.com", PAYLOAD, job_id="job-2")
+        # Submitting does not wait for the provider
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+        deadline = time.time() + 5
+        while not server.messages and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(len(server.messages), 1)
+
+    def test_worker_survives_purge_errors(self):
+        server = self._server()
+        dispatcher = self._dispatcher(server, poll_seconds=0.05)
+        self.addCleanup(dispatcher.stop)
+        purge = patch.object(self.outbox, "purge_finished",
+                             side_effect=[sqlite3.OperationalError("database is locked"), 0])
+        purge_mock = purge.start()
+        self.addCleanup(purge.stop)
+
+        with self.assertLogs(level="ERROR"):
+            dispatcher.submit("user@example.com", PAYLOAD, job_id="job-3")
+            deadline = time.time() + 5
+            while not server.messages and time.time() < deadline:
+                time.sleep(0.02)
+        self.assertEqual(len(server.messages), 1)
+        deadline = time.time() + 5
+        while purge_mock.call_count < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(purge_mock.call_count, 2)
+
+
+class TestExistingDispatcher(unittest.TestCase):
+    """Test the diagnostics accessor that never creates the dispatcher."""
+
+    def test_returns_none_until_started(self):
+        with patch.object(email_dispatcher, "_dispatcher", None), \
+                patch.object(email_dispatcher, "EmailOutbox") as outbox:
+            self.assertIsNone(email_dispatcher.get_existing_dispatcher())
+            outbox.assert_not_called()
+        sentinel = object()
+        with patch.object(email_dispatcher, "_dispatcher", sentinel):
+            self.assertIs(email_dispatcher.get_existing_dispatcher(), sentinel)
+
+
+class TestEmailServiceDispatch(unittest.TestCase):
+    """Test EmailService's queued and direct delivery paths."""
+
+    def setUp(self):
+        env = patch.dict(os.environ, {"RESEND_API_KEY": "test-key", "SENDER_EMAIL": "noreply@example.com"})
+        env.start()
+        self.addCleanup(env.stop)
+        from email_service import EmailService
+        self.service = EmailService()
+
+    def test_queue_digest_email_submits_payload(self):
+        with patch("email_service.get_email_dispatcher") as get_dispatcher:
+            self.assertTrue(self.service.queue_digest_email("user@example.com", [], job_id="job-3"))
+        recipient, payload = get_dispatcher.return_value.submit.call_args[0]
+        self.assertEqual(recipient, "user@example.com")
+        self.assertEqual(payload["to"], ["user@example.com"])
+        self.assertEqual(get_dispatcher.return_value.submit.call_args[1]["job_id"], "job-3")
+
+    def test_queue_digest_email_rejects_invalid_input(self):
+        with patch("email_service.get_email_dispatcher") as get_dispatcher:
+            self.assertFalse(self.service.queue_digest_email("", []))
+        get_dispatcher.return_value.submit.assert_not_called()
+
+    def test_send_digest_email_uses_shared_client(self):
+        with ResendStubServer() as server:
+            client = ResendClient("test-key", api_url=server.url)
+            self.addCleanup(client.close)
+            with patch("email_service.get_resend_client", return_value=client):
+                self.assertTrue(self.service.send_digest_email("user@example.com", []))
+                self.assertTrue(self.service.send_digest_email("user@example.com", []))
+            self.assertEqual(server.stats.to_dict()["connections"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
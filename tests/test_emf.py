@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for CloudWatch Embedded Metric Format emission: the emitted lines are
+parsed back and checked against the EMF specification.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import emf
+import log_events
+import transcript_metrics
+from emf import EmfAggregator
+
+
+def parse_emf(text):
+    """Parse EMF lines and assert each follows the specification."""
+    records = []
+    for line in text.splitlines():
+        record = json.loads(line)
+        metadata = record["_aws"]
+        assert isinstance(metadata["Timestamp"], int)
+        for directive in metadata["CloudWatchMetrics"]:
+            assert isinstance(directive["Namespace"], str) and directive["Namespace"]
+            assert len(directive["Metrics"]) <= emf.MAX_METRICS_PER_DIRECTIVE
+            for dimension_set in directive["Dimensions"]:
+                for dimension in dimension_set:
+                    assert isinstance(record[dimension], str), dimension
+            for metric in directive["Metrics"]:
+                value = record[metric["Name"]]
+                if isinstance(value, list):
+                    assert 0 < len(value) <= emf.MAX_VALUES_PER_METRIC
+                    assert all(isinstance(v, (int, float)) for v in value)
+                else:
+                    assert isinstance(value, (int, float))
+        records.append(record)
+    return records
+
+
+def find(records, **dimensions):
+    return [r for r in records
+            if all(r.get(k) == v for k, v in dimensions.items())
+            and set(r["_aws"]["CloudWatchMetrics"][0]["Dimensions"][0]) == set(dimensions)]
+
+
+class TestEmfAggregator(unittest.TestCase):
+    """Test aggregation and the record layout."""
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.aggregator = EmfAggregator(namespace="Test/Pipeline", stream=self.stream)
+
+    def test_counts_are_summed_per_dimension_set(self):
+        for success in (True, True, False, True):
+            self.aggregator.add_count("StageAttemptCount", {"Stage": "asr"})
+            self.aggregator.add_count("StageSuccessCount" if success else "StageFailureCount", {"Stage": "asr"})
+        self.aggregator.add_count("StageAttemptCount", {"Stage": "youtubei"})
+        self.assertEqual(self.aggregator.flush(), 2)
+
+        records = parse_emf(self.stream.getvalue())
+        asr = find(records, Stage="asr")[0]
+        self.assertEqual(asr["StageAttemptCount"], 4)
+        self.assertEqual(asr["StageSuccessRate"], 75.0)
+        self.assertEqual(asr["StageErrorRate"], 25.0)
+        self.assertEqual(asr["_aws"]["CloudWatchMetrics"][0]["Namespace"], "Test/Pipeline")
+        units = {m["Name"]: m["Unit"] for m in asr["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+        self.assertEqual(units["StageSuccessRate"], "Percent")
+        self.assertEqual(find(records, Stage="youtubei")[0]["StageSuccessRate"], 0.0)
+
+    def test_samples_are_split_at_value_limit(self):
+        for i in range(250):
+            self.aggregator.add_value("StageDuration", i, {"Stage": "asr"})
+        self.aggregator.add_count("StageAttemptCount", {"Stage": "asr"}, value=250)
+        self.assertEqual(self.aggregator.flush(), 3)
+
+        records = parse_emf(self.stream.getvalue())
+        self.assertEqual(sum(len(r["StageDuration"]) for r in records), 250)
+        self.assertEqual([r.get("StageAttemptCount") for r in records], [250, None, None])
+
+    def test_stage_duration_statistics(self):
+        for i in range(1, 201):
+            self.aggregator.add_value("StageDuration", i, {"Stage": "asr"})
+        self.aggregator.flush()
+
+        records = find(parse_emf(self.stream.getvalue()), Stage="asr")
+        self.assertEqual(records[0]["StageDurationAverage"], 100.5)
+        self.assertEqual(records[0]["StageDurationP95"], 190)
+        self.assertEqual(records[0]["StageDurationP99"], 198)
+        self.assertNotIn("StageDurationP95", records[1])
+
+    def test_flush_resets_interval(self):
+        self.aggregator.add_count("JobsReceived")
+        self.aggregator.flush()
+        self.assertEqual(self.aggregator.flush(), 0)
+        record = parse_emf(self.stream.getvalue())[0]
+        self.assertEqual(record["_aws"]["CloudWatchMetrics"][0]["Dimensions"], [[]])
+
+
+class TestPipelineHooks(unittest.TestCase):
+    """Test that stage, video and job events feed EMF when enabled."""
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.aggregator = EmfAggregator(stream=self.stream)
+        enabled = patch.object(emf, "EMF_ENABLED", True)
+        aggregator = patch.object(emf, "_aggregator", self.aggregator)
+        enabled.start()
+        aggregator.start()
+        self.addCleanup(enabled.stop)
+        self.addCleanup(aggregator.stop)
+        transcript_metrics.reset_metrics()
+        self.addCleanup(transcript_metrics.reset_metrics)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_stage_video_and_job_metrics(self):
+        transcript_metrics.record_stage_metrics("vid1", "youtubei", 2100, False, error_type="navigation_timeout")
+        transcript_metrics.record_stage_metrics("vid1", "asr", 24000, True)
+        log_events.video_processed("vid1", outcome="success", duration_ms=31000, transcript_source="asr")
+        log_events.job_received(video_count=1)
+        log_events.job_finished(total_duration_ms=33000, processed_count=1, video_count=1, outcome="success")
+        self.aggregator.flush()
+
+        records = parse_emf(self.stream.getvalue())
+        self.assertEqual(find(records, Stage="asr")[0]["StageDuration"], [24000])
+        self.assertEqual(find(records, Stage="youtubei")[0]["StageErrorRate"], 100.0)
+        self.assertEqual(find(records, Stage="youtubei", ErrorType="Timeout")[0]["StageErrorCount"], 1)
+        totals = find(records)[0]
+        self.assertEqual(totals["VideosProcessed"], 1)
+        self.assertEqual(totals["JobsReceived"], 1)
+        self.assertEqual(totals["JobDuration"], [33000])
+        self.assertEqual(find(records, Outcome="Success")[0]["JobOutcome"], 1)
+        self.assertEqual(find(records, TranscriptSource="asr")[0]["VideosByTranscriptSource"], 1)
+
+    def test_no_op_when_disabled(self):
+        with patch.object(emf, "EMF_ENABLED", False):
+            emf.record_stage("asr", 100, True)
+        self.assertEqual(self.aggregator.flush(), 0)
+
+
+class TestLogsInsightsScheduler(unittest.TestCase):
+    """Test that the Logs Insights scheduler only queries what EMF does not emit."""
+
+    def test_only_system_health_is_queried_with_emf(self):
+        from cloudwatch_metrics_publisher import LogBasedMetricsCollector, MetricsCollectionScheduler
+
+        with patch("cloudwatch_metrics_publisher.boto3"), \
+                patch("cloudwatch_metrics_publisher.CloudWatchLogsClient"):
+            collector = LogBasedMetricsCollector()
+            scheduler = MetricsCollectionScheduler()
+        scheduler.collector = collector
+        scheduler.publisher = Mock()
+        collectors = ("collect_stage_success_rates", "collect_performance_metrics",
+                      "collect_error_rate_metrics", "collect_job_metrics", "collect_system_health_metrics")
+        for name in collectors:
+            setattr(collector, name, Mock(return_value=[]))
+
+        with patch.object(emf, "EMF_ENABLED", True):
+            scheduler.collect_and_publish_once()
+        called = [name for name in collectors if getattr(collector, name).called]
+        self.assertEqual(called, ["collect_system_health_metrics"])
+
+        with patch.object(emf, "EMF_ENABLED", False):
+            scheduler.collect_and_publish_once()
+        self.assertTrue(all(getattr(collector, name).called for name in collectors))
+
+
+if __name__ == "__main__":
+    unittest.main()
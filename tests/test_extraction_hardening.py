@@ -16,6 +16,8 @@ from yt_download_helper import (
     _check_cookie_freshness,
     download_audio_with_retry
 )
+from logging_setup import clear_job_ctx, set_job_ctx
+from range_downloader import DownloadPolicy, clear_job_policy, set_job_policy
 
 
 class TestExtractionFailureDetection(unittest.TestCase):
@@ -348,5 +350,32 @@ class TestMandatoryABTesting(unittest.TestCase):
         self.assertLessEqual(sleep_time, 2.0)
 
 
+class TestJobDownloadPolicy(unittest.TestCase):
+    """Test that yt-dlp downloads pick up the running job's download policy."""
+
+    def setUp(self):
+        self.policy = DownloadPolicy(connections=3, max_bytes_per_sec=500000)
+        set_job_policy("job-ytdlp", self.policy)
+        self.addCleanup(clear_job_policy, "job-ytdlp")
+
+    @patch('yt_download_helper.download_audio_with_fallback', return_value="/tmp/audio.m4a")
+    def test_policy_from_job_id(self, mock_fallback):
+        download_audio_with_retry("https://youtube.com/watch?v=test", "test-ua", "", job_id="job-ytdlp")
+        self.assertIs(mock_fallback.call_args.kwargs['download_policy'], self.policy)
+
+    @patch('yt_download_helper.download_audio_with_fallback', return_value="/tmp/audio.m4a")
+    def test_policy_from_job_context(self, mock_fallback):
+        set_job_ctx(job_id="job-ytdlp")
+        self.addCleanup(clear_job_ctx)
+        download_audio_with_retry("https://youtube.com/watch?v=test", "test-ua", "")
+        self.assertIs(mock_fallback.call_args.kwargs['download_policy'], self.policy)
+
+    @patch('yt_download_helper.download_audio_with_fallback', return_value="/tmp/audio.m4a")
+    def test_no_job_keeps_default_throttle(self, mock_fallback):
+        clear_job_ctx()
+        download_audio_with_retry("https://youtube.com/watch?v=test", "test-ua", "")
+        self.assertIsNone(mock_fallback.call_args.kwargs['download_policy'])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
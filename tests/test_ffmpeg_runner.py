@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the governed async ffmpeg/ffprobe process runner.
+
+Uses the Python interpreter as a stand-in process so the tests do not
+require ffmpeg to be installed.
+"""
+
+import os
+import sys
+import subprocess
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ffmpeg_runner
+from ffmpeg_runner import (
+    ProcessGovernor,
+    ProcessCancelled,
+    parse_ffmpeg_progress,
+    run_process,
+    cancel_job,
+    clear_job,
+)
+
+
+def _py(code):
+    """Build a command running a Python snippet."""
+    return [sys.executable, "-c", code]
+
+
+class TestParseProgress(unittest.TestCase):
+    """Test ffmpeg -stats line parsing."""
+
+    def test_parses_time_speed_and_size(self):
+        line = "size=    1024kB time=00:01:02.50 bitrate= 128.0kbits/s speed=12.3x"
+        progress = parse_ffmpeg_progress(line)
+        self.assertEqual(progress["out_time_s"], 62.5)
+        self.assertEqual(progress["speed"], 12.3)
+        self.assertEqual(progress["size_kb"], 1024)
+
+    def test_non_progress_lines_ignored(self):
+        self.assertIsNone(parse_ffmpeg_progress("Server returned 403 Forbidden"))
+        self.assertIsNone(parse_ffmpeg_progress(""))
+        self.assertIsNone(parse_ffmpeg_progress("time=N/A bitrate=N/A"))
+
+
+class TestRunProcess(unittest.TestCase):
+    """Test the synchronous facade over the asyncio runner."""
+
+    def test_captures_output_and_returncode(self):
+        result = run_process(
+            _py("import sys; sys.stdout.write('out'); sys.stderr.write('boom\\n'); sys.exit(3)"),
+            timeout=10
+        )
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.stdout, b"out")
+        self.assertEqual(result.stderr, b"boom")
+
+    def test_progress_lines_parsed_and_excluded_from_stderr(self):
+        code = (
+            "import sys\n"
+            "sys.stderr.write('size=10kB time=00:00:01.00 speed=2.0x\\r')\n"
+            "sys.stderr.write('size=20kB time=00:00:03.00 speed=3.0x\\r')\n"
+            "sys.stderr.write('real error\\n')\n"
+        )
+        seen = []
+        with patch("ffmpeg_runner.evt") as mock_evt:
+            result = run_process(_py(code), timeout=10, context="test", on_progress=seen.append)
+
+        self.assertEqual([p["out_time_s"] for p in seen], [1.0, 3.0])
+        self.assertEqual(result.last_progress["speed"], 3.0)
+        self.assertEqual(result.stderr, b"real error")
+
+        progress_events = [c for c in mock_evt.call_args_list if c[0][0] == "ffmpeg_progress"]
+        self.assertEqual(len(progress_events), 1)  # throttled
+        self.assertEqual(progress_events[0][1]["context"], "test")
+
+    def test_timeout_raises_subprocess_timeout(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_process(_py("import time; time.sleep(30)"), timeout=0.5)
+
+    def test_cancel_terminates_running_process(self):
+        job_id = "job-cancel-test"
+        self.addCleanup(clear_job, job_id)
+
+        timer = threading.Timer(0.3, cancel_job, args=(job_id,))
+        timer.start()
+        start = time.time()
+        with self.assertRaises(ProcessCancelled):
+            run_process(_py("import time; time.sleep(30)"), timeout=30, job_id=job_id)
+        self.assertLess(time.time() - start, 10)
+
+    def test_cancelled_job_fails_fast(self):
+        job_id = "job-precancelled"
+        self.addCleanup(clear_job, job_id)
+        cancel_job(job_id)
+        with self.assertRaises(ProcessCancelled):
+            run_process(_py("pass"), timeout=10, job_id=job_id)
+
+
+class TestProcessGovernor(unittest.TestCase):
+    """Test the global concurrency cap."""
+
+    def test_concurrency_is_bounded(self):
+        governor = ProcessGovernor(max_concurrency=2)
+        with patch.object(ffmpeg_runner, "_governor", governor):
+            threads = [
+                threading.Thread(target=run_process, args=(_py("import time; time.sleep(0.3)"),), kwargs={"timeout": 10})
+                for _ in range(5)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        stats = governor.get_stats()
+        self.assertEqual(stats["peak_active"], 2)
+        self.assertEqual(stats["total_started"], 5)
+        self.assertEqual(stats["active"], 0)
+
+    def test_minimum_concurrency_is_one(self):
+        self.assertEqual(ProcessGovernor(0).max_concurrency, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for per-video job progress exposed through JobStatus.to_dict.
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes import JobManager, JobStatus, VideoProgress
+
+
+class TestJobProgress(unittest.TestCase):
+    """Test per-video stage tracking."""
+
+    def setUp(self):
+        self.manager = JobManager(worker_concurrency=1)
+        self.addCleanup(self.manager.executor.shutdown)
+        now = datetime.utcnow()
+        self.manager.jobs["job"] = JobStatus(
+            job_id="job", status="processing", created_at=now, updated_at=now, user_id=1, video_count=2,
+            videos={vid: VideoProgress(video_id=vid) for vid in ("a", "b")})
+
+    def test_videos_start_queued_in_order(self):
+        videos = self.manager.get_job_status("job").to_dict()["videos"]
+        self.assertEqual([(v["video_id"], v["stage"]) for v in videos], [("a", "queued"), ("b", "queued")])
+
+    def test_partial_and_final_summary(self):
+        self.manager.update_video_progress("job", "a", "transcript_acquired", transcript_source="acquired")
+        self.manager.update_video_progress("job", "a", "summary_streaming", summary="**IQ SUM")
+        video = self.manager.get_job_status("job").to_dict()["videos"][0]
+        self.assertEqual(video["stage"], "summary_streaming")
+        self.assertEqual(video["summary"], "**IQ SUM")
+        self.assertEqual(video["transcript_source"], "acquired")
+
+        self.manager.update_video_progress("job", "a", "summary_done", summary="**IQ SUMMARY:** done")
+        video = self.manager.get_job_status("job").to_dict()["videos"][0]
+        self.assertEqual(video["stage"], "summary_done")
+        self.assertIsNotNone(video["updated_at"])
+
+    def test_unknown_stage_rejected(self):
+        with self.assertRaises(ValueError):
+            self.manager.update_video_progress("job", "a", "half_done")
+
+    def test_unknown_job_ignored(self):
+        self.manager.update_video_progress("missing", "a", "summary_done")
+        self.assertIsNone(self.manager.get_job_status("missing"))
+
+    def test_stats_count_jobs_and_active_videos(self):
+        self.manager.update_video_progress("job", "a", "transcript_acquired")
+        stats = self.manager.get_stats()
+        self.assertEqual(stats["jobs_by_status"], {"processing": 1})
+        self.assertEqual(stats["active_videos_by_stage"], {"transcript_acquired": 1, "queued": 1})
+        self.assertEqual(stats["worker_concurrency"], 1)
+
+        self.manager.update_job_status("job", "done")
+        self.assertEqual(self.manager.get_stats()["active_videos_by_stage"], {})
+
+
+class TestCancelledJob(unittest.TestCase):
+    """Test that a cancelled job ends without a digest."""
+
+    def test_job_cancelled_while_queued_sends_no_email(self):
+        manager = JobManager(worker_concurrency=1)
+        self.addCleanup(manager.executor.shutdown)
+        now = datetime.utcnow()
+        manager.jobs["job"] = JobStatus(job_id="job", status="queued", created_at=now, updated_at=now,
+                                        user_id=1, video_count=2,
+                                        videos={vid: VideoProgress(video_id=vid) for vid in ("a", "b")})
+        self.assertTrue(manager.cancel_job("job"))
+
+        email_service = MagicMock()
+        user = MagicMock(email="user@example.com")
+        with patch("models.User") as user_model, \
+                patch("routes.YouTubeService"), patch("routes.TranscriptService") as transcript_service, \
+                patch("routes.VideoSummarizer"), patch("routes.EmailService", return_value=email_service), \
+                patch("routes.get_cookie_resolver"), patch("log_events.job_finished") as job_finished:
+            user_model.query.get.return_value = user
+            manager._run_summarize_job(MagicMock(), "job", 1, ["a", "b"])
+
+        transcript_service.return_value.get_transcript.assert_not_called()
+        email_service.send_digest_email.assert_not_called()
+        email_service.queue_digest_email.assert_not_called()
+        self.assertEqual(job_finished.call_args.kwargs["outcome"], "cancelled")
+        self.assertFalse(job_finished.call_args.kwargs["email_sent"])
+        self.assertEqual(manager.get_job_status("job").status, "cancelled")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for per-job resource sampling.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import job_resources
+from job_resources import JobResourceSampler, classify_process
+
+
+def burn_cpu(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+@unittest.skipUnless(job_resources.PSUTIL_AVAILABLE, "psutil not available")
+class TestJobResourceSampler(unittest.TestCase):
+    """Test the fields attached to a job's completion event."""
+
+    def setUp(self):
+        self.sampler = JobResourceSampler(interval_seconds=0.05, enabled=True)
+
+    def test_fields_cover_job_run(self):
+        self.assertTrue(self.sampler.start("job-1"))
+        ballast = bytearray(32 * 1024 * 1024)
+        burn_cpu(0.3)
+        fields = self.sampler.finish("job-1")
+        del ballast
+
+        self.assertGreater(fields["resource_samples"], 2)
+        self.assertGreater(fields["resource_thread_cpu_s"], 0.1)
+        self.assertGreaterEqual(fields["resource_process_cpu_s"], fields["resource_thread_cpu_s"] - 0.05)
+        self.assertGreater(fields["resource_cpu_pct_peak"], 0)
+        self.assertGreaterEqual(fields["resource_rss_mb_peak"], fields["resource_rss_mb_start"] + 16)
+        self.assertGreater(fields["resource_fds_peak"], 0)
+        self.assertIn("resource_tmp_mb_delta", fields)
+        self.assertEqual(fields["resource_overlapping_jobs"], 0)
+        self.assertEqual(self.sampler.finish("job-1"), {})
+        self.assertEqual(self.sampler.active_jobs(), 0)
+
+    def test_leaked_child_process_reported(self):
+        self.sampler.start("job-2")
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(child.wait)
+        self.addCleanup(child.kill)
+        time.sleep(0.2)
+        with patch.object(job_resources, "BROWSER_PROCESS_PREFIXES", ("python",)), \
+                patch.object(job_resources, "evt") as evt:
+            fields = self.sampler.finish("job-2")
+
+        self.assertGreaterEqual(fields["resource_children_peak"], 1)
+        self.assertGreaterEqual(fields["resource_children_delta"], 1)
+        self.assertGreaterEqual(fields["resource_browsers_delta"], 1)
+        self.assertGreater(fields["resource_children_rss_mb_peak"], 0)
+        evt.assert_called_once()
+        self.assertEqual(evt.call_args[0][0], "job_resource_leak")
+
+    def test_no_leak_reported_for_overlapping_job(self):
+        done = threading.Event()
+        other = threading.Thread(target=lambda: (self.sampler.start("other"), done.wait()))
+        other.start()
+        self.addCleanup(other.join)
+        self.addCleanup(done.set)
+        while self.sampler.active_jobs() == 0:
+            time.sleep(0.01)
+        self.sampler.start("job-5")
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(child.wait)
+        self.addCleanup(child.kill)
+        with patch.object(job_resources, "BROWSER_PROCESS_PREFIXES", ("python",)), \
+                patch.object(job_resources, "evt") as evt:
+            fields = self.sampler.finish("job-5")
+        self.sampler.finish("other")
+
+        self.assertGreaterEqual(fields["resource_browsers_delta"], 1)
+        self.assertEqual(fields["resource_overlapping_jobs"], 1)
+        evt.assert_not_called()
+
+    def test_overlapping_jobs_counted(self):
+        done = threading.Event()
+        other = threading.Thread(target=lambda: (self.sampler.start("other"), done.wait()))
+        other.start()
+        self.addCleanup(other.join)
+        self.addCleanup(done.set)
+        self.sampler.start("job-3")
+        time.sleep(0.15)
+        self.assertEqual(self.sampler.finish("job-3")["resource_overlapping_jobs"], 1)
+        self.sampler.finish("other")
+
+    def test_disabled_sampler_is_noop(self):
+        sampler = JobResourceSampler(enabled=False)
+        self.assertFalse(sampler.start("job-4"))
+        self.assertEqual(sampler.finish("job-4"), {})
+
+
+class TestClassifyProcess(unittest.TestCase):
+    """Test child process classification."""
+
+    def test_kinds(self):
+        self.assertEqual(classify_process("chrome"), "browser")
+        self.assertEqual(classify_process("headless_shell"), "browser")
+        self.assertEqual(classify_process("node"), "driver")
+        self.assertEqual(classify_process("ffprobe"), "ffmpeg")
+        self.assertEqual(classify_process("sh"), "other")
+        self.assertEqual(classify_process(None), "other")
+
+
+if __name__ == "__main__":
+    unittest.main()
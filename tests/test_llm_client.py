@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the rate-limited, retrying and coalescing LLM client.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import llm_client
+from llm_client import LLMBackend, LLMClient, LLMError, error_status, is_retryable
+from llm_stub import StubLLMBackend, StubLLMConfig
+
+
+class _FlakyBackend(StubLLMBackend):
+    """Fails the first `failures` calls with the given status."""
+
+    def __init__(self, failures: int, status: int):
+        super().__init__(StubLLMConfig(latency_s=0.0, latency_jitter_s=0.0))
+        self.failures = failures
+        self.status = status
+
+    async def generate(self, prompt, max_output_tokens, temperature):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise LLMError(f"{self.status} error", status=self.status)
+        return f"ok after {self.calls}"
+
+    # Non-streaming backend: the default stream yields the whole response
+    stream = LLMBackend.stream
+
+
+class TestLLMClient(unittest.TestCase):
+    """Test retries, coalescing and batching."""
+
+    def _client(self, backend, **kwargs):
+        kwargs.setdefault("retry_base_seconds", 0.01)
+        client = LLMClient(backend, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_retries_429_and_5xx(self):
+        for status in (429, 503):
+            client = self._client(_FlakyBackend(failures=2, status=status))
+            self.assertEqual(client.generate_sync("prompt"), "ok after 3")
+            self.assertEqual(client.get_stats()["retries"], 2)
+
+    def test_does_not_retry_client_errors(self):
+        backend = _FlakyBackend(failures=1, status=400)
+        client = self._client(backend)
+        with self.assertRaises(LLMError):
+            client.generate_sync("prompt")
+        self.assertEqual(backend.calls, 1)
+
+    def test_gives_up_after_max_retries(self):
+        backend = _FlakyBackend(failures=10, status=503)
+        client = self._client(backend, max_retries=2)
+        with self.assertRaises(LLMError):
+            client.generate_sync("prompt")
+        self.assertEqual(backend.calls, 3)
+
+    def test_identical_inflight_requests_are_coalesced(self):
+        backend = StubLLMBackend(StubLLMConfig(latency_s=0.2, latency_jitter_s=0.0))
+        client = self._client(backend)
+
+        results = client.generate_many_sync(["same prompt"] * 5 + ["other prompt"])
+
+        self.assertEqual(len(set(results[:5])), 1)
+        self.assertEqual(backend.calls, 2)
+        self.assertEqual(client.get_stats()["coalesced"], 4)
+
+    def test_batch_respects_concurrency(self):
+        backend = StubLLMBackend(StubLLMConfig(latency_s=0.05, latency_jitter_s=0.0))
+        client = self._client(backend, max_concurrency=3)
+
+        results = client.generate_many_sync([f"prompt {i}" for i in range(9)])
+
+        self.assertEqual(len(results), 9)
+        self.assertLessEqual(backend.peak_active, 3)
+
+    def test_request_bucket_throttles(self):
+        backend = StubLLMBackend(StubLLMConfig(latency_s=0.0, latency_jitter_s=0.0))
+        # Burst of 2, then one request every 0.1s
+        client = self._client(backend, requests_per_minute=600, request_burst=2)
+
+        start = time.monotonic()
+        client.generate_many_sync([f"prompt {i}" for i in range(5)])
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+
+    def test_rate_limit_pauses_other_callers(self):
+        backend = StubLLMBackend(StubLLMConfig(latency_s=0.0, latency_jitter_s=0.0,
+                                               quota_requests=3, quota_window_s=0.3))
+        client = self._client(backend, retry_base_seconds=0.1, max_retries=6)
+
+        results = client.generate_many_sync([f"prompt {i}" for i in range(6)])
+
+        self.assertFalse(any(isinstance(r, BaseException) for r in results))
+        self.assertGreater(backend.rate_limited, 0)
+        self.assertEqual(client.get_stats()["rate_limited"], backend.rate_limited)
+
+
+class _BrokenStreamBackend(StubLLMBackend):
+    """Streams one chunk, then fails with a retryable error."""
+
+    async def stream(self, prompt, max_output_tokens, temperature):
+        self.calls += 1
+        yield "partial "
+        raise LLMError("503 stream reset", status=503)
+
+
+class TestLLMClientStreaming(unittest.TestCase):
+    """Test streamed generation."""
+
+    def test_stream_delivers_chunks_in_order(self):
+        backend = StubLLMBackend(StubLLMConfig(latency_s=0.04, latency_jitter_s=0.0, stream_chunks=4))
+        client = LLMClient(backend)
+        self.addCleanup(client.close)
+        chunks = []
+
+        text = client.generate_stream_sync("prompt", chunks.append)
+
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual("".join(chunks), text)
+        self.assertTrue(text.startswith("**IQ SUMMARY:**"))
+
+    def test_stream_retries_only_before_first_chunk(self):
+        client = LLMClient(_FlakyBackend(failures=1, status=429), retry_base_seconds=0.01)
+        self.addCleanup(client.close)
+        self.assertEqual(client.generate_stream_sync("prompt", lambda chunk: None), "ok after 2")
+
+        backend = _BrokenStreamBackend(StubLLMConfig(latency_s=0.0))
+        client = LLMClient(backend, retry_base_seconds=0.01)
+        self.addCleanup(client.close)
+        with self.assertRaises(LLMError):
+            client.generate_stream_sync("prompt", lambda chunk: None)
+        self.assertEqual(backend.calls, 1)
+
+
+class TestErrorClassification(unittest.TestCase):
+    """Test status extraction from backend exceptions."""
+
+    def test_status_attributes(self):
+        class GoogleStyle(Exception):
+            code = 429
+
+        class HttpxStyle(Exception):
+            def __init__(self):
+                super().__init__("boom")
+                self.response = type("Response", (), {"status_code": 502})()
+
+        self.assertEqual(error_status(GoogleStyle()), 429)
+        self.assertEqual(error_status(HttpxStyle()), 502)
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(is_retryable(ValueError("bad prompt")))
+
+    def test_backoff_honours_retry_after(self):
+        client = LLMClient(StubLLMBackend(), retry_base_seconds=0.01, retry_max_seconds=5)
+        self.assertGreaterEqual(client._backoff_delay(0, retry_after=2), 2)
+        self.assertLessEqual(client._backoff_delay(10, retry_after=None), 5)
+
+    def test_shared_client_singleton(self):
+        with patch.object(llm_client, "_client", None):
+            self.assertIs(llm_client.get_llm_client(), llm_client.get_llm_client())
+
+
+if __name__ == "__main__":
+    unittest.main()
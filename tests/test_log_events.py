@@ -232,6 +232,72 @@ class TestStageTimer(unittest.TestCase):
         self.assertTrue(90 <= actual_duration_ms <= 150, f"Duration {actual_duration_ms}ms not in expected range")
 
 
+class TestEventSampling(unittest.TestCase):
+    """Test event classes, level-gating and sampling of diagnostic/trace events."""
+    
+    def setUp(self):
+        self.log_buffer = StringIO()
+        self.handler = logging.StreamHandler(self.log_buffer)
+        self.handler.setFormatter(JsonFormatter())
+        self.logger = logging.getLogger()
+        for handler in self.logger.handlers[:]:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.INFO)
+        self.addCleanup(log_events._sample_rates.update, log_events.get_sample_rates())
+        
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        
+    def _events(self):
+        return [json.loads(line)["event"] for line in self.log_buffer.getvalue().splitlines()]
+        
+    def test_event_classification(self):
+        """Test registry, prefix and default classification."""
+        self.assertEqual(log_events.get_event_class("job_received"), log_events.CORE)
+        self.assertEqual(log_events.get_event_class("asr_step"), log_events.DIAGNOSTIC)
+        self.assertEqual(log_events.get_event_class("asr_trace_booleans"), log_events.TRACE)
+        self.assertTrue(log_events.is_core_event("stage_result"))
+        
+        log_events.register_event("test_registered_event", log_events.DIAGNOSTIC)
+        self.addCleanup(log_events.EVENT_CLASSES.pop, "test_registered_event")
+        self.assertEqual(log_events.get_event_class("test_registered_event"), log_events.DIAGNOSTIC)
+        with self.assertRaises(ValueError):
+            log_events.register_event("test_registered_event", "verbose")
+            
+    def test_trace_events_need_debug_level(self):
+        """Test that trace events are dropped at INFO and emitted at DEBUG."""
+        log_events.evt("asr_trace_booleans", asr_enabled=True)
+        self.assertFalse(log_events.event_enabled("asr_trace_booleans"))
+        self.assertEqual(self._events(), [])
+        
+        self.logger.setLevel(logging.DEBUG)
+        self.assertTrue(log_events.event_enabled("asr_trace_booleans"))
+        log_events.evt("asr_trace_booleans", asr_enabled=True)
+        self.assertEqual(self._events(), ["asr_trace_booleans"])
+        
+    def test_diagnostic_sampling(self):
+        """Test that diagnostic events follow the sample rate; core events do not."""
+        log_events.set_sample_rate(log_events.DIAGNOSTIC, 0.0)
+        self.assertFalse(log_events.event_enabled("asr_step"))
+        for _ in range(20):
+            log_events.evt("asr_step", step="click")
+            log_events.evt("stage_result", stage="asr")
+        self.assertEqual(self._events(), ["stage_result"] * 20)
+        
+        log_events.set_sample_rate(log_events.DIAGNOSTIC, 0.5)
+        with patch("log_events.random.random", side_effect=[0.1, 0.9]):
+            log_events.evt("asr_step", step="first")
+            log_events.evt("asr_step", step="second")
+        self.assertEqual(self._events().count("asr_step"), 1)
+        
+    def test_core_events_cannot_be_sampled(self):
+        """Test that sampling is refused for core events."""
+        with self.assertRaises(ValueError):
+            log_events.set_sample_rate(log_events.CORE, 0.1)
+
+
 class TestTimeStageConvenienceFunction(unittest.TestCase):
     """Test the time_stage convenience function."""
     
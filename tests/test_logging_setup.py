@@ -19,7 +19,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from logging_setup import (
     JsonFormatter, RateLimitFilter, set_job_ctx, clear_job_ctx, get_job_ctx,
-    configure_logging, get_logger, get_perf_logger
+    configure_logging, get_logger, get_perf_logger,
+    LogRingBuffer, BatchingLogWriter, get_log_queue_stats, set_async_log_targets
 )
 
 
@@ -139,6 +140,40 @@ class TestJsonFormatter(unittest.TestCase):
             self.assertIn('detail', parsed)
 
 
+class TestJsonFormatterExtras(unittest.TestCase):
+    """Test extra-field discovery and encoder fallback."""
+    
+    def setUp(self):
+        self.formatter = JsonFormatter()
+        clear_job_ctx()
+    
+    def _record(self, **extra):
+        return logging.getLogger('test').makeRecord(
+            'test', logging.INFO, '', 0, '', (), None, extra=extra
+        )
+    
+    def test_extras_sorted_after_ordered_fields(self):
+        record = self._record(event='asr_chunk_done', zeta=1, alpha='a', chunk=2, dur_ms=5)
+        keys = list(json.loads(self.formatter.format(record)).keys())
+        self.assertEqual(keys, ['lvl', 'event', 'dur_ms', 'alpha', 'chunk', 'zeta'])
+    
+    def test_standard_private_and_none_attributes_skipped(self):
+        record = self._record(event='e', _private=1, missing=None)
+        record.message = 'set by another formatter'
+        parsed = json.loads(self.formatter.format(record))
+        self.assertEqual(parsed, {'lvl': 'INFO', 'event': 'e'})
+    
+    def test_matches_stdlib_encoding(self):
+        import logging_setup
+        record = self._record(event='e', detail='caf\u00e9 "quoted"', ratio=0.25, ok=True, items=[1, 2])
+        expected = logging_setup._stdlib_dumps(json.loads(self.formatter.format(record)))
+        self.assertEqual(self.formatter.format(record), expected)
+    
+    def test_falls_back_for_values_fast_encoder_rejects(self):
+        record = self._record(event='e', big=2 ** 70)
+        self.assertEqual(json.loads(self.formatter.format(record))['big'], 2 ** 70)
+
+
 class TestRateLimitFilter(unittest.TestCase):
     """Test RateLimitFilter rate limiting and suppression behavior."""
     
@@ -253,6 +288,53 @@ class TestRateLimitFilter(unittest.TestCase):
         self.assertGreater(allowed_count, 0)
         self.assertLessEqual(allowed_count, 4)  # At most 3 regular + 1 suppression marker
 
+    
+    def test_structured_events_keyed_by_event_name(self):
+        """Test that evt() records (empty message) are limited per event, not together."""
+        def event_record(event):
+            record = logging.LogRecord(
+                name='test', level=logging.INFO, pathname='', lineno=0,
+                msg='', args=(), exc_info=None
+            )
+            record.event = event
+            return record
+        
+        for i in range(3):
+            self.assertTrue(self.filter.filter(event_record('asr_step')))
+        self.assertTrue(self.filter.filter(event_record('asr_capture')))
+    
+    def test_exempt_events_are_never_limited(self):
+        """Test that events accepted by exempt_event bypass the limit."""
+        rate_filter = RateLimitFilter(per_key=1, window_sec=60,
+                                      exempt_event=lambda event: event == 'stage_result')
+        record = logging.LogRecord(
+            name='test', level=logging.INFO, pathname='', lineno=0,
+            msg='', args=(), exc_info=None
+        )
+        record.event = 'stage_result'
+        for i in range(20):
+            self.assertTrue(rate_filter.filter(record))
+    
+    def test_tokens_refill_gradually(self):
+        """Test that a drained key gets tokens back at per_key/window_sec."""
+        def record():
+            return logging.LogRecord(
+                name='test', level=logging.INFO, pathname='', lineno=0,
+                msg='refill message', args=(), exc_info=None
+            )
+        
+        with patch('logging_setup.time.monotonic', return_value=100.0):
+            for i in range(4):  # 3 allowed + suppression marker
+                self.filter.filter(record())
+            self.assertFalse(self.filter.filter(record()))
+        # One token back after a third of the window, then a fresh marker
+        with patch('logging_setup.time.monotonic', return_value=100.34):
+            self.assertTrue(self.filter.filter(record()))
+            marker = record()
+            self.assertTrue(self.filter.filter(marker))
+            self.assertIn('[suppressed]', marker.getMessage())
+            self.assertFalse(self.filter.filter(record()))
+
 
 class TestContextManagement(unittest.TestCase):
     """Test thread-local context management."""
@@ -317,6 +399,104 @@ class TestContextManagement(unittest.TestCase):
             self.assertEqual(results[i]['video_id'], f'vid-{i}')
 
 
+class TestAsyncLogging(unittest.TestCase):
+    """Test the queued, batching log writer."""
+    
+    def setUp(self):
+        clear_job_ctx()
+        self.root_logger = logging.getLogger()
+        self.original_handlers = self.root_logger.handlers[:]
+        self.original_level = self.root_logger.level
+    
+    def tearDown(self):
+        configure_logging("INFO", use_json=True, async_mode=False)
+        self.root_logger.handlers = self.original_handlers
+        self.root_logger.setLevel(self.original_level)
+        clear_job_ctx()
+    
+    def _capture_async(self):
+        from io import StringIO
+        configure_logging("INFO", use_json=True, async_mode=True)
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JsonFormatter())
+        self.assertTrue(set_async_log_targets([target]))
+        return stream
+    
+    def _wait_for_drain(self):
+        deadline = time.time() + 2
+        while get_log_queue_stats()["depth"] and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+    
+    def test_records_written_by_writer_thread(self):
+        stream = self._capture_async()
+        logging.getLogger().info("", extra={"event": "first"})
+        logging.getLogger().info("value %s", 42)
+        self._wait_for_drain()
+        
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines, [{"lvl": "INFO", "event": "first"}, {"lvl": "INFO", "detail": "value 42"}])
+        stats = get_log_queue_stats()
+        self.assertTrue(stats["async"])
+        self.assertEqual(stats["written"], 2)
+    
+    def test_job_context_captured_on_logging_thread(self):
+        stream = self._capture_async()
+        
+        def worker():
+            set_job_ctx(job_id="j-async", video_id="vid-async")
+            logging.getLogger().info("", extra={"event": "from_job"})
+            clear_job_ctx()
+        
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self._wait_for_drain()
+        
+        parsed = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(parsed["job_id"], "j-async")
+        self.assertEqual(parsed["video_id"], "vid-async")
+    
+    def test_reconfigure_drains_queue(self):
+        stream = self._capture_async()
+        for i in range(50):
+            logging.getLogger().info(f"message {i}")
+        configure_logging("INFO", use_json=True, async_mode=False)
+        self.assertEqual(len(stream.getvalue().splitlines()), 50)
+        self.assertFalse(get_log_queue_stats()["async"])
+    
+    def test_set_targets_without_async_mode(self):
+        configure_logging("INFO", use_json=True, async_mode=False)
+        self.assertFalse(set_async_log_targets([logging.StreamHandler()]))
+    
+    def test_ring_buffer_drops_oldest(self):
+        buffer = LogRingBuffer(capacity=3)
+        for i in range(5):
+            buffer.put_nowait(i)
+        self.assertEqual(buffer.get_batch(10, 0), [2, 3, 4])
+        self.assertEqual((buffer.enqueued, buffer.dropped), (5, 2))
+    
+    def test_dropped_records_reported(self):
+        from io import StringIO
+        buffer = LogRingBuffer(capacity=2)
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JsonFormatter())
+        writer = BatchingLogWriter(buffer, [target])
+        for i in range(4):
+            record = logging.LogRecord('test', logging.INFO, '', 0, '', (), None)
+            record.event = f"e{i}"
+            buffer.put_nowait(record)
+        
+        writer._write(buffer.get_batch(10, 0))
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0]["event"], "log_records_dropped")
+        self.assertEqual(lines[0]["count"], 2)
+        self.assertEqual([line["event"] for line in lines[1:]], ["e2", "e3"])
+        self.assertEqual(writer.written, 2)
+
+
 class TestLoggingConfiguration(unittest.TestCase):
     """Test logging configuration and library noise suppression."""
     
@@ -286,7 +286,7 @@ def test_security_privacy_compliance():
         job_manager = JobManager(worker_concurrency=1)
         
         # Test that cookie methods exist and handle security
-        if hasattr(job_manager, '_get_user_cookies'):
+        if hasattr(job_manager, '_get_user_cookie_bundle'):
             print("✅ Cookie handling method exists")
         else:
             print("❌ Cookie handling method missing")
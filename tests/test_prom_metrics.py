@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the OpenMetrics exposition and multi-process aggregation in
+prom_metrics.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prom_metrics
+import transcript_metrics
+from prom_metrics import MetricFamily, merge_families, render
+
+
+def counter(value, **labels):
+    family = MetricFamily("tldw_test_events", "counter", "Test events.")
+    family.add(labels, value)
+    return family
+
+
+def gauge(value, mode="sum"):
+    family = MetricFamily("tldw_test_depth", "gauge", "Test depth.", multiprocess_mode=mode)
+    family.add({}, value)
+    return family
+
+
+class TestRender(unittest.TestCase):
+    """Test the OpenMetrics text format."""
+
+    def test_counter_gauge_and_eof(self):
+        text = render([counter(3, stage="asr"), gauge(1.5)])
+        self.assertEqual(text.splitlines(), [
+            "# TYPE tldw_test_events counter",
+            "# HELP tldw_test_events Test events.",
+            'tldw_test_events_total{stage="asr"} 3',
+            "# TYPE tldw_test_depth gauge",
+            "# HELP tldw_test_depth Test depth.",
+            "tldw_test_depth 1.5",
+            "# EOF",
+        ])
+
+    def test_histogram_samples(self):
+        family = MetricFamily("tldw_test_seconds", "histogram", "Test.", unit="seconds")
+        family.add_histogram({"stage": "asr"}, (1.0, 2.5), (1, 3), 4, 9.5)
+        lines = render([family]).splitlines()
+        self.assertIn("# UNIT tldw_test_seconds seconds", lines)
+        self.assertIn('tldw_test_seconds_bucket{stage="asr",le="1"} 1', lines)
+        self.assertIn('tldw_test_seconds_bucket{stage="asr",le="2.5"} 3', lines)
+        self.assertIn('tldw_test_seconds_bucket{stage="asr",le="+Inf"} 4', lines)
+        self.assertIn('tldw_test_seconds_count{stage="asr"} 4', lines)
+        self.assertIn('tldw_test_seconds_sum{stage="asr"} 9.5', lines)
+
+    def test_label_values_are_escaped(self):
+        text = render([counter(1, detail='say "hi"\\\n')])
+        self.assertIn('tldw_test_events_total{detail="say \\"hi\\"\\\\\\n"} 1', text)
+
+    def test_transcript_metrics_collector(self):
+        transcript_metrics.reset_metrics()
+        self.addCleanup(transcript_metrics.reset_metrics)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        transcript_metrics.record_stage_metrics("vid1", "asr", 30000, True, proxy_used=True, profile="desktop")
+        transcript_metrics.record_stage_metrics("vid2", "asr", 800, False)
+        transcript_metrics.inc_success("asr")
+
+        lines = render(prom_metrics.collect_transcript_metrics()).splitlines()
+        self.assertIn('tldw_transcript_success_total{source="asr"} 1', lines)
+        self.assertIn('tldw_stage_attempts_total{stage="asr",proxy_used="true",profile="desktop",outcome="success"} 1',
+                      lines)
+        self.assertIn('tldw_stage_duration_seconds_bucket{stage="asr",le="1"} 1', lines)
+        self.assertIn('tldw_stage_duration_seconds_bucket{stage="asr",le="25"} 1', lines)
+        self.assertIn('tldw_stage_duration_seconds_bucket{stage="asr",le="60"} 2', lines)
+        self.assertIn('tldw_stage_duration_seconds_sum{stage="asr"} 30.8', lines)
+
+
+class TestMultiprocessAggregation(unittest.TestCase):
+    """Test merging worker snapshots."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="prom_metrics_test_")
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_counters_sum_over_all_workers_gauges_over_live_ones(self):
+        merged = {f.name: f for f in merge_families([
+            (True, [counter(2, stage="asr"), gauge(1), gauge(1, mode="max")]),
+            (True, [counter(3, stage="asr"), counter(1, stage="youtubei")]),
+            (False, [counter(5, stage="asr"), gauge(7)]),
+        ])}
+        samples = {labels["stage"]: value for _, labels, value in merged["tldw_test_events"].samples}
+        self.assertEqual(samples, {"asr": 10, "youtubei": 1})
+        self.assertEqual(merged["tldw_test_depth"].samples[0][2], 1)
+
+    def test_gauge_max_mode(self):
+        merged = merge_families([(True, [gauge(0, mode="max")]), (True, [gauge(2, mode="max")])])
+        self.assertEqual(merged[0].samples[0][2], 2)
+
+    def test_snapshots_round_trip_between_workers(self):
+        prom_metrics.write_snapshot(self.directory, [counter(4, stage="asr")])
+        own_path = prom_metrics._snapshot_path(self.directory)
+        # A sibling worker that has exited, and a file from an earlier server
+        with open(own_path) as f:
+            payload = json.load(f)
+        payload["pid"] = 2 ** 22 + 12345
+        with open(os.path.join(self.directory, f"{os.getppid()}-{payload['pid']}.json"), "w") as f:
+            json.dump(payload, f)
+        stale = os.path.join(self.directory, "1-2.json")
+        with open(stale, "w") as f:
+            json.dump(payload, f)
+        os.utime(stale, (0, 0))
+
+        snapshots = prom_metrics.read_snapshots(self.directory)
+        self.assertEqual(len(snapshots), 1)
+        self.assertFalse(snapshots[0][0])
+        self.assertEqual(snapshots[0][1][0].samples, [("_total", {"stage": "asr"}, 4)])
+        self.assertEqual(prom_metrics.remove_stale_snapshots(self.directory), 1)
+        self.assertFalse(os.path.exists(stale))
+
+    def test_render_metrics_merges_sibling_snapshots(self):
+        with patch.object(prom_metrics, "METRICS_MULTIPROC_DIR", self.directory), \
+                patch.object(prom_metrics, "_collectors", [lambda: [counter(1, stage="asr")]]), \
+                patch.object(prom_metrics, "_pid_alive", return_value=True):
+            with open(os.path.join(self.directory, f"{os.getppid()}-999999.json"), "w") as f:
+                json.dump({"pid": 999999, "written_at": 0,
+                           "families": [counter(2, stage="asr").to_dict()]}, f)
+            lines = prom_metrics.render_metrics().splitlines()
+        self.assertIn('tldw_test_events_total{stage="asr"} 3', lines)
+        self.assertIn("tldw_metrics_workers 2", lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+
+if __name__ == "__main__":
+    unittest.main()
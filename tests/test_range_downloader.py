@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for the range-parallel audio downloader against a local HTTP server.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import range_downloader
+from range_downloader import (
+    DownloadPolicy,
+    RangeDownloader,
+    TokenBucket,
+    _split_ranges,
+    get_job_bucket,
+    get_job_policy,
+    job_download_policy,
+    set_job_policy,
+    clear_job_policy,
+)
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD, honouring Range unless the path is /norange."""
+
+    range_requests = []
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        match = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match and self.path != "/norange":
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(PAYLOAD) - 1
+            body = PAYLOAD[start:end + 1]
+            _Handler.range_requests.append((start, end))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            body = PAYLOAD
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRangeDownloader(unittest.TestCase):
+    """Test ranged and single-stream downloads."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _Handler.range_requests = []
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_dir.name, "audio.bin")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parallel_ranges_reassemble_file(self):
+        policy = DownloadPolicy(connections=3, max_bytes_per_sec=0, min_part_bytes=1024 * 1024)
+        downloader = RangeDownloader(requests.Session(), policy=policy)
+
+        result = downloader.download(f"{self.base_url}/audio", self.output_path)
+
+        self.assertTrue(result.ranged)
+        self.assertEqual(result.connections, 3)
+        self.assertEqual(result.bytes_downloaded, len(PAYLOAD))
+        with open(self.output_path, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        # Probe plus one request per part
+        self.assertEqual(len(_Handler.range_requests), 4)
+
+    def test_single_stream_without_range_support(self):
+        downloader = RangeDownloader(requests.Session(), policy=DownloadPolicy(connections=4))
+
+        result = downloader.download(f"{self.base_url}/norange", self.output_path)
+
+        self.assertFalse(result.ranged)
+        self.assertEqual(result.connections, 1)
+        with open(self.output_path, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+    def test_split_ranges_respects_minimum_part_size(self):
+        ranges = _split_ranges(2 * 1024 * 1024, DownloadPolicy(connections=8, min_part_bytes=1024 * 1024))
+        self.assertEqual(ranges, [(0, 1024 * 1024 - 1), (1024 * 1024, 2 * 1024 * 1024 - 1)])
+        self.assertEqual(_split_ranges(10, DownloadPolicy(connections=4)), [(0, 9)])
+
+
+class TestDownloadPolicy(unittest.TestCase):
+    """Test per-job policy and bandwidth limiting."""
+
+    def test_job_policy_registry(self):
+        policy = DownloadPolicy(connections=2, max_bytes_per_sec=500000)
+        set_job_policy("job-range", policy)
+        self.addCleanup(clear_job_policy, "job-range")
+
+        self.assertEqual(get_job_policy("job-range"), policy)
+        self.assertEqual(get_job_policy("other-job"), DownloadPolicy())
+
+    def test_downloads_of_a_job_share_one_bucket(self):
+        set_job_policy("job-bucket", DownloadPolicy(max_bytes_per_sec=500000))
+        self.addCleanup(clear_job_policy, "job-bucket")
+
+        first = RangeDownloader(requests.Session(), job_id="job-bucket")
+        second = RangeDownloader(requests.Session(), job_id="job-bucket")
+        self.assertIs(first._bucket, second._bucket)
+        self.assertEqual(first._bucket.rate, 500000)
+        self.assertIsNot(RangeDownloader(requests.Session())._bucket, first._bucket)
+
+        clear_job_policy("job-bucket")
+        self.assertIsNot(get_job_bucket("job-bucket", DownloadPolicy()), first._bucket)
+
+    def test_worker_bandwidth_split_between_job_slots(self):
+        with patch.object(range_downloader, "AUDIO_DOWNLOAD_WORKER_MAX_BPS", 4000000), \
+                patch.object(range_downloader, "AUDIO_DOWNLOAD_MAX_BPS", 0):
+            self.assertEqual(job_download_policy(2).max_bytes_per_sec, 2000000)
+        with patch.object(range_downloader, "AUDIO_DOWNLOAD_WORKER_MAX_BPS", 4000000), \
+                patch.object(range_downloader, "AUDIO_DOWNLOAD_MAX_BPS", 1000000):
+            self.assertEqual(job_download_policy(2).max_bytes_per_sec, 1000000)
+        with patch.object(range_downloader, "AUDIO_DOWNLOAD_WORKER_MAX_BPS", 0), \
+                patch.object(range_downloader, "AUDIO_DOWNLOAD_MAX_BPS", 0):
+            self.assertEqual(job_download_policy(2).max_bytes_per_sec, 0)
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=200000, burst=100000)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.consume(100000)
+        # First 100KB is the burst, the remaining 200KB takes ~1s at 200KB/s
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+    def test_unlimited_bucket_does_not_block(self):
+        bucket = TokenBucket(rate=0)
+        start = time.monotonic()
+        bucket.consume(10 ** 9)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -88,6 +88,7 @@ class TestReliabilityConfig(unittest.TestCase):
         self.assertIn('features', config_dict)
         self.assertIn('retries', config_dict)
         self.assertIn('asr', config_dict)
+        self.assertIn('concurrency', config_dict)
         
         # Check values
         self.assertEqual(config_dict['timeouts']['ffmpeg_timeout'], 60)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the stack-sampling profiler and per-job profiling.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sampling_profiler
+from sampling_profiler import SamplingProfiler, check_admin_token, finish_job_profile
+
+
+def busy_loop(stop):
+    total = 0
+    while not stop.is_set():
+        total += sum(range(200))
+    return total
+
+
+class Worker:
+    """A thread that burns CPU in busy_loop until stopped."""
+
+    def __init__(self, name="busy-worker"):
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=busy_loop, args=(self.stop,), name=name, daemon=True)
+        self.thread.start()
+
+    def join(self):
+        self.stop.set()
+        self.thread.join()
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test stack sampling and the collapsed output."""
+
+    def test_collapsed_stacks_of_busy_thread(self):
+        worker = Worker()
+        self.addCleanup(worker.join)
+        profiler = SamplingProfiler(hz=200, thread_ids=[worker.thread.ident]).start()
+        time.sleep(0.3)
+        profile = profiler.stop()
+
+        self.assertGreater(profile.ticks, 10)
+        self.assertGreater(profile.samples, 10)
+        for line in profile.collapsed().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("busy-worker;"))
+            self.assertGreater(int(count), 0)
+        self.assertTrue(all(";test_sampling_profiler.py:busy_loop" in stack for stack in profile.stacks))
+        self.assertIn("test_sampling_profiler.py:busy_loop", dict(profile.top_frames(3)))
+
+    def test_idle_threads_skipped_by_default(self):
+        parked = threading.Event()
+        idle = threading.Thread(target=parked.wait, name="parked", daemon=True)
+        idle.start()
+        self.addCleanup(idle.join)
+        self.addCleanup(parked.set)
+
+        for include_idle, expected in ((False, 0), (True, 1)):
+            profiler = SamplingProfiler(hz=100, thread_ids=[idle.ident], include_idle=include_idle).start()
+            time.sleep(0.1)
+            self.assertEqual(min(profiler.stop().samples, 1), expected)
+
+    def test_stops_at_max_seconds(self):
+        profiler = SamplingProfiler(hz=100, max_seconds=0.05).start()
+        time.sleep(0.2)
+        self.assertLess(profiler.stop().duration_s, 0.15)
+
+    def test_rejects_rate_out_of_range(self):
+        with self.assertRaises(ValueError):
+            SamplingProfiler(hz=0)
+        with self.assertRaises(ValueError):
+            SamplingProfiler(hz=sampling_profiler.PROFILER_MAX_HZ + 1)
+
+    def test_profile_for_rejects_non_finite_seconds(self):
+        for seconds in (float("nan"), float("inf"), 0, -1):
+            with self.assertRaises(ValueError):
+                sampling_profiler.profile_for(seconds)
+        self.assertFalse(any(t.name == "sampling-profiler" for t in threading.enumerate()))
+
+    def test_profile_for_stops_sampler_on_error(self):
+        with patch.object(sampling_profiler.time, "sleep", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                sampling_profiler.profile_for(5)
+        self.assertFalse(any(t.name == "sampling-profiler" for t in threading.enumerate()))
+        self.assertIsNotNone(sampling_profiler.profile_for(0.05))
+
+    def test_admin_token(self):
+        with patch.object(sampling_profiler, "PROFILER_ADMIN_TOKEN", "s3cret"):
+            self.assertTrue(check_admin_token("Bearer s3cret"))
+            self.assertFalse(check_admin_token("Bearer wrong"))
+            self.assertFalse(check_admin_token("s3cret"))
+            self.assertFalse(check_admin_token(None))
+        with patch.object(sampling_profiler, "PROFILER_ADMIN_TOKEN", ""):
+            self.assertFalse(check_admin_token("Bearer "))
+
+
+class TestJobProfiling(unittest.TestCase):
+    """Test profiles attached to a job's completion event."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="profiler_test_")
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        patcher = patch.object(sampling_profiler, "PROFILE_DIR", self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_finish_job_profile_fields(self):
+        worker = Worker()
+        self.addCleanup(worker.join)
+        profiler = sampling_profiler.start_job_profiler(worker.thread.ident)
+        time.sleep(0.2)
+        fields = finish_job_profile(profiler, "job-1")
+
+        self.assertGreater(fields["profile_samples"], 0)
+        self.assertTrue(fields["profile_top"][0].startswith("test_sampling_profiler.py:busy_loop "))
+        with open(fields["profile_path"]) as f:
+            self.assertIn("busy-worker;", f.read())
+        self.assertEqual(finish_job_profile(None, "job-2"), {})
+
+    def test_job_manager_profiles_flagged_running_job(self):
+        from routes import JobManager, JobStatus
+
+        manager = JobManager(worker_concurrency=1)
+        self.addCleanup(manager.executor.shutdown)
+        now = datetime.utcnow()
+        manager.jobs["job"] = JobStatus(job_id="job", status="processing", created_at=now,
+                                        updated_at=now, user_id=1, video_count=1)
+        worker = Worker()
+        self.addCleanup(worker.join)
+        manager.jobs["job"].thread_id = worker.thread.ident
+
+        self.assertTrue(manager.enable_profiling("job"))
+        self.assertFalse(manager.enable_profiling("missing"))
+        time.sleep(0.1)
+        fields = manager._finish_job_profile("job")
+        self.assertGreater(fields["profile_samples"], 0)
+        self.assertEqual(manager._finish_job_profile("job"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the decrypted-cookie cache in SecureCookieManager.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security_manager import SecureCookieManager
+
+NETSCAPE_COOKIES = ".youtube.com\tTRUE\t/\tTRUE\t1999999999\tSID\tabc123\n"
+
+
+class TestSecureCookieCache(unittest.TestCase):
+    """Test caching and invalidation of decrypted cookies."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        env = patch.dict(os.environ, {"SECURE_COOKIES_DIR": self.temp_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+        self.key = Fernet.generate_key().decode()
+        self.manager = SecureCookieManager(encryption_key=self.key)
+
+    def _decrypt_calls(self):
+        return patch.object(self.manager.fernet, "decrypt", wraps=self.manager.fernet.decrypt)
+
+    def test_repeated_reads_decrypt_once(self):
+        self.manager.store_cookies(1, NETSCAPE_COOKIES)
+
+        with self._decrypt_calls() as decrypt:
+            first = self.manager.get_cookie_bundle(1)
+            second = self.manager.get_cookie_bundle(1)
+            self.assertEqual(self.manager.retrieve_cookies(1), {"cookie_string": NETSCAPE_COOKIES})
+
+        self.assertEqual(decrypt.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(first.header, "SID=abc123")
+
+    def test_store_and_delete_invalidate(self):
+        self.manager.store_cookies(1, {"SID": "old"})
+        self.assertEqual(self.manager.get_cookie_bundle(1).header, "SID=old")
+
+        self.manager.store_cookies(1, {"SID": "new"})
+        self.assertEqual(self.manager.get_cookie_bundle(1).header, "SID=new")
+
+        self.manager.delete_cookies(1)
+        self.assertIsNone(self.manager.get_cookie_bundle(1))
+
+    def test_file_change_invalidates(self):
+        self.manager.store_cookies(1, "SID=first")
+        self.assertEqual(self.manager.get_cookie_bundle(1).header, "SID=first")
+
+        # Another process rewrites the file
+        other = SecureCookieManager(encryption_key=self.key)
+        other.store_cookies(1, "SID=second-value")
+
+        self.assertEqual(self.manager.get_cookie_bundle(1).header, "SID=second-value")
+
+    def test_ttl_still_enforced_on_cache_hit(self):
+        self.manager.store_cookies(1, "SID=abc")
+        self.assertIsNotNone(self.manager.retrieve_cookies(1))
+
+        self.manager._cache[1].expires_at = datetime.utcnow() - timedelta(seconds=1)
+        self.assertIsNone(self.manager.retrieve_cookies(1))
+        self.assertFalse(os.path.exists(self.manager._get_cookie_storage_path(1)))
+
+    def test_cache_is_bounded(self):
+        self.manager.max_cached_users = 2
+        for user_id in (1, 2, 3):
+            self.manager.store_cookies(user_id, "SID=abc")
+            self.manager.retrieve_cookies(user_id)
+        self.assertEqual(list(self.manager._cache), [2, 3])
+
+    def test_returned_data_is_a_copy(self):
+        self.manager.store_cookies(1, json.dumps({"cookie_string": "SID=abc"}))
+        self.manager.retrieve_cookies(1)["cookie_string"] = "tampered"
+        self.assertEqual(self.manager.retrieve_cookies(1), {"cookie_string": "SID=abc"})
+
+
+if __name__ == "__main__":
+    unittest.main()
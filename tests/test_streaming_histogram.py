@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for the fixed-memory streaming histograms and the transcript_metrics
+stage duration store built on them.
+"""
+
+import logging
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcript_metrics
+from streaming_histogram import LogHistogram, WindowedHistogram
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestLogHistogram(unittest.TestCase):
+    """Test accuracy, bounded size and merge/subtract of LogHistogram."""
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(3)
+        values = [rng.lognormvariate(7, 1.2) for _ in range(20000)]
+        hist = LogHistogram(relative_accuracy=0.01)
+        for value in values:
+            hist.record(value)
+
+        for q, estimate in zip((0.5, 0.95, 0.99), hist.quantiles((0.5, 0.95, 0.99))):
+            exact = exact_quantile(values, q)
+            self.assertLessEqual(abs(estimate - exact) / exact, 0.0201, f"q={q}")
+        self.assertEqual(hist.count, 20000)
+        self.assertAlmostEqual(hist.mean(), sum(values) / len(values), places=6)
+
+    def test_bucket_count_is_bounded(self):
+        hist = LogHistogram()
+        for exponent in range(-6, 12):
+            for _ in range(100):
+                hist.record(10.0 ** exponent)
+        self.assertLessEqual(len(hist.buckets), hist.max_buckets)
+        # Out-of-range values land in the zero or the last bucket
+        self.assertEqual(hist.zero_count, 300)
+        self.assertEqual(hist.quantile(1.0), hist.quantile(0.99))
+
+    def test_empty_histogram(self):
+        self.assertEqual(LogHistogram().quantiles((0.5, 0.95)), [0.0, 0.0])
+
+    def test_merge_and_subtract(self):
+        a, b = LogHistogram(), LogHistogram()
+        for value in range(1, 101):
+            a.record(value)
+            b.record(value * 100)
+        a.merge(b)
+        self.assertEqual(a.count, 200)
+        a.subtract(b)
+        self.assertEqual(a.count, 100)
+        self.assertAlmostEqual(a.quantile(1.0), 100, delta=1)
+        with self.assertRaises(ValueError):
+            a.merge(LogHistogram(relative_accuracy=0.05))
+
+
+class TestWindowedHistogram(unittest.TestCase):
+    """Test rotation of the rolling windows."""
+
+    def test_samples_expire_per_window(self):
+        hist = WindowedHistogram(slot_seconds=10)
+        hist.record(100, now=1000)
+        hist.record(200, now=1030)
+
+        self.assertEqual(hist.percentiles("1m", now=1035)["count"], 2)
+        self.assertEqual(hist.percentiles("1m", now=1065)["count"], 1)
+        self.assertEqual(hist.percentiles("1m", now=1095)["count"], 0)
+        self.assertEqual(hist.percentiles("5m", now=1095)["count"], 2)
+        self.assertEqual(hist.percentiles("1h", now=5000)["count"], 0)
+        self.assertEqual(hist.percentiles("all", now=5000)["count"], 2)
+
+    def test_window_percentiles_follow_recent_samples(self):
+        hist = WindowedHistogram(slot_seconds=10)
+        for i in range(100):
+            hist.record(50, now=i)
+        for i in range(100):
+            hist.record(5000, now=600 + i)
+        self.assertAlmostEqual(hist.percentiles("1m", now=700)["p50"], 5000, delta=50)
+        self.assertAlmostEqual(hist.percentiles("1h", now=700)["p50"], 50, delta=1)
+        self.assertEqual(hist.percentiles("1h", now=700)["count"], 200)
+
+    def test_unknown_window(self):
+        with self.assertRaises(ValueError):
+            WindowedHistogram().percentiles("1d")
+
+
+class TestStageMetricsStore(unittest.TestCase):
+    """Test transcript_metrics percentiles on the histogram store."""
+
+    def setUp(self):
+        transcript_metrics.reset_metrics()
+        self.addCleanup(transcript_metrics.reset_metrics)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_stage_percentiles(self):
+        for i in range(1, 1001):
+            transcript_metrics.record_stage_metrics(f"vid{i}", "asr", i, True, proxy_used=True, profile="desktop")
+
+        p = transcript_metrics.get_stage_percentiles("asr")
+        self.assertEqual(p["count"], 1000)
+        self.assertAlmostEqual(p["p50"], 500, delta=10)
+        self.assertAlmostEqual(p["p95"], 950, delta=20)
+        self.assertEqual(transcript_metrics.get_stage_percentiles("timedtext")["count"], 0)
+        with self.assertRaises(ValueError):
+            transcript_metrics.get_stage_percentiles("asr", "1d")
+
+    def test_labeled_percentiles(self):
+        transcript_metrics.record_stage_metrics("a", "youtubei", 100, True, proxy_used=True, profile="mobile")
+        transcript_metrics.record_stage_metrics("b", "youtubei", 300, False, proxy_used=False)
+
+        labels = {(p["stage"], p["proxy_used"], p["profile"]): p["count"]
+                  for p in transcript_metrics.get_labeled_percentiles("1m")}
+        self.assertEqual(labels, {("youtubei", True, "mobile"): 1, ("youtubei", False, "none"): 1})
+
+    def test_invalid_percentile_window_falls_back(self):
+        with patch.dict(os.environ, {"METRICS_PERCENTILE_WINDOW": "15m"}):
+            self.assertEqual(transcript_metrics._percentile_window_from_env(), "1h")
+        with patch.dict(os.environ, {"METRICS_PERCENTILE_WINDOW": "5m"}):
+            self.assertEqual(transcript_metrics._percentile_window_from_env(), "5m")
+
+    def test_idle_label_sets_are_replaced(self):
+        with patch.object(transcript_metrics, "MAX_LABEL_SETS", 2), \
+                patch("transcript_metrics.time.monotonic") as monotonic:
+            monotonic.return_value = 1000.0
+            transcript_metrics.record_stage_metrics("a", "youtubei", 100, True, profile="desktop")
+            transcript_metrics.record_stage_metrics("b", "youtubei", 100, True, profile="mobile")
+            transcript_metrics.record_stage_metrics("c", "youtubei", 100, True, profile="tv")
+            monotonic.return_value = 1000.0 + transcript_metrics.LABEL_SET_IDLE_SECONDS - 10
+            transcript_metrics.record_stage_metrics("d", "youtubei", 100, True, profile="mobile")
+            monotonic.return_value = 1000.0 + transcript_metrics.LABEL_SET_IDLE_SECONDS + 1
+            transcript_metrics.record_stage_metrics("e", "youtubei", 100, True, profile="tv")
+            profiles = [p["profile"] for p in transcript_metrics.get_labeled_percentiles("all")]
+
+        self.assertEqual(profiles, ["mobile", "tv"])
+
+    def test_successful_attempts_are_bounded(self):
+        for i in range(transcript_metrics.MAX_SUCCESSFUL_ATTEMPTS + 50):
+            transcript_metrics.record_stage_metrics(f"vid{i}", "yt_api", 10, True)
+        metrics = transcript_metrics.get_comprehensive_metrics()
+        self.assertEqual(len(metrics["successful_methods"]), transcript_metrics.MAX_SUCCESSFUL_ATTEMPTS)
+        self.assertNotIn("vid0", metrics["successful_methods"])
+        self.assertEqual(metrics["stage_percentiles"]["yt_api"]["count"],
+                         transcript_metrics.MAX_SUCCESSFUL_ATTEMPTS + 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for compacted and map-reduce summarization in VideoSummarizer.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import summarizer
+from llm_client import GeminiBackend, LLMClient
+from summarizer import VideoSummarizer
+from transcript_compactor import chunk_blocks
+
+
+def _segments(minutes: int):
+    return [{"text": f"point number {i} about topic {i // 60} with details", "start": i * 5.0, "duration": 5.0}
+            for i in range(minutes * 12)]
+
+
+class _FakeModel:
+    """Records prompts and answers map/reduce prompts differently."""
+
+    def __init__(self, delay: float = 0.0, fail_parts=()):
+        self.prompts = []
+        self.delay = delay
+        self.fail_parts = set(fail_parts)
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if prompt.startswith("Below is part"):
+                part = int(prompt.split()[3])
+                if part in self.fail_parts:
+                    raise RuntimeError("chunk failed")
+                return Mock(text=f"- Note for part {part} (0{part}:00)")
+            return Mock(text="**IQ SUMMARY:** combined (01:00) and (12:30)")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestMapReduceSummarization(unittest.TestCase):
+    """Test routing between single-prompt and map-reduce paths."""
+
+    def _summarizer(self, model):
+        instance = VideoSummarizer.__new__(VideoSummarizer)
+        instance.llm = LLMClient(GeminiBackend("fake-model", model=model))
+        self.addCleanup(instance.llm.close)
+        return instance
+
+    def test_short_transcript_uses_single_prompt(self):
+        model = _FakeModel()
+        result = self._summarizer(model).summarize_video(
+            transcript_text="short transcript text", video_id="vid", segments=_segments(5))
+
+        self.assertEqual(len(model.prompts), 1)
+        self.assertIn("[00:30] point number 6", model.prompts[0])
+        self.assertIn('href="https://www.youtube.com/watch?v=vid&t=60s"', result)
+
+    @patch.object(summarizer, "SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS", 2000)
+    @patch.object(summarizer, "SUMMARY_CHUNK_MINUTES", 15)
+    @patch.object(summarizer, "SUMMARY_MAP_CONCURRENCY", 4)
+    def test_long_transcript_is_chunked_and_reduced(self):
+        model = _FakeModel(delay=0.2)
+        start = time.time()
+        result = self._summarizer(model).summarize_video(
+            transcript_text="long transcript text", video_id="vid", segments=_segments(60))
+        elapsed = time.time() - start
+
+        map_prompts = [p for p in model.prompts if p.startswith("Below is part")]
+        reduce_prompts = [p for p in model.prompts if p.startswith("Below are notes")]
+        self.assertEqual(len(map_prompts), 4)
+        self.assertEqual(len(reduce_prompts), 1)
+        self.assertIn("covering 15:00 to 29:30", "".join(map_prompts))
+        self.assertIn("Note for part 4 (04:00)", reduce_prompts[0])
+        # Map calls overlap: two sequential rounds would take >= 1.0s
+        self.assertGreater(model.peak_active, 1)
+        self.assertLess(elapsed, 0.8)
+        self.assertIn("&t=750s", result)
+
+    @patch.object(summarizer, "SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS", 2000)
+    def test_failed_chunks_are_skipped(self):
+        model = _FakeModel(fail_parts={2})
+        result = self._summarizer(model).summarize_video(
+            transcript_text="long transcript text", video_id="vid", segments=_segments(60))
+
+        reduce_prompt = [p for p in model.prompts if p.startswith("Below are notes")][0]
+        self.assertNotIn("part 2", reduce_prompt)
+        self.assertIn("IQ SUMMARY", result)
+
+    @patch.object(summarizer, "SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS", 2000)
+    def test_all_chunks_failing_reports_unavailable(self):
+        model = _FakeModel(fail_parts=set(range(1, 10)))
+        result = self._summarizer(model).summarize_video(
+            transcript_text="long transcript text", video_id="vid", segments=_segments(60))
+        self.assertTrue(result.startswith("Summary unavailable"))
+
+    @patch.object(summarizer, "SUMMARY_MAX_CHUNKS", 4)
+    @patch.object(summarizer, "SUMMARY_MAP_INPUT_TOKENS", 48000)
+    def test_very_long_transcript_is_bounded(self):
+        model = _FakeModel()
+        segments = [{"text": f"segment {i} " + "with a fairly long sentence of spoken words " * 3,
+                     "start": i * 5.0, "duration": 5.0} for i in range(10 * 60 * 12)]
+        result = self._summarizer(model).summarize_video(
+            transcript_text="ten hour transcript", video_id="vid", segments=segments)
+
+        map_prompts = [p for p in model.prompts if p.startswith("Below is part")]
+        self.assertEqual(len(map_prompts), 4)
+        self.assertEqual(len(model.prompts), 5)
+        # Map input was trimmed to the token budget (the untrimmed transcript is ~250k tokens)
+        self.assertLessEqual(sum(len(p) for p in map_prompts), 48000 * 4 + 4 * len(summarizer.MAP_PROMPT_TEMPLATE))
+        self.assertIn("covering 7:30:00 to", "".join(map_prompts))
+        self.assertIn("IQ SUMMARY", result)
+
+    def test_streams_partial_summary_with_links(self):
+        model = _FakeModel()
+        partials = []
+        result = self._summarizer(model).summarize_video(
+            transcript_text="short transcript text", video_id="vid", segments=_segments(5),
+            on_progress=partials.append)
+
+        self.assertEqual(partials[-1], result)
+        self.assertIn('href="https://www.youtube.com/watch?v=vid&t=60s"', partials[-1])
+
+
+class TestChunking(unittest.TestCase):
+    """Test chunk boundaries."""
+
+    def test_chunks_by_window_and_size(self):
+        blocks = [(i * 60.0, "x" * 100) for i in range(30)]
+        self.assertEqual([len(c) for c in chunk_blocks(blocks, 600, 100000)], [10, 10, 10])
+        # 100 chars per block, 500 chars (125 tokens) per chunk
+        self.assertEqual([len(c) for c in chunk_blocks(blocks, 600, 125)], [4] * 7 + [2])
+
+    def test_max_chunks_widens_windows(self):
+        blocks = [(i * 30.0, "z" * 200) for i in range(1200)]
+        chunks = chunk_blocks(blocks, 900, 12000, max_chunks=4)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(sum(len(c) for c in chunks), 1200)
+        # Size-closed chunks are merged back down to the cap
+        self.assertLessEqual(len(chunk_blocks(blocks, 900, 100, max_chunks=3)), 3)
+
+    def test_untimed_blocks_chunk_by_size(self):
+        blocks = [(None, "y" * 400) for _ in range(10)]
+        self.assertEqual([len(c) for c in chunk_blocks(blocks, 600, 250)], [2] * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent summary cache and its use in VideoSummarizer.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import summarizer
+from llm_client import GeminiBackend, LLMClient
+from summarizer import PROMPT_VERSION, VideoSummarizer, summary_transcript_hash
+from summary_cache import SummaryCache, prompt_version_hash
+
+
+class TestSummaryCache(unittest.TestCase):
+    """Test SummaryCache storage, expiry and statistics."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = SummaryCache(self.cache_dir, default_ttl_days=30)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_includes_every_component(self):
+        self.cache.set("vid", "hash1", "v1", "model-a", "summary text")
+
+        self.assertEqual(self.cache.get("vid", "hash1", "v1", "model-a"), "summary text")
+        self.assertIsNone(self.cache.get("other", "hash1", "v1", "model-a"))
+        self.assertIsNone(self.cache.get("vid", "hash2", "v1", "model-a"))
+        self.assertIsNone(self.cache.get("vid", "hash1", "v2", "model-a"))
+        self.assertIsNone(self.cache.get("vid", "hash1", "v1", "model-b"))
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set("vid", "hash", "v1", "model", "summary text")
+        with self.cache._get_db_connection() as conn:
+            conn.execute("UPDATE summary_cache SET expires_at = ?", (datetime.now() - timedelta(seconds=1),))
+
+        self.assertIsNone(self.cache.get("vid", "hash", "v1", "model"))
+        self.assertEqual(self.cache.cleanup_expired(), 1)
+
+    def test_hit_rate_stats(self):
+        self.cache.set("vid", "hash", "v1", "model", "summary text")
+        self.cache.get("vid", "hash", "v1", "model")
+        self.cache.get("vid", "hash", "v1", "model")
+        self.cache.get("vid", "missing", "v1", "model")
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.667)
+        self.assertEqual(stats["lifetime_hits"], 2)
+        self.assertEqual(stats["prompt_versions"], {"v1": 1})
+
+    def test_invalidates_other_prompt_versions_once(self):
+        self.cache.set("a", "hash", "old", "model", "old summary")
+        self.cache.set("b", "hash", "new", "model", "new summary")
+
+        self.assertEqual(self.cache.invalidate_prompt_versions("new"), 1)
+        self.cache.set("c", "hash", "old", "model", "old summary")
+        self.assertEqual(self.cache.invalidate_prompt_versions("new"), 0)
+        self.assertEqual(self.cache.get("b", "hash", "new", "model"), "new summary")
+
+    def test_empty_summary_not_cached(self):
+        self.assertFalse(self.cache.set("vid", "hash", "v1", "model", "  "))
+
+    def test_prompt_version_changes_with_text(self):
+        self.assertEqual(prompt_version_hash("prompt", 30), prompt_version_hash("prompt", 30))
+        self.assertNotEqual(prompt_version_hash("prompt", 30), prompt_version_hash("prompt!", 30))
+        self.assertNotEqual(prompt_version_hash("prompt", 30), prompt_version_hash("prompt", 60))
+
+
+class TestSummarizerCaching(unittest.TestCase):
+    """Test that VideoSummarizer reads through the cache."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.summarizer = VideoSummarizer.__new__(VideoSummarizer)
+        self.summarizer.cache = SummaryCache(self.cache_dir)
+        self.model = Mock(spec=["generate_content"])
+        self.model.generate_content.return_value = Mock(text="**IQ SUMMARY:** point (01:05)")
+        self.summarizer.llm = LLMClient(GeminiBackend("fake-model", model=self.model))
+
+    def tearDown(self):
+        self.summarizer.llm.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _segments(self, text="first point of the talk"):
+        return [{"text": text, "start": 0.0, "duration": 2.0},
+                {"text": "second point of the talk", "start": 65.0, "duration": 2.0}]
+
+    def test_second_call_is_served_from_cache(self):
+        first = self.summarizer.summarize_video(transcript_text="some transcript text",
+                                                video_id="vid", segments=self._segments())
+        second = self.summarizer.summarize_video(transcript_text="some transcript text",
+                                                 video_id="vid", segments=self._segments())
+
+        self.assertEqual(self.model.generate_content.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertIn("&t=65s", second)
+
+    def test_changed_transcript_misses(self):
+        self.summarizer.summarize_video(transcript_text="some transcript text",
+                                        video_id="vid", segments=self._segments())
+        self.summarizer.summarize_video(transcript_text="some transcript text",
+                                        video_id="vid", segments=self._segments("edited first point"))
+
+        self.assertEqual(self.model.generate_content.call_count, 2)
+        self.assertNotEqual(summary_transcript_hash("t", self._segments()),
+                            summary_transcript_hash("t", self._segments("edited first point")))
+
+    def test_failures_are_not_cached(self):
+        self.model.generate_content.side_effect = RuntimeError("quota")
+        result = self.summarizer.summarize_video(transcript_text="some transcript text", video_id="vid")
+
+        self.assertTrue(result.startswith("Summary unavailable"))
+        self.assertEqual(self.summarizer.cache.get_stats()["total_entries"], 0)
+
+    def test_prompt_version_covers_templates(self):
+        expected = prompt_version_hash(
+            summarizer.SUMMARY_PROMPT_TEMPLATE, summarizer.MAP_PROMPT_TEMPLATE,
+            summarizer.REDUCE_PROMPT_TEMPLATE, summarizer.TIMESTAMP_HINT,
+            summarizer.TRANSCRIPT_TOKEN_BUDGET, summarizer.TRANSCRIPT_BLOCK_SECONDS,
+            summarizer.SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS, summarizer.SUMMARY_CHUNK_MINUTES,
+            summarizer.SUMMARY_CHUNK_MAX_TOKENS, summarizer.SUMMARY_MAX_CHUNKS,
+            summarizer.SUMMARY_MAP_INPUT_TOKENS,
+        )
+        self.assertEqual(PROMPT_VERSION, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
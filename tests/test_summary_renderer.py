@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared summary renderer (timestamp links and email HTML).
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summary_renderer import (
+    EMPTY_SUMMARY_HTML,
+    add_timestamp_links,
+    render_inline,
+    render_summary_html,
+    timestamp_to_seconds,
+)
+
+
+class TestTimestampLinks(unittest.TestCase):
+    """Test timestamp parsing and link insertion."""
+
+    def test_links_minutes_and_hours(self):
+        text = add_timestamp_links("Intro (01:05) and outro (1:02:03)", "vid")
+        self.assertIn('<a href="https://www.youtube.com/watch?v=vid&t=65s">(01:05)</a>', text)
+        self.assertIn('<a href="https://www.youtube.com/watch?v=vid&t=3723s">(1:02:03)</a>', text)
+
+    def test_ignores_non_strings(self):
+        self.assertIsNone(add_timestamp_links(None, "vid"))
+        self.assertEqual(timestamp_to_seconds("bad"), 0)
+        self.assertEqual(timestamp_to_seconds("1:2:3:4"), 0)
+
+
+class TestSummaryHtml(unittest.TestCase):
+    """Test markdown to email HTML rendering."""
+
+    def test_escapes_text_but_keeps_links(self):
+        linked = add_timestamp_links('**A <b> & "c" (00:30)**', "vid")
+        html = render_inline(linked)
+        self.assertTrue(html.startswith("<strong>A &lt;b&gt; &amp; &quot;c&quot; <a href="))
+        self.assertIn("&t=30s", html)
+
+    def test_block_structure(self):
+        html = render_summary_html("**Main points:**\n- **One**\n  - detail\n- Two\n\nClosing words")
+        self.assertEqual(html.splitlines(), [
+            '<h3 style="margin: 20px 0 8px 0; font-size: 1.1em; color: #2d3748; '
+            'border-bottom: 1px solid #e2e8f0; padding-bottom: 6px;"><strong>Main points:</strong></h3>',
+            '<ul style="margin: 12px 0; padding-left: 20px; list-style-type: disc;">',
+            '<li style="margin-bottom: 8px; color: #4a5568;"><strong>One</strong></li>',
+            '<ul style="margin: 4px 0 4px 20px; padding-left: 16px; list-style-type: circle;">',
+            '<li style="margin-bottom: 4px; color: #718096; font-size: 0.95em;">detail</li>',
+            '</ul>',
+            '<li style="margin-bottom: 8px; color: #4a5568;">Two</li>',
+            '</ul>',
+            '<div style="height: 8px;"></div>',
+            '<p style="margin: 8px 0; color: #4a5568;">Closing words</p>',
+        ])
+
+    def test_links_bare_timestamps_with_video_id(self):
+        html = render_summary_html("- Point (02:00)", video_id="vid")
+        self.assertIn('&t=120s">(02:00)</a>', html)
+
+    def test_empty_summary(self):
+        self.assertEqual(render_summary_html(""), EMPTY_SUMMARY_HTML)
+        self.assertEqual(render_summary_html(None), EMPTY_SUMMARY_HTML)
+
+
+if __name__ == "__main__":
+    unittest.main()
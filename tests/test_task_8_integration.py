@@ -216,7 +216,7 @@ def test_backward_compatibility():
     assert extractor_old.proxy_manager is None, "Old constructor should work"
     
     # Test that _extract_audio_to_wav works without proxy_manager
-    with patch('subprocess.run') as mock_run, \
+    with patch('ffmpeg_runner.run_process') as mock_run, \
          patch('os.path.exists') as mock_exists, \
          patch('os.path.getsize') as mock_getsize:
         
@@ -229,7 +229,7 @@ def test_backward_compatibility():
             result = extractor_old._extract_audio_to_wav("http://example.com/audio.m3u8", wav_path)
             
             # Should work without proxy
-            assert mock_run.called, "Should still call subprocess.run"
+            assert mock_run.called, "Should still run ffmpeg"
             call_args = mock_run.call_args
             env = call_args.kwargs.get('env', os.environ)
             
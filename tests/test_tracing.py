@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for span tracing: nesting across sync, async and thread boundaries,
+and the Chrome trace and OTLP exports.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing
+from logging_setup import JsonFormatter, clear_job_ctx, get_job_ctx
+from tracing import span, traced
+
+
+@traced("fetch")
+def fetch(fail=False):
+    with span("fetch.parse"):
+        if fail:
+            raise RuntimeError("blocked")
+    return "ok"
+
+
+@traced("upload")
+async def upload():
+    await asyncio.sleep(0)
+    with span("upload.chunk", size=3):
+        await asyncio.sleep(0)
+
+
+class TestTracing(unittest.TestCase):
+    """Test span recording and export."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="tracing_test_")
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        for name, value in (("TRACE_ENABLED", True), ("TRACE_DIR", self.directory)):
+            patcher = patch.object(tracing, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(clear_job_ctx)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def run_job(self):
+        root = tracing.start_trace("job", job_id="job-1")
+        video = tracing.start_span("video", video_id="vid1")
+        fetch()
+        with self.assertRaises(RuntimeError):
+            fetch(fail=True)
+        asyncio.run(upload())
+        worker = threading.Thread(target=tracing.wrap_context(fetch), name="helper")
+        worker.start()
+        worker.join()
+        tracing.end_span(video)
+        return root
+
+    def spans_by_name(self, root):
+        spans = {}
+        for s in root.trace.spans:
+            spans.setdefault(s.name, []).append(s)
+        return spans
+
+    def test_spans_nest_across_async_and_threads(self):
+        root = self.run_job()
+        self.assertEqual(get_job_ctx()["trace_id"], root.trace.trace_id)
+        tracing.end_span(root)
+        self.assertIsNone(tracing.current_span())
+
+        spans = self.spans_by_name(root)
+        video = spans["video"][0]
+        self.assertEqual(video.parent_id, root.span_id)
+        self.assertEqual(len(spans["fetch"]), 3)
+        self.assertTrue(all(s.parent_id == video.span_id for s in spans["fetch"]))
+        self.assertEqual([s.status for s in spans["fetch"]].count("error"), 1)
+        self.assertEqual(spans["upload.chunk"][0].parent_id, spans["upload"][0].span_id)
+        self.assertIn("helper", {s.thread_name for s in spans["fetch"]})
+
+    def test_chrome_export(self):
+        root = self.run_job()
+        path = tracing.end_trace(root)
+        self.assertTrue(path.startswith(self.directory))
+        with open(path) as f:
+            payload = json.load(f)
+
+        events = [e for e in payload["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(len(events), len(root.trace.spans))
+        job = next(e for e in events if e["name"] == "job")
+        self.assertEqual(job["args"]["job_id"], "job-1")
+        for event in events:
+            # Every child lies within the root span on the timeline
+            self.assertGreaterEqual(event["ts"], job["ts"])
+            self.assertLessEqual(event["ts"] + event["dur"], job["ts"] + job["dur"] + 1)
+        self.assertIn("helper", [e["args"]["name"] for e in payload["traceEvents"] if e["name"] == "thread_name"])
+        self.assertEqual(payload["otherData"]["trace_id"], root.trace.trace_id)
+
+    def test_otlp_export(self):
+        root = self.run_job()
+        tracing.end_span(root)
+        path = tracing.export_trace(root.trace, fmt="otlp")
+        with open(path) as f:
+            spans = json.load(f)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+        by_id = {s["spanId"]: s for s in spans}
+        self.assertEqual(len(spans), len(root.trace.spans))
+        self.assertTrue(all(s["traceId"] == root.trace.trace_id for s in spans))
+        chunk = next(s for s in spans if s["name"] == "upload.chunk")
+        self.assertEqual(by_id[chunk["parentSpanId"]]["name"], "upload")
+        self.assertIn({"key": "size", "value": {"intValue": "3"}}, chunk["attributes"])
+        failed = [s for s in spans if s["status"]["code"] == 2]
+        self.assertEqual({s["name"] for s in failed}, {"fetch", "fetch.parse"})
+        self.assertTrue(int(chunk["endTimeUnixNano"]) >= int(chunk["startTimeUnixNano"]))
+
+    def test_span_cap(self):
+        with patch.object(tracing, "MAX_SPANS_PER_TRACE", 2):
+            root = self.run_job()
+            tracing.end_span(root)
+        self.assertEqual(len(root.trace.spans), 3)
+        self.assertIs(root.trace.spans[-1], root)
+        self.assertGreater(root.trace.dropped, 0)
+
+    def test_trace_id_in_log_lines(self):
+        root = tracing.start_trace("job", job_id="job-1")
+        record = logging.LogRecord("test", logging.INFO, "", 0, "message", (), None)
+        line = json.loads(JsonFormatter().format(record))
+        tracing.end_span(root)
+        self.assertEqual(line["trace_id"], root.trace.trace_id)
+
+    def test_no_op_without_active_trace(self):
+        with patch.object(tracing, "TRACE_ENABLED", False):
+            self.assertIsNone(tracing.start_trace("job", job_id="job-1"))
+        with span("orphan") as s:
+            self.assertIsNone(s)
+        self.assertEqual(fetch(), "ok")
+        self.assertIsNone(tracing.end_trace(None))
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
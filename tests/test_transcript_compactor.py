@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for transcript compaction before summarization.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_compactor import (
+    clean_cue_text,
+    compact_transcript,
+    estimate_tokens,
+    format_timestamp,
+)
+
+
+def _cues(*items):
+    return [{"text": text, "start": start, "duration": 2.0} for start, text in items]
+
+
+class TestCueCleaning(unittest.TestCase):
+    """Test filler and sound tag removal."""
+
+    def test_strips_fillers_and_tags(self):
+        self.assertEqual(clean_cue_text("[Music] >> um so, uh, today we"), "so, today we")
+        self.assertEqual(clean_cue_text("(applause) thank you"), "thank you")
+
+    def test_keeps_words_containing_fillers(self):
+        self.assertEqual(clean_cue_text("umbrella uhura humming"), "umbrella uhura humming")
+
+    def test_format_timestamp(self):
+        self.assertEqual(format_timestamp(75), "01:15")
+        self.assertEqual(format_timestamp(3725), "1:02:05")
+
+
+class TestCompaction(unittest.TestCase):
+    """Test cue merging, deduplication and budgeting."""
+
+    def test_merges_cues_into_timestamped_blocks(self):
+        result = compact_transcript(_cues(
+            (0.0, "welcome to the show"),
+            (3.0, "today we talk about caching"),
+            (31.0, "first the basics"),
+            (65.0, "then the details"),
+        ), block_seconds=30)
+
+        self.assertTrue(result.has_timestamps)
+        self.assertEqual(result.text.splitlines(), [
+            "[00:00] welcome to the show today we talk about caching",
+            "[00:31] first the basics",
+            "[01:05] then the details",
+        ])
+
+    def test_removes_rolling_and_exact_duplicates(self):
+        result = compact_transcript(_cues(
+            (0.0, "so the main idea here"),
+            (2.0, "the main idea here is that caching"),
+            (4.0, "is that caching helps"),
+            (6.0, "is that caching helps"),
+            (8.0, "[Music]"),
+        ))
+
+        self.assertEqual(result.text, "[00:00] so the main idea here is that caching helps")
+        self.assertEqual(result.cues_in, 5)
+
+    def test_plain_text_has_no_timestamps(self):
+        text = "First sentence here. Um, second sentence here. Second sentence here."
+        result = compact_transcript(text)
+
+        self.assertFalse(result.has_timestamps)
+        self.assertEqual(result.text, "First sentence here. second sentence here.")
+
+    def test_single_segment_treated_as_untimed(self):
+        result = compact_transcript([{"text": "One long ASR transcript. With sentences.", "start": 0.0, "duration": 0.0}])
+        self.assertFalse(result.has_timestamps)
+
+    def test_budget_trims_every_block(self):
+        cues = _cues(*[(i * 5.0, f"sentence number {i} with some extra words to pad it out") for i in range(720)])
+        result = compact_transcript(cues, token_budget=2000, block_seconds=60)
+
+        self.assertTrue(result.trimmed)
+        self.assertLessEqual(estimate_tokens(result.text), 2000)
+        lines = result.text.splitlines()
+        # Whole timeline is still covered
+        self.assertEqual(len(lines), 60)
+        self.assertTrue(lines[-1].startswith("[59:00]"))
+        self.assertGreater(result.reduction, 0.5)
+
+    def test_empty_input(self):
+        result = compact_transcript([])
+        self.assertEqual(result.text, "")
+        self.assertEqual(result.reduction, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
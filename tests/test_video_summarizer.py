@@ -20,7 +20,7 @@ def test_summarizer_initialization():
     
     try:
         from summarizer import VideoSummarizer
-        summarizer = VideoSummarizer()
+        summarizer = VideoSummarizer(use_cache=False)
         print("❌ Should have failed without API key")
         return False
     except ValueError as e:
@@ -102,7 +102,7 @@ def test_input_validation():
         from summarizer import VideoSummarizer
         
         # Create summarizer instance (will fail on actual API call, but that's OK for validation testing)
-        summarizer = VideoSummarizer()
+        summarizer = VideoSummarizer(use_cache=False)
         
         # Test empty transcript
         result = summarizer.summarize_video(transcript_text="", video_id="test123")
@@ -159,7 +159,7 @@ def test_timestamp_conversion():
     try:
         from summarizer import VideoSummarizer
         
-        summarizer = VideoSummarizer()
+        summarizer = VideoSummarizer(use_cache=False)
         
         # Test valid timestamps
         test_cases = [
@@ -209,7 +209,7 @@ def test_error_handling():
     try:
         from summarizer import VideoSummarizer
         
-        summarizer = VideoSummarizer()
+        summarizer = VideoSummarizer(use_cache=False)
         
         # Test timestamp link addition with invalid inputs
         test_cases = [
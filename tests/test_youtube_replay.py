@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the YouTube response replay used by the pipeline benchmark, and
+for the shipped fixtures staying readable by the transcript methods.
+"""
+
+import logging
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import requests
+
+from pipeline_benchmark import DEFAULT_FIXTURES
+from resend_stub import ResendStubServer
+from youtube_replay import YouTubeReplay
+
+FIXTURES = {
+    "videos": {"fixtureVid1": {}},
+    "interactions": [
+        {"video_id": "fixtureVid1", "method": "GET", "url": "https://www.youtube.com/api/timedtext",
+         "query": {"type": "list"}, "status": 200, "headers": {"Content-Type": "text/xml"},
+         "body": '<transcript_list><track id="0" lang_code="en"/></transcript_list>'},
+        {"video_id": "fixtureVid1", "method": "GET", "url": "https://www.youtube.com/api/timedtext",
+         "query": {}, "status": 200, "headers": {"Content-Type": "text/xml"},
+         "body": '<transcript v="fixtureVid1"/>'},
+        {"video_id": "fixtureVid1", "method": "POST", "url": "https://www.youtube.com/youtubei/v1/player",
+         "query": {}, "status": 200, "headers": {"Content-Type": "application/json"},
+         "json": {"videoDetails": {"videoId": "fixtureVid1"}}},
+    ],
+}
+
+
+class TestYouTubeReplay(unittest.TestCase):
+    """Test request matching and passthrough."""
+
+    def setUp(self):
+        self.replay = YouTubeReplay(FIXTURES).install()
+        self.addCleanup(self.replay.uninstall)
+
+    def test_most_specific_fixture_wins(self):
+        listing = requests.get("https://www.youtube.com/api/timedtext?type=list&v=fixtureVid1&hl=en")
+        track = requests.get("https://www.youtube.com/api/timedtext?v=fixtureVid1&lang=en")
+        self.assertIn("transcript_list", listing.text)
+        self.assertEqual(track.text, '<transcript v="fixtureVid1"/>')
+        self.assertEqual(track.headers["content-type"], "text/xml")
+
+    def test_alias_matches_json_body_and_rewrites_id(self):
+        self.replay.alias("aliasVid002", "fixtureVid1")
+        response = requests.post("https://www.youtube.com/youtubei/v1/player?key=k", json={"videoId": "aliasVid002"})
+        self.assertEqual(response.json()["videoDetails"]["videoId"], "aliasVid002")
+        with self.assertRaises(KeyError):
+            self.replay.alias("x", "missing")
+
+    def test_unmatched_requests_are_counted(self):
+        response = requests.get("https://www.youtube.com/watch?v=unknownVid1")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.replay.stats()["unmatched"], 1)
+
+    def test_other_hosts_pass_through(self):
+        with ResendStubServer() as server:
+            response = requests.post(server.url, json={"from": "a", "to": ["b"], "subject": "s", "html": "h"},
+                                     headers={"Authorization": "Bearer k"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.replay.stats()["requests"], 0)
+
+
+class TestShippedFixtures(unittest.TestCase):
+    """Test the benchmark fixtures through the transcript methods."""
+
+    def setUp(self):
+        self.replay = YouTubeReplay.from_file(DEFAULT_FIXTURES).install()
+        self.addCleanup(self.replay.uninstall)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_youtube_api_fixture(self):
+        from youtube_transcript_api_compat import get_transcript
+
+        self.replay.alias("aliasYtApi1", "bnchYtApi01")
+        segments = get_transcript("aliasYtApi1", ["en"])
+        self.assertGreater(len(segments), 200)
+        self.assertTrue(segments[0]["text"])
+
+    def test_timedtext_fixture(self):
+        from timedtext_service import timedtext_attempt
+
+        self.assertGreater(len(timedtext_attempt("bnchTmdTxt2") or ""), 1000)
+        self.assertIsNone(timedtext_attempt("bnchNoCap03"))
+        self.assertEqual(self.replay.stats()["unmatched"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,6 +23,10 @@ class TestYtdlpService(unittest.TestCase):
         # Clear environment variables
         os.environ.pop("DISABLE_YTDLP", None)
         os.environ.pop("ENFORCE_PROXY_ALL", None)
+        
+        # Resolved URLs are cached per video; start each test cold
+        from audio_url_cache import get_audio_url_cache
+        get_audio_url_cache().clear()
     
     @mock.patch('ytdlp_service.yt_dlp')
     def test_extract_best_audio_url_success(self, mock_ytdlp):
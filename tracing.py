@@ -0,0 +1,314 @@
+"""
+Lightweight span tracing for a single job.
+
+A job opens a root span (start_trace) and everything it does underneath
+(video -> transcript method -> navigation, panel open, ffmpeg, Deepgram
+upload) records child spans with span() or @traced. When the root span ends
+the trace is written to TRACE_DIR as Chrome trace JSON (loads in Perfetto,
+chrome://tracing or speedscope for a flame graph of one slow video) or as
+OTLP/JSON (TRACE_FORMAT=otlp) for an OpenTelemetry collector.
+
+The current span lives in a ContextVar, so it follows asyncio tasks
+automatically; thread hops carry it with wrap_context(). The trace id is
+also placed in the job context (set_job_ctx) so every log line of a traced
+job carries trace_id. With no active trace, span() and @traced cost one
+ContextVar lookup. Off unless TRACE_ENABLED=true.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from log_events import evt
+from logging_setup import set_job_ctx
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() == "true"
+TRACE_DIR = os.getenv("TRACE_DIR", "/tmp/tldw_traces")
+TRACE_FORMAT = os.getenv("TRACE_FORMAT", "chrome").lower()  # chrome | otlp
+MAX_SPANS_PER_TRACE = int(os.getenv("TRACE_MAX_SPANS", "5000"))
+
+TRACE_FORMATS = ("chrome", "otlp")
+SERVICE_NAME = "tldw"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("tldw_current_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attributes", "start_ns", "end_ns",
+                 "status", "status_message", "thread_id", "thread_name", "_token")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.status_message: Optional[str] = None
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.status_message = f"{type(error).__name__}: {error}"[:200]
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """Finished spans of one trace, in the order they ended."""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    def _finished(self, span: Span) -> None:
+        with self._lock:
+            # The root always fits: it ends last and anchors the exported tree
+            if len(self.spans) < MAX_SPANS_PER_TRACE or span is self.root:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def start_trace(name: str, **attributes) -> Optional[Span]:
+    """
+    Open the root span of a new trace in the current context.
+
+    Returns None when tracing is disabled; pass the result to end_trace.
+    """
+    if not TRACE_ENABLED:
+        return None
+    trace = Trace()
+    root = Span(trace, name, None, attributes)
+    trace.root = root
+    root._token = _current_span.set(root)
+    set_job_ctx(trace_id=trace.trace_id)
+    return root
+
+
+def end_trace(root: Optional[Span], error: Optional[BaseException] = None) -> Optional[str]:
+    """End the root span and export the trace; returns the file written, if any."""
+    if root is None:
+        return None
+    end_span(root, error)
+    try:
+        path = export_trace(root.trace)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Trace export failed: {e}")
+        return None
+    evt("trace_exported", trace_id=root.trace.trace_id, path=path,
+        span_count=len(root.trace.spans), dropped_spans=root.trace.dropped,
+        dur_ms=int(root.duration_ms))
+    return path
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Open a child of the current span; None (no-op) when no trace is active."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    span = Span(parent.trace, name, parent.span_id, attributes)
+    span._token = _current_span.set(span)
+    return span
+
+
+def end_span(span: Optional[Span], error: Optional[BaseException] = None) -> None:
+    """End a span opened with start_span (or start_trace) and restore its parent."""
+    if span is None or span.end_ns is not None:
+        return
+    if error is not None:
+        span.set_error(error)
+    span.end_ns = time.time_ns()
+    try:
+        _current_span.reset(span._token)
+    except (ValueError, RuntimeError):
+        # Ended from another context than the one it was opened in
+        pass
+    span.trace._finished(span)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Context manager form of start_span/end_span; marks the span failed on exceptions."""
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    try:
+        yield current
+    except Exception as e:
+        current.set_error(e)
+        raise
+    finally:
+        end_span(current)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """Decorator recording a span per call of a sync or async function."""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(span_name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def wrap_context(fn: Callable) -> Callable:
+    """Bind fn to the caller's context so spans opened on another thread nest correctly."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+    return wrapper
+
+
+# --- Export ------------------------------------------------------------------
+
+def _plain(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+def _ordered(trace: Trace) -> List[Span]:
+    with trace._lock:
+        return sorted(trace.spans, key=lambda s: s.start_ns)
+
+
+def to_chrome_trace(trace: Trace) -> Dict[str, Any]:
+    """Chrome trace event format: one complete ("X") event per span."""
+    pid = os.getpid()
+    spans = _ordered(trace)
+    events: List[Dict[str, Any]] = [{
+        "name": "process_name", "ph": "M", "pid": pid,
+        "args": {"name": f"{SERVICE_NAME} {trace.root.name if trace.root else 'trace'}"},
+    }]
+    threads = {}
+    for s in spans:
+        threads.setdefault(s.thread_id, s.thread_name)
+    for tid, thread_name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+    for s in spans:
+        args = {key: _plain(value) for key, value in s.attributes.items()}
+        args["span_id"] = s.span_id
+        if s.parent_id:
+            args["parent_id"] = s.parent_id
+        if s.status != "ok":
+            args["status"] = s.status
+            args["error"] = s.status_message
+        events.append({
+            "name": s.name,
+            "cat": "tldw",
+            "ph": "X",
+            "ts": s.start_ns / 1000,
+            "dur": ((s.end_ns or s.start_ns) - s.start_ns) / 1000,
+            "pid": pid,
+            "tid": s.thread_id,
+            "args": args,
+        })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"trace_id": trace.trace_id, "dropped_spans": trace.dropped},
+    }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for the trace."""
+    spans = []
+    for s in _ordered(trace):
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": _otlp_attributes(dict(s.attributes, **{"thread.id": s.thread_id,
+                                                                 "thread.name": s.thread_name})),
+            "status": {"code": 2, "message": s.status_message} if s.status == "error" else {"code": 1},
+        }
+        if s.parent_id:
+            otlp_span["parentSpanId"] = s.parent_id
+        spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+        "scopeSpans": [{"scope": {"name": "tldw.tracing"}, "spans": spans}],
+    }]}
+
+
+def export_trace(trace: Trace, directory: Optional[str] = None, fmt: Optional[str] = None) -> str:
+    """Atomically write the trace to directory (default TRACE_DIR); returns the path."""
+    fmt = (fmt or TRACE_FORMAT).lower()
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"Unknown trace format {fmt!r}; expected one of {TRACE_FORMATS}")
+    directory = directory or TRACE_DIR
+    os.makedirs(directory, exist_ok=True)
+    label = str((trace.root.attributes.get("job_id") if trace.root else None) or "trace")
+    path = os.path.join(directory, f"{label}-{trace.trace_id[:16]}.{fmt}.json")
+    payload = to_chrome_trace(trace) if fmt == "chrome" else to_otlp(trace)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
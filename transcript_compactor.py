@@ -0,0 +1,296 @@
+"""
+Prompt-size-aware transcript compaction.
+
+Caption tracks arrive as thousands of 2-5 second cues, and auto-generated
+tracks repeat text across rolling cues and carry sound tags ([Music]) and
+fillers (um, uh). Before summarization the transcript is compacted:
+
+1. filler words, sound tags and speaker chevrons are stripped
+2. duplicated and rolling-overlap auto-caption text is removed
+3. cues are merged into TRANSCRIPT_BLOCK_SECONDS blocks, each prefixed
+   with a coarse [MM:SS] timestamp the model can cite
+4. if the result still exceeds TRANSCRIPT_TOKEN_BUDGET, every block is
+   trimmed proportionally so coverage of the whole video is kept
+
+Token counts are estimated at CHARS_PER_TOKEN characters per token.
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "60000"))
+TRANSCRIPT_BLOCK_SECONDS = int(os.getenv("TRANSCRIPT_BLOCK_SECONDS", "30"))
+CHARS_PER_TOKEN = 4
+# Block size for transcripts without cue timing (ASR/timedtext plain text)
+UNTIMED_BLOCK_CHARS = 1000
+# Longest rolling overlap (in words) checked between consecutive cues
+MAX_OVERLAP_WORDS = 20
+
+_SOUND_TAG_RE = re.compile(r"\[(?:[^\]]{0,30})\]|\((?:music|applause|laughter|laughs|inaudible)\)", re.I)
+_FILLER_RE = re.compile(r"(?<![\w'])(?:um+|uh+|erm+|hmm+|mhm+|uh-huh)(?![\w'])[,.]?\s*", re.I)
+_CHEVRON_RE = re.compile(r"(?:^|\s)>>\s*")
+_WHITESPACE_RE = re.compile(r"\s+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+TranscriptInput = Union[str, Sequence[Dict]]
+
+
+@dataclass
+class CompactionResult:
+    """Compacted transcript text with before/after size statistics."""
+    text: str
+    input_chars: int
+    output_chars: int
+    cues_in: int
+    blocks_out: int
+    has_timestamps: bool
+    trimmed: bool
+    # (start_s, text) blocks behind text; start_s is None when untimed
+    blocks: List[Tuple[Optional[float], str]] = field(default_factory=list, repr=False)
+
+    @property
+    def input_tokens(self) -> int:
+        return estimate_tokens_from_chars(self.input_chars)
+
+    @property
+    def output_tokens(self) -> int:
+        return estimate_tokens_from_chars(self.output_chars)
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of the input removed (0.0-1.0)."""
+        if not self.input_chars:
+            return 0.0
+        return round(1 - self.output_chars / self.input_chars, 3)
+
+    def to_dict(self) -> Dict:
+        return {
+            "input_chars": self.input_chars,
+            "output_chars": self.output_chars,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cues_in": self.cues_in,
+            "blocks_out": self.blocks_out,
+            "has_timestamps": self.has_timestamps,
+            "trimmed": self.trimmed,
+            "reduction": self.reduction,
+        }
+
+
+def estimate_tokens_from_chars(chars: int) -> int:
+    return math.ceil(chars / CHARS_PER_TOKEN)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for prompt budgeting."""
+    return estimate_tokens_from_chars(len(text or ""))
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as MM:SS, or H:MM:SS from one hour."""
+    total = max(0, int(seconds))
+    hours, remainder = divmod(total, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def clean_cue_text(text: str) -> str:
+    """Strip sound tags, fillers and speaker chevrons from caption text."""
+    text = _SOUND_TAG_RE.sub(" ", text or "")
+    text = _CHEVRON_RE.sub(" ", text)
+    text = _FILLER_RE.sub("", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _overlap_size(previous_lower: List[str], words_lower: List[str]) -> int:
+    """Length of the prefix of words that repeats the tail of the previous cue."""
+    limit = min(len(previous_lower), len(words_lower), MAX_OVERLAP_WORDS)
+    first = words_lower[0] if words_lower else None
+    for size in range(limit, 0, -1):
+        if previous_lower[-size] == first and previous_lower[-size:] == words_lower[:size]:
+            # Single-word overlaps are only removed when they are the whole cue
+            if size > 1 or size == len(words_lower):
+                return size
+    return 0
+
+
+def _normalize_cues(transcript: TranscriptInput) -> Tuple[List[Tuple[Optional[float], str]], int]:
+    """Return (start, text) cues and the raw input size in characters."""
+    if isinstance(transcript, str):
+        sentences = [s for s in _SENTENCE_RE.split(transcript) if s.strip()]
+        return [(None, s) for s in sentences], len(transcript)
+
+    cues = []
+    input_chars = 0
+    for segment in transcript or []:
+        if not isinstance(segment, dict):
+            continue
+        text = str(segment.get("text") or "")
+        input_chars += len(text) + 1
+        try:
+            start = float(segment["start"]) if segment.get("start") is not None else None
+        except (TypeError, ValueError):
+            start = None
+        cues.append((start, text))
+
+    # A single segment (timedtext/ASR) carries no useful timing
+    if len(cues) <= 1:
+        joined = " ".join(text for _, text in cues)
+        return [(None, s) for s in _SENTENCE_RE.split(joined) if s.strip()], input_chars
+    return cues, input_chars
+
+
+def _dedupe_cues(cues: List[Tuple[Optional[float], str]]) -> List[Tuple[Optional[float], str]]:
+    """Clean cue text and remove exact and rolling duplicates."""
+    result = []
+    previous_lower: List[str] = []
+    previous_cue: List[str] = []
+    for start, text in cues:
+        words = clean_cue_text(text).split()
+        if not words:
+            continue
+        words_lower = [w.lower() for w in words]
+        if words_lower == previous_cue:
+            continue
+        previous_cue = words_lower
+        overlap = _overlap_size(previous_lower, words_lower)
+        if overlap == len(words):
+            continue
+        result.append((start, " ".join(words[overlap:])))
+        previous_lower = (previous_lower + words_lower[overlap:])[-MAX_OVERLAP_WORDS:]
+    return result
+
+
+def _merge_into_blocks(cues: List[Tuple[Optional[float], str]], block_seconds: int) -> List[Tuple[Optional[float], str]]:
+    """Merge cues into time-window blocks (or size-bounded blocks when untimed)."""
+    blocks: List[Tuple[Optional[float], List[str]]] = []
+    timed = all(start is not None for start, _ in cues)
+
+    for start, text in cues:
+        if blocks:
+            block_start, parts = blocks[-1]
+            if timed and start - block_start < block_seconds:
+                parts.append(text)
+                continue
+            if not timed and sum(len(p) + 1 for p in parts) + len(text) <= UNTIMED_BLOCK_CHARS:
+                parts.append(text)
+                continue
+        blocks.append((start if timed else None, [text]))
+
+    return [(start, " ".join(parts)) for start, parts in blocks]
+
+
+def _trim_to_budget(blocks: List[Tuple[Optional[float], str]], budget_chars: int) -> List[Tuple[Optional[float], str]]:
+    """Trim each block proportionally so the whole timeline stays represented."""
+    total = sum(len(text) for _, text in blocks)
+    if total <= budget_chars or not blocks:
+        return blocks
+
+    ratio = budget_chars / total
+    trimmed = []
+    for start, text in blocks:
+        keep = max(40, int(len(text) * ratio))
+        if keep < len(text):
+            cut = text.rfind(" ", 0, keep)
+            text = text[:cut if cut > 0 else keep].rstrip(",;: ") + " …"
+        trimmed.append((start, text))
+    return trimmed
+
+
+def compact_transcript(
+    transcript: TranscriptInput,
+    token_budget: int = TRANSCRIPT_TOKEN_BUDGET,
+    block_seconds: int = TRANSCRIPT_BLOCK_SECONDS
+) -> CompactionResult:
+    """
+    Compact a transcript for use in an LLM prompt.
+
+    Args:
+        transcript: Segments ({'text', 'start', 'duration'}) or plain text
+        token_budget: Maximum estimated tokens for the compacted text (0 = unlimited)
+        block_seconds: Time window merged into one timestamped line
+
+    Returns:
+        CompactionResult with the compacted text and size statistics
+    """
+    cues, input_chars = _normalize_cues(transcript)
+    cleaned = _dedupe_cues(cues)
+    blocks = _merge_into_blocks(cleaned, block_seconds)
+
+    has_timestamps = bool(blocks) and blocks[0][0] is not None
+    if token_budget:
+        prefix_chars = 12 if has_timestamps else 0
+        budget_chars = max(0, token_budget * CHARS_PER_TOKEN - prefix_chars * len(blocks))
+        fitted = _trim_to_budget(blocks, budget_chars)
+    else:
+        fitted = blocks
+
+    text = render_blocks(fitted)
+
+    return CompactionResult(
+        text=text,
+        input_chars=input_chars,
+        output_chars=len(text),
+        cues_in=len(cues),
+        blocks_out=len(fitted),
+        has_timestamps=has_timestamps,
+        trimmed=fitted is not blocks,
+        blocks=fitted,
+    )
+
+
+def render_blocks(blocks: List[Tuple[Optional[float], str]]) -> str:
+    """Render blocks as lines, prefixed with [MM:SS] when timed."""
+    return "\n".join(
+        f"[{format_timestamp(start)}] {text}" if start is not None else text
+        for start, text in blocks
+    )
+
+
+def chunk_blocks(
+    blocks: List[Tuple[Optional[float], str]],
+    chunk_seconds: int,
+    max_chunk_tokens: int,
+    max_chunks: int = 0
+) -> List[List[Tuple[Optional[float], str]]]:
+    """
+    Split blocks into consecutive chunks for map-reduce summarization.
+
+    Timed blocks are grouped into chunk_seconds windows; any chunk (timed or
+    not) is also closed once it reaches max_chunk_tokens. With max_chunks,
+    windows and the size cap are widened so a long transcript still yields
+    at most max_chunks chunks.
+    """
+    chunks: List[List[Tuple[Optional[float], str]]] = []
+    chunk_chars = 0
+    max_chunk_chars = max_chunk_tokens * CHARS_PER_TOKEN
+    if max_chunks and blocks:
+        starts = [start for start, _ in blocks if start is not None]
+        if starts:
+            chunk_seconds = max(chunk_seconds, math.ceil((starts[-1] - starts[0] + 1) / max_chunks))
+        total_chars = sum(len(text) + 1 for _, text in blocks)
+        max_chunk_chars = max(max_chunk_chars, math.ceil(total_chars / max_chunks))
+
+    for start, text in blocks:
+        if chunks:
+            chunk_start = chunks[-1][0][0]
+            in_window = start is None or chunk_start is None or start - chunk_start < chunk_seconds
+            if in_window and chunk_chars + len(text) <= max_chunk_chars:
+                chunks[-1].append((start, text))
+                chunk_chars += len(text) + 1
+                continue
+        chunks.append([(start, text)])
+        chunk_chars = len(text) + 1
+
+    # Window and size boundaries can still leave a few extra chunks; merge the smallest neighbours
+    while max_chunks and len(chunks) > max_chunks:
+        sizes = [sum(len(text) for _, text in chunk) for chunk in chunks]
+        i = min(range(len(chunks) - 1), key=lambda j: sizes[j] + sizes[j + 1])
+        chunks[i:i + 2] = [chunks[i] + chunks[i + 1]]
+
+    return chunks
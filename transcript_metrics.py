@@ -1,21 +1,46 @@
 import logging
+import os
 import time
-from collections import Counter, defaultdict, deque
+from collections import Counter, OrderedDict, deque
 from threading import Lock
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
-import statistics
+
+import emf
+from streaming_histogram import WindowedHistogram, DEFAULT_WINDOWS, LIFETIME
 
 _success = Counter()   # keys: 'yt_api', 'timedtext', 'youtubei', 'asr'
 _fail = Counter()      # keys: 'timedtext', 'youtubei', 'asr', 'none'
 _lock = Lock()
 
+
+def _percentile_window_from_env() -> str:
+    """METRICS_PERCENTILE_WINDOW, or "1h" when unset or not a known window."""
+    window = os.getenv("METRICS_PERCENTILE_WINDOW", "1h")
+    if window not in [name for name, _ in DEFAULT_WINDOWS] + [LIFETIME]:
+        logging.warning(f"Unknown METRICS_PERCENTILE_WINDOW {window!r}, using '1h'")
+        return "1h"
+    return window
+
+
+# Window used when a percentile query does not name one
+DEFAULT_PERCENTILE_WINDOW = _percentile_window_from_env()
+# Cap on (stage, proxy, profile) label sets; when full, the set recorded least
+# recently is replaced once it has been idle for LABEL_SET_IDLE_SECONDS
+MAX_LABEL_SETS = int(os.getenv("METRICS_MAX_LABEL_SETS", "64"))
+LABEL_SET_IDLE_SECONDS = max(span for _, span in DEFAULT_WINDOWS)
+MAX_SUCCESSFUL_ATTEMPTS = 1000
+
 # Enhanced metrics storage
-_stage_durations = defaultdict(list)  # stage -> list of duration_ms
+_stage_durations: Dict[str, WindowedHistogram] = {}  # stage -> duration_ms histogram
+# (stage, proxy_used, profile) -> histogram, least recently recorded first
+_labeled_durations: "OrderedDict[Tuple[str, bool, str], WindowedHistogram]" = OrderedDict()
+_label_last_recorded: Dict[Tuple[str, bool, str], float] = {}  # label set -> monotonic time of last record
+_stage_attempts = Counter()  # (stage, proxy_used, profile, outcome) -> attempts since start
 _stage_metrics = deque(maxlen=1000)   # Recent stage metrics for detailed analysis
 _circuit_breaker_events = deque(maxlen=100)  # Recent circuit breaker events
-_successful_attempts = {}  # video_id -> successful stage name
+_successful_attempts = OrderedDict()  # video_id -> successful stage name, most recent MAX_SUCCESSFUL_ATTEMPTS
 
 
 @dataclass
@@ -66,13 +91,31 @@ def record_stage_metrics(
 ) -> None:
     """Record comprehensive stage metrics with structured logging."""
     
+    now = time.monotonic()
+    label_key = (stage, bool(proxy_used), profile or "none")
+    
     with _lock:
-        # Store duration for percentile calculations
-        _stage_durations[stage].append(duration_ms)
+        # Fold the duration into the per-stage and per-label-set histograms
+        hist = _stage_durations.get(stage)
+        if hist is None:
+            hist = _stage_durations[stage] = WindowedHistogram()
+        hist.record(duration_ms, now)
         
-        # Keep only recent durations (last 1000 per stage)
-        if len(_stage_durations[stage]) > 1000:
-            _stage_durations[stage] = _stage_durations[stage][-1000:]
+        hist = _labeled_durations.get(label_key)
+        if hist is None:
+            if len(_labeled_durations) >= MAX_LABEL_SETS:
+                oldest = next(iter(_labeled_durations))
+                if now - _label_last_recorded[oldest] > LABEL_SET_IDLE_SECONDS:
+                    del _labeled_durations[oldest]
+                    del _label_last_recorded[oldest]
+            if len(_labeled_durations) < MAX_LABEL_SETS:
+                hist = _labeled_durations[label_key] = WindowedHistogram()
+        else:
+            _labeled_durations.move_to_end(label_key)
+        if hist is not None:
+            hist.record(duration_ms, now)
+            _label_last_recorded[label_key] = now
+        _stage_attempts[label_key + ("success" if success else "failure",)] += 1
         
         # Create structured metrics record
         metrics = StageMetrics(
@@ -92,6 +135,11 @@ def record_stage_metrics(
         # Track successful attempts for "which method succeeded" logging
         if success:
             _successful_attempts[video_id] = stage
+            _successful_attempts.move_to_end(video_id)
+            if len(_successful_attempts) > MAX_SUCCESSFUL_ATTEMPTS:
+                _successful_attempts.popitem(last=False)
+    
+    emf.record_stage(stage, duration_ms, success, error_type)
     
     # Emit structured log with all required labels
     log_data = {
@@ -176,33 +224,63 @@ def log_successful_transcript_method(video_id: str) -> None:
         )
 
 
-def get_stage_percentiles(stage: str) -> Dict[str, float]:
-    """Calculate p50 and p95 percentiles for stage duration."""
+def get_stage_percentiles(stage: str, window: Optional[str] = None) -> Dict[str, float]:
+    """
+    Return p50/p95/p99, count and mean of a stage's durations over a window.
     
+    Windows are "1m", "5m", "1h" and "all" (since start); defaults to
+    METRICS_PERCENTILE_WINDOW. Raises ValueError for an unknown window.
+    """
     with _lock:
-        durations = _stage_durations.get(stage, [])
-    
-    if not durations:
-        return {"p50": 0.0, "p95": 0.0, "count": 0}
+        return _stage_percentiles_locked(stage, window or DEFAULT_PERCENTILE_WINDOW)
+
+
+def _stage_percentiles_locked(stage: str, window: str) -> Dict[str, float]:
+    hist = _stage_durations.get(stage)
+    if hist is None:
+        if window not in get_percentile_windows():
+            raise ValueError(f"Unknown window {window!r}")
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "count": 0, "mean": 0.0}
+    return hist.percentiles(window)
+
+
+def get_labeled_percentiles(window: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Percentiles per (stage, proxy_used, profile) label set over a window."""
+    window = window or DEFAULT_PERCENTILE_WINDOW
+    with _lock:
+        return [
+            dict(stage=stage, proxy_used=proxy_used, profile=profile, **hist.percentiles(window))
+            for (stage, proxy_used, profile), hist in _labeled_durations.items()
+        ]
+
+
+def get_stage_duration_buckets(bounds_ms: List[float]) -> Dict[str, Dict[str, Any]]:
+    """
+    Cumulative duration counts per stage since start, for histogram exposition.
     
-    try:
-        p50 = statistics.median(durations)
-        p95 = statistics.quantiles(durations, n=20)[18] if len(durations) >= 20 else max(durations)
-        
-        return {
-            "p50": round(p50, 2),
-            "p95": round(p95, 2),
-            "count": len(durations)
-        }
-    except Exception:
-        # Fallback for edge cases
+    Returns {stage: {"buckets": [count <= bound for each bound], "count": n, "sum": total_ms}}.
+    """
+    with _lock:
         return {
-            "p50": sum(durations) / len(durations),
-            "p95": max(durations),
-            "count": len(durations)
+            stage: {
+                "buckets": hist.lifetime.cumulative_counts(bounds_ms),
+                "count": hist.lifetime.count,
+                "sum": hist.lifetime.sum,
+            }
+            for stage, hist in _stage_durations.items()
         }
 
 
+def get_stage_attempt_counts() -> Dict[Tuple[str, bool, str, str], int]:
+    """Stage attempts since start keyed by (stage, proxy_used, profile, outcome)."""
+    with _lock:
+        return dict(_stage_attempts)
+
+
+def get_percentile_windows() -> List[str]:
+    return [name for name, _ in DEFAULT_WINDOWS] + [LIFETIME]
+
+
 def get_comprehensive_metrics() -> Dict[str, Any]:
     """Get comprehensive metrics including percentiles and recent events."""
     
@@ -210,7 +288,7 @@ def get_comprehensive_metrics() -> Dict[str, Any]:
         # Calculate percentiles for each stage
         stage_percentiles = {}
         for stage in _stage_durations.keys():
-            stage_percentiles[stage] = get_stage_percentiles(stage)
+            stage_percentiles[stage] = _stage_percentiles_locked(stage, DEFAULT_PERCENTILE_WINDOW)
         
         # Get recent stage metrics
         recent_metrics = [
@@ -261,6 +339,11 @@ def get_comprehensive_metrics() -> Dict[str, Any]:
                 "total_fail": sum(_fail.values()),
             },
             "stage_percentiles": stage_percentiles,
+            "stage_label_percentiles": [
+                dict(stage=stage, proxy_used=proxy_used, profile=profile,
+                     **hist.percentiles(DEFAULT_PERCENTILE_WINDOW))
+                for (stage, proxy_used, profile), hist in _labeled_durations.items()
+            ],
             "stage_success_rates": stage_success_rates,
             "recent_stage_metrics": recent_metrics,
             "recent_circuit_breaker_events": recent_cb_events,
@@ -268,7 +351,8 @@ def get_comprehensive_metrics() -> Dict[str, Any]:
             "metrics_summary": {
                 "total_stage_attempts": len(_stage_metrics),
                 "total_circuit_breaker_events": len(_circuit_breaker_events),
-                "stages_tracked": list(_stage_durations.keys())
+                "stages_tracked": list(_stage_durations.keys()),
+                "percentile_window": DEFAULT_PERCENTILE_WINDOW
             }
         }
 
@@ -290,6 +374,9 @@ def reset_metrics() -> None:
         _success.clear()
         _fail.clear()
         _stage_durations.clear()
+        _labeled_durations.clear()
+        _label_last_recorded.clear()
+        _stage_attempts.clear()
         _stage_metrics.clear()
         _circuit_breaker_events.clear()
         _successful_attempts.clear()
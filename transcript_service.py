@@ -20,8 +20,9 @@ from dataclasses import dataclass
 import tenacity
 
 # Import new structured logging components
-from log_events import evt, StageTimer
+from log_events import evt, event_enabled, StageTimer
 from logging_setup import set_job_ctx, get_job_ctx
+from tracing import span, traced
 
 # Import enhanced services
 from storage_state_manager import get_storage_state_manager
@@ -98,6 +99,11 @@ from error_handler import (
     log_performance_metrics,
     log_resource_cleanup,
 )
+import ffmpeg_runner
+from ffmpeg_runner import ProcessCancelled
+from audio_url_cache import get_audio_url_cache, proxy_session_key
+from cookie_resolver import CookieBundle, get_cookie_resolver, get_s3_client
+from asr_budget import AsrPlan, plan_asr_extraction, probe_duration_seconds
 from transcript_metrics import inc_success, inc_fail, record_stage_metrics, record_circuit_breaker_event, log_successful_transcript_method
 from performance_monitor import get_optimized_browser_context, emit_performance_metric
 from logging_setup import get_logger
@@ -143,6 +149,8 @@ ASR_DISABLED = os.getenv("ASR_DISABLED", "false").lower() in ("1", "true", "yes"
 ENABLE_ASR_FALLBACK = (
     not ASR_DISABLED
 )  # Enable ASR by default unless explicitly disabled
+# Deepgram endpoint (override to point ASR at a local stand-in for load testing)
+DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com/v1/listen")
 
 # Get reliability configuration
 _config = get_reliability_config()
@@ -1069,7 +1077,6 @@ def load_user_cookies_from_s3(user_id: int) -> Optional[Dict[str, str]]:
         Dict of cookie name-value pairs, or None if not found/error
     """
     try:
-        import boto3
         from botocore.exceptions import ClientError, NoCredentialsError
         
         # Get S3 configuration
@@ -1078,8 +1085,8 @@ def load_user_cookies_from_s3(user_id: int) -> Optional[Dict[str, str]]:
             logger.debug("S3_COOKIE_BUCKET not configured, skipping S3 cookie lookup")
             return None
         
-        # Create S3 client
-        s3_client = boto3.client('s3')
+        # Shared S3 client
+        s3_client = get_s3_client()
         
         # Construct S3 key
         s3_key = f"user_cookies/{user_id}/cookies.json"
@@ -1636,7 +1643,7 @@ class ASRAudioExtractor:
         self.deepgram_api_key = deepgram_api_key
         self.proxy_manager = proxy_manager
 
-    def extract_transcript(self, video_id: str, job_id: str = None) -> str:
+    def extract_transcript(self, video_id: str, job_id: str = None, duration_s: Optional[float] = None) -> str:
         """
         Extract transcript using ASR fallback with audio extraction and Deepgram transcription.
         
@@ -1644,9 +1651,12 @@ class ASRAudioExtractor:
         1. yt-dlp: Deterministic extraction (ASR_AUDIO_EXTRACTOR=yt_dlp)
         2. Playwright HLS: Browser-based extraction (default)
         
+        Audio sent to Deepgram is bounded by the ASR budget (see asr_budget).
+        
         Args:
             video_id: YouTube video ID
             job_id: Optional job ID for context tracking
+            duration_s: Video duration in seconds if known (ffprobe is used otherwise)
             
         Returns:
             Transcript text or empty string if failed
@@ -1732,15 +1742,29 @@ class ASRAudioExtractor:
             
             evt("asr_step", step="audio_url_extraction", outcome="success", video_id=video_id)
             
-            # Step 2: Extract audio to WAV using ffmpeg
-            import tempfile
-            import os
+            # Bound ASR work by video duration
+            if duration_s is None:
+                duration_s = probe_duration_seconds(
+                    audio_url,
+                    self._build_ffmpeg_headers([f"User-Agent: {_CHROME_UA}", "Referer: https://www.youtube.com/"]),
+                    dict(os.environ, **(self.proxy_manager.proxy_env_for_subprocess() if self.proxy_manager else {}))
+                )
+            plan = plan_asr_extraction(duration_s)
+            evt("asr_budget_plan",
+                video_id=video_id,
+                strategy=plan.strategy,
+                video_duration_s=plan.video_duration_s,
+                budget_s=plan.budget_s,
+                segments=len(plan.segments))
             
+            # Step 2: Extract audio to WAV using ffmpeg
             with tempfile.TemporaryDirectory() as temp_dir:
                 wav_path = os.path.join(temp_dir, "audio.wav")
                 
-                if not self._extract_audio_to_wav(audio_url, wav_path):
+                if not self._extract_audio_to_wav(audio_url, wav_path, plan):
                     evt("asr_step", step="audio_extraction", outcome="failed", video_id=video_id)
+                    # The URL may have been rejected (403/expired) - resolve afresh next time
+                    get_audio_url_cache().invalidate(video_id, reason="ffmpeg_failed")
                     return ""
                 
                 evt("asr_step", step="audio_extraction", outcome="success", video_id=video_id)
@@ -1764,6 +1788,7 @@ class ASRAudioExtractor:
                 video_id=video_id, error=str(e)[:100])
             return ""
 
+    @traced("asr.deepgram_upload")
     def _transcribe_with_deepgram(self, audio_data: bytes, video_id: str) -> str:
         """
         Transcribe audio data using Deepgram API.
@@ -1779,7 +1804,7 @@ class ASRAudioExtractor:
             import httpx
             
             # Prepare Deepgram API request
-            url = "https://api.deepgram.com/v1/listen"
+            url = DEEPGRAM_API_URL
             headers = {
                 "Authorization": f"Token {self.deepgram_api_key}",
                 "Content-Type": "audio/wav"
@@ -1830,8 +1855,25 @@ class ASRAudioExtractor:
                 video_id=video_id, error=str(e)[:100])
             return ""
 
+    @traced("asr.capture_audio_url")
     def _extract_hls_audio_url(
         self, video_id: str, proxy_manager=None, cookies=None
+    ) -> str:
+        """Get HLS audio stream URL, reusing a cached capture until it expires"""
+        url_cache = get_audio_url_cache()
+        session_key = proxy_session_key(proxy_manager, get_job_ctx().get("job_id"))
+        
+        cached = url_cache.get(video_id, session_key, "playwright_hls")
+        if cached is not None:
+            return cached.url
+        
+        audio_url = self._capture_hls_audio_url(video_id, proxy_manager, cookies)
+        if audio_url:
+            url_cache.put(video_id, session_key, "playwright_hls", audio_url)
+        return audio_url
+
+    def _capture_hls_audio_url(
+        self, video_id: str, proxy_manager=None, cookies=None
     ) -> str:
         """Use Playwright to capture HLS audio stream URL"""
         timeout_ms = PW_NAV_TIMEOUT_MS
@@ -2095,8 +2137,15 @@ class ASRAudioExtractor:
             evt("asr_playback_trigger_failed", err=str(e)[:100])
             # Continue anyway - some videos may already be playing or may start playing later
 
-    def _extract_audio_to_wav(self, audio_url: str, wav_path: str) -> bool:
-        """Extract audio from HLS stream to WAV using ffmpeg with WebM/Opus hardening and proxy support"""
+    @traced("asr.ffmpeg_extract")
+    def _extract_audio_to_wav(self, audio_url: str, wav_path: str, plan: Optional[AsrPlan] = None) -> bool:
+        """
+        Extract audio from HLS stream to WAV using ffmpeg with WebM/Opus hardening and proxy support.
+        
+        An AsrPlan limits extraction to budgeted windows (seek/duration per input,
+        concatenated) or applies a speech-only filter with a capped output length.
+        """
+        plan = plan or AsrPlan(strategy="full")
         max_retries = 2
         
         for attempt in range(max_retries):
@@ -2117,11 +2166,12 @@ class ASRAudioExtractor:
                     "ffmpeg",
                     "-y",
                     "-loglevel", "error",
-                    "-headers", headers_arg,
+                    "-stats",  # Progress lines on stderr (parsed by ffmpeg_runner)
                 ]
                 
                 # Get proxy environment variables for subprocess
                 proxy_env = {}
+                proxy_args = []
                 if self.proxy_manager:
                     proxy_env = self.proxy_manager.proxy_env_for_subprocess()
                     if proxy_env:
@@ -2130,14 +2180,35 @@ class ASRAudioExtractor:
                     # Fallback to legacy proxy URL method if proxy_manager not available
                     proxy_url = _ffmpeg_proxy_url(self.proxy_manager)
                     if proxy_url:
-                        cmd += ["-http_proxy", proxy_url]
+                        proxy_args = ["-http_proxy", proxy_url]
+                
+                # One input per budgeted window; input options must precede each -i
+                for start_s, duration_s in plan.segments:
+                    cmd += ["-headers", headers_arg] + proxy_args + [
+                        # Add input format tolerance for WebM/Opus streams
+                        "-analyzeduration", "10M",
+                        "-probesize", "50M",
+                    ]
+                    if start_s:
+                        cmd += ["-ss", str(start_s)]
+                    if duration_s:
+                        cmd += ["-t", str(duration_s)]
+                    cmd += ["-i", audio_url]
+                
+                if len(plan.segments) > 1:
+                    inputs = "".join(f"[{i}:a]" for i in range(len(plan.segments)))
+                    graph = f"{inputs}concat=n={len(plan.segments)}:v=0:a=1"
+                    if plan.audio_filter:
+                        graph += f",{plan.audio_filter}"
+                    cmd += ["-filter_complex", graph + "[a]", "-map", "[a]"]
+                elif plan.audio_filter:
+                    cmd += ["-af", plan.audio_filter]
+                
+                if plan.max_output_s:
+                    cmd += ["-t", str(plan.max_output_s)]
                 
                 # Continue building command
                 cmd += [
-                    # Add input format tolerance for WebM/Opus streams
-                    "-analyzeduration", "10M",
-                    "-probesize", "50M",
-                    "-i", audio_url,
                     # Force audio codec and format conversion
                     "-c:a", "pcm_s16le",  # Force PCM WAV output
                     "-ar", "16000",       # 16kHz sample rate
@@ -2158,13 +2229,12 @@ class ASRAudioExtractor:
                 if proxy_env:
                     subprocess_env.update(proxy_env)
 
-                # Execute FFmpeg with timeout
-                result = subprocess.run(
+                # Execute FFmpeg with timeout through the governed async runner
+                result = ffmpeg_runner.run_process(
                     cmd,
                     env=subprocess_env,
-                    capture_output=True,
-                    text=True,
-                    timeout=300  # 5 minute timeout
+                    timeout=300,  # 5 minute timeout
+                    context="asr_ffmpeg"
                 )
 
                 elapsed_time = time.time() - start_time
@@ -2176,7 +2246,7 @@ class ASRAudioExtractor:
                     return True
                 else:
                     # FFmpeg failed
-                    error_output = result.stderr.strip() if result.stderr else "No error output"
+                    error_output = result.stderr.decode("utf-8", errors="replace").strip() if result.stderr else "No error output"
                     evt("asr_ffmpeg_failed", 
                         attempt=attempt + 1, 
                         returncode=result.returncode,
@@ -2201,6 +2271,10 @@ class ASRAudioExtractor:
                 else:
                     return False
                     
+            except ProcessCancelled:
+                evt("asr_ffmpeg_cancelled", attempt=attempt + 1)
+                return False
+                    
             except Exception as e:
                 elapsed_time = time.time() - start_time
                 evt("asr_ffmpeg_error", 
@@ -2346,11 +2420,12 @@ class DeterministicTranscriptCapture:
             return None
 
 
-def get_transcript_via_youtubei_enhanced(video_id: str, job_id: str = None, user_cookies=None, proxy_manager=None) -> str:
+def get_transcript_via_youtubei_enhanced(video_id: str, job_id: str = None, user_cookies=None, proxy_manager=None,
+                                         playwright_cookies=None) -> str:
     """Enhanced YouTubei extraction using centralized service."""
     try:
         # Use the centralized YouTubei service with correct parameter order
-        return extract_transcript_with_job_proxy(video_id, job_id, proxy_manager, user_cookies)
+        return extract_transcript_with_job_proxy(video_id, job_id, proxy_manager, user_cookies, playwright_cookies)
     except Exception as e:
         evt("youtubei_enhanced_error", 
             video_id=video_id, error=str(e)[:100])
@@ -2604,6 +2679,7 @@ class TranscriptService:
             self.proxy_manager = None
             self.cache = TranscriptCache()
 
+    @traced("transcript")
     def get_transcript(
         self,
         video_id: str,
@@ -2611,6 +2687,8 @@ class TranscriptService:
         user_id: Optional[int] = None,
         job_id: Optional[str] = None,
         cookie_header: Optional[str] = None,
+        duration_s: Optional[float] = None,
+        cookie_bundle: Optional[CookieBundle] = None,
     ) -> List[Dict]:
         """
         Main transcript extraction method with hierarchical fallback.
@@ -2621,6 +2699,9 @@ class TranscriptService:
             user_id: Optional user ID for S3 cookie lookup
             job_id: Optional job ID for context tracking
             cookie_header: Optional cookie header string
+            duration_s: Optional video duration in seconds (bounds ASR work)
+            cookie_bundle: Optional cookies already resolved for the job
+                (skips per-video S3/env lookups)
             
         Returns:
             List of transcript segments with text, start, and duration
@@ -2648,7 +2729,9 @@ class TranscriptService:
             language_codes=language_codes,
             user_id=user_id,
             job_id=job_id,
-            cookie_header=cookie_header
+            cookie_header=cookie_header,
+            duration_s=duration_s,
+            cookie_bundle=cookie_bundle
         )
         
         # Cache successful results
@@ -2658,6 +2741,14 @@ class TranscriptService:
         
         return result
 
+    def _resolve_cookies(self, user_id: Optional[int], cookie_header: Optional[str]) -> CookieBundle:
+        """Resolve cookies for a user (cached), or wrap a caller-supplied header."""
+        if user_id:
+            return get_cookie_resolver().resolve(user_id)
+        if isinstance(cookie_header, str):
+            return CookieBundle.from_header(cookie_header)
+        return CookieBundle(source="none")
+
     def _execute_transcript_pipeline(
         self,
         video_id: str,
@@ -2665,6 +2756,8 @@ class TranscriptService:
         user_id: Optional[int] = None,
         job_id: Optional[str] = None,
         cookie_header: Optional[str] = None,
+        duration_s: Optional[float] = None,
+        cookie_bundle: Optional[CookieBundle] = None,
     ) -> List[Dict]:
         """
         Execute the hierarchical transcript extraction pipeline.
@@ -2678,18 +2771,20 @@ class TranscriptService:
         Returns:
             List of transcript segments or empty list if all methods fail
         """
+        # Resolve cookies once for all methods
+        if cookie_bundle is None:
+            cookie_bundle = self._resolve_cookies(user_id, cookie_header)
+        user_cookies = cookie_bundle.header
         
         # Method 1: YouTube Transcript API
         if ENABLE_YT_API:
             try:
                 evt("transcript_method_start", method="youtube_api", video_id=video_id)
                 
-                # Get user cookies for API if available
-                user_cookies = get_user_cookies_with_fallback(user_id) if user_id else cookie_header
-                
                 # Try with compatibility layer
                 proxies = _requests_proxies(self.proxy_manager)
-                transcript_list = get_transcript(video_id, language_codes, user_cookies, proxies)
+                with span("method.youtube_api"):
+                    transcript_list = get_transcript(video_id, language_codes, user_cookies, proxies)
                 
                 if transcript_list:
                     # Convert to standard format
@@ -2718,15 +2813,13 @@ class TranscriptService:
             try:
                 evt("transcript_method_start", method="timedtext", video_id=video_id)
                 
-                # Get user cookies
-                user_cookies = get_user_cookies_with_fallback(user_id) if user_id else cookie_header
-                
-                transcript_text = timedtext_with_job_proxy(
-                    video_id=video_id,
-                    job_id=job_id,
-                    proxy_manager=self.proxy_manager,
-                    cookies=user_cookies
-                )
+                with span("method.timedtext"):
+                    transcript_text = timedtext_with_job_proxy(
+                        video_id=video_id,
+                        job_id=job_id,
+                        proxy_manager=self.proxy_manager,
+                        cookies=cookie_bundle.jar or user_cookies
+                    )
                 
                 if transcript_text and transcript_text.strip():
                     # Convert to segments format
@@ -2751,16 +2844,15 @@ class TranscriptService:
             try:
                 evt("transcript_method_start", method="youtubei", video_id=video_id)
                 
-                # Get user cookies
-                user_cookies = get_user_cookies_with_fallback(user_id) if user_id else cookie_header
-                
                 # Use centralized YouTubei service
-                transcript_text = get_transcript_via_youtubei_enhanced(
-                    video_id=video_id,
-                    job_id=job_id,
-                    user_cookies=user_cookies,
-                    proxy_manager=self.proxy_manager
-                )
+                with span("method.youtubei"):
+                    transcript_text = get_transcript_via_youtubei_enhanced(
+                        video_id=video_id,
+                        job_id=job_id,
+                        user_cookies=user_cookies,
+                        proxy_manager=self.proxy_manager,
+                        playwright_cookies=cookie_bundle.playwright_cookies
+                    )
                 
                 if transcript_text and transcript_text.strip():
                     # Parse transcript text into segments
@@ -2798,16 +2890,17 @@ class TranscriptService:
         )
         
         # TRACE: Log entry into ASR section with all state information
-        evt("asr_trace_entry",
-            video_id=video_id,
-            job_id=job_id,
-            env_ENABLE_ASR_FALLBACK=str(ENABLE_ASR_FALLBACK),
-            env_ASR_DISABLED=os.getenv("ASR_DISABLED", "false"),
-            env_DEEPGRAM_API_KEY_present=bool(os.environ.get("DEEPGRAM_API_KEY")),
-            instance_deepgram_api_key_present=bool(self.deepgram_api_key),
-            instance_deepgram_api_key_value_preview=str(self.deepgram_api_key)[:20] if self.deepgram_api_key else "None",
-            proxy_manager_present=bool(self.proxy_manager),
-            proxy_manager_in_use=self.proxy_manager.in_use if self.proxy_manager else False)
+        if event_enabled("asr_trace_entry"):
+            evt("asr_trace_entry",
+                video_id=video_id,
+                job_id=job_id,
+                env_ENABLE_ASR_FALLBACK=str(ENABLE_ASR_FALLBACK),
+                env_ASR_DISABLED=os.getenv("ASR_DISABLED", "false"),
+                env_DEEPGRAM_API_KEY_present=bool(os.environ.get("DEEPGRAM_API_KEY")),
+                instance_deepgram_api_key_present=bool(self.deepgram_api_key),
+                instance_deepgram_api_key_value_preview=str(self.deepgram_api_key)[:20] if self.deepgram_api_key else "None",
+                proxy_manager_present=bool(self.proxy_manager),
+                proxy_manager_in_use=self.proxy_manager.in_use if self.proxy_manager else False)
         
         # Diagnostic logging for ASR eligibility (helps debug staging issues)
         asr_enabled = ENABLE_ASR_FALLBACK
@@ -2823,32 +2916,35 @@ class TranscriptService:
             key_var_present=bool(os.environ.get("DEEPGRAM_API_KEY")))
         
         # TRACE: Log exact boolean values before conditional evaluation
-        evt("asr_trace_booleans",
-            video_id=video_id,
-            job_id=job_id,
-            asr_enabled_value=asr_enabled,
-            asr_enabled_type=str(type(asr_enabled)),
-            asr_key_configured_value=asr_key_configured,
-            asr_key_configured_type=str(type(asr_key_configured)),
-            conditional_will_pass=bool(asr_enabled and asr_key_configured))
+        if event_enabled("asr_trace_booleans"):
+            evt("asr_trace_booleans",
+                video_id=video_id,
+                job_id=job_id,
+                asr_enabled_value=asr_enabled,
+                asr_enabled_type=str(type(asr_enabled)),
+                asr_key_configured_value=asr_key_configured,
+                asr_key_configured_type=str(type(asr_key_configured)),
+                conditional_will_pass=bool(asr_enabled and asr_key_configured))
         
         # Step 3 & 4: Guarantee attempt and do not silently skip
         if asr_enabled and asr_key_configured:
             # TRACE: Conditional passed, entering ASR execution block
-            evt("asr_trace_conditional_passed",
-                video_id=video_id,
-                job_id=job_id,
-                about_to_log_method_start=True)
+            if event_enabled("asr_trace_conditional_passed"):
+                evt("asr_trace_conditional_passed",
+                    video_id=video_id,
+                    job_id=job_id,
+                    about_to_log_method_start=True)
             
             try:
                 evt("transcript_method_start", method="asr", video_id=video_id, job_id=job_id)
                 
                 # TRACE: Log ASR extractor instantiation attempt
-                evt("asr_trace_extractor_init_start",
-                    video_id=video_id,
-                    job_id=job_id,
-                    deepgram_key_length=len(self.deepgram_api_key) if self.deepgram_api_key else 0,
-                    proxy_manager_type=str(type(self.proxy_manager)))
+                if event_enabled("asr_trace_extractor_init_start"):
+                    evt("asr_trace_extractor_init_start",
+                        video_id=video_id,
+                        job_id=job_id,
+                        deepgram_key_length=len(self.deepgram_api_key) if self.deepgram_api_key else 0,
+                        proxy_manager_type=str(type(self.proxy_manager)))
                 
                 asr_extractor = ASRAudioExtractor(
                     deepgram_api_key=self.deepgram_api_key,
@@ -2856,12 +2952,14 @@ class TranscriptService:
                 )
                 
                 # TRACE: Extractor instantiation successful
-                evt("asr_trace_extractor_init_success",
-                    video_id=video_id,
-                    job_id=job_id,
-                    extractor_type=str(type(asr_extractor)))
+                if event_enabled("asr_trace_extractor_init_success"):
+                    evt("asr_trace_extractor_init_success",
+                        video_id=video_id,
+                        job_id=job_id,
+                        extractor_type=str(type(asr_extractor)))
                 
-                transcript_text = asr_extractor.extract_transcript(video_id, job_id)
+                with span("method.asr", duration_s=duration_s):
+                    transcript_text = asr_extractor.extract_transcript(video_id, job_id, duration_s=duration_s)
                 
                 if transcript_text and transcript_text.strip():
                     # Convert to segments format
@@ -2880,30 +2978,30 @@ class TranscriptService:
                         error_class="extraction_failed", error="empty_result")
                     
             except Exception as e:
-                # TRACE: Enhanced exception logging with stack trace
-                import traceback
-                stack_trace = traceback.format_exc()
-                
                 error_class = classify_transcript_error(e, video_id, "asr")
                 evt("transcript_method_failed", 
                     method="asr", video_id=video_id, job_id=job_id,
                     error_class=error_class, error=str(e)[:100])
                 
                 # TRACE: Log detailed exception information
-                evt("asr_trace_exception",
-                    video_id=video_id,
-                    job_id=job_id,
-                    exception_type=type(e).__name__,
-                    exception_message=str(e)[:200],
-                    stack_trace_preview=stack_trace[:500])
+                if event_enabled("asr_trace_exception"):
+                    import traceback
+                    stack_trace = traceback.format_exc()
+                    evt("asr_trace_exception",
+                        video_id=video_id,
+                        job_id=job_id,
+                        exception_type=type(e).__name__,
+                        exception_message=str(e)[:200],
+                        stack_trace_preview=stack_trace[:500])
         else:
             # TRACE: Conditional failed, log why
-            evt("asr_trace_conditional_failed",
-                video_id=video_id,
-                job_id=job_id,
-                asr_enabled=asr_enabled,
-                asr_key_configured=asr_key_configured,
-                reason_for_failure="asr_disabled" if not asr_enabled else "no_key" if not asr_key_configured else "unknown")
+            if event_enabled("asr_trace_conditional_failed"):
+                evt("asr_trace_conditional_failed",
+                    video_id=video_id,
+                    job_id=job_id,
+                    asr_enabled=asr_enabled,
+                    asr_key_configured=asr_key_configured,
+                    reason_for_failure="asr_disabled" if not asr_enabled else "no_key" if not asr_key_configured else "unknown")
             
             # Step 4: Explicit skip reason
             if not asr_enabled:
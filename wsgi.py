@@ -9,7 +9,7 @@ import logging
 import sys
 
 # Initialize minimal JSON logging early
-from logging_setup import configure_logging
+from logging_setup import configure_logging, set_async_log_targets
 configure_logging(
     log_level=os.getenv("LOG_LEVEL", "INFO"),
     use_json=os.getenv("USE_MINIMAL_LOGGING", "true").lower() == "true"
@@ -25,7 +25,9 @@ if _guni.handlers:
         for handler in _guni.handlers:
             if formatter:
                 handler.setFormatter(formatter)
-        root_logger.handlers = _guni.handlers
+        # In async mode keep the queue handler and let the writer thread output via gunicorn's handlers
+        if not set_async_log_targets(_guni.handlers):
+            root_logger.handlers = _guni.handlers
         root_logger.setLevel(_guni.level)
 
 ALLOW_MISSING = os.getenv("ALLOW_MISSING_DEPS", "false").lower() == "true"
@@ -50,7 +50,8 @@ class YouTubeDownloadService:
         logger = logging.getLogger(__name__)
         return ProxyManager(secret_data, logger)
     
-    def download_with_ytdlp(self, video_id: str, user_id: Optional[int] = None) -> Dict:
+    def download_with_ytdlp(self, video_id: str, user_id: Optional[int] = None,
+                            job_id: Optional[str] = None) -> Dict:
         """Download video with yt-dlp using validated proxy"""
         correlation_id = generate_correlation_id()
         
@@ -73,7 +74,7 @@ class YouTubeDownloadService:
         
         try:
             # Step 3: Attempt download with proxy
-            result = self._attempt_download(video_id, proxies, user_id, correlation_id)
+            result = self._attempt_download(video_id, proxies, user_id, correlation_id, job_id)
             return result
             
         except Exception as e:
@@ -97,7 +98,7 @@ class YouTubeDownloadService:
                 # Preflight passed - proceed with fresh session
                 try:
                     fresh_proxies = self.proxy_manager.proxies_for(video_id) if self.proxy_manager else {}
-                    result = self._attempt_download(video_id, fresh_proxies, user_id, correlation_id)
+                    result = self._attempt_download(video_id, fresh_proxies, user_id, correlation_id, job_id)
                     return result
                 except Exception as retry_e:
                     logging.error(f"Retry failed for video {video_id}: {retry_e}")
@@ -107,7 +108,8 @@ class YouTubeDownloadService:
             logging.error(f"Download failed for video {video_id}: {e}")
             return {"error": str(e), "correlation_id": correlation_id}
     
-    def _attempt_download(self, video_id: str, proxies: Dict, user_id: Optional[int], correlation_id: str) -> Dict:
+    def _attempt_download(self, video_id: str, proxies: Dict, user_id: Optional[int], correlation_id: str,
+                          job_id: Optional[str] = None) -> Dict:
         """Attempt single download with given proxies"""
         # Fast-fail cookie check
         cookiefile = self._get_valid_cookiefile(user_id)
@@ -127,7 +129,8 @@ class YouTubeDownloadService:
                 proxy_url=proxy_url,
                 ffmpeg_path=os.environ.get('FFMPEG_LOCATION', '/usr/bin/ffmpeg'),
                 cookiefile=cookiefile if cookies_valid else None,
-                user_id=user_id
+                user_id=user_id,
+                job_id=job_id
             )
             
             if audio_path and os.path.exists(audio_path):
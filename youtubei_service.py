@@ -15,7 +15,7 @@ import time
 import logging
 import asyncio
 import xml.etree.ElementTree as ET
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence
 from urllib.parse import urlparse
 
 import httpx
@@ -23,6 +23,7 @@ from playwright.async_api import async_playwright, Page as AsyncPage
 
 from logging_setup import get_logger, set_job_ctx, get_job_ctx
 from log_events import evt
+from tracing import span, traced
 from storage_state_manager import get_storage_state_manager
 from reliability_config import get_reliability_config
 
@@ -69,12 +70,14 @@ class DeterministicYouTubeiCapture:
         # Get storage state manager
         self.storage_manager = get_storage_state_manager()
     
-    async def extract_transcript(self, cookies: Optional[str] = None) -> str:
+    async def extract_transcript(self, cookies: Optional[str] = None,
+                                 playwright_cookies: Optional[Sequence[Dict[str, Any]]] = None) -> str:
         """
         Extract transcript using deterministic YouTubei capture.
         
         Args:
             cookies: Cookie header string (optional)
+            playwright_cookies: The same cookies in context.add_cookies() format (optional)
             
         Returns:
             Transcript text if successful, empty string otherwise
@@ -128,6 +131,17 @@ class DeterministicYouTubeiCapture:
                 )
                 context = await browser.new_context(**context_args)
                 
+                # Load the user's cookies on top of the storage state so the page itself is signed in
+                if playwright_cookies:
+                    try:
+                        await context.add_cookies(list(playwright_cookies))
+                    except Exception as e:
+                        evt("youtubei_add_cookies_failed",
+                            video_id=self.video_id,
+                            job_id=self.job_id,
+                            cookie_count=len(playwright_cookies),
+                            error=str(e)[:200])
+                
                 # Log context opened and increment active count
                 evt("playwright_context_opened", 
                     video_id=self.video_id, 
@@ -168,7 +182,8 @@ class DeterministicYouTubeiCapture:
                         timeout_ms=90000,
                         resource_blocking=True)
                     
-                    await page.goto(desktop_url, wait_until="domcontentloaded", timeout=90000)
+                    with span("youtubei.navigate", variant="desktop"):
+                        await page.goto(desktop_url, wait_until="domcontentloaded", timeout=90000)
                     navigation_success = True
                     navigation_strategy = "desktop_domcontentloaded"
                     
@@ -191,7 +206,8 @@ class DeterministicYouTubeiCapture:
                             timeout_ms=90000,
                             resource_blocking=True)
                         
-                        await page.goto(mobile_url, wait_until="domcontentloaded", timeout=90000)
+                        with span("youtubei.navigate", variant="mobile"):
+                            await page.goto(mobile_url, wait_until="domcontentloaded", timeout=90000)
                         navigation_success = True
                         navigation_strategy = "mobile_domcontentloaded"
                         final_url = mobile_url
@@ -371,6 +387,7 @@ class DeterministicYouTubeiCapture:
                 if browser:
                     await browser.close()
     
+    @traced("youtubei.caption_tracks")
     async def _extract_captions_from_player_response(self, cookies: Optional[str] = None) -> Optional[str]:
         """
         Extract captions directly from ytInitialPlayerResponse without DOM interaction.
@@ -902,6 +919,7 @@ class DeterministicYouTubeiCapture:
             # Graceful degradation: always return without raising exceptions
             return False
 
+    @traced("youtubei.panel_open")
     async def _open_transcript_panel_deterministic(self) -> bool:
         """
         Deterministic sequence to open transcript panel on modern YouTube.
@@ -1247,6 +1265,7 @@ class DeterministicYouTubeiCapture:
                 error=str(e)[:100])
             return False
 
+    @traced("youtubei.panel_open_enhanced")
     async def open_transcript_panel_enhanced(self):
         """Multiple strategies to open transcript panel with better error handling"""
         
@@ -1485,6 +1504,7 @@ class DeterministicYouTubeiCapture:
     
 
     
+    @traced("youtubei.wait_transcript")
     async def _wait_for_transcript_with_fallback(self, cookies: Optional[str] = None) -> Optional[str]:
         """
         Wait for transcript capture with route interception and DOM fallback.
@@ -2134,7 +2154,8 @@ def extract_transcript_with_job_proxy(
     video_id: str,
     job_id: str,
     proxy_manager,
-    cookies: Optional[str] = None
+    cookies: Optional[str] = None,
+    playwright_cookies: Optional[Sequence[Dict[str, Any]]] = None
 ) -> str:
     """
     Extract transcript using YouTubei with job-scoped proxy session.
@@ -2144,13 +2165,14 @@ def extract_transcript_with_job_proxy(
         job_id: Job identifier for sticky proxy session
         proxy_manager: ProxyManager instance
         cookies: Cookie header string (optional)
+        playwright_cookies: The same cookies in context.add_cookies() format (optional)
         
     Returns:
         Transcript text if successful, empty string otherwise
     """
     async def _async_extract():
         capture = DeterministicYouTubeiCapture(job_id, video_id, proxy_manager)
-        return await capture.extract_transcript(cookies)
+        return await capture.extract_transcript(cookies, playwright_cookies)
     
     # Run async extraction with robust event loop handling
     try:
@@ -7,6 +7,9 @@ import random
 from typing import Callable, Dict, Optional, Tuple
 from urllib.parse import urlparse
 
+from logging_setup import get_job_ctx
+from range_downloader import DownloadPolicy, get_job_policy
+
 # NOTE: yt-dlp is not part of the no-yt-dl stack. This module is quarantined.
 # Import lazily and guard calls so importing this file never crashes.
 try:
@@ -177,6 +180,7 @@ def download_audio_with_fallback(
     ffmpeg_path: str = "/usr/bin",
     logger: Optional[Callable[[str], None]] = None,
     cookiefile: Optional[str] = None,
+    download_policy: Optional[DownloadPolicy] = None,
 ) -> str:
     if not _YTDLP_AVAILABLE:
         raise RuntimeError("yt-dlp is not available in this build. The no-yt-dl stack disables this path.")
@@ -185,6 +189,9 @@ def download_audio_with_fallback(
     Step 1: Direct audio download (m4a preferred, no re-encode).
     Step 2 (fallback): Re-encode to mp3 using FFmpegExtractAudio.
     
+    download_policy sets fragment concurrency and bandwidth for the job; without
+    one the conservative single-fragment ~100 KB/s throttle is kept.
+    
     Returns: Path to the downloaded audio file, or raises RuntimeError if both attempts fail.
     """
     log = (logger or (lambda m: None))
@@ -227,13 +234,13 @@ def download_audio_with_fallback(
             }
         },
         # Additional hardening options
-        "concurrent_fragment_downloads": 1,  # Reduce detection risk
+        "concurrent_fragment_downloads": download_policy.connections if download_policy else 1,  # 1 reduces detection risk
         "nopart": True,  # avoid leaving .part files around
         "geo_bypass": False,  # Avoid suspicious behavior patterns
         "ffmpeg_location": ffmpeg_path,
         "forceipv4": True,  # Some pools/targets behave better over IPv4
         "http_chunk_size": 10485760,  # 10 MB chunks
-        "ratelimit": 100000,  # ~100 KB/s intentional rate limiting
+        "ratelimit": (download_policy.max_bytes_per_sec or None) if download_policy else 100000,  # ~100 KB/s intentional rate limiting by default
         "restrictfilenames": True,  # Avoid surprise characters in temp names
         # Let service logs show details; don't silence warnings entirely
         "quiet": False,
@@ -392,6 +399,8 @@ def download_audio_with_retry(
     logger: Optional[Callable[[str], None]] = None,
     cookiefile: Optional[str] = None,
     user_id: Optional[int] = None,
+    download_policy: Optional[DownloadPolicy] = None,
+    job_id: Optional[str] = None,
 ) -> str:
     if not _YTDLP_AVAILABLE:
         raise RuntimeError("yt-dlp is not available in this build. The no-yt-dl stack disables this path.")
@@ -403,10 +412,19 @@ def download_audio_with_retry(
     2. Mandatory retry: Always retry without cookies on ANY extraction failure (even with fresh cookies)
     3. Fail gracefully with "consider updating yt-dlp" message
     
+    Without download_policy, the policy registered for job_id (default: the
+    current thread's job) applies, so yt-dlp honours the same per-job limits
+    as the Range downloader.
+    
     Returns: Path to downloaded audio file, or raises RuntimeError with detailed error info.
     """
     log = (logger or (lambda m: None))
     
+    if download_policy is None:
+        job_id = job_id or get_job_ctx().get("job_id")
+        if job_id:
+            download_policy = get_job_policy(job_id)
+    
     # Check environment disable flag
     cookies_disabled = os.getenv('DISABLE_COOKIES', 'false').lower() == 'true'
     
@@ -432,7 +450,8 @@ def download_audio_with_retry(
     
     try:
         return download_audio_with_fallback(
-            video_url, ua, proxy_url, ffmpeg_path, logger, attempt_cookiefile
+            video_url, ua, proxy_url, ffmpeg_path, logger, attempt_cookiefile,
+            download_policy=download_policy
         )
     except RuntimeError as e:
         error_text = str(e)
@@ -469,7 +488,8 @@ def download_audio_with_retry(
             
             try:
                 return download_audio_with_fallback(
-                    video_url, ua, proxy_url, ffmpeg_path, logger, cookiefile=None
+                    video_url, ua, proxy_url, ffmpeg_path, logger, cookiefile=None,
+                    download_policy=download_policy
                 )
             except RuntimeError as e2:
                 error_text2 = str(e2)
@@ -9,6 +9,7 @@ Features:
 - Fail_class error categorization
 - Comprehensive logging via evt()
 - Kill-switches for safety (DISABLE_YTDLP, ASR_AUDIO_EXTRACTOR)
+- Resolved URLs cached per (video_id, proxy session) until googlevideo expiry
 """
 
 import os
@@ -19,6 +20,7 @@ from urllib.parse import urlparse
 # Import structured logging
 from log_events import evt
 from logging_setup import get_logger
+from audio_url_cache import get_audio_url_cache, proxy_session_key, video_id_from_url
 
 logger = get_logger(__name__)
 
@@ -272,6 +274,14 @@ def extract_best_audio_url(
             "proxy_profile": None
         }
     
+    # Reuse a previously resolved URL for this video and proxy session
+    url_cache = get_audio_url_cache()
+    video_id = video_id_from_url(youtube_url)
+    session_key = proxy_session_key(proxy_manager, job_id)
+    cached = url_cache.get(video_id, session_key, "yt_dlp")
+    if cached is not None:
+        return dict(cached.metadata, url=cached.url, cached=True)
+    
     # Configure yt-dlp options
     ydl_opts = {
         'quiet': True,
@@ -330,6 +340,7 @@ def extract_best_audio_url(
                 proxy_enabled=proxy_enabled,
                 **proxy_info)
             
+            url_cache.put(video_id, session_key, "yt_dlp", audio_url, metadata=result)
             return result
             
     except Exception as e: